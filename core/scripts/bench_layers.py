@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+"""
+Benchmark serial vs. layer-parallel evaluation on wide flow graphs.
+
+Each graph is a root node, WIDTH independent nodes (one layer) with a
+filter and a validator over EVENTS events each, and a join node. Every
+run is evaluated serially and with the nodes of each layer on a thread
+pool, and both results are checked to be identical.
+
+Speedups need a free-threaded build (e.g. python3.14t); with the GIL the
+threads take turns and the parallel mode only adds overhead.
+
+Usage (from core/):
+    PYTHONPATH=. python scripts/bench_layers.py --widths 8 32 128 --threads 8
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any
+
+from src.domain.evaluation import match_events_to_layers, validate_flow_execution
+from src.domain.graph import build_flow_graph, topological_sort_layers
+from src.domain.types import ValidationResult
+from src.eval.eval import MultiEvaluator
+from src.models import Event, Expr, Node
+
+# CPU-bound enough per event for the evaluation to dominate scheduling
+FILTER = "sum(x * x for x in data['values']) % 7 != 0"
+VALIDATOR = "max(data['values']) - min(data['values']) < ctx['data']['limit']"
+
+
+def build_flow(width: int, events: int) -> tuple[list[Node], list[Event]]:
+    """Nodes and events of a run through a flow with one wide layer."""
+    nodes = [Node(id="root", flow="bench", type="act")]
+    run: list[Event] = [
+        Event(
+            id="root_ev",
+            run_id="run",
+            flow="bench",
+            node_id="root",
+            data={"limit": 500},
+            ts=0,
+        )
+    ]
+
+    for i in range(width):
+        node_id = f"node_{i}"
+        nodes.append(
+            Node(
+                id=node_id,
+                flow="bench",
+                type="act",
+                dep_ids=["root"],
+                filter=Expr(engine="python", script=FILTER),
+                validator=Expr(engine="python", script=VALIDATOR),
+            )
+        )
+        run.extend(
+            Event(
+                id=f"{node_id}_{n}",
+                run_id="run",
+                flow="bench",
+                node_id=node_id,
+                data={"values": list(range(n, n + 200))},
+                ts=n + 1,
+            )
+            for n in range(events)
+        )
+
+    nodes.append(
+        Node(
+            id="join",
+            flow="bench",
+            type="act",
+            dep_ids=[f"node_{i}" for i in range(width)],
+        )
+    )
+    return nodes, run
+
+
+def evaluate(
+    nodes: list[Node],
+    events: list[Event],
+    evaluator: MultiEvaluator,
+    executor: Executor | None,
+) -> ValidationResult:
+    flow_graph = build_flow_graph(nodes)
+    layers = topological_sort_layers(flow_graph["graph"])
+    matched = match_events_to_layers(
+        events, layers, flow_graph["nodes"], evaluator, executor
+    )
+    return validate_flow_execution(
+        matched, flow_graph["nodes"], layers, evaluator, executor
+    )
+
+
+def comparable(result: ValidationResult) -> dict[str, Any]:
+    """Validation result without timing fields."""
+    return {
+        **result,
+        "elapsed_ns": 0,
+        "items": [{**item, "elapsed_ns": 0} for item in result["items"]],
+    }
+
+
+def timed(
+    nodes: list[Node],
+    events: list[Event],
+    evaluator: MultiEvaluator,
+    executor: Executor | None,
+    repeat: int,
+) -> tuple[float, ValidationResult]:
+    """Median wall time (ms) of ``repeat`` evaluations, and the last result."""
+    samples: list[float] = []
+    result = evaluate(nodes, events, evaluator, executor)  # warm up caches
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = evaluate(nodes, events, evaluator, executor)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--widths", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--events", type=int, default=20, help="Events per node")
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    gil = "enabled" if getattr(sys, "_is_gil_enabled", lambda: True)() else "disabled"
+    print(f"Python {sys.version.split()[0]}, GIL {gil}")
+    print(f"{args.threads} threads, {args.events} events per node\n")
+    print(f"{'width':>6} {'serial ms':>10} {'parallel ms':>12} {'speedup':>8}")
+
+    # Expressions built outside of a flow plan are never memoized, so every
+    # repetition evaluates them again
+    evaluator = MultiEvaluator(native=False)
+
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        for width in args.widths:
+            nodes, events = build_flow(width, args.events)
+            serial_ms, serial = timed(nodes, events, evaluator, None, args.repeat)
+            parallel_ms, parallel = timed(
+                nodes, events, evaluator, executor, args.repeat
+            )
+
+            if comparable(serial) != comparable(parallel):
+                sys.exit(f"width={width}: parallel result differs from serial")
+
+            print(
+                f"{width:>6} {serial_ms:>10.1f} {parallel_ms:>12.1f} "
+                f"{serial_ms / parallel_ms:>7.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,46 @@ This module encapsulates all SQLite-specific queries, making it easy to
 swap out for a different storage backend at desplega.ai.
 """
 
+from collections.abc import AsyncIterator
+from datetime import datetime
+
+from sqlalchemy import bindparam, insert, or_, text
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlmodel import asc, select
+from sqlalchemy.sql.elements import BindParameter
+from sqlmodel import asc, col, delete, func, select, update
+
+from src.models import EvalDeadline, EvalOutput, EvalStatus, Event, LatestRunState, Node
+from src.utils.time import now
+
+# Max number of IDs bound in a single IN (...) clause
+IDS_PER_QUERY = 500
+
+# Max number of nodes upserted by a single INSERT ... ON CONFLICT
+NODES_PER_UPSERT = 500
+
+# Max number of run states upserted by a single INSERT ... ON CONFLICT
+RUN_STATES_PER_UPSERT = 500
 
-from src.models import Event, Node
+# Node fields set by the SDKs (covered by Node.fingerprint)
+_CODE_NODE_FIELDS = (
+    "type",
+    "description",
+    "dep_ids",
+    "validator",
+    "filter",
+    "conditions",
+    "additional_meta",
+)
+
+
+def literal_statuses(statuses: list[EvalStatus]) -> BindParameter[list[str]]:
+    """Statuses to filter by, rendered inline.
+
+    SQLite only uses a partial index (e.g. over unsettled statuses) when the
+    query repeats its predicate with the same literals, not bound parameters.
+    """
+    return bindparam("statuses", list(statuses), expanding=True, literal_execute=True)
 
 
 class SqliteEventStorage:
@@ -64,6 +100,314 @@ class SqliteEventStorage:
         )
         return list(result.scalars().all())
 
+    async def count_events_by_run(
+        self,
+        run_id: str,
+        flow: str,
+        session: AsyncSession,
+    ) -> int:
+        """Count the events of a run_id + flow tuple.
+
+        Args:
+            run_id: Run identifier
+            flow: Flow identifier
+            session: Database session
+
+        Returns:
+            Number of events
+        """
+        result = await session.execute(
+            select(func.count()).where(
+                Event.run_id == run_id,
+                Event.flow == flow,
+            )
+        )
+        return int(result.scalar_one())
+
+    async def count_events_by_runs(
+        self,
+        run_ids: list[str],
+        flow: str,
+        session: AsyncSession,
+    ) -> dict[str, int]:
+        """Count the events of many runs of a flow.
+
+        Args:
+            run_ids: Run identifiers
+            flow: Flow identifier
+            session: Database session
+
+        Returns:
+            Map of run_id -> number of events. Runs without events are not
+            included.
+        """
+        counts: dict[str, int] = {}
+        unique_run_ids = list(dict.fromkeys(run_ids))
+
+        for start in range(0, len(unique_run_ids), IDS_PER_QUERY):
+            chunk = unique_run_ids[start : start + IDS_PER_QUERY]
+            result = await session.execute(
+                select(Event.run_id, func.count())
+                .where(
+                    Event.run_id.in_(chunk),  # type: ignore
+                    Event.flow == flow,
+                )
+                .group_by(Event.run_id)
+            )
+            for run_id, count in result.all():
+                counts[run_id] = int(count)
+
+        return counts
+
+    async def stream_events_by_run(
+        self,
+        run_id: str,
+        flow: str,
+        node_ids: list[str],
+        chunk_size: int,
+        session: AsyncSession,
+    ) -> AsyncIterator[list[Event]]:
+        """Read the events of some nodes of a run in chunks.
+
+        Rows are fetched from a server-side cursor as the chunks are
+        consumed, so only one chunk is loaded at a time. Nodes are queried
+        in chunks of IDS_PER_QUERY: events are in timestamp order per node,
+        not across chunks of nodes.
+
+        Args:
+            run_id: Run identifier
+            flow: Flow identifier
+            node_ids: Nodes whose events are read
+            chunk_size: Max number of events per chunk
+            session: Database session
+
+        Yields:
+            Lists of events, ordered by timestamp (oldest first) per node
+        """
+        for start in range(0, len(node_ids), IDS_PER_QUERY):
+            result = await session.stream_scalars(
+                select(Event)
+                .where(
+                    Event.run_id == run_id,
+                    Event.flow == flow,
+                    col(Event.node_id).in_(node_ids[start : start + IDS_PER_QUERY]),
+                )
+                .order_by(asc(Event.ts))
+                .execution_options(yield_per=chunk_size)
+            )
+            try:
+                async for chunk in result.partitions():
+                    yield list(chunk)
+            finally:
+                await result.close()
+
+    async def get_events_by_runs(
+        self,
+        run_ids: list[str],
+        flow: str,
+        session: AsyncSession,
+    ) -> dict[str, list[Event]]:
+        """Fetch all events for many runs of a flow.
+
+        Runs are queried in chunks of IDS_PER_QUERY to stay within the
+        bound-parameter limits of the database.
+
+        Args:
+            run_ids: Run identifiers
+            flow: Flow identifier
+            session: Database session
+
+        Returns:
+            Map of run_id -> events ordered by timestamp (oldest first).
+            Runs without events are not included.
+        """
+        events_by_run: dict[str, list[Event]] = {}
+        unique_run_ids = list(dict.fromkeys(run_ids))
+
+        for start in range(0, len(unique_run_ids), IDS_PER_QUERY):
+            chunk = unique_run_ids[start : start + IDS_PER_QUERY]
+            result = await session.execute(
+                select(Event)
+                .where(
+                    Event.run_id.in_(chunk),  # type: ignore
+                    Event.flow == flow,
+                )
+                .order_by(asc(Event.ts))
+            )
+            for event in result.scalars().all():
+                events_by_run.setdefault(event.run_id, []).append(event)
+
+        return events_by_run
+
+    async def get_event_ids_by_run(
+        self,
+        run_id: str,
+        flow: str,
+        session: AsyncSession,
+    ) -> list[str]:
+        """Fetch the IDs of all events for a run_id + flow tuple.
+
+        Much cheaper than loading the events themselves, and used to find
+        which events an incremental evaluation has not seen yet.
+
+        Args:
+            run_id: Run identifier
+            flow: Flow identifier
+            session: Database session
+
+        Returns:
+            List of event IDs
+        """
+        result = await session.execute(
+            select(Event.id).where(
+                Event.run_id == run_id,
+                Event.flow == flow,
+            )
+        )
+        return list(result.scalars().all())
+
+    async def get_event_ids_by_runs(
+        self,
+        run_ids: list[str],
+        flow: str,
+        session: AsyncSession,
+    ) -> dict[str, set[str]]:
+        """Fetch the IDs of all events for many runs of a flow.
+
+        Args:
+            run_ids: Run identifiers
+            flow: Flow identifier
+            session: Database session
+
+        Returns:
+            Map of run_id -> event IDs. Runs without events are not included.
+        """
+        ids_by_run: dict[str, set[str]] = {}
+        unique_run_ids = list(dict.fromkeys(run_ids))
+
+        for start in range(0, len(unique_run_ids), IDS_PER_QUERY):
+            chunk = unique_run_ids[start : start + IDS_PER_QUERY]
+            result = await session.execute(
+                select(Event.run_id, Event.id).where(
+                    Event.run_id.in_(chunk),  # type: ignore
+                    Event.flow == flow,
+                )
+            )
+            for run_id, event_id in result.all():
+                ids_by_run.setdefault(run_id, set()).add(event_id)
+
+        return ids_by_run
+
+    async def get_recent_run_ids(
+        self,
+        flow: str,
+        limit: int,
+        session: AsyncSession,
+    ) -> list[str]:
+        """Fetch the IDs of the most recent runs of a flow.
+
+        Args:
+            flow: Flow identifier
+            limit: Max number of runs
+            session: Database session
+
+        Returns:
+            Run IDs, most recent (by latest event) first
+        """
+        result = await session.execute(
+            select(Event.run_id)
+            .where(Event.flow == flow)
+            .group_by(Event.run_id)
+            .order_by(func.max(Event.ts).desc())
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def get_events_by_ids(
+        self,
+        event_ids: list[str],
+        session: AsyncSession,
+    ) -> list[Event]:
+        """Fetch events by ID.
+
+        Args:
+            event_ids: Event identifiers
+            session: Database session
+
+        Returns:
+            List of events, ordered by timestamp (oldest first)
+        """
+        events: list[Event] = []
+
+        for start in range(0, len(event_ids), IDS_PER_QUERY):
+            result = await session.execute(
+                select(Event).where(
+                    Event.id.in_(event_ids[start : start + IDS_PER_QUERY])  # type: ignore
+                )
+            )
+            events.extend(result.scalars().all())
+
+        events.sort(key=lambda event: event.ts)
+        return events
+
+    async def cluster_events(self, session: AsyncSession) -> int:
+        """Rewrite the event table in (run_id, flow, ts, id) order.
+
+        Evaluating a run then reads a few contiguous pages however large the
+        table gets. Rows written afterwards are not kept in order, so this
+        is run from time to time (``business-use db cluster-events``); it
+        locks the table while it runs. The schema is left unchanged.
+
+        Args:
+            session: Database session (committed by the caller)
+
+        Returns:
+            Number of events rewritten
+        """
+        columns = "id, run_id, type, flow, node_id, data, ts"
+        order = "ORDER BY run_id, flow, ts, id"
+
+        if session.get_bind().dialect.name == "postgresql":
+            await session.execute(text("CLUSTER event USING idx_event_run_id_flow_ts"))
+            await session.execute(text("ANALYZE event"))
+        else:
+            # Rows are stored in rowid order, assigned in insertion order
+            await session.execute(
+                text(
+                    f"CREATE TEMP TABLE event_clustered AS "
+                    f"SELECT {columns} FROM event {order}"
+                )
+            )
+            await session.execute(text("DELETE FROM event"))
+            await session.execute(
+                text(
+                    f"INSERT INTO event ({columns}) "
+                    f"SELECT {columns} FROM event_clustered {order}"
+                )
+            )
+            await session.execute(text("DROP TABLE event_clustered"))
+
+        result = await session.execute(select(func.count()).select_from(Event))
+        return int(result.scalar_one())
+
+    async def insert_events(
+        self,
+        events: list[Event],
+        session: AsyncSession,
+    ) -> None:
+        """Insert new events with multi-row INSERTs.
+
+        Does not commit.
+
+        Args:
+            events: Events to insert
+            session: Database session
+        """
+        if events:
+            await session.execute(
+                insert(Event), [event.model_dump() for event in events]
+            )
+
     async def get_nodes_by_flow(
         self,
         flow: str,
@@ -86,6 +430,36 @@ class SqliteEventStorage:
         )
         return list(result.scalars().all())
 
+    async def get_node_definitions_token(
+        self,
+        flow: str,
+        session: AsyncSession,
+    ) -> tuple[int, datetime | None, datetime | None]:
+        """Fetch a cheap token that changes whenever a flow's nodes change.
+
+        Every node write sets created_at or updated_at, and deletes change
+        the number of active nodes.
+
+        Args:
+            flow: Flow identifier
+            session: Database session
+
+        Returns:
+            Tuple of (active node count, max created_at, max updated_at)
+        """
+        result = await session.execute(
+            select(
+                func.count(),
+                func.max(Node.created_at),
+                func.max(Node.updated_at),
+            ).where(
+                Node.flow == flow,
+                Node.deleted_at.is_(None),  # type: ignore
+            )
+        )
+        count, max_created_at, max_updated_at = result.one()
+        return count, max_created_at, max_updated_at
+
     async def get_all_nodes(
         self,
         session: AsyncSession,
@@ -104,3 +478,273 @@ class SqliteEventStorage:
             )
         )
         return list(result.scalars().all())
+
+    async def upsert_code_nodes(
+        self,
+        nodes: list[Node],
+        session: AsyncSession,
+    ) -> set[str]:
+        """Create or update nodes reported by the SDKs, in a few statements.
+
+        Existing "code" and "scan" nodes take the SDK definition ("scan"
+        nodes only have metadata); "manual" nodes, edited in the UI, are
+        left alone. "code" nodes with the same fingerprint are not written.
+
+        Does not commit.
+
+        Args:
+            nodes: Nodes with source "code" and their fingerprint, one per ID
+            session: Database session
+
+        Returns:
+            Flows with a node created or changed
+
+        Raises:
+            ValueError: If a node has no fingerprint
+        """
+        if any(node.fingerprint is None for node in nodes):
+            raise ValueError("Nodes must have a fingerprint to be upserted")
+
+        insert_node = (
+            postgresql.insert
+            if session.get_bind().dialect.name == "postgresql"
+            else sqlite.insert
+        )
+        changed_flows: set[str] = set()
+
+        for i in range(0, len(nodes), NODES_PER_UPSERT):
+            stmt = insert_node(Node).values(
+                [node.model_dump() for node in nodes[i : i + NODES_PER_UPSERT]]
+            )
+            excluded = stmt.excluded
+            upsert = stmt.on_conflict_do_update(
+                index_elements=[col(Node.id)],
+                set_={
+                    **{field: excluded[field] for field in _CODE_NODE_FIELDS},
+                    "fingerprint": excluded["fingerprint"],
+                    "source": "code",
+                    "updated_at": now(),
+                },
+                where=col(Node.source).in_(("code", "scan"))
+                & or_(
+                    col(Node.source) != "code",
+                    col(Node.fingerprint).is_distinct_from(excluded["fingerprint"]),
+                ),
+            ).returning(col(Node.flow))
+
+            result = await session.execute(upsert)
+            changed_flows.update(result.scalars())
+
+        return changed_flows
+
+    async def save_eval_outputs(
+        self,
+        outputs: list[EvalOutput],
+        session: AsyncSession,
+    ) -> None:
+        """Store evaluations of whole runs and make them their runs' state.
+
+        Does not commit.
+
+        Args:
+            outputs: Evaluation results, at most one per run
+            session: Database session
+        """
+        session.add_all(outputs)
+        await self.upsert_run_states(
+            [
+                LatestRunState(
+                    flow=output.flow,
+                    run_id=output.run_id,
+                    status=output.output.status,
+                    last_eval_at=output.created_at,
+                    deadline_ns=output.output.deadline_ns,
+                    last_output_id=output.id,
+                )
+                for output in outputs
+                if output.run_id is not None
+            ],
+            session,
+        )
+
+    async def upsert_run_states(
+        self,
+        states: list[LatestRunState],
+        session: AsyncSession,
+    ) -> None:
+        """Create or update the latest state of runs.
+
+        A state older than the stored one (a slower concurrent evaluation)
+        is ignored. Does not commit.
+
+        Args:
+            states: Run states, at most one per run
+            session: Database session
+        """
+        insert_state = (
+            postgresql.insert
+            if session.get_bind().dialect.name == "postgresql"
+            else sqlite.insert
+        )
+
+        for i in range(0, len(states), RUN_STATES_PER_UPSERT):
+            stmt = insert_state(LatestRunState).values(
+                [state.model_dump() for state in states[i : i + RUN_STATES_PER_UPSERT]]
+            )
+            excluded = stmt.excluded
+            await session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[
+                        col(LatestRunState.flow),
+                        col(LatestRunState.run_id),
+                    ],
+                    set_={
+                        field: excluded[field]
+                        for field in (
+                            "status",
+                            "last_eval_at",
+                            "deadline_ns",
+                            "last_output_id",
+                        )
+                    },
+                    where=col(LatestRunState.last_eval_at) <= excluded["last_eval_at"],
+                )
+            )
+
+    async def get_run_states(
+        self,
+        session: AsyncSession,
+        statuses: list[EvalStatus] | None = None,
+        since: datetime | None = None,
+    ) -> list[LatestRunState]:
+        """Fetch the state of runs, most recently evaluated first.
+
+        Args:
+            session: Database session
+            statuses: Only runs whose latest evaluation has one of these
+            since: Only runs evaluated since then
+
+        Returns:
+            List of LatestRunState rows
+        """
+        stmt = select(LatestRunState)
+        if statuses is not None:
+            stmt = stmt.where(
+                col(LatestRunState.status).in_(literal_statuses(statuses))
+            )
+        if since is not None:
+            stmt = stmt.where(col(LatestRunState.last_eval_at) >= since)
+
+        result = await session.execute(
+            stmt.order_by(col(LatestRunState.last_eval_at).desc())
+        )
+        return list(result.scalars().all())
+
+    async def get_eval_outputs_by_ids(
+        self,
+        output_ids: list[str],
+        session: AsyncSession,
+    ) -> list[EvalOutput]:
+        """Fetch evaluation results by ID, in chunks.
+
+        Args:
+            output_ids: EvalOutput identifiers
+            session: Database session
+
+        Returns:
+            List of EvalOutput rows (unordered)
+        """
+        outputs: list[EvalOutput] = []
+
+        for i in range(0, len(output_ids), IDS_PER_QUERY):
+            result = await session.execute(
+                select(EvalOutput).where(
+                    col(EvalOutput.id).in_(output_ids[i : i + IDS_PER_QUERY])
+                )
+            )
+            outputs.extend(result.scalars().all())
+
+        return outputs
+
+    async def get_deadlines(
+        self,
+        session: AsyncSession,
+    ) -> list[EvalDeadline]:
+        """Fetch every pending run deadline, earliest first.
+
+        Args:
+            session: Database session
+
+        Returns:
+            List of EvalDeadline rows
+        """
+        result = await session.execute(
+            select(EvalDeadline).order_by(asc(EvalDeadline.deadline_ns))
+        )
+        return list(result.scalars().all())
+
+    async def save_deadlines(
+        self,
+        flow: str,
+        deadlines: dict[str, int | None],
+        session: AsyncSession,
+    ) -> None:
+        """Set or clear the deadlines of runs of a flow.
+
+        Does not commit.
+
+        Args:
+            flow: Flow identifier
+            deadlines: Map of run_id -> deadline (ns), None to clear it
+            session: Database session
+        """
+        cleared = [run_id for run_id, deadline in deadlines.items() if deadline is None]
+
+        for i in range(0, len(cleared), IDS_PER_QUERY):
+            await session.execute(
+                delete(EvalDeadline).where(
+                    col(EvalDeadline.flow) == flow,
+                    col(EvalDeadline.run_id).in_(cleared[i : i + IDS_PER_QUERY]),
+                )
+            )
+
+        for run_id, deadline in deadlines.items():
+            if deadline is not None:
+                await session.merge(
+                    EvalDeadline(flow=flow, run_id=run_id, deadline_ns=deadline)
+                )
+
+    async def claim_deadline(
+        self,
+        flow: str,
+        run_id: str,
+        deadline_ns: int,
+        lease_ns: int,
+        session: AsyncSession,
+    ) -> bool:
+        """Atomically move a due deadline forward to ``lease_ns``.
+
+        Only one process can claim a given deadline: it fails if the row
+        was claimed, rescheduled or cleared in the meantime. Does not
+        commit.
+
+        Args:
+            flow: Flow identifier
+            run_id: Run identifier
+            deadline_ns: Deadline the caller expects to be stored
+            lease_ns: New deadline, used as retry if the claimer dies
+            session: Database session
+
+        Returns:
+            True if this call claimed the deadline
+        """
+        result = await session.execute(
+            update(EvalDeadline)
+            .where(
+                col(EvalDeadline.flow) == flow,
+                col(EvalDeadline.run_id) == run_id,
+                col(EvalDeadline.deadline_ns) == deadline_ns,
+            )
+            .values(deadline_ns=lease_ns)
+        )
+        return bool(result.rowcount == 1)  # type: ignore[attr-defined]
@@ -13,10 +13,16 @@ from sqlalchemy import desc
 from sqlmodel import select
 
 from src import __version__
+from src.adapters.sqlite import SqliteEventStorage, literal_statuses
 from src.api.middlewares import ensure_api_key
 from src.api.models import (
+    BudgetResponse,
+    CoalescingResponse,
     EvalInput,
     EventBatchItem,
+    ExpressionBudget,
+    ExpressionProfileItem,
+    ExpressionProfileResponse,
     HealthResponse,
     NodeCreateSchema,
     NodeUpdateSchema,
@@ -26,13 +32,26 @@ from src.api.models import (
     ScanUploadResponse,
     SuccessResponse,
 )
+from src.config import FLOW_BUDGETS
 from src.db.transactional import transactional
-from src.events.handlers import new_bus
+from src.domain.streaming import EvalMemoryExceeded
+from src.eval.executor import EvalQueueFullError, get_eval_executor
+from src.eval.fingerprints import get_node_fingerprint_cache
+from src.eval.plan import get_flow_plan_cache, node_fingerprint
+from src.eval.singleflight import get_eval_flights
+from src.events.handlers import handle_due_deadlines, new_bus
 from src.events.models import NewBatchEvent
+from src.events.scheduler import get_deadline_scheduler
+from src.execution.budget import DEFAULT_BUDGET, flow_budget, get_budget_metrics
+from src.execution.profiling import get_expr_profiler
 from src.models import (
+    UNSETTLED_EVAL_STATUSES,
     BaseEvalOutput,
     EvalOutput,
+    EvalPolicy,
+    EvalStatus,
     Event,
+    LatestRunState,
     Node,
 )
 from src.notifications import build_dispatcher, get_dispatcher
@@ -71,29 +90,52 @@ async def get_eval_outputs(
     _: Annotated[None, Depends(ensure_api_key)],
     name: Annotated[list[str] | None, Query()] = None,
     ev_id: str | None = None,
+    eval_status: Annotated[list[EvalStatus] | None, Query()] = None,
+    latest: bool = False,
     limit: int = 100,
     offset: int = 0,
 ):
+    """List evaluation results, most recent first.
+
+    With ``latest``, only the latest evaluation of each run is listed (from
+    the run states), ordered by when the run was last evaluated.
+    ``eval_status`` filters by the status of the evaluation.
+    """
     async with transactional() as s:
         _s = select(EvalOutput)
 
+        if latest:
+            _s = _s.join(
+                LatestRunState,
+                LatestRunState.last_output_id == EvalOutput.id,  # type: ignore[arg-type]
+            )
+
         if name:
             _s = _s.where(EvalOutput.flow.in_(name))  # type: ignore
 
         if ev_id:
             _s = _s.where(EvalOutput.trigger_ev_id == ev_id)
 
+        if eval_status:
+            _s = _s.where(
+                EvalOutput.eval_status.in_(literal_statuses(eval_status))  # type: ignore
+            )
+
         _s = (
             _s.offset(offset)
             .limit(limit)
             .order_by(
-                desc(EvalOutput.created_at)  # type: ignore
+                desc(LatestRunState.last_eval_at if latest else EvalOutput.created_at)  # type: ignore
             )
         )
 
         outs = await s.execute(_s)
         outs = outs.scalars().all()
 
+    # Ensure output dicts are converted to objects
+    for out in outs:
+        out.ensure()
+
     return outs
 
 
@@ -102,17 +144,22 @@ async def persist_events_batch(
     _: Annotated[None, Depends(ensure_api_key)],
     request: Request,
     body: list[EventBatchItem],
+    policy: EvalPolicy | None = None,
 ):
-    ids: list[str] = []
-
-    # NOTE
-    # This is not optimal for large batches, and it's intended to be
-    # used locally for now.
-    async with transactional() as s:
-        nodes: list[Node] = []
+    """Store a batch of events and their nodes, then evaluate their runs.
 
-        for item in body:
-            ev = Event(
+    The optional ``policy`` query parameter selects the evaluation policy
+    of the runs ("full", "fail_fast" or "fail_fast_branch"; by default,
+    eval_policy from the config).
+    """
+    storage = SqliteEventStorage()
+    events: list[Event] = []
+    # Each batch re-sends the node of every event: keep the last definition
+    nodes: dict[str, Node] = {}
+
+    for item in body:
+        events.append(
+            Event(
                 id=str(uuid4()),
                 flow=item.flow,
                 node_id=item.id,
@@ -121,55 +168,46 @@ async def persist_events_batch(
                 data=item.data,
                 ts=item.ts,
             )
+        )
 
-            ids.append(ev.id)
-            s.add(ev)
-
-            nodes.append(
-                Node(
-                    id=item.id,
-                    flow=item.flow,
-                    type=item.type,
-                    source="code",
-                    description=item.description,
-                    dep_ids=item.dep_ids or [],
-                    validator=item.validator,
-                    filter=item.filter,
-                    conditions=[],
-                    additional_meta=None,
-                    created_at=now(),
-                )
-            )
+        node = Node(
+            id=item.id,
+            flow=item.flow,
+            type=item.type,
+            source="code",
+            description=item.description,
+            dep_ids=item.dep_ids or [],
+            validator=item.validator,
+            filter=item.filter,
+            conditions=[],
+            additional_meta=None,
+            created_at=now(),
+        )
+        node.fingerprint = node_fingerprint(node)
+        nodes[item.id] = node
 
-        # Upsert nodes - but don't overwrite user-edited fields
-        for node in nodes:
-            existing_node = await s.get(Node, node.id)
-
-            if existing_node:
-                # SDK events upgrade both "code" and "scan" nodes.
-                # "scan" nodes only have metadata (has_validator bool) — SDK
-                # provides the real serialized validators, so it takes precedence.
-                # Only "manual" (user-edited in UI) nodes are protected.
-                if existing_node.source in ("code", "scan"):
-                    existing_node.source = "code"
-                    existing_node.type = node.type
-                    existing_node.description = node.description
-                    existing_node.dep_ids = node.dep_ids
-                    existing_node.validator = node.validator
-                    existing_node.filter = node.filter
-                    existing_node.conditions = node.conditions
-                    existing_node.additional_meta = node.additional_meta
-                    existing_node.updated_at = now()
-                    await s.merge(existing_node)
-                # If source is "manual", don't update - user has edited in UI
+    # Definitions this process stored recently don't need an upsert
+    fingerprints = get_node_fingerprint_cache()
+    stale_nodes = fingerprints.stale(list(nodes.values()))
+    changed_flows: set[str] = set()
 
-            else:
-                s.add(node)
+    async with transactional() as s:
+        await storage.insert_events(events, s)
+        # SDK events upgrade both "code" and "scan" nodes. "scan" nodes only
+        # have metadata (has_validator bool) — SDK provides the real
+        # serialized validators, so it takes precedence. Only "manual"
+        # (user-edited in UI) nodes are protected. Unchanged nodes aren't
+        # written (and don't invalidate their flow's plan).
+        if stale_nodes:
+            changed_flows = await storage.upsert_code_nodes(stale_nodes, s)
+
+    get_flow_plan_cache().invalidate(*changed_flows)
+    fingerprints.store(stale_nodes)
 
     b: EventBus = request.state.bus
 
     # Notify new batch of events
-    b.dispatch(NewBatchEvent(ev_ids=ids))
+    b.dispatch(NewBatchEvent(ev_ids=[event.id for event in events], policy=policy))
 
     return SuccessResponse(
         message="Ok",
@@ -219,16 +257,27 @@ async def run_eval(
     - run_id: Run identifier
     - flow: Flow identifier
     - start_node_id: Optional node to start from (for subgraph eval)
+    - streaming: Optional, stream the run's events instead of loading them
+      all (by default, for runs with streaming_eval_min_events events)
+    - policy: Optional, "full", "fail_fast" or "fail_fast_branch" (by
+      default, eval_policy from the config)
 
     Results are automatically persisted to the database.
     """
     from src.eval import eval_flow_run
 
-    result = await eval_flow_run(
-        run_id=body.run_id,
-        flow=body.flow,
-        start_node_id=body.start_node_id,
-    )
+    try:
+        result = await eval_flow_run(
+            run_id=body.run_id,
+            flow=body.flow,
+            start_node_id=body.start_node_id,
+            streaming=body.streaming,
+            policy=body.policy,
+        )
+    except EvalQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
+    except EvalMemoryExceeded as e:
+        raise HTTPException(status_code=422, detail=str(e)) from e
 
     # Persist evaluation result to database
     async with transactional() as session:
@@ -242,7 +291,14 @@ async def run_eval(
             status="active",
         )
 
-        session.add(eval_output)
+        # Subgraph results don't cover the whole run
+        if body.start_node_id:
+            session.add(eval_output)
+        else:
+            await SqliteEventStorage().save_eval_outputs([eval_output], session)
+            await get_deadline_scheduler().schedule(
+                body.flow, {body.run_id: result.deadline_ns}, session
+            )
         await session.commit()
 
     if result.status == "failed":
@@ -259,12 +315,16 @@ async def reeval_running_flows(
 ):
     """Re-evaluate flows in 'running' or 'failed' state.
 
-    This endpoint should be called periodically by an external cron job (every 30s recommended).
-    It re-evaluates recent EvalOutputs with status='running' or 'failed' to check if timeouts
-    have expired or if previously failed flows have recovered.
+    Timeouts no longer depend on this endpoint: the server re-evaluates a run
+    as soon as one of its waits expires (see src/events/scheduler.py). It is
+    kept for manual re-checks, e.g. to pick up runs evaluated before the
+    deadline scheduler existed, or when it is disabled.
+    It re-evaluates runs whose latest evaluation is 'running' or 'failed' (from
+    their run state) to check if timeouts have expired or if previously failed
+    flows have recovered. The latest EvalOutput of each run is updated in place.
 
     Args:
-        max_age_seconds: Only check evaluations created within this time window (default: 24 hours)
+        max_age_seconds: Only check runs evaluated within this time window (default: 24 hours)
 
     Returns:
         JSON with counts: total_running, updated, still_running, failed
@@ -273,50 +333,88 @@ async def reeval_running_flows(
         * * * * * curl -X POST http://localhost:13370/v1/reeval-running-flows -H "X-Api-Key: KEY"
         * * * * * sleep 30 && curl -X POST http://localhost:13370/v1/reeval-running-flows -H "X-Api-Key: KEY"
     """
-    from datetime import datetime, timedelta
+    from datetime import timedelta
 
-    from src.eval import eval_flow_run
+    from src.eval import eval_flow_runs
 
-    cutoff_time = datetime.utcnow() - timedelta(seconds=max_age_seconds)
+    storage = SqliteEventStorage()
+    cutoff_time = now() - timedelta(seconds=max_age_seconds)
 
     async with transactional() as session:
-        # Find recent EvalOutputs with running or failed status
-        stmt = (
-            select(EvalOutput)
-            .where(
-                EvalOutput.output["status"].astext.in_(["running", "failed"]),  # type: ignore
-                EvalOutput.created_at >= cutoff_time,
-            )
-            .order_by(desc(EvalOutput.created_at))  # type: ignore
+        # Find runs whose latest evaluation is running or failed
+        run_states = await storage.get_run_states(
+            session, statuses=list(UNSETTLED_EVAL_STATUSES), since=cutoff_time
         )
 
-        results = await session.execute(stmt)
-        running_evals = results.scalars().all()
-
-        log.info(f"Found {len(running_evals)} running evaluations to re-check")
+        log.info(f"Found {len(run_states)} running evaluations to re-check")
 
         updated_count = 0
         still_running_count = 0
         failed_count = 0
 
-        for eval_output in running_evals:
+        # Re-evaluate all runs of each flow with a single bulk evaluation
+        run_ids_by_flow: dict[str, list[str]] = {}
+        for run_state in run_states:
+            run_ids_by_flow.setdefault(run_state.flow, []).append(run_state.run_id)
+
+        new_results: dict[tuple[str, str], BaseEvalOutput] = {}
+        for flow, run_ids in run_ids_by_flow.items():
             try:
-                # Re-evaluate
-                new_result = await eval_flow_run(
-                    run_id=eval_output.run_id,
-                    flow=eval_output.flow,
-                )
+                flow_results = await eval_flow_runs(flow=flow, run_ids=run_ids)
+            except Exception as e:
+                log.exception(f"Failed to re-evaluate runs of flow={flow}: {e}")
+                continue
+
+            for run_id, flow_result in flow_results.items():
+                new_results[(flow, run_id)] = flow_result
+
+            await get_deadline_scheduler().schedule(
+                flow,
+                {
+                    run_id: flow_result.deadline_ns
+                    for run_id, flow_result in flow_results.items()
+                },
+                session,
+            )
+
+        eval_outputs = {
+            eval_output.id: eval_output
+            for eval_output in await storage.get_eval_outputs_by_ids(
+                [run_state.last_output_id for run_state in run_states], session
+            )
+        }
+        evaluated_at = now()
+        new_states: list[LatestRunState] = []
+
+        for run_state in run_states:
+            try:
+                new_result = new_results.get((run_state.flow, run_state.run_id))
+                if new_result is None:
+                    raise ValueError("Run could not be evaluated")
 
                 # Update output and timestamp
-                old_status = eval_output.output.status
-                eval_output.output = new_result
-                eval_output.updated_at = now()
-                await session.merge(eval_output)
+                old_status = run_state.status
+                eval_output = eval_outputs.get(run_state.last_output_id)
+                if eval_output is not None:
+                    eval_output.output = new_result
+                    eval_output.updated_at = evaluated_at
+                    session.add(eval_output)
+
+                new_states.append(
+                    LatestRunState(
+                        flow=run_state.flow,
+                        run_id=run_state.run_id,
+                        status=new_result.status,
+                        last_eval_at=evaluated_at,
+                        deadline_ns=new_result.deadline_ns,
+                        last_output_id=run_state.last_output_id,
+                    )
+                )
 
                 # Track status changes
                 if new_result.status != old_status:
                     log.info(
-                        f"Status changed for {eval_output.flow}/{eval_output.run_id}: "
+                        f"Status changed for {run_state.flow}/{run_state.run_id}: "
                         f"{old_status} → {new_result.status}"
                     )
                     updated_count += 1
@@ -325,15 +423,15 @@ async def reeval_running_flows(
                     dispatcher = get_dispatcher()
                     if old_status == "failed" and new_result.status == "passed":
                         await dispatcher.dispatch(
-                            flow=eval_output.flow,
-                            run_id=eval_output.run_id,
+                            flow=run_state.flow,
+                            run_id=run_state.run_id,
                             result=new_result,
                             transition="failed->passed",
                         )
                     elif new_result.status == "failed" and old_status != "failed":
                         await dispatcher.dispatch(
-                            flow=eval_output.flow,
-                            run_id=eval_output.run_id,
+                            flow=run_state.flow,
+                            run_id=run_state.run_id,
                             result=new_result,
                         )
                 else:
@@ -341,22 +439,75 @@ async def reeval_running_flows(
 
             except Exception as e:
                 log.exception(
-                    f"Failed to re-evaluate {eval_output.flow}/{eval_output.run_id}: {e}"
+                    f"Failed to re-evaluate {run_state.flow}/{run_state.run_id}: {e}"
                 )
                 failed_count += 1
                 continue
 
+        await storage.upsert_run_states(new_states, session)
         await session.commit()
 
     return {
         "message": "Re-evaluation complete",
-        "total_running": len(running_evals),
+        "total_running": len(run_states),
         "updated": updated_count,
         "still_running": still_running_count,
         "failed": failed_count,
     }
 
 
+@router.get("/debug/expressions", response_model=ExpressionProfileResponse)
+async def get_expression_profiles(
+    _: Annotated[None, Depends(ensure_api_key)],
+    flow: str | None = None,
+    limit: int = 50,
+):
+    """Per-expression profiling data, slowest (by total time) first.
+
+    Requires expr_profiling to be enabled. Data is per server process (each
+    `server prod` worker profiles the evaluations it runs).
+    """
+    profiler = get_expr_profiler()
+
+    return ExpressionProfileResponse(
+        enabled=profiler.enabled,
+        expressions=[
+            ExpressionProfileItem(**profile)
+            for profile in profiler.report(flow=flow, limit=limit)
+        ],
+    )
+
+
+@router.delete("/debug/expressions", response_model=SuccessResponse)
+async def reset_expression_profiles(_: Annotated[None, Depends(ensure_api_key)]):
+    """Drop the profiling data collected so far."""
+    get_expr_profiler().clear()
+
+    return SuccessResponse(message="Expression profiles cleared")
+
+
+@router.get("/debug/budgets", response_model=BudgetResponse)
+async def get_budgets(_: Annotated[None, Depends(ensure_api_key)]):
+    """Expression budgets and the breaches counted so far.
+
+    Breaches are counted per server process, like expression profiles.
+    """
+    return BudgetResponse(
+        default=ExpressionBudget(**DEFAULT_BUDGET),
+        flows={flow: ExpressionBudget(**flow_budget(flow)) for flow in FLOW_BUDGETS},
+        **get_budget_metrics().stats(),
+    )
+
+
+@router.get("/debug/coalescing", response_model=CoalescingResponse)
+async def get_coalescing(_: Annotated[None, Depends(ensure_api_key)]):
+    """Run evaluations shared by concurrent callers, counted so far.
+
+    Counted per server process, like budget breaches.
+    """
+    return CoalescingResponse(**get_eval_flights().stats())
+
+
 @router.get("/nodes", response_model=list[Node])
 async def get_nodes(_: Annotated[None, Depends(ensure_api_key)]):
     async with transactional() as s:
@@ -412,6 +563,10 @@ async def create_node(
         else:
             s.add(md)
 
+    get_flow_plan_cache().invalidate(
+        md.flow, *([existing_md.flow] if existing_md else [])
+    )
+
     return md
 
 
@@ -437,6 +592,7 @@ async def update_node(
             )
 
         update_data = body.model_dump(exclude_unset=True, exclude={"upstream_changes"})
+        previous_flow = md.flow
 
         for key, value in update_data.items():
             setattr(md, key, value)
@@ -444,6 +600,8 @@ async def update_node(
         md.updated_at = now()
         await s.merge(md)
 
+    get_flow_plan_cache().invalidate(previous_flow, md.flow)
+
     return md
 
 
@@ -469,6 +627,8 @@ async def delete_definition(
 
         await s.merge(md)
 
+    get_flow_plan_cache().invalidate(md.flow)
+
     return SuccessResponse(message="Node deleted")
 
 
@@ -486,6 +646,7 @@ async def upload_scan(
     created = 0
     updated = 0
     deleted = 0
+    changed_flows: set[str] = set(body.flows.keys())
 
     async with transactional() as s:
         # Collect all node IDs from the payload, grouped by flow
@@ -501,6 +662,7 @@ async def upload_scan(
 
                 if existing_node:
                     # Update existing node
+                    changed_flows.add(existing_node.flow)
                     existing_node.flow = body_node.flow
                     existing_node.type = body_node.type
                     existing_node.source = "scan"
@@ -544,6 +706,8 @@ async def upload_scan(
                     await s.merge(node)
                     deleted += 1
 
+    get_flow_plan_cache().invalidate(*changed_flows)
+
     return ScanUploadResponse(
         created=created,
         updated=updated,
@@ -567,10 +731,24 @@ async def lifespan(_: FastAPI) -> AsyncIterator[AppState]:
 
     build_dispatcher()
 
+    from src.config import DEADLINE_SCHEDULER_ENABLED
+
+    if DEADLINE_SCHEDULER_ENABLED:
+        try:
+            await get_deadline_scheduler().start(handle_due_deadlines)
+        except Exception as e:
+            log.exception(f"Failed to start deadline scheduler: {e}")
+
     yield {
         "bus": new_bus(),
     }
 
+    from src.eval import get_incremental_evaluator
+
+    await get_deadline_scheduler().stop()
+    get_incremental_evaluator().flush()
+    get_eval_executor().shutdown()
+
     log.info("Ciaito!")
 
 
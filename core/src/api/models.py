@@ -6,6 +6,7 @@ from pydantic import BaseModel
 from src.models import (
     ActionInput,
     ActionType,
+    EvalPolicy,
     Expr,
     NodeCondition,
     NodeType,
@@ -43,6 +44,47 @@ class ReEvalResponse(BaseModel):
     failed: int
 
 
+class ExpressionProfileItem(BaseModel):
+    flow: str
+    node_id: str
+    script_hash: str
+    engine: str
+    script: str
+    calls: int
+    items: int
+    errors: int
+    total_ms: float
+    p50_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+class ExpressionProfileResponse(BaseModel):
+    enabled: bool
+    expressions: list[ExpressionProfileItem]
+
+
+class ExpressionBudget(BaseModel):
+    expr_time_ms: float
+    expr_memory_mb: float
+    eval_time_ms: float
+
+
+class BudgetResponse(BaseModel):
+    default: ExpressionBudget
+    flows: dict[str, ExpressionBudget]
+    breaches: int
+    by_kind: dict[str, int]
+    by_flow: dict[str, int]
+
+
+class CoalescingResponse(BaseModel):
+    in_flight: int
+    flights: int
+    coalesced: int
+    follow_ups: int
+
+
 class EventBatchItem(BaseModel):
     flow: str
     id: str
@@ -103,12 +145,18 @@ class EvalInput(BaseModel):
         run_id: Run identifier
         flow: Flow identifier
         start_node_id: Optional node to start from (for subgraph eval)
+        streaming: Stream the run's events instead of loading them all
+            (None = for runs with streaming_eval_min_events events)
+        policy: Skip the rest of the run once a node failed
+            (None = eval_policy from the config)
     """
 
     # Required fields
     run_id: str
     flow: str
     start_node_id: str | None = None
+    streaming: bool | None = None
+    policy: EvalPolicy | None = None
 
 
 # --- Scanner models ---
@@ -4,6 +4,7 @@ import logging
 import secrets
 import warnings
 from pathlib import Path
+from typing import TYPE_CHECKING, cast
 
 import click
 import questionary
@@ -14,6 +15,9 @@ from src import __version__
 from src.config import API_KEY, DATABASE_PATH
 from src.logging import configure_logging
 
+if TYPE_CHECKING:
+    from src.models import EvalPolicy
+
 log = logging.getLogger(__name__)
 
 
@@ -785,6 +789,32 @@ def migrate(revision: str) -> None:
     click.echo("✓ Migrations completed successfully")
 
 
+@db.command("cluster-events")
+def cluster_events() -> None:
+    """Store each run's events next to each other on disk.
+
+    Rewrites the event table in (run_id, flow, ts) order so evaluating a run
+    reads a few pages however large the table gets. New events are not kept
+    in order: run it again from time to time. It locks the event table
+    while it runs (stop the server first on SQLite).
+
+    Examples:
+        cli db cluster-events
+    """
+    from src.adapters.sqlite import SqliteEventStorage
+    from src.db.transactional import transactional
+
+    async def run_cluster() -> int:
+        async with transactional() as session:
+            count = await SqliteEventStorage().cluster_events(session)
+            await session.commit()
+        return count
+
+    click.echo("Clustering events by run...")
+    count = asyncio.run(run_cluster())
+    click.echo(f"✓ Clustered {count} events")
+
+
 @cli.group()
 def server() -> None:
     """Server management commands."""
@@ -909,6 +939,7 @@ def render_graph(graph: dict[str, list[str]], status_map: dict[str, str]) -> str
         "passed": "✓",
         "failed": "✗",
         "skipped": "⊘",
+        "cancelled": "⊘",
         "pending": "○",
     }
 
@@ -955,6 +986,20 @@ def render_graph(graph: dict[str, list[str]], status_map: dict[str, str]) -> str
     "--verbose", "-v", is_flag=True, help="Verbose output with execution details"
 )
 @click.option("--show-graph", "-g", is_flag=True, help="Show ASCII graph visualization")
+@click.option(
+    "--stream/--no-stream",
+    default=None,
+    help="Stream the run's events instead of loading them all "
+    "(default: for runs with streaming_eval_min_events events)",
+)
+@click.option(
+    "--policy",
+    type=click.Choice(["full", "fail_fast", "fail_fast_branch"]),
+    default=None,
+    help="Skip the rest of the run once a node failed: fail_fast skips the "
+    "following layers, fail_fast_branch the nodes downstream of the failed "
+    "one (default: eval_policy)",
+)
 def eval(
     run_id: str,
     flow_name: str,
@@ -962,6 +1007,8 @@ def eval(
     json_output: bool,
     verbose: bool,
     show_graph: bool,
+    stream: bool | None,
+    policy: str | None,
 ) -> None:
     """Evaluate a flow run by run_id and flow.
 
@@ -975,6 +1022,8 @@ def eval(
         business-use flow eval run_123 checkout -g -v        # Graph + verbose
         business-use flow eval run_123 checkout --json-output # Output as JSON
         business-use flow eval run_123 checkout --start-node payment_processed  # Subgraph
+        business-use flow eval run_123 checkout --stream     # Bounded memory
+        business-use flow eval run_123 checkout --policy fail_fast  # Stop early
     """
     ensure_database_or_exit()
 
@@ -990,6 +1039,8 @@ def eval(
                 run_id=run_id,
                 flow=flow_name,
                 start_node_id=start_node,
+                streaming=stream,
+                policy=cast("EvalPolicy | None", policy),
             )
 
             if json_output:
@@ -1015,6 +1066,7 @@ def eval(
                         for item in result.exec_info
                     ],
                     "ev_ids": result.ev_ids,
+                    "peak_memory_bytes": result.peak_memory_bytes,
                 }
                 click.echo(json.dumps(output, indent=2))
             else:
@@ -1027,6 +1079,11 @@ def eval(
                 click.echo(f"Elapsed: {result.elapsed_ns / 1_000_000:.2f}ms")
                 click.echo(f"Events processed: {len(result.ev_ids)}")
                 click.echo(f"Graph nodes: {len(result.graph)}")
+                if result.peak_memory_bytes is not None:
+                    click.echo(
+                        f"Peak memory: {result.peak_memory_bytes / 2**20:.1f}MB "
+                        "(estimated, streaming)"
+                    )
                 click.echo(f"{'=' * 60}\n")
 
                 # Show graph visualization if requested
@@ -1063,7 +1120,11 @@ def eval(
                         item_status_color = (
                             "green"
                             if item.status == "passed"
-                            else ("yellow" if item.status == "skipped" else "red")
+                            else (
+                                "yellow"
+                                if item.status in ("skipped", "cancelled")
+                                else "red"
+                            )
                         )
 
                         click.echo(f"\nNode: {item.node_id}")
@@ -1096,6 +1157,9 @@ def eval(
                     skipped = sum(
                         1 for item in result.exec_info if item.status == "skipped"
                     )
+                    cancelled = sum(
+                        1 for item in result.exec_info if item.status == "cancelled"
+                    )
 
                     click.echo("Summary:")
                     click.secho(f"  ✓ Passed: {passed}", fg="green")
@@ -1103,6 +1167,8 @@ def eval(
                         click.secho(f"  ✗ Failed: {failed}", fg="red")
                     if skipped > 0:
                         click.secho(f"  ⊘ Skipped: {skipped}", fg="yellow")
+                    if cancelled > 0:
+                        click.secho(f"  ⊘ Cancelled: {cancelled}", fg="yellow")
 
                     if failed > 0:
                         click.echo("\nFailed nodes:")
@@ -1125,6 +1191,115 @@ def eval(
     asyncio.run(run_evaluation())
 
 
+@flow.command()
+@click.argument("flow_name")
+@click.option(
+    "--runs", "num_runs", default=100, help="Number of recent runs to evaluate"
+)
+@click.option("--limit", default=20, help="Number of expressions to show")
+@click.option("--json-output", is_flag=True, help="Output results as JSON")
+def profile(flow_name: str, num_runs: int, limit: int, json_output: bool) -> None:
+    """Profile the filters and validators of a flow.
+
+    Re-evaluates the most recent runs of the flow with expression profiling
+    enabled and shows its expressions, slowest (by total time) first, with
+    call counts, p50/p99 latency and errors. Results are not stored.
+
+    Examples:
+        business-use flow profile checkout              # Last 100 runs
+        business-use flow profile checkout --runs 1000  # Last 1000 runs
+        business-use flow profile checkout --json-output
+    """
+    ensure_database_or_exit()
+
+    import time
+
+    from src.adapters.sqlite import SqliteEventStorage
+    from src.db.transactional import transactional
+    from src.eval.eval import MultiEvaluator, evaluate_events
+    from src.eval.plan import get_flow_plan_cache
+    from src.execution.profiling import ExprProfiler
+
+    async def load_runs():
+        storage = SqliteEventStorage()
+
+        async with transactional() as session:
+            plan = await get_flow_plan_cache().get(flow_name, session)
+            run_ids = await storage.get_recent_run_ids(flow_name, num_runs, session)
+            events_by_run = await storage.get_events_by_runs(
+                run_ids, flow_name, session
+            )
+
+        return plan, run_ids, events_by_run
+
+    plan, run_ids, events_by_run = asyncio.run(load_runs())
+
+    if plan is None:
+        click.secho(
+            f"Error: No node definitions found for flow={flow_name}", fg="red", err=True
+        )
+        raise click.Abort()
+
+    if not run_ids:
+        click.secho(f"No runs found for flow={flow_name}", fg="yellow")
+        return
+
+    profiler = ExprProfiler(enabled=True)
+    evaluator = MultiEvaluator(profiler=profiler)
+    failed_runs = 0
+    start = time.perf_counter()
+
+    for run_id in run_ids:
+        try:
+            evaluate_events(
+                events_by_run.get(run_id, []), plan.flow_graph, plan.layers, evaluator
+            )
+        except Exception as e:
+            failed_runs += 1
+            log.warning(f"Failed to evaluate run_id={run_id}: {e}")
+
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    profiles = profiler.report(limit=limit)
+
+    if json_output:
+        output = {
+            "flow": flow_name,
+            "runs": len(run_ids),
+            "failed_runs": failed_runs,
+            "elapsed_ms": elapsed_ms,
+            "expressions": profiles,
+        }
+        click.echo(json.dumps(output, indent=2))
+        return
+
+    click.echo(f"\n{'=' * 60}")
+    click.secho(f"Flow: {flow_name}", bold=True)
+    click.echo(f"Runs evaluated: {len(run_ids)} in {elapsed_ms:.2f}ms")
+    if failed_runs:
+        click.secho(f"Runs that failed to evaluate: {failed_runs}", fg="red")
+    click.echo(f"{'=' * 60}\n")
+
+    if not profiles:
+        click.secho("No filters or validators were evaluated", fg="yellow")
+        return
+
+    click.echo(
+        f"{'Node':<24} {'Engine':<13} {'Calls':>7} {'Items':>7} {'Errors':>7} "
+        f"{'Total ms':>10} {'p50 ms':>8} {'p99 ms':>8}"
+    )
+    click.echo("-" * 90)
+
+    for item in profiles:
+        click.secho(
+            f"{item['node_id'][:24]:<24} {item['engine']:<13} {item['calls']:>7} "
+            f"{item['items']:>7} {item['errors']:>7} {item['total_ms']:>10.2f} "
+            f"{item['p50_ms']:>8.3f} {item['p99_ms']:>8.3f}",
+            fg="red" if item["errors"] else None,
+        )
+        script = item["script"].replace("\n", " ")
+        click.echo(f"  [{item['script_hash']}] {script[:82]}")
+
+
 @flow.command()
 @click.argument("flow_name", required=False)
 @click.option(
@@ -1512,25 +1687,30 @@ def export(flow_name: str, output: Path | None) -> None:
 @click.option("--flow", default=None, help="Filter by flow name")
 @click.option("--run-id", default=None, help="Filter by run ID")
 @click.option("--limit", default=10, help="Number of results to show")
+@click.option(
+    "--history", is_flag=True, help="Show every evaluation, not only the latest"
+)
 @click.option("--json-output", is_flag=True, help="Output results as JSON")
 @click.option("--verbose", "-v", is_flag=True, help="Show detailed execution info")
 def runs(
     flow: str | None,
     run_id: str | None,
     limit: int,
+    history: bool,
     json_output: bool,
     verbose: bool,
 ) -> None:
     """View stored evaluation runs from the database.
 
-    Shows past evaluations that have been stored automatically or via API.
-    You can filter by flow name or run ID.
+    Shows the latest evaluation of each run, stored automatically or via
+    API. You can filter by flow name or run ID.
 
     Examples:
         business-use flow runs                          # Show last 10 runs
         business-use flow runs --flow checkout          # Show runs for checkout flow
         business-use flow runs --run-id run_123         # Show specific run
         business-use flow runs --limit 20               # Show last 20 runs
+        business-use flow runs --run-id run_123 --history  # Show every evaluation
         business-use flow runs --verbose                # Show detailed execution info
         business-use flow runs --json-output            # Output as JSON
     """
@@ -1542,20 +1722,29 @@ def runs(
     from sqlmodel import select
 
     from src.db.transactional import transactional
-    from src.models import EvalOutput
+    from src.models import EvalOutput, LatestRunState
 
     async def show_runs() -> None:
         try:
             async with transactional() as session:
                 stmt = select(EvalOutput)
 
+                if not history:
+                    stmt = stmt.join(
+                        LatestRunState,
+                        LatestRunState.last_output_id == EvalOutput.id,  # type: ignore[arg-type]
+                    )
+
                 if flow:
                     stmt = stmt.where(EvalOutput.flow == flow)
 
                 if run_id:
                     stmt = stmt.where(EvalOutput.run_id == run_id)
 
-                stmt = stmt.order_by(desc(EvalOutput.created_at)).limit(limit)  # type: ignore
+                order_by = (
+                    EvalOutput.created_at if history else LatestRunState.last_eval_at
+                )
+                stmt = stmt.order_by(desc(order_by)).limit(limit)  # type: ignore
 
                 result = await session.execute(stmt)
                 eval_outputs = result.scalars().all()
@@ -1,3 +1,4 @@
+import json
 import logging
 import os
 from pathlib import Path
@@ -166,3 +167,166 @@ NOTIFY_THROTTLE_SECONDS: Final[int] = int(
         "BUSINESS_USE_NOTIFY_THROTTLE_SECONDS", "notify_throttle_seconds", "0"
     )
 )
+
+# --- Evaluation settings ---
+# Max number of compiled Python expressions kept in the process-wide LRU cache
+EXPR_CACHE_SIZE: Final[int] = int(
+    get_env_or_config("BUSINESS_USE_EXPR_CACHE_SIZE", "expr_cache_size", "1024")
+)
+
+# Execution budgets of filter/validator expressions (0 = unlimited): wall
+# time per evaluated event, memory per call, and wall time of one
+# evaluation of a run. Calls over budget make their node "error".
+EXPR_TIME_BUDGET_MS: Final[float] = float(
+    get_env_or_config("BUSINESS_USE_EXPR_TIME_BUDGET_MS", "expr_time_budget_ms", "1000")
+)
+EXPR_MEMORY_BUDGET_MB: Final[float] = float(
+    get_env_or_config(
+        "BUSINESS_USE_EXPR_MEMORY_BUDGET_MB", "expr_memory_budget_mb", "64"
+    )
+)
+EVAL_TIME_BUDGET_MS: Final[float] = float(
+    get_env_or_config(
+        "BUSINESS_USE_EVAL_TIME_BUDGET_MS", "eval_time_budget_ms", "30000"
+    )
+)
+# Per-flow overrides of the budgets above: {flow: {expr_time_ms, expr_memory_mb,
+# eval_time_ms}} (a JSON object in the environment variable)
+_flow_budgets = get_env_or_config("BUSINESS_USE_FLOW_BUDGETS", "flow_budgets", {})
+FLOW_BUDGETS: Final[dict[str, dict[str, Any]]] = (
+    json.loads(_flow_budgets) if isinstance(_flow_budgets, str) else _flow_budgets
+) or {}
+
+# Cost budget of each CEL expression call (evaluated nodes, iterations and
+# the size of strings/lists scanned or built); a call over budget yields False
+CEL_MAX_COST: Final[int] = int(
+    get_env_or_config("BUSINESS_USE_CEL_MAX_COST", "cel_max_cost", "100000")
+)
+
+# QuickJS contexts are long-lived and recycled after this age / number of calls
+JS_CONTEXT_MAX_AGE_SECONDS: Final[float] = float(
+    get_env_or_config(
+        "BUSINESS_USE_JS_CONTEXT_MAX_AGE_SECONDS", "js_context_max_age_seconds", "300"
+    )
+)
+JS_CONTEXT_MAX_CALLS: Final[int] = int(
+    get_env_or_config(
+        "BUSINESS_USE_JS_CONTEXT_MAX_CALLS", "js_context_max_calls", "100000"
+    )
+)
+# Memory limit per QuickJS context (0 = unlimited)
+JS_CONTEXT_MEMORY_LIMIT_MB: Final[int] = int(
+    get_env_or_config(
+        "BUSINESS_USE_JS_CONTEXT_MEMORY_LIMIT_MB", "js_context_memory_limit_mb", "64"
+    )
+)
+
+# Python expressions run in up to this many subinterpreters, each with its
+# own GIL (0 = in the server's interpreter). Needs Python 3.14+.
+PYTHON_SUBINTERPRETERS: Final[int] = int(
+    get_env_or_config(
+        "BUSINESS_USE_PYTHON_SUBINTERPRETERS", "python_subinterpreters", "0"
+    )
+)
+
+# Run states kept in memory for incremental evaluation of new event batches (LRU)
+INCREMENTAL_EVAL_MAX_RUNS: Final[int] = int(
+    get_env_or_config(
+        "BUSINESS_USE_INCREMENTAL_EVAL_MAX_RUNS", "incremental_eval_max_runs", "1000"
+    )
+)
+# Events held by those run states; larger runs are evaluated without a state
+INCREMENTAL_EVAL_MAX_EVENTS: Final[int] = int(
+    get_env_or_config(
+        "BUSINESS_USE_INCREMENTAL_EVAL_MAX_EVENTS",
+        "incremental_eval_max_events",
+        "200000",
+    )
+)
+# Optional directory where evicted run states are snapshotted (disabled if unset)
+INCREMENTAL_EVAL_SNAPSHOT_DIR: Final[str | None] = get_env_or_config(
+    "BUSINESS_USE_INCREMENTAL_EVAL_SNAPSHOT_DIR", "incremental_eval_snapshot_dir"
+)
+
+# Compiled flow plans are re-checked against the stored node definitions
+# after this many seconds (picks up node changes made by other processes)
+FLOW_PLAN_REVALIDATE_SECONDS: Final[float] = float(
+    get_env_or_config(
+        "BUSINESS_USE_FLOW_PLAN_REVALIDATE_SECONDS", "flow_plan_revalidate_seconds", "5"
+    )
+)
+
+# Memory budget of memoized filter/validator results per process (0 = disabled)
+EVAL_MEMO_MAX_MB: Final[float] = float(
+    get_env_or_config("BUSINESS_USE_EVAL_MEMO_MAX_MB", "eval_memo_max_mb", "64")
+)
+
+# Run simple filters/validators as native predicates instead of eval()/QuickJS
+EXPR_NATIVE_FASTPATH: Final[bool] = str(
+    get_env_or_config(
+        "BUSINESS_USE_EXPR_NATIVE_FASTPATH", "expr_native_fastpath", "true"
+    )
+).lower() in ("1", "true", "yes", "on")
+
+# Record per-expression call counts, latency and errors (see /v1/debug/expressions)
+EXPR_PROFILING: Final[bool] = str(
+    get_env_or_config("BUSINESS_USE_EXPR_PROFILING", "expr_profiling", "false")
+).lower() in ("1", "true", "yes", "on")
+
+# Flow evaluation runs off the event loop: "thread", "process" or "inline"
+EVAL_EXECUTOR: Final[str] = get_env_or_config(
+    "BUSINESS_USE_EVAL_EXECUTOR", "eval_executor", "thread"
+)
+# Evaluations running concurrently per server process
+EVAL_WORKERS: Final[int] = int(
+    get_env_or_config("BUSINESS_USE_EVAL_WORKERS", "eval_workers", "4")
+)
+# Evaluations allowed to wait for a worker before new ones are rejected
+EVAL_MAX_QUEUE: Final[int] = int(
+    get_env_or_config("BUSINESS_USE_EVAL_MAX_QUEUE", "eval_max_queue", "1000")
+)
+# Threads evaluating the nodes of a graph layer concurrently (0 = serially)
+EVAL_LAYER_THREADS: Final[int] = int(
+    get_env_or_config("BUSINESS_USE_EVAL_LAYER_THREADS", "eval_layer_threads", "0")
+)
+
+# Evaluation policy used when a call doesn't choose one: "full", "fail_fast"
+# (skip nodes after a failure) or "fail_fast_branch" (skip nodes below it)
+EVAL_POLICY: Final[str] = get_env_or_config(
+    "BUSINESS_USE_EVAL_POLICY", "eval_policy", "full"
+)
+
+# Runs with at least this many events are evaluated by streaming their events
+# in chunks instead of loading them all (0 = only when asked to)
+STREAMING_EVAL_MIN_EVENTS: Final[int] = int(
+    get_env_or_config(
+        "BUSINESS_USE_STREAMING_EVAL_MIN_EVENTS", "streaming_eval_min_events", "50000"
+    )
+)
+# Events read from the database per chunk of a streaming evaluation
+STREAMING_EVAL_CHUNK_SIZE: Final[int] = int(
+    get_env_or_config(
+        "BUSINESS_USE_STREAMING_EVAL_CHUNK_SIZE", "streaming_eval_chunk_size", "1000"
+    )
+)
+# Estimated memory a streaming evaluation may hold before it fails (0 = unlimited)
+STREAMING_EVAL_MAX_MEMORY_MB: Final[float] = float(
+    get_env_or_config(
+        "BUSINESS_USE_STREAMING_EVAL_MAX_MEMORY_MB",
+        "streaming_eval_max_memory_mb",
+        "512",
+    )
+)
+
+# Re-evaluate runs in-process when a node waiting for its event times out
+DEADLINE_SCHEDULER_ENABLED: Final[bool] = str(
+    get_env_or_config(
+        "BUSINESS_USE_DEADLINE_SCHEDULER_ENABLED", "deadline_scheduler_enabled", "true"
+    )
+).lower() in ("1", "true", "yes", "on")
+# A claimed deadline is retried after this long if its evaluation never finishes
+DEADLINE_LEASE_SECONDS: Final[float] = float(
+    get_env_or_config(
+        "BUSINESS_USE_DEADLINE_LEASE_SECONDS", "deadline_lease_seconds", "60"
+    )
+)
@@ -5,16 +5,45 @@ and validating flow execution. It has zero external dependencies except for
 the evaluator protocol.
 """
 
+import contextvars
+import hashlib
 import logging
+from collections.abc import Callable
+from concurrent.futures import Executor
 from time import time_ns
-from typing import Any, Protocol
-
-from src.domain.types import LayeredEvents, ValidationItem, ValidationResult
-from src.models import Event, Expr, Node
+from typing import Any, Literal, Protocol, cast, get_args, runtime_checkable
+
+from src.domain.types import (
+    Ctx,
+    DepData,
+    LayeredEvents,
+    ValidationItem,
+    ValidationResult,
+)
+from src.models import EvalPolicy, EvalStatus, Event, Expr, Node
 from src.utils.text import append_text
 
 logger = logging.getLogger(__name__)
 
+BudgetKind = Literal["time", "memory", "evaluation_time", "cost"]
+
+
+class ExprBudgetExceeded(Exception):
+    """An expression call ran over its execution budget.
+
+    The only exception evaluators raise: the node being matched or
+    validated gets the "error" status, with the reason as its error.
+
+    Attributes:
+        reason: Human readable description of the breach
+        kind: Budget that was exceeded
+    """
+
+    def __init__(self, reason: str, kind: BudgetKind = "time") -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.kind = kind
+
 
 class ExprEvaluator(Protocol):
     """Protocol for expression evaluation.
@@ -33,16 +62,233 @@ class ExprEvaluator(Protocol):
 
         Returns:
             True if expression evaluates to true, False otherwise.
-            Never raises exceptions.
+
+        Raises:
+            ExprBudgetExceeded: If the call ran over its execution budget
+                (other errors are never raised)
         """
         ...
 
+    def evaluate_many(
+        self,
+        expr: Expr,
+        items: list[dict[str, Any]],
+        ctx: dict[str, Any],
+    ) -> list[bool]:
+        """Evaluate an expression against many data items sharing one context.
+
+        Used to run a node's filter or validator over all of its candidate
+        events in a single call.
+
+        Args:
+            expr: Expression to evaluate
+            items: Target data of each candidate event
+            ctx: Context data shared by all items
+
+        Returns:
+            One result per item, in order, with the same semantics as
+            ``evaluate``.
+
+        Raises:
+            ExprBudgetExceeded: If the call ran over its execution budget
+        """
+        ...
+
+
+@runtime_checkable
+class KeyedExprEvaluator(Protocol):
+    """Evaluator that can reuse results across evaluations of a run.
+
+    Results are keyed by event: an event's data never changes, so an
+    expression evaluated on the same event with the same upstream events
+    (and the same node definition) always gives the same result.
+    """
+
+    def evaluate_keyed(
+        self,
+        expr: Expr,
+        items: list[dict[str, Any]],
+        ctx: dict[str, Any],
+        keys: list[tuple[str, str]],
+    ) -> list[bool]:
+        """Same as ``evaluate_many``, with one key per item.
+
+        Args:
+            expr: Expression to evaluate
+            items: Target data of each candidate event
+            ctx: Context data shared by all items
+            keys: (event ID, upstream event IDs hash) of each item
+        """
+        ...
+
+
+def upstream_ids_hash(upstream_ev_ids: list[str]) -> str:
+    """Short hash of the upstream event IDs a context was built from."""
+    if not upstream_ev_ids:
+        return ""
+    return hashlib.blake2b(
+        "\0".join(upstream_ev_ids).encode("utf-8"), digest_size=8
+    ).hexdigest()
+
+
+def evaluate_expr(
+    evaluator: ExprEvaluator,
+    expr: Expr,
+    events: list[Event],
+    ctx: Ctx,
+    upstream_ev_ids: list[str],
+) -> list[bool]:
+    """Evaluate an expression over events sharing one context.
+
+    Keyed evaluators get each event's ID and upstream IDs hash, so they
+    can skip events they already evaluated.
+
+    Returns:
+        One result per event, in order
+    """
+    items = [event.data for event in events]
+
+    if isinstance(evaluator, KeyedExprEvaluator):
+        upstream_hash = upstream_ids_hash(upstream_ev_ids)
+        return evaluator.evaluate_keyed(
+            expr,
+            items,
+            cast(dict[str, Any], ctx),
+            [(event.id, upstream_hash) for event in events],
+        )
+
+    return evaluator.evaluate_many(expr, items, cast(dict[str, Any], ctx))
+
+
+def index_events_by_node(
+    event_ids: list[str],
+    events_map: dict[str, Event],
+) -> dict[str, list[Event]]:
+    """Group events by node_id, preserving their original order.
+
+    Args:
+        event_ids: Event IDs to index (e.g. all matched IDs, layer by layer)
+        events_map: Map of event_id -> Event
+
+    Returns:
+        Map of node_id -> events for that node
+    """
+    by_node: dict[str, list[Event]] = {}
+    for ev_id in event_ids:
+        event = events_map[ev_id]
+        by_node.setdefault(event.node_id, []).append(event)
+    return by_node
+
+
+def build_upstream_ctx(
+    dep_ids: list[str],
+    matched_by_node: dict[str, list[Event]],
+) -> tuple[Ctx, list[str]]:
+    """Build the Ctx for a node from its already-matched upstream events.
+
+    The result only depends on the node's dependencies, so it is computed
+    once per node and shared by all of that node's candidate events.
+
+    Args:
+        dep_ids: Upstream node IDs of the current node
+        matched_by_node: Map of node_id -> matched events from previous layers
+
+    Returns:
+        Tuple of (ctx, upstream_ev_ids)
+    """
+    ctx: Ctx = {"deps": []}
+    upstream_ev_ids: list[str] = []
+
+    for dep_id in dep_ids:
+        for prev_event in matched_by_node.get(dep_id, ()):
+            upstream_ev_ids.append(prev_event.id)
+            dep_data: DepData = {
+                "flow": prev_event.flow,
+                "id": prev_event.node_id,
+                "data": prev_event.data,
+            }
+            ctx["deps"].append(dep_data)
+
+    # Convenience: if single dep, populate ctx["data"]
+    if len(ctx["deps"]) == 1:
+        ctx["data"] = ctx["deps"][0]["data"]
+
+    return ctx, upstream_ev_ids
+
+
+def map_layer[T](
+    fn: Callable[[str], T],
+    node_ids: list[str],
+    executor: Executor | None = None,
+) -> list[T]:
+    """Apply ``fn`` to the nodes of a layer, concurrently on ``executor``.
+
+    Nodes of a layer don't depend on each other, so they can be matched or
+    validated in any order. Each call runs in a copy of the caller's
+    context (e.g. its evaluation budget); results are returned in node
+    order whatever order the calls finish in, so the output is the same as
+    running them serially.
+
+    Args:
+        fn: Function of a node ID; must not mutate state shared by the layer
+        node_ids: Nodes of the layer
+        executor: Pool to run the calls on (None = serially, in this thread)
+
+    Returns:
+        One result per node, in order
+
+    Raises:
+        Exception: The first (in node order) exception raised by ``fn``
+    """
+    if executor is None or len(node_ids) < 2:
+        return [fn(node_id) for node_id in node_ids]
+
+    futures = [
+        executor.submit(contextvars.copy_context().run, fn, node_id)
+        for node_id in node_ids
+    ]
+    return [future.result() for future in futures]
+
+
+def match_node_events(
+    node: Node,
+    candidates: list[Event],
+    matched_by_node: dict[str, list[Event]],
+    evaluator: ExprEvaluator,
+) -> list[Event]:
+    """Select the candidate events of a node that pass its filter.
+
+    Args:
+        node: Node definition (already ensured)
+        candidates: Events reported for this node, in timestamp order
+        matched_by_node: Map of node_id -> matched events from previous layers
+        evaluator: Expression evaluator for filter evaluation
+
+    Returns:
+        Matched events, in candidate order
+    """
+    if not candidates:
+        return []
+
+    if not node.filter:
+        return list(candidates)
+
+    # Build context from ALL upstream dependencies (once per node)
+    ctx, upstream_ev_ids = build_upstream_ctx(node.dep_ids, matched_by_node)
+
+    # Evaluate the filter over all candidates at once. If it returns
+    # False for an event, skip it (node will get "passed" status
+    # during validation)
+    keep = evaluate_expr(evaluator, node.filter, candidates, ctx, upstream_ev_ids)
+    return [event for event, kept in zip(candidates, keep, strict=True) if kept]
+
 
 def match_events_to_layers(
     events: list[Event],
     layers: list[list[str]],
     nodes_map: dict[str, Node],
     evaluator: ExprEvaluator,
+    executor: Executor | None = None,
 ) -> LayeredEvents:
     """Match events to graph layers based on run_id, flow, and filters.
 
@@ -54,9 +300,12 @@ def match_events_to_layers(
         layers: Topologically sorted layers of node IDs
         nodes_map: Map of node_id -> Node for lookup
         evaluator: Expression evaluator for filter evaluation
+        executor: Optional pool matching the nodes of each layer
+            concurrently (see ``map_layer``)
 
     Returns:
-        LayeredEvents with matched events per layer
+        LayeredEvents with matched events per layer, and the nodes whose
+        filter ran over its execution budget (they match no events)
 
     Example:
         >>> events = [Event(id="e1", node_id="a", run_id="run1", ...)]
@@ -65,84 +314,408 @@ def match_events_to_layers(
         >>> matched["layers"]
         [["e1"], ["e2", "e3"]]
     """
-    from typing import cast
-
-    from src.domain.types import Ctx, DepData
-
     final_ev_list: list[list[str]] = []
     events_map: dict[str, Event] = {ev.id: ev for ev in events}
 
+    # Candidate events per node, and matched events per node (filled as we go)
+    events_by_node = index_events_by_node([ev.id for ev in events], events_map)
+    matched_by_node: dict[str, list[Event]] = {}
+    errors: dict[str, str] = {}
+
+    def match(node_id: str) -> list[Event] | ExprBudgetExceeded:
+        try:
+            return match_node_events(
+                nodes_map[node_id], events_by_node[node_id], matched_by_node, evaluator
+            )
+        except ExprBudgetExceeded as e:
+            return e
+
     # For each layer, find matching events
-    for layer_index, layer_node_ids in enumerate(layers):
+    for layer_node_ids in layers:
         layer_event_ids: list[str] = []
+        layer_matched: dict[str, list[Event]] = {}
 
+        node_ids: list[str] = []
         for node_id in layer_node_ids:
             current_node = nodes_map.get(node_id)
-            if current_node is None:
+            if current_node is None or not events_by_node.get(node_id):
                 continue
 
             current_node.ensure()  # Ensure node is properly initialized
+            node_ids.append(node_id)
 
-            # Find events for this node
-            for event in events:
-                if event.node_id != node_id:
-                    continue
+        for node_id, node_matched in zip(
+            node_ids, map_layer(match, node_ids, executor), strict=True
+        ):
+            if isinstance(node_matched, ExprBudgetExceeded):
+                errors[node_id] = node_matched.reason
+                continue
 
-                # Build context from ALL upstream dependencies
-                ctx: Ctx = {"deps": []}
-
-                if current_node.dep_ids:
-                    # For each dep_id, find ALL matching events from previous layers
-                    for dep_id in current_node.dep_ids:
-                        # Search all previous layers for events matching this dep_id
-                        for prev_layer_index in range(layer_index):
-                            prev_layer_event_ids = final_ev_list[prev_layer_index]
-                            for prev_event_id in prev_layer_event_ids:
-                                prev_event = events_map[prev_event_id]
-                                if prev_event.node_id == dep_id:
-                                    # Add this event to deps
-                                    dep_data: DepData = {
-                                        "flow": prev_event.flow,
-                                        "id": prev_event.node_id,
-                                        "data": prev_event.data,
-                                    }
-                                    ctx["deps"].append(dep_data)
-
-                # Convenience: if single dep, populate ctx["data"]
-                if len(ctx["deps"]) == 1:
-                    ctx["data"] = ctx["deps"][0]["data"]
-
-                # Evaluate filter if present
-                include_event = True
-                if current_node.filter:
-                    # Evaluate filter with proper Ctx
-                    filter_result = evaluator.evaluate(
-                        current_node.filter,
-                        data=event.data,
-                        ctx=cast(dict[str, Any], ctx),
-                    )
-                    # If filter returns False, skip this event
-                    # (node will get "passed" status during validation)
-                    if not filter_result:
-                        include_event = False
-
-                # Include event only if filter passed (or no filter)
-                if include_event:
-                    layer_event_ids.append(event.id)
+            layer_event_ids.extend(event.id for event in node_matched)
+            layer_matched[node_id] = node_matched
 
+        # Only previous layers are visible as upstream context
+        matched_by_node.update(layer_matched)
         final_ev_list.append(layer_event_ids)
 
     return LayeredEvents(
         layers=final_ev_list,
         events=events_map,
+        errors=errors,
+    )
+
+
+# Timeout applied to nodes waiting for an event when none is configured
+DEFAULT_TIMEOUT_MS = 10000
+
+
+def node_timeout_ms(node: Node) -> int | None:
+    """How long a node waits for its event after its upstream events.
+
+    Returns:
+        Timeout in milliseconds, or None if the node never times out
+        (only act nodes with conditions and assert nodes do)
+    """
+    if node.type == "act" and not node.conditions:
+        return None
+    if node.type not in ("act", "assert"):
+        return None
+
+    for condition in node.conditions or []:
+        if condition.timeout_ms:
+            return condition.timeout_ms
+
+    return DEFAULT_TIMEOUT_MS
+
+
+def upstream_event_ts(
+    node: Node,
+    matched_by_node: dict[str, list[Event]],
+) -> int | None:
+    """Timestamp of the most recent matched event of a node's dependencies."""
+    return max(
+        (
+            prev_event.ts
+            for dep_id in node.dep_ids
+            for prev_event in matched_by_node.get(dep_id, ())
+        ),
+        default=None,
+    )
+
+
+def missing_events_status(
+    node: Node,
+    upstream_event_ts: int | None,
+) -> tuple[str, str]:
+    """Status and message of a node that has no matched events."""
+    timeout_ms = node_timeout_ms(node)
+
+    # Only act nodes with conditions and assert nodes wait for their event
+    if timeout_ms is None:
+        return "skipped", "No events for this node"
+
+    if upstream_event_ts is None:
+        # No upstream event yet - skip (dependency hasn't completed)
+        return "skipped", "Waiting for upstream dependency"
+
+    # Calculate elapsed time since upstream event
+    elapsed_ms = (time_ns() - upstream_event_ts) / 1_000_000
+
+    if elapsed_ms < timeout_ms:
+        # Still within timeout window - keep waiting
+        remaining_ms = timeout_ms - elapsed_ms
+        return (
+            "running",
+            f"Waiting for event ({elapsed_ms:.0f}ms / {timeout_ms}ms elapsed, "
+            f"{remaining_ms:.0f}ms remaining)",
+        )
+
+    # Timeout expired - fail
+    return "failed", f"Timeout: No event received within {timeout_ms}ms"
+
+
+def run_deadline_ns(
+    items: list[ValidationItem],
+    nodes_map: dict[str, Node],
+    matched_by_node: dict[str, list[Event]],
+) -> int | None:
+    """When the result of a run changes on its own, without new events.
+
+    That is the earliest time a node still waiting for its event times out.
+
+    Returns:
+        Deadline (ns since epoch), or None if no node is waiting
+    """
+    return earliest_deadline_ns(
+        items, nodes_map, lambda node: upstream_event_ts(node, matched_by_node)
     )
 
 
+def earliest_deadline_ns(
+    items: list[ValidationItem],
+    nodes_map: dict[str, Node],
+    upstream_ts: Callable[[Node], int | None],
+) -> int | None:
+    """Same as ``run_deadline_ns``, given each node's upstream event ts."""
+    deadlines: list[int] = []
+
+    for item in items:
+        if item.get("status") != "running" or item.get("ev_ids"):
+            continue
+
+        node = nodes_map.get(item["node_id"])
+        if node is None:
+            continue
+
+        timeout_ms = node_timeout_ms(node)
+        node_upstream_ts = upstream_ts(node)
+        if timeout_ms is not None and node_upstream_ts is not None:
+            deadlines.append(node_upstream_ts + timeout_ms * 1_000_000)
+
+    return min(deadlines, default=None)
+
+
+def validate_node(
+    node_id: str,
+    node: Node,
+    node_events: list[Event],
+    matched_by_node: dict[str, list[Event]],
+    evaluator: ExprEvaluator | None = None,
+    match_error: str | None = None,
+) -> ValidationItem:
+    """Validate a single node against its matched events.
+
+    The item only depends on the node definition, its matched events and
+    the matched events of its dependencies, except for nodes without
+    events, whose status depends on the current time (timeouts).
+
+    Nodes whose filter or validator ran over its execution budget get the
+    "error" status, with the reason as error.
+
+    Args:
+        node_id: Node identifier
+        node: Node definition (already ensured)
+        node_events: Matched events of this node
+        matched_by_node: Map of node_id -> matched events for every node
+        evaluator: Optional expression evaluator for validator evaluation
+        match_error: Why matching the node's events failed, if it did
+
+    Returns:
+        ValidationItem for the node
+    """
+    item_start = time_ns()
+
+    if match_error is not None:
+        return budget_error_item(node_id, node, [], [], match_error, item_start)
+
+    # If no events for this node, determine status based on node type, conditions, and timing
+    if not node_events:
+        # Timeouts count from the most recent upstream dependency event
+        node_status, node_message = missing_events_status(
+            node, upstream_event_ts(node, matched_by_node)
+        )
+
+        return ValidationItem(
+            node_id=node_id,
+            dep_node_ids=node.dep_ids or [],
+            message=node_message,
+            status=node_status,  # type: ignore
+            elapsed_ns=time_ns() - item_start,
+            ev_ids=[],
+            upstream_ev_ids=[],
+        )
+
+    # Build Ctx from ALL upstream dependencies
+    ctx, upstream_ev_ids = build_upstream_ctx(node.dep_ids, matched_by_node)
+
+    # Most recent upstream event, shared by all timeout checks below
+    max_upstream_ts = upstream_event_ts(node, matched_by_node)
+
+    # Validate each event for this node
+    status: str = "running"
+    error: str | None = None
+    message: str | None = None
+
+    # Run the validator (if present) over all events in one call
+    validator_results: list[bool] | None = None
+    if node.validator and evaluator:
+        try:
+            validator_results = evaluate_expr(
+                evaluator, node.validator, node_events, ctx, upstream_ev_ids
+            )
+        except ExprBudgetExceeded as e:
+            return budget_error_item(
+                node_id,
+                node,
+                [ev.id for ev in node_events],
+                upstream_ev_ids,
+                e.reason,
+                item_start,
+            )
+
+    for ev_index, current_ev in enumerate(node_events):
+        if status == "failed":
+            break
+
+        # Check validator result if present
+        if validator_results is not None:
+            if not validator_results[ev_index]:
+                error = "Validator assertion failed"
+                status = "failed"
+                break
+            else:
+                message = "Validator passed"
+                status = "passed"
+
+        # Check timeout conditions if present
+        if node.conditions:
+            for cond in node.conditions:
+                if not cond.timeout_ms:
+                    continue
+
+                # Check timeout against all upstream events
+                if max_upstream_ts is not None:
+                    time_diff_ms = (current_ev.ts - max_upstream_ts) / 1_000_000
+
+                    if time_diff_ms > cond.timeout_ms:
+                        error = append_text(
+                            f"Timeout exceeded: {time_diff_ms}ms > {cond.timeout_ms}ms",
+                            error,
+                            "\n",
+                        )
+                        status = "failed"
+                    else:
+                        if not message:
+                            message = f"Timeout satisfied: {time_diff_ms}ms <= {cond.timeout_ms}ms"
+                        if status == "running":
+                            status = "passed"
+
+    # If no validator and no conditions, mark as passed
+    if status == "running":
+        if node.dep_ids and not ctx["deps"]:
+            message = "No upstream events found for dependencies"
+            status = "failed"
+        else:
+            message = "Node validation passed"
+            status = "passed"
+
+    return ValidationItem(
+        node_id=node_id,
+        dep_node_ids=node.dep_ids or [],
+        status=status,  # type: ignore
+        message=message,
+        error=error,
+        elapsed_ns=time_ns() - item_start,
+        ev_ids=[ev.id for ev in node_events],
+        upstream_ev_ids=upstream_ev_ids,
+    )
+
+
+def budget_error_item(
+    node_id: str,
+    node: Node,
+    ev_ids: list[str],
+    upstream_ev_ids: list[str],
+    reason: str,
+    item_start: int,
+) -> ValidationItem:
+    """Item of a node whose filter or validator ran over its budget."""
+    return ValidationItem(
+        node_id=node_id,
+        dep_node_ids=node.dep_ids or [],
+        status="error",
+        message=None,
+        error=reason,
+        elapsed_ns=time_ns() - item_start,
+        ev_ids=ev_ids,
+        upstream_ev_ids=upstream_ev_ids,
+    )
+
+
+class ShortCircuit:
+    """Which nodes an evaluation policy skips after a failure.
+
+    Nodes are decided layer by layer, from the items of the previous
+    layers: with "fail_fast", every node after the layer of a failed node
+    is skipped; with "fail_fast_branch", only the nodes downstream of a
+    failed node. Nodes of the same layer never skip each other, and
+    skipped nodes don't run their filter or validator. Failed nodes make
+    the run fail, so the overall status is the same as with "full".
+
+    Args:
+        policy: Evaluation policy
+
+    Raises:
+        ValueError: If the policy is unknown
+    """
+
+    def __init__(self, policy: EvalPolicy = "full") -> None:
+        if policy not in get_args(EvalPolicy):
+            raise ValueError(f"Unknown evaluation policy: {policy}")
+        self.policy = policy
+        self.failed = False
+        # Failed and cancelled nodes
+        self.stopped: set[str] = set()
+
+    def cancels(self, node: Node) -> bool:
+        """Whether the node is skipped."""
+        if self.policy == "fail_fast":
+            return self.failed
+        if self.policy == "fail_fast_branch":
+            return any(dep_id in self.stopped for dep_id in node.dep_ids)
+        return False
+
+    def record(self, items: list[ValidationItem]) -> None:
+        """Take the items of a layer into account for the next layers."""
+        for item in items:
+            if item["status"] == "failed":
+                self.failed = True
+            if item["status"] in ("failed", "cancelled"):
+                self.stopped.add(item["node_id"])
+
+    def cancelled_item(self, node_id: str, node: Node) -> ValidationItem:
+        """Item of a skipped node."""
+        message = (
+            "Not evaluated: an upstream node failed"
+            if self.policy == "fail_fast_branch"
+            else "Not evaluated: the flow already failed"
+        )
+        return ValidationItem(
+            node_id=node_id,
+            dep_node_ids=node.dep_ids or [],
+            status="cancelled",
+            message=message,
+            elapsed_ns=0,
+            ev_ids=[],
+            upstream_ev_ids=[],
+        )
+
+
+def summarize_status(items: list[ValidationItem]) -> EvalStatus:
+    """Overall flow status from its validation items.
+
+    The flow fails if any node failed, errors if any node's expressions
+    ran over budget, is running while any node is still waiting, and
+    passes otherwise.
+    """
+    if any(item["status"] == "failed" for item in items):
+        return "failed"
+
+    if any(item["status"] == "error" for item in items):
+        return "error"
+
+    if any(item["status"] == "running" for item in items):
+        return "running"
+
+    return "passed"
+
+
 def validate_flow_execution(
     matched: LayeredEvents,
     nodes_map: dict[str, Node],
     layers: list[list[str]],
     evaluator: ExprEvaluator | None = None,
+    executor: Executor | None = None,
 ) -> ValidationResult:
     """Validate that flow execution followed the expected graph.
 
@@ -151,301 +724,168 @@ def validate_flow_execution(
     - Dependencies are satisfied
     - Timeout conditions are met
     - Validators pass
+    - Filters and validators stay within their execution budgets
 
     Args:
         matched: Events matched to layers
         nodes_map: Map of node_id -> Node
         layers: Topologically sorted layers of node IDs
         evaluator: Optional expression evaluator for validator evaluation
+        executor: Optional pool validating the nodes of each layer
+            concurrently (see ``map_layer``)
 
     Returns:
         ValidationResult with status and detailed items
     """
-    from typing import cast
-
-    from src.domain.types import Ctx, DepData
-
     start_time = time_ns()
     items: list[ValidationItem] = []
     all_ev_ids: list[str] = []
-    overall_status: str = "pending"
 
     # Collect all event IDs
     for layer_ev_ids in matched["layers"]:
         all_ev_ids.extend(layer_ev_ids)
 
-    # Build graph for output
-    graph: dict[str, list[str]] = {}
-    for node_id, node in nodes_map.items():
-        graph[node_id] = node.dep_ids or []
+    # Index matched events by node once, instead of rescanning layers per node
+    matched_by_node = index_events_by_node(all_ev_ids, matched["events"])
+    match_errors = matched.get("errors", {})
 
-    # Validate each layer
-    for layer_index, layer_node_ids in enumerate(layers):
-        layer_ev_ids = matched["layers"][layer_index]
+    def validate(node_id: str) -> ValidationItem:
+        return validate_node(
+            node_id,
+            nodes_map[node_id],
+            matched_by_node.get(node_id, []),
+            matched_by_node,
+            evaluator,
+            match_errors.get(node_id),
+        )
 
+    # Validate each layer
+    for layer_node_ids in layers:
+        node_ids: list[str] = []
         for node_id in layer_node_ids:
             current_node = nodes_map.get(node_id)
             if current_node is None:
                 continue
 
             current_node.ensure()
+            node_ids.append(node_id)
 
-            item_start = time_ns()
-
-            # Get current layer events for this node
-            current_node_events = [
-                matched["events"][ev_id]
-                for ev_id in layer_ev_ids
-                if matched["events"][ev_id].node_id == node_id
-            ]
-
-            # If no events for this node, determine status based on node type, conditions, and timing
-            if not current_node_events:
-                # Find the most recent upstream dependency event timestamp
-                upstream_event_ts: int | None = None
-                if current_node.dep_ids:
-                    # Search all previous layers for the most recent dependency event
-                    for prev_layer_index in range(layer_index):
-                        prev_layer_event_ids = matched["layers"][prev_layer_index]
-                        for prev_event_id in prev_layer_event_ids:
-                            prev_event = matched["events"][prev_event_id]
-                            if prev_event.node_id in current_node.dep_ids:
-                                # Track the most recent (highest timestamp)
-                                if (
-                                    upstream_event_ts is None
-                                    or prev_event.ts > upstream_event_ts
-                                ):
-                                    upstream_event_ts = prev_event.ts
-
-                # Check if this node should fail/wait based on timing
-                node_status = "skipped"
-                node_message = "No events for this node"
-                should_mark_overall_failed = False
-
-                # Act nodes with conditions (especially timeout)
-                if current_node.type == "act" and current_node.conditions:
-                    # Find timeout_ms if present, default to 10 seconds
-                    timeout_ms = None
-                    for condition in current_node.conditions:
-                        if condition.timeout_ms:
-                            timeout_ms = condition.timeout_ms
-                            break
-
-                    # Default timeout: 10 seconds if not specified
-                    if timeout_ms is None:
-                        timeout_ms = 10000
-
-                    if upstream_event_ts is not None:
-                        # Calculate elapsed time since upstream event
-                        current_time_ns = time_ns()
-                        elapsed_ns = current_time_ns - upstream_event_ts
-                        elapsed_ms = elapsed_ns / 1_000_000
-
-                        if elapsed_ms < timeout_ms:
-                            # Still within timeout window - keep waiting
-                            node_status = "running"
-                            remaining_ms = timeout_ms - elapsed_ms
-                            node_message = f"Waiting for event ({elapsed_ms:.0f}ms / {timeout_ms}ms elapsed, {remaining_ms:.0f}ms remaining)"
-                        else:
-                            # Timeout expired - fail
-                            node_status = "failed"
-                            node_message = (
-                                f"Timeout: No event received within {timeout_ms}ms"
-                            )
-                            should_mark_overall_failed = True
-                    else:
-                        # No upstream event - can't determine if timeout expired
-                        if upstream_event_ts is None:
-                            # No upstream event yet - skip (dependency hasn't completed)
-                            node_status = "skipped"
-                            node_message = "Waiting for upstream dependency"
-                        else:
-                            # Has upstream but something went wrong
-                            node_status = "failed"
-                            node_message = (
-                                "No event received for act node with conditions"
-                            )
-                            should_mark_overall_failed = True
-
-                # Assert nodes always should fail when missing (they have validators)
-                elif current_node.type == "assert":
-                    # Check if we have a timeout from conditions, default to 10 seconds
-                    timeout_ms = None
-                    if current_node.conditions:
-                        for condition in current_node.conditions:
-                            if condition.timeout_ms:
-                                timeout_ms = condition.timeout_ms
-                                break
-
-                    # Default timeout: 10 seconds if not specified
-                    if timeout_ms is None:
-                        timeout_ms = 10000
-
-                    if upstream_event_ts is not None:
-                        # Calculate elapsed time since upstream event
-                        current_time_ns = time_ns()
-                        elapsed_ns = current_time_ns - upstream_event_ts
-                        elapsed_ms = elapsed_ns / 1_000_000
-
-                        if elapsed_ms < timeout_ms:
-                            # Still within timeout window
-                            node_status = "running"
-                            remaining_ms = timeout_ms - elapsed_ms
-                            node_message = f"Waiting for event ({elapsed_ms:.0f}ms / {timeout_ms}ms elapsed, {remaining_ms:.0f}ms remaining)"
-                        else:
-                            # Timeout expired
-                            node_status = "failed"
-                            node_message = (
-                                f"Timeout: No event received within {timeout_ms}ms"
-                            )
-                            should_mark_overall_failed = True
-                    else:
-                        # No timeout or no upstream event
-                        if upstream_event_ts is None:
-                            # No upstream event yet - skip (dependency hasn't completed)
-                            node_status = "skipped"
-                            node_message = "Waiting for upstream dependency"
-                        else:
-                            # Has upstream but no timeout - fail
-                            node_status = "failed"
-                            node_message = "No event received for assert node"
-                            should_mark_overall_failed = True
-
-                # Mark overall status as failed only if actually failed (not running)
-                if should_mark_overall_failed:
-                    overall_status = "failed"
-
-                items.append(
-                    ValidationItem(
-                        node_id=node_id,
-                        dep_node_ids=current_node.dep_ids or [],
-                        message=node_message,
-                        status=node_status,  # type: ignore
-                        elapsed_ns=time_ns() - item_start,
-                        ev_ids=[],
-                        upstream_ev_ids=[],
-                    )
-                )
+        items.extend(map_layer(validate, node_ids, executor))
+
+    return ValidationResult(
+        status=summarize_status(items),
+        items=items,
+        elapsed_ns=time_ns() - start_time,
+        graph=build_output_graph(nodes_map),
+        ev_ids=all_ev_ids,
+        deadline_ns=run_deadline_ns(items, nodes_map, matched_by_node),
+    )
+
+
+def evaluate_flow(
+    events: list[Event],
+    layers: list[list[str]],
+    nodes_map: dict[str, Node],
+    evaluator: ExprEvaluator,
+    executor: Executor | None = None,
+    policy: EvalPolicy = "full",
+) -> ValidationResult:
+    """Match and validate the events of a run layer by layer.
+
+    Each layer is validated before the next one is matched, so nodes the
+    policy skips (see ``ShortCircuit``) never run their filter or
+    validator. With the "full" policy, the result is the same as
+    ``match_events_to_layers`` followed by ``validate_flow_execution``.
+
+    Args:
+        events: List of events (already filtered by run_id + flow)
+        layers: Topologically sorted layers of node IDs
+        nodes_map: Map of node_id -> Node
+        evaluator: Expression evaluator for filters and validators
+        executor: Optional pool matching and validating the nodes of each
+            layer concurrently (see ``map_layer``)
+        policy: Evaluation policy
+
+    Returns:
+        ValidationResult with status and detailed items
+    """
+    start_time = time_ns()
+    short_circuit = ShortCircuit(policy)
+    events_map: dict[str, Event] = {ev.id: ev for ev in events}
+    events_by_node = index_events_by_node([ev.id for ev in events], events_map)
+    matched_by_node: dict[str, list[Event]] = {}
+    errors: dict[str, str] = {}
+    items: list[ValidationItem] = []
+    all_ev_ids: list[str] = []
+
+    def match(node_id: str) -> list[Event] | ExprBudgetExceeded:
+        try:
+            return match_node_events(
+                nodes_map[node_id], events_by_node[node_id], matched_by_node, evaluator
+            )
+        except ExprBudgetExceeded as e:
+            return e
+
+    def validate(node_id: str) -> ValidationItem:
+        return validate_node(
+            node_id,
+            nodes_map[node_id],
+            matched_by_node.get(node_id, []),
+            matched_by_node,
+            evaluator,
+            errors.get(node_id),
+        )
+
+    for layer_node_ids in layers:
+        node_ids: list[str] = []
+        cancelled: list[str] = []
+        for node_id in layer_node_ids:
+            current_node = nodes_map.get(node_id)
+            if current_node is None:
                 continue
 
-            # Build Ctx from ALL upstream dependencies
-            ctx: Ctx = {"deps": []}
-            upstream_ev_ids: list[str] = []
-
-            if current_node.dep_ids:
-                # For each dep_id, find ALL matching events from previous layers
-                for dep_id in current_node.dep_ids:
-                    # Search all previous layers for events matching this dep_id
-                    for prev_layer_index in range(layer_index):
-                        prev_layer_event_ids = matched["layers"][prev_layer_index]
-                        for prev_event_id in prev_layer_event_ids:
-                            prev_event = matched["events"][prev_event_id]
-                            if prev_event.node_id == dep_id:
-                                # Add to upstream_ev_ids
-                                upstream_ev_ids.append(prev_event_id)
-                                # Add this event to deps
-                                dep_data: DepData = {
-                                    "flow": prev_event.flow,
-                                    "id": prev_event.node_id,
-                                    "data": prev_event.data,
-                                }
-                                ctx["deps"].append(dep_data)
-
-            # Convenience: if single dep, populate ctx["data"]
-            if len(ctx["deps"]) == 1:
-                ctx["data"] = ctx["deps"][0]["data"]
-
-            # Validate each event for this node
-            status: str = "running"
-            error: str | None = None
-            message: str | None = None
-
-            for current_ev in current_node_events:
-                if status == "failed":
-                    break
-
-                # Call validator if present
-                if current_node.validator and evaluator:
-                    validator_passed = evaluator.evaluate(
-                        current_node.validator,
-                        data=current_ev.data,
-                        ctx=cast(dict[str, Any], ctx),
-                    )
-                    if not validator_passed:
-                        error = "Validator assertion failed"
-                        status = "failed"
-                        overall_status = "failed"
-                        break
-                    else:
-                        message = "Validator passed"
-                        status = "passed"
-
-                # Check timeout conditions if present
-                if current_node.conditions:
-                    for cond in current_node.conditions:
-                        if not cond.timeout_ms:
-                            continue
-
-                        # Check timeout against all upstream events
-                        if ctx["deps"]:
-                            # Find the most recent upstream event
-                            max_upstream_ts = max(
-                                matched["events"][ev_id].ts
-                                for ev_id in upstream_ev_ids
-                                if ev_id in matched["events"]
-                            )
-                            time_diff_ms = (current_ev.ts - max_upstream_ts) / 1_000_000
-
-                            if time_diff_ms > cond.timeout_ms:
-                                error = append_text(
-                                    f"Timeout exceeded: {time_diff_ms}ms > {cond.timeout_ms}ms",
-                                    error,
-                                    "\n",
-                                )
-                                status = "failed"
-                                overall_status = "failed"
-                            else:
-                                if not message:
-                                    message = f"Timeout satisfied: {time_diff_ms}ms <= {cond.timeout_ms}ms"
-                                if status == "running":
-                                    status = "passed"
-
-            # If no validator and no conditions, mark as passed
-            if status == "running":
-                if current_node.dep_ids and not ctx["deps"]:
-                    message = "No upstream events found for dependencies"
-                    status = "failed"
-                    overall_status = "failed"
-                else:
-                    message = "Node validation passed"
-                    status = "passed"
-
-            items.append(
-                ValidationItem(
-                    node_id=node_id,
-                    dep_node_ids=current_node.dep_ids or [],
-                    status=status,  # type: ignore
-                    message=message,
-                    error=error,
-                    elapsed_ns=time_ns() - item_start,
-                    ev_ids=[ev.id for ev in current_node_events],
-                    upstream_ev_ids=upstream_ev_ids,
-                )
+            current_node.ensure()
+            if short_circuit.cancels(current_node):
+                cancelled.append(node_id)
+            else:
+                node_ids.append(node_id)
+
+        with_events = [node_id for node_id in node_ids if events_by_node.get(node_id)]
+        for node_id, node_matched in zip(
+            with_events, map_layer(match, with_events, executor), strict=True
+        ):
+            if isinstance(node_matched, ExprBudgetExceeded):
+                errors[node_id] = node_matched.reason
+                continue
+
+            all_ev_ids.extend(event.id for event in node_matched)
+            matched_by_node[node_id] = node_matched
+
+        layer_items = dict(
+            zip(node_ids, map_layer(validate, node_ids, executor), strict=True)
+        )
+        for node_id in cancelled:
+            layer_items[node_id] = short_circuit.cancelled_item(
+                node_id, nodes_map[node_id]
             )
 
-    # Determine overall status
-    if overall_status != "failed":
-        # Check if any nodes are still running
-        has_running = any(item["status"] == "running" for item in items)
-        if has_running:
-            overall_status = "running"
-        else:
-            overall_status = "passed"
+        # Keep the node order of the layer
+        ordered = [
+            layer_items[node_id] for node_id in layer_node_ids if node_id in layer_items
+        ]
+        short_circuit.record(ordered)
+        items.extend(ordered)
 
     return ValidationResult(
-        status=overall_status,  # type: ignore
+        status=summarize_status(items),
         items=items,
         elapsed_ns=time_ns() - start_time,
-        graph=graph,
+        graph=build_output_graph(nodes_map),
         ev_ids=all_ev_ids,
+        deadline_ns=run_deadline_ns(items, nodes_map, matched_by_node),
     )
+
+
+def build_output_graph(nodes_map: dict[str, Node]) -> dict[str, list[str]]:
+    """Map of node_id -> dep_ids reported alongside validation results."""
+    return {node_id: node.dep_ids or [] for node_id, node in nodes_map.items()}
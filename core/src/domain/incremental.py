@@ -0,0 +1,266 @@
+"""Incremental flow validation.
+
+Keeps the matched events and validation items of a run between evaluations
+so that a new batch of events only re-evaluates the nodes that received
+events and everything downstream of them. Uses the same per-node functions
+as the full evaluation, so both produce the same result.
+"""
+
+from __future__ import annotations
+
+from bisect import insort
+from concurrent.futures import Executor
+from time import time_ns
+from typing import Any
+
+from src.domain.evaluation import (
+    ExprBudgetExceeded,
+    ExprEvaluator,
+    ShortCircuit,
+    build_output_graph,
+    map_layer,
+    match_node_events,
+    run_deadline_ns,
+    summarize_status,
+    validate_node,
+)
+from src.domain.types import FlowGraph, ValidationItem, ValidationResult
+from src.models import EvalPolicy, Event
+
+
+class RunState:
+    """Evaluation state of a single (run_id, flow).
+
+    Attributes:
+        fingerprint: Fingerprint of the node definitions the state was built with
+        events: Map of event_id -> Event for every event applied so far
+        events_by_node: Candidate events per node, in timestamp order
+        matched_by_node: Matched events per node (after filters)
+        items_by_node: Cached validation items of nodes that have matched
+            events. Nodes without events are always re-validated because
+            their status depends on the current time.
+        errors_by_node: Nodes whose filter ran over its execution budget,
+            with the reason. They are re-matched on the next batch.
+        cancelled: Nodes skipped by the evaluation policy (they have no
+            matched events nor item). They are re-matched on the next batch.
+    """
+
+    def __init__(self, fingerprint: str) -> None:
+        self.fingerprint = fingerprint
+        self.events: dict[str, Event] = {}
+        self.events_by_node: dict[str, list[Event]] = {}
+        self.matched_by_node: dict[str, list[Event]] = {}
+        self.items_by_node: dict[str, ValidationItem] = {}
+        self.errors_by_node: dict[str, str] = {}
+        self.cancelled: set[str] = set()
+
+    def to_dict(self) -> dict[str, Any]:
+        """Serialize the state to JSON-compatible data."""
+        return {
+            "fingerprint": self.fingerprint,
+            "events": [
+                event.model_dump(mode="json")
+                for node_events in self.events_by_node.values()
+                for event in node_events
+            ],
+            "matched": {
+                node_id: [event.id for event in node_events]
+                for node_id, node_events in self.matched_by_node.items()
+            },
+            "items": self.items_by_node,
+            "errors": self.errors_by_node,
+            "cancelled": sorted(self.cancelled),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> RunState:
+        """Rebuild a state serialized with ``to_dict``."""
+        state = cls(data["fingerprint"])
+        for raw in data["events"]:
+            event = Event.model_validate(raw)
+            state.events[event.id] = event
+            state.events_by_node.setdefault(event.node_id, []).append(event)
+
+        state.matched_by_node = {
+            node_id: [state.events[ev_id] for ev_id in ev_ids]
+            for node_id, ev_ids in data["matched"].items()
+        }
+        state.items_by_node = data["items"]
+        state.errors_by_node = data.get("errors", {})
+        state.cancelled = set(data.get("cancelled", []))
+        return state
+
+
+def downstream_nodes(graph: dict[str, list[str]], node_ids: set[str]) -> set[str]:
+    """Return the given nodes plus every node reachable from them.
+
+    Args:
+        graph: Adjacency list where graph[node] = [dependent_nodes]
+        node_ids: Nodes to start from
+
+    Returns:
+        Set of node IDs
+    """
+    visited: set[str] = set()
+    stack = list(node_ids)
+
+    while stack:
+        current = stack.pop()
+        if current in visited:
+            continue
+
+        visited.add(current)
+        stack.extend(graph.get(current, []))
+
+    return visited
+
+
+def apply_events(
+    state: RunState,
+    new_events: list[Event],
+    flow_graph: FlowGraph,
+    layers: list[list[str]],
+    evaluator: ExprEvaluator,
+    executor: Executor | None = None,
+    policy: EvalPolicy = "full",
+) -> ValidationResult:
+    """Add events to a run state and return the updated validation result.
+
+    Only nodes that received new events, and the nodes downstream of them,
+    are re-matched and re-validated. Everything else is reused from the
+    state. Applying all events of a run to an empty state is equivalent to
+    ``evaluate_flow`` with the same policy.
+
+    Args:
+        state: Run state to update in place
+        new_events: Events to add (events already in the state are ignored)
+        flow_graph: Flow graph the state was built with
+        layers: Topologically sorted layers of node IDs
+        evaluator: Expression evaluator for filters and validators
+        executor: Optional pool matching and validating the nodes of each
+            layer concurrently (see ``map_layer``)
+        policy: Evaluation policy (see ``ShortCircuit``)
+
+    Returns:
+        ValidationResult for the whole run
+    """
+    start_time = time_ns()
+    nodes_map = flow_graph["nodes"]
+
+    changed: set[str] = set()
+    for event in new_events:
+        if event.id in state.events:
+            continue
+
+        state.events[event.id] = event
+        # Keep candidates in timestamp order, ties in arrival order
+        insort(
+            state.events_by_node.setdefault(event.node_id, []),
+            event,
+            key=lambda ev: ev.ts,
+        )
+        changed.add(event.node_id)
+
+    # Budget breaches may be transient: retry them with every batch. So are
+    # cancellations: what cancelled a node may be outside its upstream
+    changed.update(state.errors_by_node)
+    changed.update(state.cancelled)
+    dirty = downstream_nodes(flow_graph["graph"], changed)
+    state.cancelled = set()
+    short_circuit = ShortCircuit(policy)
+
+    def match(node_id: str) -> list[Event] | ExprBudgetExceeded:
+        try:
+            return match_node_events(
+                nodes_map[node_id],
+                state.events_by_node.get(node_id, []),
+                state.matched_by_node,
+                evaluator,
+            )
+        except ExprBudgetExceeded as e:
+            return e
+
+    def validate(node_id: str) -> ValidationItem:
+        return validate_node(
+            node_id,
+            nodes_map[node_id],
+            state.matched_by_node.get(node_id, []),
+            state.matched_by_node,
+            evaluator,
+            state.errors_by_node.get(node_id),
+        )
+
+    items: list[ValidationItem] = []
+    ev_ids: list[str] = []
+
+    # Re-match dirty nodes and re-validate stale ones layer by layer;
+    # upstream nodes are always in an earlier layer, so they are up to date
+    for layer_node_ids in layers:
+        layer_ids = [node_id for node_id in layer_node_ids if node_id in nodes_map]
+
+        node_ids: list[str] = []
+        for node_id in layer_ids:
+            if node_id in dirty:
+                state.items_by_node.pop(node_id, None)
+                state.errors_by_node.pop(node_id, None)
+
+            nodes_map[node_id].ensure()
+            if short_circuit.cancels(nodes_map[node_id]):
+                # Cancelled nodes keep no state: they are matched again
+                # once they aren't cancelled anymore
+                state.cancelled.add(node_id)
+                state.items_by_node.pop(node_id, None)
+                state.errors_by_node.pop(node_id, None)
+                state.matched_by_node.pop(node_id, None)
+            elif node_id in dirty:
+                node_ids.append(node_id)
+
+        for node_id, node_matched in zip(
+            node_ids, map_layer(match, node_ids, executor), strict=True
+        ):
+            if isinstance(node_matched, ExprBudgetExceeded):
+                state.errors_by_node[node_id] = node_matched.reason
+                node_matched = []
+            if node_matched:
+                state.matched_by_node[node_id] = node_matched
+            else:
+                state.matched_by_node.pop(node_id, None)
+
+        # Nodes without a cached item are re-validated
+        stale = [
+            node_id
+            for node_id in layer_ids
+            if node_id not in state.items_by_node and node_id not in state.cancelled
+        ]
+        validated = dict(zip(stale, map_layer(validate, stale, executor), strict=True))
+
+        layer_items: list[ValidationItem] = []
+        for node_id in layer_ids:
+            if node_id in state.cancelled:
+                layer_items.append(
+                    short_circuit.cancelled_item(node_id, nodes_map[node_id])
+                )
+                continue
+
+            node_events = state.matched_by_node.get(node_id, [])
+            ev_ids.extend(event.id for event in node_events)
+
+            item = validated.get(node_id)
+            if item is None:
+                item = state.items_by_node[node_id]
+            elif node_events and item["status"] != "error":
+                state.items_by_node[node_id] = item
+
+            layer_items.append(item)
+
+        short_circuit.record(layer_items)
+        items.extend(layer_items)
+
+    return ValidationResult(
+        status=summarize_status(items),
+        items=items,
+        elapsed_ns=time_ns() - start_time,
+        graph=build_output_graph(nodes_map),
+        ev_ids=ev_ids,
+        deadline_ns=run_deadline_ns(items, nodes_map, state.matched_by_node),
+    )
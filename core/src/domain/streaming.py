@@ -0,0 +1,464 @@
+"""Streaming flow validation.
+
+Validates a run from its events read in chunks, in timestamp order, one
+graph layer at a time, instead of from all of its events at once. Nodes
+only depend on previous layers, so once a layer's events have been read
+its matched events are final. Each node keeps a summary of them (IDs and
+latest timestamp); their data is only kept when the filter or validator
+of a dependent node reads ``ctx``.
+
+The result is the same as ``match_events_to_layers`` followed by
+``validate_flow_execution``, except that filters and validators are
+called once per chunk, each call with its own expression budget.
+"""
+
+from __future__ import annotations
+
+import sys
+from time import time_ns
+from typing import Any
+
+from src.domain.evaluation import (
+    ExprBudgetExceeded,
+    ExprEvaluator,
+    ShortCircuit,
+    budget_error_item,
+    build_output_graph,
+    build_upstream_ctx,
+    earliest_deadline_ns,
+    evaluate_expr,
+    missing_events_status,
+    summarize_status,
+)
+from src.domain.types import Ctx, FlowGraph, ValidationItem, ValidationResult
+from src.models import EvalPolicy, Event, Expr, Node
+from src.utils.text import append_text
+
+# Estimated memory of a loaded Event besides its data (ORM state, columns)
+EVENT_BYTES = 2048
+
+# Estimated memory of a matched event ID kept in a summary (string + slot)
+ID_BYTES = 64
+
+# Names through which a script can read its ctx argument, per engine (a
+# direct JS eval can build the name, e.g. eval("c" + "tx"))
+_CTX_NAMES: dict[str, tuple[str, ...]] = {
+    "python": ("ctx", "locals", "vars"),
+    "js": ("ctx", "arguments", "eval"),
+    "cel": ("ctx",),
+}
+
+
+class EvalMemoryExceeded(Exception):
+    """A streaming evaluation needed more memory than its ceiling.
+
+    Attributes:
+        used_bytes: Estimated memory held when the ceiling was crossed
+        max_bytes: The ceiling
+    """
+
+    def __init__(self, used_bytes: int, max_bytes: int) -> None:
+        super().__init__(
+            f"Evaluation needs more than {max_bytes / 2**20:.0f}MB of memory "
+            f"(estimated {used_bytes / 2**20:.1f}MB)"
+        )
+        self.used_bytes = used_bytes
+        self.max_bytes = max_bytes
+
+
+def reads_ctx(expr: Expr | None) -> bool:
+    """Whether a script may read its ctx argument.
+
+    Errs on the side of True: any mention of a name giving access to ctx
+    counts, even in a string or another identifier.
+    """
+    if expr is None:
+        return False
+    names = _CTX_NAMES.get(expr.engine, ("ctx",))
+    return any(name in expr.script for name in names)
+
+
+def value_size(value: Any) -> int:
+    """Approximate memory held by a JSON value, e.g. parsed event data."""
+    size = 0
+    stack = [value]
+
+    while stack:
+        current = stack.pop()
+        size += sys.getsizeof(current)
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, list):
+            stack.extend(current)
+
+    return size
+
+
+def event_size(event: Event) -> int:
+    """Approximate memory held by a loaded event."""
+    return EVENT_BYTES + value_size(event.data)
+
+
+class NodeSummary:
+    """What a streaming evaluation keeps of a node.
+
+    Attributes:
+        keep_events: Whether matched events are kept (a dependent node
+            reads ctx)
+        ev_ids: IDs of the matched events, in timestamp order
+        events: Matched events, if kept
+        max_ts: Timestamp of the latest matched event
+        match_error: Why the filter ran over budget (the node then matches
+            no events)
+        validator_error: Why the validator ran over budget
+        status: Validation status over the events seen so far
+        message: Validation message
+        error: Validation error
+        ctx: Ctx of the node's filter and validator, built on first use
+            (only holds the upstream events if a script reads it)
+        upstream_ev_ids: Matched events of the node's dependencies
+        elapsed_ns: Time spent validating the node
+        bytes: Estimated memory held by the summary
+    """
+
+    def __init__(self, keep_events: bool) -> None:
+        self.keep_events = keep_events
+        self.ev_ids: list[str] = []
+        self.events: list[Event] = []
+        self.max_ts: int | None = None
+        self.match_error: str | None = None
+        self.validator_error: str | None = None
+        self.status = "running"
+        self.message: str | None = None
+        self.error: str | None = None
+        self.ctx: Ctx | None = None
+        self.upstream_ev_ids: list[str] = []
+        self.elapsed_ns = 0
+        self.bytes = 0
+
+
+class StreamingValidation:
+    """Validation of a run whose events are fed layer by layer.
+
+    For each layer (``layers``), in order, call ``start_layer`` and feed
+    the events of the nodes it returns in timestamp order; then call
+    ``result``. Nodes the policy skips are not returned: their events
+    don't need to be read.
+
+    Args:
+        flow_graph: Flow graph to validate against
+        layers: Topologically sorted layers of node IDs
+        evaluator: Expression evaluator for filters and validators
+        max_bytes: Memory ceiling of the evaluation (0 = none)
+        policy: Evaluation policy (see ``ShortCircuit``)
+
+    Attributes:
+        layers: Layers of nodes defined in the flow graph
+        used_bytes: Estimated memory held by the node summaries
+        peak_bytes: Highest estimated memory held, including the chunk
+            being evaluated
+        events_read: Events fed so far
+    """
+
+    def __init__(
+        self,
+        flow_graph: FlowGraph,
+        layers: list[list[str]],
+        evaluator: ExprEvaluator,
+        max_bytes: int = 0,
+        policy: EvalPolicy = "full",
+    ) -> None:
+        self.start_ns = time_ns()
+        self.short_circuit = ShortCircuit(policy)
+        self.nodes_map: dict[str, Node] = flow_graph["nodes"]
+        self.evaluator = evaluator
+        self.max_bytes = max_bytes
+        self.layers = [
+            [node_id for node_id in layer if node_id in self.nodes_map]
+            for layer in layers
+        ]
+
+        keep: set[str] = set()
+        for layer in self.layers:
+            for node_id in layer:
+                node = self.nodes_map[node_id]
+                node.ensure()
+                if reads_ctx(node.filter) or reads_ctx(node.validator):
+                    keep.update(node.dep_ids)
+
+        self.summaries = {
+            node_id: NodeSummary(node_id in keep)
+            for layer in self.layers
+            for node_id in layer
+        }
+        self.used_bytes = 0
+        self.peak_bytes = 0
+        self.events_read = 0
+        # Items of the layers before ``_closed``, which are final
+        self.items: dict[str, ValidationItem] = {}
+        self.cancelled: set[str] = set()
+        self._closed = 0
+
+    def start_layer(self, index: int) -> list[str]:
+        """Start feeding a layer.
+
+        Returns:
+            Nodes of the layer whose events must be fed
+        """
+        self._close_layers(index)
+
+        node_ids: list[str] = []
+        for node_id in self.layers[index]:
+            if self.short_circuit.cancels(self.nodes_map[node_id]):
+                self.cancelled.add(node_id)
+            else:
+                node_ids.append(node_id)
+        return node_ids
+
+    def _close_layers(self, end: int) -> None:
+        """Compute the items of the layers before ``end``."""
+        for layer in self.layers[self._closed : end]:
+            layer_items: list[ValidationItem] = []
+            for node_id in layer:
+                node = self.nodes_map[node_id]
+                if self.short_circuit.cancels(node):
+                    item = self.short_circuit.cancelled_item(node_id, node)
+                else:
+                    item = self._item(node_id)
+                self.items[node_id] = item
+                layer_items.append(item)
+            self.short_circuit.record(layer_items)
+
+        self._closed = max(self._closed, end)
+
+    def feed(self, events: list[Event]) -> None:
+        """Match and validate a chunk of events.
+
+        Every event of the dependencies of the chunk's nodes must have been
+        fed before.
+
+        Raises:
+            EvalMemoryExceeded: If the evaluation crossed its memory ceiling
+        """
+        self.events_read += len(events)
+        self._track(sum(event_size(event) for event in events))
+
+        events_by_node: dict[str, list[Event]] = {}
+        for event in events:
+            events_by_node.setdefault(event.node_id, []).append(event)
+
+        for node_id, node_events in events_by_node.items():
+            summary = self.summaries.get(node_id)
+            if (
+                summary is not None
+                and summary.match_error is None
+                and node_id not in self.cancelled
+            ):
+                self._feed_node(self.nodes_map[node_id], summary, node_events)
+
+        # The chunk's events are released, except the ones kept
+        self._track(0)
+
+    def _feed_node(self, node: Node, summary: NodeSummary, events: list[Event]) -> None:
+        ctx = self._ctx(node, summary)
+
+        matched = events
+        if node.filter:
+            try:
+                keep = evaluate_expr(
+                    self.evaluator, node.filter, events, ctx, summary.upstream_ev_ids
+                )
+            except ExprBudgetExceeded as e:
+                self.used_bytes -= summary.bytes
+                summary.match_error = e.reason
+                summary.ev_ids, summary.events, summary.max_ts = [], [], None
+                summary.bytes = 0
+                return
+            matched = [event for event, kept in zip(events, keep, strict=True) if kept]
+
+        if not matched:
+            return
+
+        added = ID_BYTES * len(matched)
+        summary.ev_ids.extend(event.id for event in matched)
+        latest_ts = max(event.ts for event in matched)
+        if summary.max_ts is None or latest_ts > summary.max_ts:
+            summary.max_ts = latest_ts
+        if summary.keep_events:
+            summary.events.extend(matched)
+            added += sum(event_size(event) for event in matched)
+        summary.bytes += added
+        self.used_bytes += added
+
+        start = time_ns()
+        self._validate(node, summary, matched, ctx)
+        summary.elapsed_ns += time_ns() - start
+
+    def _ctx(self, node: Node, summary: NodeSummary) -> Ctx:
+        """Ctx of a node, built from its dependencies' summaries once."""
+        if summary.ctx is not None:
+            return summary.ctx
+
+        if reads_ctx(node.filter) or reads_ctx(node.validator):
+            summary.ctx, summary.upstream_ev_ids = build_upstream_ctx(
+                node.dep_ids,
+                {
+                    dep_id: self.summaries[dep_id].events
+                    for dep_id in node.dep_ids
+                    if dep_id in self.summaries
+                },
+            )
+        else:
+            # Scripts never see it: only the upstream IDs (memo keys) matter
+            summary.ctx = {"deps": []}
+            summary.upstream_ev_ids = [
+                ev_id
+                for dep_id in node.dep_ids
+                if dep_id in self.summaries
+                for ev_id in self.summaries[dep_id].ev_ids
+            ]
+
+        added = ID_BYTES * len(summary.upstream_ev_ids)
+        summary.bytes += added
+        self.used_bytes += added
+        return summary.ctx
+
+    def _upstream_ts(self, node: Node) -> int | None:
+        """Timestamp of the latest matched event of a node's dependencies."""
+        latest: int | None = None
+        for dep_id in node.dep_ids:
+            summary = self.summaries.get(dep_id)
+            if summary is None or summary.max_ts is None:
+                continue
+            if latest is None or summary.max_ts > latest:
+                latest = summary.max_ts
+        return latest
+
+    def _validate(
+        self, node: Node, summary: NodeSummary, events: list[Event], ctx: Ctx
+    ) -> None:
+        """Carry the checks of ``validate_node`` over a chunk of matched events."""
+        validator_results: list[bool] | None = None
+        if node.validator:
+            if summary.validator_error is not None:
+                return
+            try:
+                validator_results = evaluate_expr(
+                    self.evaluator, node.validator, events, ctx, summary.upstream_ev_ids
+                )
+            except ExprBudgetExceeded as e:
+                summary.validator_error = e.reason
+                return
+
+        max_upstream_ts = self._upstream_ts(node)
+
+        for ev_index, current_ev in enumerate(events):
+            if summary.status == "failed":
+                break
+
+            if validator_results is not None:
+                if not validator_results[ev_index]:
+                    summary.error = "Validator assertion failed"
+                    summary.status = "failed"
+                    break
+                else:
+                    summary.message = "Validator passed"
+                    summary.status = "passed"
+
+            for cond in node.conditions or []:
+                if not cond.timeout_ms or max_upstream_ts is None:
+                    continue
+
+                time_diff_ms = (current_ev.ts - max_upstream_ts) / 1_000_000
+                if time_diff_ms > cond.timeout_ms:
+                    summary.error = append_text(
+                        f"Timeout exceeded: {time_diff_ms}ms > {cond.timeout_ms}ms",
+                        summary.error,
+                        "\n",
+                    )
+                    summary.status = "failed"
+                else:
+                    if not summary.message:
+                        summary.message = f"Timeout satisfied: {time_diff_ms}ms <= {cond.timeout_ms}ms"
+                    if summary.status == "running":
+                        summary.status = "passed"
+
+    def _track(self, chunk_bytes: int) -> None:
+        used = self.used_bytes + chunk_bytes
+        self.peak_bytes = max(self.peak_bytes, used)
+        if self.max_bytes and used > self.max_bytes:
+            raise EvalMemoryExceeded(used, self.max_bytes)
+
+    def _item(self, node_id: str) -> ValidationItem:
+        node = self.nodes_map[node_id]
+        summary = self.summaries[node_id]
+        item_start = time_ns() - summary.elapsed_ns
+
+        if summary.match_error is not None:
+            return budget_error_item(
+                node_id, node, [], [], summary.match_error, item_start
+            )
+
+        if not summary.ev_ids:
+            node_status, node_message = missing_events_status(
+                node, self._upstream_ts(node)
+            )
+            return ValidationItem(
+                node_id=node_id,
+                dep_node_ids=node.dep_ids or [],
+                message=node_message,
+                status=node_status,  # type: ignore
+                elapsed_ns=time_ns() - item_start,
+                ev_ids=[],
+                upstream_ev_ids=[],
+            )
+
+        if summary.validator_error is not None:
+            return budget_error_item(
+                node_id,
+                node,
+                summary.ev_ids,
+                summary.upstream_ev_ids,
+                summary.validator_error,
+                item_start,
+            )
+
+        status, message = summary.status, summary.message
+        if status == "running":
+            if node.dep_ids and not summary.upstream_ev_ids:
+                message = "No upstream events found for dependencies"
+                status = "failed"
+            else:
+                message = "Node validation passed"
+                status = "passed"
+
+        return ValidationItem(
+            node_id=node_id,
+            dep_node_ids=node.dep_ids or [],
+            status=status,  # type: ignore
+            message=message,
+            error=summary.error,
+            elapsed_ns=time_ns() - item_start,
+            ev_ids=summary.ev_ids,
+            upstream_ev_ids=summary.upstream_ev_ids,
+        )
+
+    def result(self) -> ValidationResult:
+        """Validation result of the run, once every layer has been fed."""
+        self._close_layers(len(self.layers))
+        items = [self.items[node_id] for layer in self.layers for node_id in layer]
+
+        return ValidationResult(
+            status=summarize_status(items),
+            items=items,
+            elapsed_ns=time_ns() - self.start_ns,
+            graph=build_output_graph(self.nodes_map),
+            ev_ids=[
+                ev_id
+                for layer in self.layers
+                for node_id in layer
+                for ev_id in self.summaries[node_id].ev_ids
+            ],
+            deadline_ns=earliest_deadline_ns(items, self.nodes_map, self._upstream_ts),
+        )
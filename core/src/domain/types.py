@@ -3,7 +3,7 @@
 These are lightweight alternatives to Pydantic models for internal use.
 """
 
-from typing import Any, TypedDict
+from typing import Any, NotRequired, TypedDict
 
 from src.models import EvalStatus
 
@@ -53,10 +53,13 @@ class LayeredEvents(TypedDict):
     Attributes:
         layers: List of layers, each containing list of event IDs
         events: Map of event_id -> Event object for quick lookup
+        errors: Map of node_id -> reason, for nodes whose filter ran over
+            its execution budget
     """
 
     layers: list[list[str]]  # List of layers with event IDs
     events: dict[str, Any]  # event_id -> Event
+    errors: NotRequired[dict[str, str]]
 
 
 class ValidationItem(TypedDict, total=False):
@@ -92,6 +95,8 @@ class ValidationResult(TypedDict):
         elapsed_ns: Total time taken
         graph: The graph that was evaluated
         ev_ids: All event IDs involved
+        deadline_ns: When a node still waiting for its event times out
+            (earliest, ns since epoch), None if no node is waiting
     """
 
     status: EvalStatus
@@ -99,3 +104,4 @@ class ValidationResult(TypedDict):
     elapsed_ns: int
     graph: dict[str, list[str]]
     ev_ids: list[str]
+    deadline_ns: int | None
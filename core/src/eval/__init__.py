@@ -1,7 +1,11 @@
 """Evaluation module - Public API exports."""
 
-from src.eval.eval import eval_flow_run
+from src.eval.eval import eval_flow_run, eval_flow_runs
+from src.eval.incremental import IncrementalEvaluator, get_incremental_evaluator
 
 __all__ = [
     "eval_flow_run",
+    "eval_flow_runs",
+    "IncrementalEvaluator",
+    "get_incremental_evaluator",
 ]
@@ -9,33 +9,116 @@ The architecture is designed to be pluggable - the core domain logic can
 be reused with different storage backends and evaluators at desplega.ai.
 """
 
+import asyncio
+import contextvars
 import logging
-from typing import Any
+import time
+from collections.abc import Callable
+from contextlib import ExitStack
+from typing import Any, cast
+
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.adapters.sqlite import SqliteEventStorage
+from src.config import (
+    EVAL_POLICY,
+    EXPR_NATIVE_FASTPATH,
+    STREAMING_EVAL_CHUNK_SIZE,
+    STREAMING_EVAL_MAX_MEMORY_MB,
+    STREAMING_EVAL_MIN_EVENTS,
+)
 from src.db.transactional import transactional
-from src.domain.evaluation import match_events_to_layers, validate_flow_execution
-from src.domain.graph import (
-    build_flow_graph,
-    filter_subgraph_from_node,
-    topological_sort_layers,
+from src.domain.evaluation import ExprBudgetExceeded, evaluate_flow
+from src.domain.streaming import StreamingValidation
+from src.domain.types import FlowGraph, ValidationResult
+from src.eval.executor import get_eval_executor, get_layer_executor
+from src.eval.memo import MemoKey, ResultMemo, get_result_memo
+from src.eval.plan import get_flow_plan_cache
+from src.eval.singleflight import RunKey, get_eval_flights
+from src.execution.budget import (
+    ExprLimits,
+    current_limits,
+    evaluation_budget,
+    get_budget_metrics,
+)
+from src.execution.cel_eval import CELEvaluator
+from src.execution.js_eval import JSEvaluator, js_value_scope
+from src.execution.native import NativePredicate, native_predicate
+from src.execution.profiling import (
+    ExprProfiler,
+    expression_error_count,
+    get_expr_profiler,
 )
-from src.execution.js_eval import JSEvaluator
 from src.execution.python_eval import PythonEvaluator
-from src.models import BaseEvalOutput, Expr
+from src.models import BaseEvalOutput, EvalPolicy, Event, Expr
 
 logger = logging.getLogger(__name__)
 
+# Runs evaluated per executor job by eval_flow_runs
+RUNS_PER_JOB = 50
+
+
+def _run_native(
+    predicate: NativePredicate,
+    data: dict[str, Any],
+    ctx: dict[str, Any],
+) -> bool | None:
+    """Result of a native predicate, None if the engine must evaluate it."""
+    try:
+        result = predicate(data, ctx)
+    except Exception:
+        return None
+    return result if isinstance(result, bool) else None
+
+
+def _native_engine(expr: Expr) -> str:
+    """Engine name reported by profiling for native predicate calls."""
+    return f"{expr.engine}-native"
+
+
+def _flow_of(expr: Expr) -> str | None:
+    return expr.origin[0] if expr.origin else None
+
+
+def eval_policy(policy: EvalPolicy | None) -> EvalPolicy:
+    """The given evaluation policy, or the configured default."""
+    return policy or cast(EvalPolicy, EVAL_POLICY)
+
 
 class MultiEvaluator:
     """Router that dispatches expressions to appropriate evaluators based on engine type.
 
-    This allows mixing Python and JavaScript expressions in the same flow.
+    This allows mixing Python, JavaScript and CEL expressions in the same flow.
+    Engine calls run under the execution budget of the expression's flow;
+    calls over budget raise ``ExprBudgetExceeded`` and are counted by the
+    budget metrics. Native predicates are not budgeted.
+
+    Args:
+        profiler: Records per-expression statistics while enabled
+            (defaults to the process-wide profiler)
+        memo: Memoized results reused by ``evaluate_keyed`` (defaults to
+            the process-wide memo)
+        native: Run simple expressions as native predicates, falling back
+            to their engine (defaults to EXPR_NATIVE_FASTPATH)
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        profiler: ExprProfiler | None = None,
+        memo: ResultMemo | None = None,
+        native: bool | None = None,
+    ) -> None:
         self.python_evaluator = PythonEvaluator()
         self.js_evaluator = JSEvaluator()
+        self.cel_evaluator = CELEvaluator()
+        self.profiler = profiler or get_expr_profiler()
+        self.memo = memo or get_result_memo()
+        self.native = EXPR_NATIVE_FASTPATH if native is None else native
+
+    def __reduce__(self) -> tuple[type, tuple[()]]:
+        # Stateless: process pool workers build their own (and profile
+        # into / memoize in their own process-wide profiler and memo)
+        return (MultiEvaluator, ())
 
     def evaluate(self, expr: Expr, data: dict[str, Any], ctx: dict[str, Any]) -> bool:
         """Evaluate an expression using the appropriate evaluator based on engine type.
@@ -47,23 +130,226 @@ class MultiEvaluator:
 
         Returns:
             bool: Result of evaluation, False if error or unknown engine
+
+        Raises:
+            ExprBudgetExceeded: If the engine call ran over budget
+        """
+        predicate = self._native_predicate(expr, 1)
+        if predicate is not None:
+            start = time.perf_counter_ns()
+            native_result = _run_native(predicate, data, ctx)
+            if native_result is not None:
+                if self.profiler.enabled:
+                    self.profiler.record(
+                        expr,
+                        time.perf_counter_ns() - start,
+                        engine=_native_engine(expr),
+                    )
+                return native_result
+
+        if not self.profiler.enabled:
+            return self._evaluate(expr, data, ctx)
+
+        errors_before = expression_error_count()
+        start = time.perf_counter_ns()
+        result = self._evaluate(expr, data, ctx)
+        self.profiler.record(
+            expr,
+            time.perf_counter_ns() - start,
+            errors=expression_error_count() - errors_before,
+        )
+        return result
+
+    def evaluate_many(
+        self,
+        expr: Expr,
+        items: list[dict[str, Any]],
+        ctx: dict[str, Any],
+    ) -> list[bool]:
+        """Evaluate an expression over many data items with one dispatch.
+
+        Args:
+            expr: Expression to evaluate
+            items: Target data for each candidate event
+            ctx: Context data shared by all items
+
+        Returns:
+            list[bool]: One result per item, all False if unknown engine
+
+        Raises:
+            ExprBudgetExceeded: If the engine call ran over budget
         """
+        predicate = self._native_predicate(expr, len(items))
+        if predicate is None:
+            return self._profiled_many(expr, items, ctx)
+
+        start = time.perf_counter_ns()
+        results = [_run_native(predicate, data, ctx) for data in items]
+        fallback = [i for i, result in enumerate(results) if result is None]
+
+        if self.profiler.enabled and len(fallback) < len(items):
+            self.profiler.record(
+                expr,
+                time.perf_counter_ns() - start,
+                items=len(items) - len(fallback),
+                engine=_native_engine(expr),
+            )
+
+        # Items the predicate couldn't handle run on the engine, which also
+        # reports their errors
+        if fallback:
+            engine_results = self._profiled_many(
+                expr, [items[i] for i in fallback], ctx
+            )
+            for i, result in zip(fallback, engine_results, strict=True):
+                results[i] = result
+
+        return cast(list[bool], results)
+
+    def _native_predicate(self, expr: Expr, batch_size: int) -> NativePredicate | None:
+        if not self.native:
+            return None
+        # Python batches already run as one compiled loop, which beats
+        # calling a closure per item
+        if expr.engine == "python" and batch_size > 1:
+            return None
+        return native_predicate(expr)
+
+    def _profiled_many(
+        self,
+        expr: Expr,
+        items: list[dict[str, Any]],
+        ctx: dict[str, Any],
+    ) -> list[bool]:
+        if not self.profiler.enabled:
+            return self._evaluate_many(expr, items, ctx)
+
+        errors_before = expression_error_count()
+        start = time.perf_counter_ns()
+        results = self._evaluate_many(expr, items, ctx)
+        self.profiler.record(
+            expr,
+            time.perf_counter_ns() - start,
+            items=len(items),
+            errors=expression_error_count() - errors_before,
+        )
+        return results
+
+    def evaluate_keyed(
+        self,
+        expr: Expr,
+        items: list[dict[str, Any]],
+        ctx: dict[str, Any],
+        keys: list[tuple[str, str]],
+    ) -> list[bool]:
+        """Evaluate an expression over many events, reusing memoized results.
+
+        Only expressions of compiled flow plans (with a memo key) are
+        memoized. Results of calls that reported an error are not, so
+        transient failures (e.g. a JS timeout) are retried next time.
+
+        Args:
+            expr: Expression to evaluate
+            items: Target data for each candidate event
+            ctx: Context data shared by all items
+            keys: (event ID, upstream IDs hash) of each item
+
+        Returns:
+            list[bool]: One result per item
+        """
+        if expr.memo_key is None or expr.origin is None or not self.memo.enabled:
+            return self.evaluate_many(expr, items, ctx)
+
+        flow = expr.origin[0]
+        memo_keys: list[MemoKey] = [
+            (flow, expr.memo_key, ev_id, upstream_hash) for ev_id, upstream_hash in keys
+        ]
+        results = self.memo.get_many(memo_keys)
+        missing = [i for i, result in enumerate(results) if result is None]
+        if not missing:
+            return cast(list[bool], results)
+
+        errors_before = expression_error_count()
+        evaluated = self.evaluate_many(expr, [items[i] for i in missing], ctx)
+
+        entries: list[tuple[MemoKey, bool]] = []
+        for i, result in zip(missing, evaluated, strict=True):
+            results[i] = result
+            entries.append((memo_keys[i], result))
+
+        if expression_error_count() == errors_before:
+            self.memo.put_many(entries)
+
+        return cast(list[bool], results)
+
+    def _evaluate(self, expr: Expr, data: dict[str, Any], ctx: dict[str, Any]) -> bool:
+        limits = current_limits(_flow_of(expr))
+        try:
+            return self._dispatch(expr, data, ctx, limits)
+        except ExprBudgetExceeded as e:
+            get_budget_metrics().record(_flow_of(expr), e.kind)
+            raise
+
+    def _dispatch(
+        self,
+        expr: Expr,
+        data: dict[str, Any],
+        ctx: dict[str, Any],
+        limits: ExprLimits,
+    ) -> bool:
         if expr.engine == "python":
-            return self.python_evaluator.evaluate(expr, data, ctx)
+            return self.python_evaluator.evaluate(expr, data, ctx, limits)
         elif expr.engine == "js":
-            return self.js_evaluator.evaluate(expr, data, ctx)
+            return self.js_evaluator.evaluate(expr, data, ctx, limits)
+        elif expr.engine == "cel":
+            return self.cel_evaluator.evaluate(expr, data, ctx, limits)
         else:
             logger.error(
                 f"Unknown expression engine: {expr.engine}. "
-                f"Supported engines: python, js"
+                f"Supported engines: python, js, cel"
             )
             return False
 
+    def _evaluate_many(
+        self,
+        expr: Expr,
+        items: list[dict[str, Any]],
+        ctx: dict[str, Any],
+    ) -> list[bool]:
+        limits = current_limits(_flow_of(expr))
+        try:
+            return self._dispatch_many(expr, items, ctx, limits)
+        except ExprBudgetExceeded as e:
+            get_budget_metrics().record(_flow_of(expr), e.kind)
+            raise
+
+    def _dispatch_many(
+        self,
+        expr: Expr,
+        items: list[dict[str, Any]],
+        ctx: dict[str, Any],
+        limits: ExprLimits,
+    ) -> list[bool]:
+        if expr.engine == "python":
+            return self.python_evaluator.evaluate_many(expr, items, ctx, limits)
+        elif expr.engine == "js":
+            return self.js_evaluator.evaluate_many(expr, items, ctx, limits)
+        elif expr.engine == "cel":
+            return self.cel_evaluator.evaluate_many(expr, items, ctx, limits)
+        else:
+            logger.error(
+                f"Unknown expression engine: {expr.engine}. "
+                f"Supported engines: python, js, cel"
+            )
+            return [False] * len(items)
+
 
 async def eval_flow_run(
     run_id: str,
     flow: str,
     start_node_id: str | None = None,
+    streaming: bool | None = None,
+    policy: EvalPolicy | None = None,
 ) -> BaseEvalOutput:
     """Evaluate flow execution for a specific run.
 
@@ -74,76 +360,375 @@ async def eval_flow_run(
         run_id: The run identifier (e.g., user session, order ID)
         flow: The flow identifier (e.g., "checkout", "onboarding")
         start_node_id: Optional node to start evaluation from (subgraph only)
+        streaming: Stream the run's events in chunks instead of loading
+            them all (None = if it has streaming_eval_min_events events)
+        policy: Evaluation policy (None = eval_policy from the config)
 
     Returns:
         BaseEvalOutput with evaluation results
 
     Raises:
         ValueError: If flow not found or no events for run
+        EvalMemoryExceeded: If a streaming evaluation needed more than
+            streaming_eval_max_memory_mb
+
+    Concurrent calls for the same run share their evaluation (see
+    src/eval/singleflight.py).
 
     Example:
         >>> result = await eval_flow_run("run_123", "checkout")
         >>> result.status
         "passed"
     """
+    resolved = eval_policy(policy)
+
+    return await get_eval_flights().run(
+        (flow, run_id, start_node_id, resolved),
+        lambda: _eval_flow_run(run_id, flow, start_node_id, streaming, resolved),
+    )
+
+
+async def _eval_flow_run(
+    run_id: str,
+    flow: str,
+    start_node_id: str | None,
+    streaming: bool | None,
+    policy: EvalPolicy,
+) -> BaseEvalOutput:
     logger.info(f"Evaluating flow run: run_id={run_id}, flow={flow}")
 
     # 1. Fetch data from storage (adapter layer)
     storage = SqliteEventStorage()
 
     async with transactional() as session:
+        count: int | None = None
+        if streaming or (streaming is None and STREAMING_EVAL_MIN_EVENTS > 0):
+            count = await storage.count_events_by_run(run_id, flow, session)
+            if streaming is None:
+                streaming = should_stream(count)
+
+        if streaming:
+            if not count:
+                raise ValueError(f"No events found for run_id={run_id}, flow={flow}")
+
+            logger.info(f"Streaming {count} events for evaluation")
+            return await _eval_flow_run_streaming(
+                run_id, flow, start_node_id, policy, storage, session
+            )
+
         # Fetch all events for this run + flow
         events = await storage.get_events_by_run(run_id, flow, session)
 
-        # Fetch all node definitions for this flow
-        nodes = await storage.get_nodes_by_flow(flow, session)
+        if not events:
+            raise ValueError(f"No events found for run_id={run_id}, flow={flow}")
 
-    if not events:
-        raise ValueError(f"No events found for run_id={run_id}, flow={flow}")
+        # Compiled node definitions, graph and layers for this flow
+        plan = await get_flow_plan_cache().get(flow, session)
 
-    if not nodes:
+    if plan is None:
         raise ValueError(f"No node definitions found for flow={flow}")
 
-    logger.info(f"Found {len(events)} events and {len(nodes)} nodes for evaluation")
+    logger.info(
+        f"Found {len(events)} events and {len(plan.flow_graph['nodes'])} nodes "
+        "for evaluation"
+    )
 
-    # 2. Build flow graph (domain layer)
-    flow_graph = build_flow_graph(nodes)
+    # 2-4. Flow graph and topological layers, optionally for a subgraph
+    flow_graph = plan.flow_graph
+    layers = plan.layers
 
-    # 3. Optionally filter to subgraph (domain layer)
     if start_node_id:
         logger.info(f"Filtering to subgraph starting from node: {start_node_id}")
-        flow_graph = filter_subgraph_from_node(flow_graph, start_node_id)
+        flow_graph, layers = plan.subgraph(start_node_id)
 
-    # 4. Topological sort (domain layer)
-    layers = topological_sort_layers(flow_graph["graph"])
     logger.info(f"Graph has {len(layers)} layers and {len(events)} raw events")
 
-    # 5. Match events to layers (domain + execution layers)
-    evaluator = MultiEvaluator()
-    matched = match_events_to_layers(
-        events=events,
-        layers=layers,
-        nodes_map=flow_graph["nodes"],
-        evaluator=evaluator,
+    # 5-7. Match, validate and convert to output model, off the event loop
+    return await get_eval_executor().run(
+        evaluate_events,
+        events,
+        flow_graph,
+        layers,
+        MultiEvaluator(),
+        policy,
+    )
+
+
+def should_stream(event_count: int) -> bool:
+    """Whether a run with this many events is evaluated by streaming them."""
+    return 0 < STREAMING_EVAL_MIN_EVENTS <= event_count
+
+
+async def _eval_flow_run_streaming(
+    run_id: str,
+    flow: str,
+    start_node_id: str | None,
+    policy: EvalPolicy,
+    storage: SqliteEventStorage,
+    session: AsyncSession,
+) -> BaseEvalOutput:
+    """Evaluate a run from its events read layer by layer, in chunks.
+
+    Each chunk is matched and validated off the event loop, in one shared
+    context: like in ``evaluate_events``, all expression calls share the
+    evaluation budget and the values loaded in QuickJS.
+    """
+    plan = await get_flow_plan_cache().get(flow, session)
+    if plan is None:
+        raise ValueError(f"No node definitions found for flow={flow}")
+
+    flow_graph = plan.flow_graph
+    layers = plan.layers
+    if start_node_id:
+        flow_graph, layers = plan.subgraph(start_node_id)
+
+    validation = StreamingValidation(
+        flow_graph,
+        layers,
+        MultiEvaluator(),
+        max_bytes=int(STREAMING_EVAL_MAX_MEMORY_MB * 1024 * 1024),
+        policy=policy,
     )
+    executor = get_eval_executor()
+    context = contextvars.copy_context()
+    scope = ExitStack()
+    context.run(scope.enter_context, evaluation_budget(flow))
+    context.run(scope.enter_context, js_value_scope())
+
+    async def step[T](fn: Callable[..., T], *args: Any) -> T:
+        # Process pool workers can't share the validation state
+        if executor.mode == "process":
+            return await asyncio.to_thread(context.run, fn, *args)
+        return await executor.run(context.run, fn, *args)
+
+    try:
+        for index in range(len(validation.layers)):
+            node_ids = validation.start_layer(index)
+            if not node_ids:
+                continue
+            async for chunk in storage.stream_events_by_run(
+                run_id, flow, node_ids, STREAMING_EVAL_CHUNK_SIZE, session
+            ):
+                await step(validation.feed, chunk)
+
+        result = await step(validation.result)
+    finally:
+        context.run(scope.close)
 
     logger.info(
-        f"Matched {len(matched['events'])} events for {len(matched['layers'])} layers"
+        f"Streamed {validation.events_read} events, estimated peak memory "
+        f"{validation.peak_bytes / 2**20:.1f}MB"
     )
+    return build_eval_output(result, peak_memory_bytes=validation.peak_bytes)
 
-    # 6. Validate flow execution (domain layer)
-    result = validate_flow_execution(
-        matched=matched,
-        nodes_map=flow_graph["nodes"],
-        layers=layers,
-        evaluator=evaluator,
+
+async def eval_flow_runs(
+    flow: str,
+    run_ids: list[str],
+    start_node_id: str | None = None,
+    policy: EvalPolicy | None = None,
+) -> dict[str, BaseEvalOutput]:
+    """Evaluate many runs of the same flow.
+
+    Events of all runs are loaded with a handful of queries, and the flow
+    plan and evaluator are shared by every run. Runs with at least
+    streaming_eval_min_events events are streamed one at a time instead.
+    Runs already being evaluated by another call share that evaluation.
+
+    Args:
+        flow: The flow identifier
+        run_ids: Run identifiers to evaluate
+        start_node_id: Optional node to start evaluation from (subgraph only)
+        policy: Evaluation policy (None = eval_policy from the config)
+
+    Returns:
+        Map of run_id -> BaseEvalOutput. Runs that could not be evaluated
+        (no events, evaluation error) are not included.
+
+    Raises:
+        ValueError: If flow not found
+    """
+    resolved = eval_policy(policy)
+
+    async def evaluate(
+        keys: list[RunKey],
+    ) -> dict[RunKey, BaseEvalOutput | BaseException]:
+        outputs = await _eval_flow_runs(
+            flow, [key[1] for key in keys], start_node_id, resolved
+        )
+        return {key: outputs[key[1]] for key in keys if key[1] in outputs}
+
+    results = await get_eval_flights().run_many(
+        [(flow, run_id, start_node_id, resolved) for run_id in run_ids], evaluate
     )
 
-    # 7. Convert to output model
+    outputs: dict[str, BaseEvalOutput] = {}
+    for key, result in results.items():
+        if isinstance(result, BaseException):
+            logger.error(f"Failed to evaluate run_id={key[1]}, flow={flow}: {result}")
+        else:
+            outputs[key[1]] = result
+    return outputs
+
+
+async def _eval_flow_runs(
+    flow: str,
+    run_ids: list[str],
+    start_node_id: str | None,
+    policy: EvalPolicy,
+) -> dict[str, BaseEvalOutput]:
+    logger.info(f"Evaluating {len(run_ids)} runs of flow={flow}")
+
+    storage = SqliteEventStorage()
+
+    outputs: dict[str, BaseEvalOutput] = {}
+
+    async with transactional() as session:
+        plan = await get_flow_plan_cache().get(flow, session)
+        if plan is None:
+            raise ValueError(f"No node definitions found for flow={flow}")
+
+        # Large runs are streamed instead of loaded with the others
+        large_run_ids: list[str] = []
+        if STREAMING_EVAL_MIN_EVENTS > 0:
+            counts = await storage.count_events_by_runs(run_ids, flow, session)
+            large_run_ids = [
+                run_id for run_id, count in counts.items() if should_stream(count)
+            ]
+
+        events_by_run = await storage.get_events_by_runs(
+            [run_id for run_id in run_ids if run_id not in large_run_ids],
+            flow,
+            session,
+        )
+
+        for run_id in large_run_ids:
+            logger.info(f"Streaming {counts[run_id]} events of run_id={run_id}")
+            try:
+                outputs[run_id] = await _eval_flow_run_streaming(
+                    run_id, flow, start_node_id, policy, storage, session
+                )
+            except Exception as e:
+                logger.error(f"Failed to evaluate run_id={run_id}, flow={flow}: {e}")
+
+    flow_graph = plan.flow_graph
+    layers = plan.layers
+    if start_node_id:
+        flow_graph, layers = plan.subgraph(start_node_id)
+
+    evaluator = MultiEvaluator()
+    executor = get_eval_executor()
+    jobs: list[dict[str, list[Event]]] = []
+
+    for run_id in dict.fromkeys(run_ids):
+        if run_id in large_run_ids:
+            continue
+
+        events = events_by_run.get(run_id)
+        if not events:
+            logger.warning(f"No events found for run_id={run_id}, flow={flow}")
+            continue
+
+        if not jobs or len(jobs[-1]) >= RUNS_PER_JOB:
+            jobs.append({})
+        jobs[-1][run_id] = events
+
+    results = await asyncio.gather(
+        *(
+            executor.run(evaluate_runs, job, flow_graph, layers, evaluator, policy)
+            for job in jobs
+        ),
+        return_exceptions=True,
+    )
+
+    for job, result in zip(jobs, results, strict=True):
+        if isinstance(result, BaseException):
+            logger.error(f"Failed to evaluate {len(job)} runs of flow={flow}: {result}")
+            continue
+
+        job_outputs, errors = result
+        for run_id, error in errors.items():
+            logger.error(f"Failed to evaluate run_id={run_id}, flow={flow}: {error}")
+
+        outputs.update(job_outputs)
+
+    # Keep the requested order
+    return {run_id: outputs[run_id] for run_id in run_ids if run_id in outputs}
+
+
+def evaluate_runs(
+    events_by_run: dict[str, list[Event]],
+    flow_graph: FlowGraph,
+    layers: list[list[str]],
+    evaluator: MultiEvaluator,
+    policy: EvalPolicy = "full",
+) -> tuple[dict[str, BaseEvalOutput], dict[str, str]]:
+    """Evaluate several runs against the same flow graph.
+
+    Returns:
+        Map of run_id -> BaseEvalOutput, and map of run_id -> error
+        message for runs whose evaluation raised
+    """
+    outputs: dict[str, BaseEvalOutput] = {}
+    errors: dict[str, str] = {}
+
+    for run_id, events in events_by_run.items():
+        try:
+            outputs[run_id] = evaluate_events(
+                events, flow_graph, layers, evaluator, policy
+            )
+        except Exception as e:
+            errors[run_id] = str(e)
+
+    return outputs, errors
+
+
+def evaluate_events(
+    events: list[Event],
+    flow_graph: FlowGraph,
+    layers: list[list[str]],
+    evaluator: MultiEvaluator,
+    policy: EvalPolicy = "full",
+) -> BaseEvalOutput:
+    """Match and validate the events of one run against a flow graph.
+
+    Expression calls share the evaluation budget of the run's flow, and JS
+    calls the values loaded into QuickJS. With eval_layer_threads set, the
+    nodes of each layer are evaluated concurrently.
+    """
+    executor = get_layer_executor()
+    flow = events[0].flow if events else None
+
+    with evaluation_budget(flow), js_value_scope():
+        # Match and validate layer by layer (domain + execution layers)
+        result = evaluate_flow(
+            events=events,
+            layers=layers,
+            nodes_map=flow_graph["nodes"],
+            evaluator=evaluator,
+            executor=executor,
+            policy=policy,
+        )
+
+    logger.info(
+        f"Matched {len(result['ev_ids'])} of {len(events)} events for "
+        f"{len(layers)} layers"
+    )
+
+    return build_eval_output(result)
+
+
+def build_eval_output(
+    result: ValidationResult,
+    peak_memory_bytes: int | None = None,
+) -> BaseEvalOutput:
+    """Convert a domain validation result to the output model."""
     return BaseEvalOutput(
         status=result["status"],
         elapsed_ns=result["elapsed_ns"],
         graph=result["graph"],
         exec_info=result["items"],  # type: ignore
         ev_ids=result["ev_ids"],
+        deadline_ns=result["deadline_ns"],
+        peak_memory_bytes=peak_memory_bytes,
     )
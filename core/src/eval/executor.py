@@ -0,0 +1,251 @@
+"""Executor that runs CPU-bound flow evaluation off the asyncio event loop.
+
+Matching and validating events is synchronous CPU work. Running it inside
+async handlers blocks every other request on the same uvicorn worker, so
+evaluations are submitted to a thread or process pool instead.
+
+Only ``max_workers`` jobs are handed to the pool at a time; the others wait
+in a bounded queue (without blocking the event loop) and are rejected with
+EvalQueueFullError once ``max_queue`` jobs are already waiting. Time spent
+waiting is tracked and reported in ``stats()``.
+
+Modes:
+- thread: ThreadPoolExecutor (default). Frees the event loop; expression
+  evaluation still shares the GIL with the server.
+- process: ProcessPoolExecutor ("spawn"). Jobs and their arguments must
+  be picklable; evaluations run in parallel.
+- inline: run on the event loop, as before (useful for debugging).
+
+Within an evaluation, the nodes of each graph layer can also be evaluated
+concurrently on a shared thread pool (``get_layer_executor``, sized by
+eval_layer_threads), which scales on free-threaded Python builds.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Literal, TypedDict, TypeVar
+
+from src.config import (
+    EVAL_EXECUTOR,
+    EVAL_LAYER_THREADS,
+    EVAL_MAX_QUEUE,
+    EVAL_WORKERS,
+)
+
+logger = logging.getLogger(__name__)
+
+ExecutorMode = Literal["thread", "process", "inline"]
+
+# Queue waits above this are logged as warnings
+SLOW_QUEUE_WAIT_MS = 1000.0
+
+_T = TypeVar("_T")
+
+
+class EvalQueueFullError(RuntimeError):
+    """Raised when too many evaluations are already waiting for a worker."""
+
+
+class EvalExecutorStats(TypedDict):
+    """Counters for the evaluation executor.
+
+    Attributes:
+        mode: Executor mode (thread, process or inline)
+        max_workers: Jobs running concurrently
+        max_queue: Jobs allowed to wait for a worker
+        running: Jobs currently running
+        queued: Jobs currently waiting for a worker
+        submitted: Jobs submitted since startup
+        completed: Jobs finished (successfully or not)
+        rejected: Jobs rejected because the queue was full
+        wait_ms_total: Total time jobs spent waiting for a worker
+        wait_ms_max: Longest time a job waited for a worker
+        wait_ms_last: Time the last started job waited for a worker
+    """
+
+    mode: str
+    max_workers: int
+    max_queue: int
+    running: int
+    queued: int
+    submitted: int
+    completed: int
+    rejected: int
+    wait_ms_total: float
+    wait_ms_max: float
+    wait_ms_last: float
+
+
+class EvalExecutor:
+    """Runs evaluation jobs on a bounded worker pool.
+
+    Args:
+        mode: "thread", "process" or "inline"
+        max_workers: Number of pool workers (jobs running concurrently)
+        max_queue: Max number of jobs waiting for a worker
+    """
+
+    def __init__(
+        self,
+        mode: ExecutorMode = "thread",
+        max_workers: int = 4,
+        max_queue: int = 1000,
+    ) -> None:
+        if mode not in ("thread", "process", "inline"):
+            raise ValueError(f"Unknown evaluation executor mode: {mode}")
+
+        self.mode = mode
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max_queue
+        self._pool: Executor | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._slots_loop: asyncio.AbstractEventLoop | None = None
+        self._lock = threading.Lock()
+        self.running = 0
+        self.queued = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self.wait_ms_last = 0.0
+
+    def _get_pool(self) -> Executor:
+        with self._lock:
+            if self._pool is None:
+                if self.mode == "process":
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                else:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="bu-eval",
+                    )
+            return self._pool
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        # Semaphores are bound to the loop they are first used on
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_workers)
+            self._slots_loop = loop
+        return self._slots
+
+    async def run(self, fn: Callable[..., _T], *args: Any) -> _T:
+        """Run ``fn(*args)`` on a worker and return its result.
+
+        Raises:
+            EvalQueueFullError: If max_queue jobs are already waiting
+            Exception: Whatever ``fn`` raises
+        """
+        if self.mode == "inline":
+            with self._lock:
+                self.submitted += 1
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self.completed += 1
+
+        slots = self._get_slots()
+
+        with self._lock:
+            if slots.locked() and self.queued >= self.max_queue:
+                self.rejected += 1
+                raise EvalQueueFullError(
+                    f"Evaluation queue is full ({self.queued} jobs waiting)"
+                )
+            self.submitted += 1
+            self.queued += 1
+
+        queued_at = time.monotonic()
+        try:
+            await slots.acquire()
+        finally:
+            with self._lock:
+                self.queued -= 1
+
+        wait_ms = (time.monotonic() - queued_at) * 1000
+        with self._lock:
+            self.running += 1
+            self.wait_ms_total += wait_ms
+            self.wait_ms_last = wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+
+        if wait_ms > SLOW_QUEUE_WAIT_MS:
+            logger.warning(f"Evaluation waited {wait_ms:.0f}ms for a worker")
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_pool(), fn, *args)
+        finally:
+            slots.release()
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+
+    def stats(self) -> EvalExecutorStats:
+        """Return a snapshot of the executor counters."""
+        with self._lock:
+            return EvalExecutorStats(
+                mode=self.mode,
+                max_workers=self.max_workers,
+                max_queue=self.max_queue,
+                running=self.running,
+                queued=self.queued,
+                submitted=self.submitted,
+                completed=self.completed,
+                rejected=self.rejected,
+                wait_ms_total=self.wait_ms_total,
+                wait_ms_max=self.wait_ms_max,
+                wait_ms_last=self.wait_ms_last,
+            )
+
+    def shutdown(self) -> None:
+        """Stop the worker pool (it is recreated on the next job)."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+_eval_executor = EvalExecutor(
+    mode=EVAL_EXECUTOR,  # type: ignore[arg-type]
+    max_workers=EVAL_WORKERS,
+    max_queue=EVAL_MAX_QUEUE,
+)
+
+
+def get_eval_executor() -> EvalExecutor:
+    """Return the process-wide evaluation executor."""
+    return _eval_executor
+
+
+_layer_executor: ThreadPoolExecutor | None = None
+_layer_executor_lock = threading.Lock()
+
+
+def get_layer_executor() -> ThreadPoolExecutor | None:
+    """Return the process-wide pool evaluating the nodes of a layer.
+
+    Created on first use (so process pool workers build their own), None
+    when eval_layer_threads is 0.
+    """
+    global _layer_executor
+
+    if EVAL_LAYER_THREADS <= 0:
+        return None
+
+    with _layer_executor_lock:
+        if _layer_executor is None:
+            _layer_executor = ThreadPoolExecutor(
+                max_workers=EVAL_LAYER_THREADS, thread_name_prefix="eval-layer"
+            )
+        return _layer_executor
@@ -0,0 +1,137 @@
+"""Fingerprints of the node definitions ingested by this process.
+
+Every event batch carries the definition of the nodes its events belong to
+and SDKs resend the same definitions with each batch. Ingestion stores a
+fingerprint (content hash) per node in ``Node.fingerprint`` and only
+rewrites a node when it changes; this cache remembers the fingerprints
+written (or confirmed) recently, so batches with known definitions skip the
+node upsert entirely.
+
+Entries are dropped when their flow's nodes are written through this
+process (``FlowPlanCache.invalidate``) and expire after the flow plan
+revalidation interval, which bounds how long writes from other processes
+(e.g. a node deleted in the UI) go unnoticed.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import TypedDict
+
+from src.config import FLOW_PLAN_REVALIDATE_SECONDS
+from src.models import Node
+
+# node_id -> (flow, fingerprint, monotonic time it was stored)
+_Entry = tuple[str, str, float]
+
+
+class NodeFingerprintCacheStats(TypedDict):
+    """Counters for the node fingerprint cache.
+
+    Attributes:
+        size: Nodes with a cached fingerprint
+        hits: Node definitions known to be stored already
+        misses: Node definitions that had to be upserted
+        invalidations: Fingerprints dropped because their flow's nodes changed
+    """
+
+    size: int
+    hits: int
+    misses: int
+    invalidations: int
+
+
+class NodeFingerprintCache:
+    """Thread-safe LRU of the fingerprints of stored node definitions.
+
+    Args:
+        max_age_seconds: How long a fingerprint is trusted
+        max_size: Maximum number of nodes kept (0 disables the cache)
+    """
+
+    def __init__(self, max_age_seconds: float = 5.0, max_size: int = 10_000) -> None:
+        self.max_age_seconds = max_age_seconds
+        self.max_size = max_size
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def stale(self, nodes: list[Node]) -> list[Node]:
+        """Return the nodes whose fingerprint is not known to be stored."""
+        now = time.monotonic()
+        stale: list[Node] = []
+
+        with self._lock:
+            for node in nodes:
+                entry = self._entries.get(node.id)
+                if (
+                    entry is not None
+                    and entry[:2] == (node.flow, node.fingerprint)
+                    and now - entry[2] < self.max_age_seconds
+                ):
+                    self.hits += 1
+                    self._entries.move_to_end(node.id)
+                else:
+                    self.misses += 1
+                    stale.append(node)
+
+        return stale
+
+    def store(self, nodes: list[Node]) -> None:
+        """Remember the fingerprints of nodes whose upsert was committed."""
+        if self.max_size <= 0:
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            for node in nodes:
+                if node.fingerprint is None:
+                    continue
+                self._entries[node.id] = (node.flow, node.fingerprint, now)
+                self._entries.move_to_end(node.id)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *flows: str) -> None:
+        """Drop the fingerprints of flows whose nodes were written."""
+        stale_flows = set(flows)
+        with self._lock:
+            stale = [
+                node_id
+                for node_id, (flow, _, _) in self._entries.items()
+                if flow in stale_flows
+            ]
+            for node_id in stale:
+                del self._entries[node_id]
+            self.invalidations += len(stale)
+
+    def stats(self) -> NodeFingerprintCacheStats:
+        """Return a snapshot of the cache counters."""
+        with self._lock:
+            return NodeFingerprintCacheStats(
+                size=len(self._entries),
+                hits=self.hits,
+                misses=self.misses,
+                invalidations=self.invalidations,
+            )
+
+    def clear(self) -> None:
+        """Drop all fingerprints and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.invalidations = 0
+
+
+_node_fingerprint_cache = NodeFingerprintCache(
+    max_age_seconds=FLOW_PLAN_REVALIDATE_SECONDS
+)
+
+
+def get_node_fingerprint_cache() -> NodeFingerprintCache:
+    """Return the process-wide node fingerprint cache."""
+    return _node_fingerprint_cache
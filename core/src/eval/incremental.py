@@ -0,0 +1,550 @@
+"""Incremental flow evaluation.
+
+Evaluating a run from scratch reloads every event and re-runs every filter
+and validator, even though a new batch usually only touches a couple of
+nodes. The IncrementalEvaluator keeps the evaluation state of recent runs
+in an LRU bounded by run count and by the events the states hold
+(optionally snapshotted to disk when evicted) and only
+loads the events it has not seen yet, re-evaluating the nodes that received
+them and everything downstream.
+
+Runs with at least ``streaming_eval_min_events`` events are streamed like
+in ``eval_flow_run`` and never get a state.
+
+The state is always reconciled with storage (by event IDs and node
+definitions), so the result is the same as ``eval_flow_run`` even when
+events are ingested by another process.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import TypedDict
+
+from src.adapters.sqlite import SqliteEventStorage
+from src.config import (
+    INCREMENTAL_EVAL_MAX_EVENTS,
+    INCREMENTAL_EVAL_MAX_RUNS,
+    INCREMENTAL_EVAL_SNAPSHOT_DIR,
+)
+from src.db.transactional import transactional
+from src.domain.evaluation import ExprEvaluator
+from src.domain.incremental import RunState, apply_events
+from src.domain.types import FlowGraph, ValidationResult
+from src.eval.eval import (
+    RUNS_PER_JOB,
+    MultiEvaluator,
+    _eval_flow_run_streaming,
+    build_eval_output,
+    eval_policy,
+    should_stream,
+)
+from src.eval.executor import get_eval_executor, get_layer_executor
+from src.eval.plan import get_flow_plan_cache
+from src.eval.singleflight import RunKey, get_eval_flights
+from src.execution.budget import evaluation_budget
+from src.execution.js_eval import js_value_scope
+from src.models import BaseEvalOutput, EvalPolicy, Event
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalEvalStats(TypedDict):
+    """Counters for the incremental evaluator.
+
+    Attributes:
+        size: Run states currently held in memory
+        max_runs: Maximum number of run states held in memory
+        events: Events held by the run states in memory
+        max_events: Maximum number of events held by the run states
+        hits: Evaluations that reused an in-memory state
+        snapshot_loads: Evaluations that reused a state loaded from disk
+        rebuilds: Evaluations that had to start from an empty state
+        evictions: States dropped from memory to stay within max_runs and
+            max_events
+        oversized: States not kept because they alone exceed max_events
+        streamed: Large runs evaluated by streaming their events, no state
+        events_applied: Events loaded and applied incrementally
+    """
+
+    size: int
+    max_runs: int
+    events: int
+    max_events: int
+    hits: int
+    snapshot_loads: int
+    rebuilds: int
+    evictions: int
+    oversized: int
+    streamed: int
+    events_applied: int
+
+
+class IncrementalEvaluator:
+    """Evaluates runs incrementally from cached per-run state.
+
+    Args:
+        max_runs: Maximum number of run states kept in memory
+        max_events: Maximum number of events held by the states kept in
+            memory. A run with more events is evaluated from scratch every
+            time, like ``eval_flow_run`` (0 = no limit).
+        snapshot_dir: Optional directory where evicted states are written
+            and looked up again on a miss
+        evaluator: Expression evaluator (defaults to MultiEvaluator)
+    """
+
+    def __init__(
+        self,
+        max_runs: int = 1000,
+        max_events: int = 0,
+        snapshot_dir: str | Path | None = None,
+        evaluator: ExprEvaluator | None = None,
+    ) -> None:
+        self.max_runs = max_runs
+        self.max_events = max_events
+        self.snapshot_dir = Path(snapshot_dir).expanduser() if snapshot_dir else None
+        self.evaluator = evaluator or MultiEvaluator()
+        self.storage = SqliteEventStorage()
+        self._states: OrderedDict[tuple[str, str], RunState] = OrderedDict()
+        self._checked_out: set[tuple[str, str]] = set()
+        # Event count of each state when stored (states are updated in place)
+        self._sizes: dict[tuple[str, str], int] = {}
+        self._events = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.snapshot_loads = 0
+        self.rebuilds = 0
+        self.evictions = 0
+        self.oversized = 0
+        self.streamed = 0
+        self.events_applied = 0
+
+    async def eval_flow_run(
+        self,
+        run_id: str,
+        flow: str,
+        policy: EvalPolicy | None = None,
+    ) -> BaseEvalOutput:
+        """Evaluate a run, reusing its cached state when possible.
+
+        Args:
+            run_id: The run identifier
+            flow: The flow identifier
+            policy: Evaluation policy (None = eval_policy from the config)
+
+        Returns:
+            BaseEvalOutput with evaluation results
+
+        Raises:
+            ValueError: If flow not found or no events for run
+        """
+        outputs, errors = await self._eval_runs(flow, [run_id], policy)
+
+        if run_id in errors:
+            raise errors[run_id]
+
+        if run_id not in outputs:
+            raise ValueError(f"No events found for run_id={run_id}, flow={flow}")
+
+        return outputs[run_id]
+
+    async def eval_flow_runs(
+        self,
+        flow: str,
+        run_ids: list[str],
+        policy: EvalPolicy | None = None,
+    ) -> dict[str, BaseEvalOutput]:
+        """Evaluate many runs of a flow, reusing their cached states.
+
+        Event IDs of all runs and every event not seen yet are loaded with
+        a handful of queries.
+
+        Args:
+            flow: The flow identifier
+            run_ids: Run identifiers to evaluate
+            policy: Evaluation policy (None = eval_policy from the config)
+
+        Returns:
+            Map of run_id -> BaseEvalOutput. Runs that could not be
+            evaluated (no events, evaluation error) are not included.
+
+        Raises:
+            ValueError: If flow not found
+        """
+        outputs, errors = await self._eval_runs(flow, run_ids, policy)
+
+        for run_id, e in errors.items():
+            logger.error(f"Failed to evaluate run_id={run_id}, flow={flow}: {e}")
+
+        return outputs
+
+    async def _eval_runs(
+        self,
+        flow: str,
+        run_ids: list[str],
+        policy: EvalPolicy | None,
+    ) -> tuple[dict[str, BaseEvalOutput], dict[str, Exception]]:
+        resolved = eval_policy(policy)
+
+        # Runs being evaluated by another call (incremental or not) share
+        # that evaluation: the result is the same
+        async def evaluate(
+            keys: list[RunKey],
+        ) -> dict[RunKey, BaseEvalOutput | BaseException]:
+            outputs, errors = await self._apply_runs(
+                flow, [key[1] for key in keys], resolved
+            )
+            return {
+                key: outputs.get(key[1]) or errors[key[1]]
+                for key in keys
+                if key[1] in outputs or key[1] in errors
+            }
+
+        results = await get_eval_flights().run_many(
+            [(flow, run_id, None, resolved) for run_id in run_ids], evaluate
+        )
+
+        outputs: dict[str, BaseEvalOutput] = {}
+        errors: dict[str, Exception] = {}
+        for key, result in results.items():
+            if isinstance(result, Exception):
+                errors[key[1]] = result
+            elif isinstance(result, BaseEvalOutput):
+                outputs[key[1]] = result
+        return outputs, errors
+
+    async def _apply_runs(
+        self,
+        flow: str,
+        run_ids: list[str],
+        policy: EvalPolicy,
+    ) -> tuple[dict[str, BaseEvalOutput], dict[str, Exception]]:
+        async with transactional() as session:
+            ids_by_run = await self.storage.get_event_ids_by_runs(
+                run_ids, flow, session
+            )
+
+            if not ids_by_run:
+                return {}, {}
+
+            plan = await get_flow_plan_cache().get(flow, session)
+
+            if plan is None:
+                raise ValueError(f"No node definitions found for flow={flow}")
+
+            outputs: dict[str, BaseEvalOutput] = {}
+            errors: dict[str, Exception] = {}
+
+            # Large runs are streamed and their states dropped
+            for run_id, event_ids in list(ids_by_run.items()):
+                if not should_stream(len(event_ids)):
+                    continue
+
+                del ids_by_run[run_id]
+                key = (flow, run_id)
+                with self._lock:
+                    self.streamed += 1
+                    if key not in self._checked_out:
+                        self._pop(key)
+
+                logger.info(
+                    f"Streaming {len(event_ids)} events of run_id={run_id}, flow={flow}"
+                )
+                try:
+                    outputs[run_id] = await _eval_flow_run_streaming(
+                        run_id, flow, None, policy, self.storage, session
+                    )
+                except Exception as e:
+                    errors[run_id] = e
+
+            states: dict[str, RunState] = {}
+            owned: set[tuple[str, str]] = set()
+            rebuild_run_ids: list[str] = []
+            missing_ids: list[str] = []
+
+            for run_id, event_ids in ids_by_run.items():
+                key = (flow, run_id)
+                state, is_owned = self._checkout(key, plan.fingerprint, event_ids)
+                states[run_id] = state
+                if is_owned:
+                    owned.add(key)
+
+                if state.events:
+                    missing_ids.extend(
+                        ev_id for ev_id in event_ids if ev_id not in state.events
+                    )
+                else:
+                    rebuild_run_ids.append(run_id)
+
+            try:
+                new_events_by_run = await self.storage.get_events_by_runs(
+                    rebuild_run_ids, flow, session
+                )
+                for event in await self.storage.get_events_by_ids(missing_ids, session):
+                    new_events_by_run.setdefault(event.run_id, []).append(event)
+            except BaseException:
+                self._release(owned)
+                raise
+
+        jobs: list[list[tuple[str, RunState, list[Event]]]] = []
+
+        for run_id, state in states.items():
+            new_events = new_events_by_run.get(run_id, [])
+
+            with self._lock:
+                self.events_applied += len(new_events)
+
+            logger.info(
+                f"Incremental evaluation of run_id={run_id}, flow={flow}: "
+                f"{len(new_events)} new of {len(ids_by_run[run_id])} events"
+            )
+
+            if not jobs or len(jobs[-1]) >= RUNS_PER_JOB:
+                jobs.append([])
+            jobs[-1].append((run_id, state, new_events))
+
+        executor = get_eval_executor()
+        try:
+            results = await asyncio.gather(
+                *(
+                    executor.run(
+                        apply_runs,
+                        job,
+                        plan.flow_graph,
+                        plan.layers,
+                        self.evaluator,
+                        policy,
+                    )
+                    for job in jobs
+                ),
+                return_exceptions=True,
+            )
+        except BaseException:
+            # Cancelled: jobs may still be updating the states
+            self._release(owned, drop=True)
+            raise
+
+        for job, job_results in zip(jobs, results, strict=True):
+            for i, (run_id, _, _) in enumerate(job):
+                key = (flow, run_id)
+                run_result = (
+                    job_results
+                    if isinstance(job_results, BaseException)
+                    else job_results[i]
+                )
+
+                if isinstance(run_result, BaseException):
+                    # The state may be half-updated: drop it
+                    if key in owned:
+                        self._release({key}, drop=True)
+                    errors[run_id] = (
+                        run_result
+                        if isinstance(run_result, Exception)
+                        else RuntimeError(str(run_result))
+                    )
+                    continue
+
+                # In process mode this is an updated copy of the state. States
+                # of runs checked out by a concurrent evaluation are not kept.
+                state, result = run_result
+                if key in owned:
+                    self._store(key, state)
+                outputs[run_id] = build_eval_output(result)
+
+        return outputs, errors
+
+    def _checkout(
+        self,
+        key: tuple[str, str],
+        fingerprint: str,
+        event_ids: set[str],
+    ) -> tuple[RunState, bool]:
+        """Return a state consistent with storage, or a fresh one.
+
+        The state stays checked out until it is stored or released. A
+        concurrent evaluation of the same run gets a fresh state it does
+        not own (returned flag is False) instead of sharing it.
+        """
+        with self._lock:
+            if key in self._checked_out:
+                self.rebuilds += 1
+                return RunState(fingerprint), False
+            self._checked_out.add(key)
+
+            state = self._states.get(key)
+            from_snapshot = False
+            if state is None:
+                state = self._load_snapshot(key)
+                from_snapshot = state is not None
+
+            # Definitions changed or events were removed: start over
+            if (
+                state is None
+                or state.fingerprint != fingerprint
+                or not state.events.keys() <= event_ids
+            ):
+                self.rebuilds += 1
+                return RunState(fingerprint), True
+
+            if from_snapshot:
+                self.snapshot_loads += 1
+            else:
+                self.hits += 1
+
+            return state, True
+
+    def _release(self, keys: set[tuple[str, str]], drop: bool = False) -> None:
+        """Release checked out states without storing them."""
+        with self._lock:
+            for key in keys:
+                self._checked_out.discard(key)
+                if drop:
+                    self._pop(key)
+
+    def _pop(self, key: tuple[str, str]) -> RunState | None:
+        self._events -= self._sizes.pop(key, 0)
+        return self._states.pop(key, None)
+
+    def _store(self, key: tuple[str, str], state: RunState) -> None:
+        with self._lock:
+            self._checked_out.discard(key)
+            self._pop(key)
+
+            # Too large to keep: evaluated from scratch next time
+            if 0 < self.max_events < len(state.events):
+                self.oversized += 1
+                return
+
+            self._states[key] = state
+            self._sizes[key] = len(state.events)
+            self._events += self._sizes[key]
+
+            while len(self._states) > self.max_runs or (
+                0 < self.max_events < self._events
+            ):
+                evicted_key = next(iter(self._states))
+                evicted = self._pop(evicted_key)
+                self.evictions += 1
+                if evicted is not None:
+                    self._write_snapshot(evicted_key, evicted)
+
+    def _snapshot_path(self, key: tuple[str, str]) -> Path | None:
+        if self.snapshot_dir is None:
+            return None
+
+        digest = hashlib.sha256("\0".join(key).encode("utf-8")).hexdigest()
+        return self.snapshot_dir / f"{digest}.json"
+
+    def _write_snapshot(self, key: tuple[str, str], state: RunState) -> None:
+        path = self._snapshot_path(key)
+        if path is None:
+            return
+
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(state.to_dict()))
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Failed to write run state snapshot {path}: {e}")
+
+    def _load_snapshot(self, key: tuple[str, str]) -> RunState | None:
+        path = self._snapshot_path(key)
+        if path is None or not path.exists():
+            return None
+
+        try:
+            return RunState.from_dict(json.loads(path.read_text()))
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable run state snapshot {path}: {e}")
+            return None
+
+    def flush(self) -> None:
+        """Snapshot every in-memory state to disk (no-op without snapshot_dir)."""
+        with self._lock:
+            for key, state in self._states.items():
+                self._write_snapshot(key, state)
+
+    def stats(self) -> IncrementalEvalStats:
+        """Return a snapshot of the evaluator counters."""
+        with self._lock:
+            return IncrementalEvalStats(
+                size=len(self._states),
+                max_runs=self.max_runs,
+                events=self._events,
+                max_events=self.max_events,
+                hits=self.hits,
+                snapshot_loads=self.snapshot_loads,
+                rebuilds=self.rebuilds,
+                evictions=self.evictions,
+                oversized=self.oversized,
+                streamed=self.streamed,
+                events_applied=self.events_applied,
+            )
+
+    def clear(self) -> None:
+        """Drop all in-memory states and reset the counters."""
+        with self._lock:
+            self._states.clear()
+            self._sizes.clear()
+            self._checked_out.clear()
+            self._events = 0
+            self.hits = 0
+            self.snapshot_loads = 0
+            self.rebuilds = 0
+            self.evictions = 0
+            self.oversized = 0
+            self.streamed = 0
+            self.events_applied = 0
+
+
+def apply_runs(
+    runs: list[tuple[str, RunState, list[Event]]],
+    flow_graph: FlowGraph,
+    layers: list[list[str]],
+    evaluator: ExprEvaluator,
+    policy: EvalPolicy = "full",
+) -> list[tuple[RunState, ValidationResult] | Exception]:
+    """Apply new events to several run states (executor job).
+
+    Each run is applied under the evaluation budget of the flow and in its
+    own JS value scope, with the nodes of each layer evaluated on the
+    layer executor (if enabled).
+
+    Returns:
+        Per run, its updated state and validation result, or the error
+        raised while applying its events
+    """
+    results: list[tuple[RunState, ValidationResult] | Exception] = []
+    flow = next((node.flow for node in flow_graph["nodes"].values()), None)
+    executor = get_layer_executor()
+
+    for _, state, new_events in runs:
+        try:
+            with evaluation_budget(flow), js_value_scope():
+                result = apply_events(
+                    state, new_events, flow_graph, layers, evaluator, executor, policy
+                )
+        except Exception as e:
+            results.append(e)
+            continue
+        results.append((state, result))
+
+    return results
+
+
+_incremental_evaluator = IncrementalEvaluator(
+    max_runs=INCREMENTAL_EVAL_MAX_RUNS,
+    max_events=INCREMENTAL_EVAL_MAX_EVENTS,
+    snapshot_dir=INCREMENTAL_EVAL_SNAPSHOT_DIR,
+)
+
+
+def get_incremental_evaluator() -> IncrementalEvaluator:
+    """Return the process-wide incremental evaluator."""
+    return _incremental_evaluator
@@ -0,0 +1,151 @@
+"""Memoized filter/validator results.
+
+The same run is evaluated many times (polling through /v1/run-eval, new
+batches, reeval, deadlines) and most of its events are unchanged between
+evaluations. An expression's result only depends on the event, the node
+definition and the upstream events its context was built from, so results
+are memoized under (flow, expression memo key, event ID, upstream IDs hash)
+and re-evaluating a run only runs expressions on its new events.
+
+The memo key of an expression includes a hash of its node definition
+(``Expr.memo_key``, set on compiled flow plans), so results for a previous
+definition are never reused; they are dropped when a new definition of the
+flow is compiled, or evicted (LRU) once the memory budget is reached.
+
+Like profiles, memoized results live in the process that evaluates.
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+from typing import TypedDict
+
+from src.config import EVAL_MEMO_MAX_MB
+
+# (flow, expression memo key, event ID, upstream IDs hash)
+MemoKey = tuple[str, str, str, str]
+
+# Approximate bytes held per entry besides its event ID: key tuple, dict
+# slot and LRU links (flow, memo key and upstream hash strings are shared)
+ENTRY_OVERHEAD_BYTES = 200
+
+
+def _entry_bytes(key: MemoKey) -> int:
+    return ENTRY_OVERHEAD_BYTES + sys.getsizeof(key[2])
+
+
+class ResultMemoStats(TypedDict):
+    """Counters for the result memo.
+
+    Attributes:
+        size: Results currently memoized
+        bytes: Approximate memory held by memoized results
+        max_bytes: Memory budget
+        hits: Results reused
+        misses: Results that had to be evaluated
+        evictions: Results dropped to stay within the memory budget
+        invalidations: Results dropped because their flow's nodes changed
+    """
+
+    size: int
+    bytes: int
+    max_bytes: int
+    hits: int
+    misses: int
+    evictions: int
+    invalidations: int
+
+
+class ResultMemo:
+    """Thread-safe LRU of expression results, bounded by memory.
+
+    Args:
+        max_bytes: Approximate memory budget (0 disables the memo)
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self._results: OrderedDict[MemoKey, bool] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get_many(self, keys: list[MemoKey]) -> list[bool | None]:
+        """Return the memoized result of each key (None if not memoized)."""
+        results: list[bool | None] = []
+
+        with self._lock:
+            for key in keys:
+                result = self._results.get(key)
+                if result is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                    self._results.move_to_end(key)
+                results.append(result)
+
+        return results
+
+    def put_many(self, entries: list[tuple[MemoKey, bool]]) -> None:
+        """Memoize results, evicting the least recently used past the budget."""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            for key, result in entries:
+                if key not in self._results:
+                    self._bytes += _entry_bytes(key)
+                self._results[key] = result
+                self._results.move_to_end(key)
+
+            while self._bytes > self.max_bytes and self._results:
+                evicted, _ = self._results.popitem(last=False)
+                self._bytes -= _entry_bytes(evicted)
+                self.evictions += 1
+
+    def invalidate(self, flow: str) -> None:
+        """Drop the results of a flow (its node definitions changed)."""
+        with self._lock:
+            stale = [key for key in self._results if key[0] == flow]
+            for key in stale:
+                del self._results[key]
+                self._bytes -= _entry_bytes(key)
+            self.invalidations += len(stale)
+
+    def stats(self) -> ResultMemoStats:
+        """Return a snapshot of the memo counters."""
+        with self._lock:
+            return ResultMemoStats(
+                size=len(self._results),
+                bytes=self._bytes,
+                max_bytes=self.max_bytes,
+                hits=self.hits,
+                misses=self.misses,
+                evictions=self.evictions,
+                invalidations=self.invalidations,
+            )
+
+    def clear(self) -> None:
+        """Drop all memoized results and reset the counters."""
+        with self._lock:
+            self._results.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.invalidations = 0
+
+
+_result_memo = ResultMemo(max_bytes=int(EVAL_MEMO_MAX_MB * 1024 * 1024))
+
+
+def get_result_memo() -> ResultMemo:
+    """Return the process-wide result memo."""
+    return _result_memo
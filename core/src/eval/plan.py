@@ -0,0 +1,304 @@
+"""Compiled flow plans.
+
+Everything an evaluation needs from a flow's node definitions (parsed
+expressions, graph, layers, dep/child indexes and subgraphs) only changes
+when the nodes change, so it is compiled once per flow and cached.
+
+Plans are keyed by a per-flow version bumped by every endpoint that writes
+node definitions. Other processes (e.g. ``server prod`` workers) cannot
+bump this process' versions, so a cached plan is also revalidated against
+a cheap definitions token from storage at most every
+``FLOW_PLAN_REVALIDATE_SECONDS``.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Any, TypedDict
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.adapters.sqlite import SqliteEventStorage
+from src.config import FLOW_PLAN_REVALIDATE_SECONDS
+from src.domain.graph import (
+    build_flow_graph,
+    filter_subgraph_from_node,
+    topological_sort_layers,
+)
+from src.domain.types import FlowGraph
+from src.eval.fingerprints import get_node_fingerprint_cache
+from src.eval.memo import get_result_memo
+from src.models import Expr, Node, NodeCondition
+
+logger = logging.getLogger(__name__)
+
+
+class FlowPlanCacheStats(TypedDict):
+    """Counters for the flow plan cache.
+
+    Attributes:
+        size: Flows with a cached plan
+        hits: Lookups served without touching storage
+        revalidations: Lookups that confirmed a plan against storage
+        compiles: Plans compiled from node definitions
+        invalidations: Version bumps caused by node writes
+    """
+
+    size: int
+    hits: int
+    revalidations: int
+    compiles: int
+    invalidations: int
+
+
+def _dump_expr(expr: Expr | dict[str, Any] | None) -> dict[str, Any] | None:
+    if not expr:
+        return None
+    return Expr.model_validate(expr).model_dump(mode="json")
+
+
+def node_definition(node: Node) -> dict[str, Any]:
+    """Evaluation-relevant fields of a node, normalized for comparison.
+
+    Works on both raw (as loaded from storage) and ensured nodes, without
+    modifying them.
+    """
+    return {
+        "id": node.id,
+        "type": node.type,
+        "dep_ids": list(node.dep_ids or []),
+        "filter": _dump_expr(node.filter),
+        "validator": _dump_expr(node.validator),
+        "conditions": [
+            NodeCondition.model_validate(cond).model_dump(mode="json")
+            for cond in node.conditions or []
+        ],
+    }
+
+
+def definition_hash(node: Node) -> str:
+    """Short content hash of the evaluation-relevant fields of a node."""
+    return hashlib.sha256(
+        json.dumps(node_definition(node), sort_keys=True).encode("utf-8")
+    ).hexdigest()[:16]
+
+
+def node_fingerprint(node: Node) -> str:
+    """Content hash of the fields of a node set by the SDKs.
+
+    Stored in ``Node.fingerprint`` by ingestion, which only rewrites a node
+    when it changes.
+    """
+    payload = {
+        **node_definition(node),
+        "description": node.description,
+        "additional_meta": node.additional_meta,
+    }
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()[:32]
+
+
+def nodes_fingerprint(nodes: list[Node]) -> str:
+    """Content hash of the evaluation-relevant fields of a flow's nodes."""
+    payload = [node_definition(node) for node in sorted(nodes, key=lambda n: n.id)]
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+class FlowPlan:
+    """Compiled, read-only evaluation plan of a flow.
+
+    Nodes are detached copies with their expressions already parsed, so
+    the plan can be shared by concurrent evaluations. Do not modify it.
+
+    Attributes:
+        flow: Flow identifier
+        version: Flow version the plan was compiled for
+        token: Storage definitions token the plan was compiled for
+        fingerprint: Content hash of the node definitions
+        flow_graph: Graph (children adjacency) and node lookup map
+        layers: Topologically sorted layers of node IDs
+        deps: Map of node_id -> dependency node IDs
+        children: Map of node_id -> dependent node IDs
+    """
+
+    def __init__(
+        self,
+        flow: str,
+        nodes: list[Node],
+        version: int = 0,
+        token: Any = None,
+    ) -> None:
+        compiled: list[Node] = []
+        for node in nodes:
+            copy = Node(**{name: getattr(node, name) for name in Node.model_fields})
+            copy.ensure()
+            # Results memoized for a previous definition of the node are
+            # never looked up again
+            definition = definition_hash(copy)
+            if copy.filter:
+                copy.filter = copy.filter.with_origin(
+                    flow, copy.id, f"{definition}:filter"
+                )
+            if copy.validator:
+                copy.validator = copy.validator.with_origin(
+                    flow, copy.id, f"{definition}:validator"
+                )
+            compiled.append(copy)
+
+        self.flow = flow
+        self.version = version
+        self.token = token
+        self.fingerprint = nodes_fingerprint(compiled)
+        self.flow_graph = build_flow_graph(compiled)
+        self.layers = topological_sort_layers(self.flow_graph["graph"])
+        self.deps: dict[str, list[str]] = {node.id: node.dep_ids for node in compiled}
+        self.children: dict[str, list[str]] = self.flow_graph["graph"]
+        self._subgraphs: dict[str, tuple[FlowGraph, list[list[str]]]] = {}
+        self._lock = threading.Lock()
+
+    def subgraph(self, start_node_id: str) -> tuple[FlowGraph, list[list[str]]]:
+        """Return the (memoized) subgraph starting at a node and its layers.
+
+        Raises:
+            ValueError: If start_node_id not found in graph
+        """
+        with self._lock:
+            cached = self._subgraphs.get(start_node_id)
+        if cached is not None:
+            return cached
+
+        flow_graph = filter_subgraph_from_node(self.flow_graph, start_node_id)
+        cached = (flow_graph, topological_sort_layers(flow_graph["graph"]))
+
+        with self._lock:
+            self._subgraphs[start_node_id] = cached
+        return cached
+
+
+class FlowPlanCache:
+    """Process-wide cache of compiled flow plans, keyed by flow version.
+
+    Args:
+        revalidate_seconds: How long a plan is trusted before its
+            definitions token is checked against storage again
+    """
+
+    def __init__(self, revalidate_seconds: float = 5.0) -> None:
+        self.revalidate_seconds = revalidate_seconds
+        self.storage = SqliteEventStorage()
+        self._plans: dict[str, FlowPlan] = {}
+        self._checked_at: dict[str, float] = {}
+        self._versions: dict[str, int] = {}
+        self._fingerprints: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidations = 0
+        self.compiles = 0
+        self.invalidations = 0
+
+    def version(self, flow: str) -> int:
+        """Current definitions version of a flow in this process."""
+        with self._lock:
+            return self._versions.get(flow, 0)
+
+    def invalidate(self, *flows: str) -> None:
+        """Bump the version of flows whose node definitions were written.
+
+        Call after the write is committed.
+        """
+        with self._lock:
+            for flow in set(flows):
+                self._versions[flow] = self._versions.get(flow, 0) + 1
+                self._plans.pop(flow, None)
+                self.invalidations += 1
+
+        get_node_fingerprint_cache().invalidate(*flows)
+
+    async def get(self, flow: str, session: AsyncSession) -> FlowPlan | None:
+        """Return the plan of a flow, compiling it if needed.
+
+        Returns:
+            FlowPlan, or None if the flow has no active nodes
+
+        Raises:
+            ValueError: If the flow graph has a cycle
+        """
+        with self._lock:
+            version = self._versions.get(flow, 0)
+            plan = self._plans.get(flow)
+            checked_at = self._checked_at.get(flow, 0.0)
+
+            if plan is not None and plan.version == version:
+                if time.monotonic() - checked_at < self.revalidate_seconds:
+                    self.hits += 1
+                    return plan
+            else:
+                plan = None
+
+        token = await self.storage.get_node_definitions_token(flow, session)
+
+        if plan is not None and plan.token == token:
+            with self._lock:
+                self._checked_at[flow] = time.monotonic()
+                self.revalidations += 1
+            return plan
+
+        nodes = await self.storage.get_nodes_by_flow(flow, session)
+        if not nodes:
+            return None
+
+        plan = FlowPlan(flow, nodes, version=version, token=token)
+        logger.info(
+            f"Compiled plan for flow={flow} (version {version}): "
+            f"{len(nodes)} nodes, {len(plan.layers)} layers"
+        )
+
+        with self._lock:
+            self.compiles += 1
+            previous = self._fingerprints.get(flow)
+            self._fingerprints[flow] = plan.fingerprint
+            # Don't cache a plan that was invalidated while loading
+            if self._versions.get(flow, 0) == version:
+                self._plans[flow] = plan
+                self._checked_at[flow] = time.monotonic()
+
+        # Results memoized for the previous definitions can't be hit anymore
+        if previous is not None and previous != plan.fingerprint:
+            get_result_memo().invalidate(flow)
+
+        return plan
+
+    def stats(self) -> FlowPlanCacheStats:
+        """Return a snapshot of the cache counters."""
+        with self._lock:
+            return FlowPlanCacheStats(
+                size=len(self._plans),
+                hits=self.hits,
+                revalidations=self.revalidations,
+                compiles=self.compiles,
+                invalidations=self.invalidations,
+            )
+
+    def clear(self) -> None:
+        """Drop all cached plans and reset the counters."""
+        with self._lock:
+            self._plans.clear()
+            self._checked_at.clear()
+            self._fingerprints.clear()
+            self.hits = 0
+            self.revalidations = 0
+            self.compiles = 0
+            self.invalidations = 0
+
+
+_flow_plan_cache = FlowPlanCache(revalidate_seconds=FLOW_PLAN_REVALIDATE_SECONDS)
+
+
+def get_flow_plan_cache() -> FlowPlanCache:
+    """Return the process-wide flow plan cache."""
+    return _flow_plan_cache
@@ -0,0 +1,185 @@
+"""Single-flight coalescing of concurrent evaluations of the same run.
+
+The same run is often evaluated by several callers at once: a new batch,
+/v1/run-eval, reeval and ``ensure`` polling. Evaluations go through a
+SingleFlight keyed by what determines their result (flow, run, start node
+and policy), so concurrent callers share the work:
+
+- A call for a key that is not being evaluated starts an evaluation.
+- Calls arriving while it runs may have seen events it did not read, so
+  they don't take its result: they all wait for one follow-up evaluation,
+  started when the running one finishes.
+
+However many calls arrive, a key has at most one running and one pending
+evaluation. Evaluations run in their own task: a caller giving up (e.g. a
+client disconnecting) doesn't cancel them for the others.
+
+Like the other counters, flights are per process and per event loop.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import TypedDict
+
+from src.models import BaseEvalOutput, EvalPolicy
+
+# (flow, run_id, start_node_id, policy)
+RunKey = tuple[str, str, str | None, EvalPolicy]
+
+# Evaluates a group of keys: a result or an error per key (missing keys
+# have no result, e.g. runs without events)
+type FlightFn[K, T] = Callable[[list[K]], Awaitable[dict[K, T | BaseException]]]
+
+
+class SingleFlightStats(TypedDict):
+    """Counters for coalesced evaluations.
+
+    Attributes:
+        in_flight: Keys being evaluated
+        flights: Evaluations started (including follow-ups)
+        coalesced: Calls that shared another call's evaluation
+        follow_ups: Evaluations started for calls that arrived while the
+            previous evaluation of their key was running
+    """
+
+    in_flight: int
+    flights: int
+    coalesced: int
+    follow_ups: int
+
+
+class _Flight[K, T]:
+    """One evaluation of a key, and the follow-up waiting for it."""
+
+    def __init__(self, fn: FlightFn[K, T]) -> None:
+        self.fn = fn
+        self.future: asyncio.Future[T | BaseException | None] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self.next: _Flight[K, T] | None = None
+
+
+class SingleFlight[K: Hashable, T]:
+    """Coalesces concurrent evaluations of the same keys."""
+
+    def __init__(self) -> None:
+        self._flights: dict[K, _Flight[K, T]] = {}
+        self._tasks: set[asyncio.Task[dict[K, T | BaseException]]] = set()
+        self.flights = 0
+        self.coalesced = 0
+        self.follow_ups = 0
+
+    async def run(self, key: K, fn: Callable[[], Awaitable[T]]) -> T:
+        """Evaluate one key, sharing a concurrent evaluation of it.
+
+        Raises:
+            Whatever the (shared) evaluation raised
+        """
+
+        async def evaluate(keys: list[K]) -> dict[K, T | BaseException]:
+            return {key: await fn()}
+
+        result = (await self.run_many([key], evaluate))[key]
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    async def run_many(
+        self, keys: list[K], fn: FlightFn[K, T]
+    ) -> dict[K, T | BaseException]:
+        """Evaluate many keys, sharing the concurrent evaluations of any of them.
+
+        Keys that are not being evaluated are evaluated together by one
+        call to ``fn``.
+
+        Returns:
+            Map of key -> result or error, in the order of ``keys`` (keys
+            without a result are not included)
+
+        Raises:
+            Whatever an evaluation of one of the keys raised as a whole
+        """
+        keys = list(dict.fromkeys(keys))
+        waiting: list[tuple[K, _Flight[K, T]]] = []
+        started: list[K] = []
+
+        for key in keys:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight(fn)
+                started.append(key)
+            else:
+                self.coalesced += 1
+                if flight.next is None:
+                    flight.next = _Flight(fn)
+                flight = flight.next
+            waiting.append((key, flight))
+
+        if started:
+            self._start(started, fn)
+
+        # Shielded: cancelling this call must not cancel the shared results
+        await asyncio.gather(
+            *(asyncio.shield(flight.future) for _, flight in waiting),
+            return_exceptions=True,
+        )
+
+        results: dict[K, T | BaseException] = {}
+        for key, flight in waiting:
+            # Raises CancelledError if the evaluation was cancelled
+            error = flight.future.exception()
+            if error is not None:
+                raise error
+            result = flight.future.result()
+            if result is not None:
+                results[key] = result
+        return results
+
+    def _start(self, keys: list[K], fn: FlightFn[K, T]) -> None:
+        self.flights += 1
+        task = asyncio.ensure_future(fn(keys))
+        self._tasks.add(task)
+        task.add_done_callback(lambda task: self._finish(keys, task))
+
+    def _finish(
+        self, keys: list[K], task: asyncio.Task[dict[K, T | BaseException]]
+    ) -> None:
+        self._tasks.discard(task)
+        follow_ups: dict[int, tuple[FlightFn[K, T], list[K]]] = {}
+
+        for key in keys:
+            flight = self._flights.pop(key)
+
+            if task.cancelled():
+                flight.future.cancel()
+            elif (error := task.exception()) is not None:
+                flight.future.set_exception(error)
+            else:
+                flight.future.set_result(task.result().get(key))
+
+            if flight.next is not None:
+                self._flights[key] = flight.next
+                fn = flight.next.fn
+                follow_ups.setdefault(id(fn), (fn, []))[1].append(key)
+
+        # Follow-ups requested with the same function run together
+        for fn, follow_up_keys in follow_ups.values():
+            self.follow_ups += 1
+            self._start(follow_up_keys, fn)
+
+    def stats(self) -> SingleFlightStats:
+        """Return a snapshot of the coalescing counters."""
+        return SingleFlightStats(
+            in_flight=len(self._flights),
+            flights=self.flights,
+            coalesced=self.coalesced,
+            follow_ups=self.follow_ups,
+        )
+
+
+_eval_flights: SingleFlight[RunKey, BaseEvalOutput] = SingleFlight()
+
+
+def get_eval_flights() -> SingleFlight[RunKey, BaseEvalOutput]:
+    """Return the process-wide coalescer of run evaluations."""
+    return _eval_flights
@@ -4,9 +4,11 @@ from uuid import uuid4
 from bubus import EventBus
 from sqlmodel import select
 
+from src.adapters.sqlite import SqliteEventStorage
 from src.db.transactional import transactional
 from src.events.models import NewBatchEvent, NewEvent
-from src.models import EvalOutput, Event
+from src.events.scheduler import get_deadline_scheduler
+from src.models import BaseEvalOutput, EvalOutput, EvalPolicy, Event
 from src.notifications import get_dispatcher
 from src.utils.time import now
 
@@ -38,54 +40,126 @@ async def handle_new_batch_event(ev: NewBatchEvent) -> None:
         log.warning("No events found for batch evaluation")
         return
 
-    # Group events by (run_id, flow)
-    runs_by_flow: dict[tuple[str, str], list[Event]] = {}
+    # Group events by flow, then run_id
+    runs_by_flow: dict[str, dict[str, list[Event]]] = {}
     for event in events:
-        key = (event.run_id, event.flow)
-        if key not in runs_by_flow:
-            runs_by_flow[key] = []
-        runs_by_flow[key].append(event)
-
-    # Run evaluation for each unique (run_id, flow) pair
-    for (run_id, flow), flow_events in runs_by_flow.items():
-        log.info(
-            f"Running evaluation for run_id={run_id}, flow={flow} "
-            f"({len(flow_events)} events)"
+        runs_by_flow.setdefault(event.flow, {}).setdefault(event.run_id, []).append(
+            event
         )
 
+    # Evaluate all runs of each flow in one go
+    for flow, runs in runs_by_flow.items():
+        log.info(f"Running evaluation for {len(runs)} runs of flow={flow}")
+
         try:
-            from src.eval import eval_flow_run
+            await evaluate_runs(
+                flow,
+                list(runs),
+                trigger_ev_ids={run_id: evs[0].id for run_id, evs in runs.items()},
+                policy=ev.policy,
+            )
+        except Exception as e:
+            log.exception(f"Failed to evaluate runs of flow={flow}: {e}")
+            # Don't fail the entire batch if one flow fails
+            continue
 
-            eval_result = await eval_flow_run(run_id=run_id, flow=flow)
 
-            # Store evaluation result in a new transaction
-            async with transactional() as session:
-                eval_output = EvalOutput(
+async def handle_due_deadlines(flow: str, run_ids: list[str]) -> None:
+    """Re-evaluate runs with a node whose wait just timed out.
+
+    Called by the DeadlineScheduler.
+    """
+    try:
+        await evaluate_runs(flow, run_ids, clear_missing=True)
+    except ValueError as e:
+        # Flow is gone: nothing left to wait for
+        log.warning(f"Dropping deadlines of {len(run_ids)} runs of flow={flow}: {e}")
+        async with transactional() as session:
+            await get_deadline_scheduler().schedule(
+                flow, dict.fromkeys(run_ids), session
+            )
+            await session.commit()
+
+
+async def evaluate_runs(
+    flow: str,
+    run_ids: list[str],
+    trigger_ev_ids: dict[str, str] | None = None,
+    clear_missing: bool = False,
+    policy: EvalPolicy | None = None,
+) -> dict[str, BaseEvalOutput]:
+    """Evaluate runs of a flow, store the results and notify failures.
+
+    Each result is stored, as the run's state, with the run's next deadline
+    (when a node still waiting for its event times out) in the same
+    transaction.
+
+    Args:
+        flow: The flow identifier
+        run_ids: Run identifiers to evaluate
+        trigger_ev_ids: Optional map of run_id -> event that triggered it
+        clear_missing: Clear the deadlines of runs that could not be
+            evaluated (no events, evaluation error)
+        policy: Evaluation policy (None = eval_policy from the config)
+
+    Returns:
+        Map of run_id -> BaseEvalOutput for the evaluated runs
+
+    Raises:
+        ValueError: If flow not found
+    """
+    from src.eval import get_incremental_evaluator
+
+    trigger_ev_ids = trigger_ev_ids or {}
+
+    # Only the nodes touched since the last evaluation (and their downstream
+    # nodes) are re-evaluated; same result as eval_flow_run
+    eval_results = await get_incremental_evaluator().eval_flow_runs(
+        flow=flow, run_ids=run_ids, policy=policy
+    )
+
+    deadlines: dict[str, int | None] = {
+        run_id: eval_result.deadline_ns for run_id, eval_result in eval_results.items()
+    }
+    if clear_missing:
+        for run_id in run_ids:
+            deadlines.setdefault(run_id, None)
+
+    # Store evaluation results in a new transaction
+    async with transactional() as session:
+        await SqliteEventStorage().save_eval_outputs(
+            [
+                EvalOutput(
                     id=str(uuid4()),
                     flow=flow,
                     run_id=run_id,
-                    trigger_ev_id=flow_events[0].id if flow_events else None,
+                    trigger_ev_id=trigger_ev_ids.get(run_id),
                     output=eval_result,
                     created_at=now(),
                     status="active",
                 )
+                for run_id, eval_result in eval_results.items()
+            ],
+            session,
+        )
 
-                session.add(eval_output)
-                await session.commit()
+        await get_deadline_scheduler().schedule(flow, deadlines, session)
+        await session.commit()
 
-            log.info(
-                f"Evaluation completed for run_id={run_id}, flow={flow}: "
-                f"status={eval_result.status}"
-            )
+    for run_id, eval_result in eval_results.items():
+        log.info(
+            f"Evaluation completed for run_id={run_id}, flow={flow}: "
+            f"status={eval_result.status}"
+        )
 
-            if eval_result.status == "failed":
+        if eval_result.status == "failed":
+            try:
                 dispatcher = get_dispatcher()
                 await dispatcher.dispatch(flow=flow, run_id=run_id, result=eval_result)
+            except Exception as e:
+                log.exception(f"Failed to notify for run_id={run_id}, flow={flow}: {e}")
 
-        except Exception as e:
-            log.exception(f"Failed to evaluate run_id={run_id}, flow={flow}: {e}")
-            # Don't fail the entire batch if one evaluation fails
-            continue
+    return eval_results
 
 
 async def handle_new_event(ev: NewEvent) -> None:
@@ -1,8 +1,11 @@
 from bubus import BaseEvent
 
+from src.models import EvalPolicy
+
 
 class NewBatchEvent(BaseEvent[None]):
     ev_ids: list[str]
+    policy: EvalPolicy | None = None
 
 
 class NewEvent(BaseEvent[None]):
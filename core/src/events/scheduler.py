@@ -0,0 +1,264 @@
+"""Deadline scheduler for timeout-driven re-evaluation.
+
+A run whose nodes are all settled only changes when new events arrive, but
+a node waiting for its event turns from "running" into a timeout failure on
+its own. Every evaluation reports the earliest such deadline
+(``BaseEvalOutput.deadline_ns``); the scheduler keeps those deadlines in a
+min-heap and re-evaluates each run as soon as its deadline passes.
+
+Deadlines are stored in the ``evaldeadline`` table in the same transaction
+as the evaluation result, so they survive restarts (every server process
+loads them on startup). A due deadline is claimed with a conditional
+update before it is evaluated, so only one process evaluates it; the claim
+moves the deadline forward by a lease, used as a retry if that process dies
+before storing the new result.
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import TypedDict
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.adapters.sqlite import SqliteEventStorage
+from src.config import DEADLINE_LEASE_SECONDS
+from src.db.transactional import transactional
+
+logger = logging.getLogger(__name__)
+
+# Called with (flow, run_ids) for claimed deadlines. It must re-evaluate the
+# runs and save their new deadlines (or clear them).
+DueHandler = Callable[[str, list[str]], Awaitable[None]]
+
+
+class DeadlineSchedulerStats(TypedDict):
+    """Counters for the deadline scheduler.
+
+    Attributes:
+        pending: Deadlines currently scheduled in this process
+        scheduled: Deadlines set since startup
+        fired: Due deadlines this process tried to claim
+        claimed: Due deadlines this process claimed and re-evaluated
+        lag_ms_max: Longest delay between a deadline and its re-evaluation
+        lag_ms_last: Delay between the last deadline and its re-evaluation
+    """
+
+    pending: int
+    scheduled: int
+    fired: int
+    claimed: int
+    lag_ms_max: float
+    lag_ms_last: float
+
+
+class DeadlineScheduler:
+    """Min-heap of per-run deadlines, persisted in storage.
+
+    Args:
+        lease_seconds: How long a claimed deadline is held before another
+            process may retry it
+    """
+
+    def __init__(self, lease_seconds: float = 60.0) -> None:
+        self.lease_ns = int(lease_seconds * 1_000_000_000)
+        self.storage = SqliteEventStorage()
+        # Entries are (deadline_ns, flow, run_id); stale entries (whose
+        # deadline no longer matches _deadlines) are skipped when popped
+        self._heap: list[tuple[int, str, str]] = []
+        self._deadlines: dict[tuple[str, str], int] = {}
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._on_due: DueHandler | None = None
+        self._active = False
+        self.scheduled = 0
+        self.fired = 0
+        self.claimed = 0
+        self.lag_ms_max = 0.0
+        self.lag_ms_last = 0.0
+
+    async def start(self, on_due: DueHandler) -> None:
+        """Load stored deadlines and start the scheduling loop."""
+        if self._task is not None:
+            return
+
+        self._on_due = on_due
+        self._wakeup = asyncio.Event()
+        self._active = True
+
+        async with transactional() as session:
+            deadlines = await self.storage.get_deadlines(session)
+
+        for deadline in deadlines:
+            self._push(deadline.flow, deadline.run_id, deadline.deadline_ns)
+
+        logger.info(f"Deadline scheduler started with {len(deadlines)} deadlines")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the scheduling loop (stored deadlines are kept)."""
+        task, self._task = self._task, None
+        self._active = False
+        if task is None:
+            return
+
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def schedule(
+        self,
+        flow: str,
+        deadlines: dict[str, int | None],
+        session: AsyncSession,
+    ) -> None:
+        """Set or clear the deadlines of runs of a flow.
+
+        Writes them in the caller's transaction (commit is up to the
+        caller). A deadline whose transaction is rolled back fires
+        harmlessly: it can't be claimed. Processes whose scheduler is not
+        running only store them.
+
+        Args:
+            flow: Flow identifier
+            deadlines: Map of run_id -> deadline (ns), None to clear it
+            session: Database session
+        """
+        if not deadlines:
+            return
+
+        await self.storage.save_deadlines(flow, deadlines, session)
+
+        for run_id, deadline_ns in deadlines.items():
+            if deadline_ns is None:
+                self._deadlines.pop((flow, run_id), None)
+            else:
+                self._push(flow, run_id, deadline_ns)
+
+    def _push(self, flow: str, run_id: str, deadline_ns: int) -> None:
+        # Not running: deadlines are only stored (see start())
+        if not self._active:
+            return
+
+        key = (flow, run_id)
+        if self._deadlines.get(key) == deadline_ns:
+            return
+
+        self._deadlines[key] = deadline_ns
+        heapq.heappush(self._heap, (deadline_ns, flow, run_id))
+        self.scheduled += 1
+
+        # Wake the loop up if this is the new earliest deadline
+        if self._wakeup is not None and self._heap[0][0] == deadline_ns:
+            self._wakeup.set()
+
+    def _pop_due(self, now_ns: int) -> list[tuple[int, str, str]]:
+        due: list[tuple[int, str, str]] = []
+
+        while self._heap and self._heap[0][0] <= now_ns:
+            deadline_ns, flow, run_id = heapq.heappop(self._heap)
+            if self._deadlines.get((flow, run_id)) == deadline_ns:
+                due.append((deadline_ns, flow, run_id))
+
+        return due
+
+    def _next_deadline_ns(self) -> int | None:
+        # Drop stale entries so the loop doesn't wake up for them
+        while self._heap:
+            deadline_ns, flow, run_id = self._heap[0]
+            if self._deadlines.get((flow, run_id)) == deadline_ns:
+                return deadline_ns
+            heapq.heappop(self._heap)
+        return None
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+
+        while True:
+            self._wakeup.clear()
+
+            due = self._pop_due(time.time_ns())
+            if due:
+                try:
+                    await self._fire(due)
+                except Exception as e:
+                    logger.exception(f"Failed to claim due deadlines: {e}")
+                    # Retry them shortly
+                    for entry in due:
+                        heapq.heappush(self._heap, entry)
+                    await asyncio.sleep(1)
+                continue
+
+            next_ns = self._next_deadline_ns()
+            timeout = (
+                None
+                if next_ns is None
+                else max(0.0, (next_ns - time.time_ns()) / 1_000_000_000)
+            )
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except TimeoutError:
+                pass
+
+    async def _fire(self, due: list[tuple[int, str, str]]) -> None:
+        assert self._on_due is not None
+
+        now_ns = time.time_ns()
+        lease_ns = now_ns + self.lease_ns
+        claimed_by_flow: dict[str, list[str]] = {}
+
+        async with transactional() as session:
+            for deadline_ns, flow, run_id in due:
+                self.fired += 1
+                if await self.storage.claim_deadline(
+                    flow, run_id, deadline_ns, lease_ns, session
+                ):
+                    claimed_by_flow.setdefault(flow, []).append(run_id)
+
+                    lag_ms = (now_ns - deadline_ns) / 1_000_000
+                    self.lag_ms_last = lag_ms
+                    self.lag_ms_max = max(self.lag_ms_max, lag_ms)
+                elif self._deadlines.get((flow, run_id)) == deadline_ns:
+                    # Rescheduled, cleared or claimed by another process
+                    del self._deadlines[(flow, run_id)]
+
+            await session.commit()
+
+        for flow, run_ids in claimed_by_flow.items():
+            self.claimed += len(run_ids)
+            logger.info(f"Deadline reached for {len(run_ids)} runs of flow={flow}")
+
+            # Retried after the lease unless on_due reschedules them
+            for run_id in run_ids:
+                self._push(flow, run_id, lease_ns)
+
+            try:
+                await self._on_due(flow, run_ids)
+            except Exception as e:
+                logger.exception(
+                    f"Failed to re-evaluate runs of flow={flow} at deadline: {e}"
+                )
+
+    def stats(self) -> DeadlineSchedulerStats:
+        """Return a snapshot of the scheduler counters."""
+        return DeadlineSchedulerStats(
+            pending=len(self._deadlines),
+            scheduled=self.scheduled,
+            fired=self.fired,
+            claimed=self.claimed,
+            lag_ms_max=self.lag_ms_max,
+            lag_ms_last=self.lag_ms_last,
+        )
+
+
+_deadline_scheduler = DeadlineScheduler(lease_seconds=DEADLINE_LEASE_SECONDS)
+
+
+def get_deadline_scheduler() -> DeadlineScheduler:
+    """Return the process-wide deadline scheduler."""
+    return _deadline_scheduler
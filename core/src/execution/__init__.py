@@ -1,9 +1,38 @@
 """Execution layer - Pluggable expression evaluation."""
 
-from src.execution.js_eval import JSEvaluator
-from src.execution.python_eval import PythonEvaluator
+from src.execution.budget import (
+    ExprLimits,
+    current_limits,
+    evaluation_budget,
+    get_budget_metrics,
+)
+from src.execution.cel_eval import CELEvaluator, compile_cel
+from src.execution.js_eval import (
+    JSContextPool,
+    JSEvaluator,
+    get_js_pool,
+    js_value_scope,
+)
+from src.execution.native import native_predicate
+from src.execution.python_eval import (
+    CompiledExprCache,
+    PythonEvaluator,
+    get_expr_cache,
+)
 
 __all__ = [
     "PythonEvaluator",
     "JSEvaluator",
+    "CELEvaluator",
+    "compile_cel",
+    "CompiledExprCache",
+    "get_expr_cache",
+    "JSContextPool",
+    "get_js_pool",
+    "js_value_scope",
+    "native_predicate",
+    "ExprLimits",
+    "current_limits",
+    "evaluation_budget",
+    "get_budget_metrics",
 ]
@@ -0,0 +1,262 @@
+"""Execution budgets of filter and validator expressions.
+
+Every expression call runs under limits derived from its flow's budget:
+
+- time: wall time per evaluated event (a batched call over N events gets
+  N times the budget). Python and CEL calls are interrupted by a watchdog
+  thread (see ``sandbox``); QuickJS calls by its interrupt handler.
+- memory: memory a call may allocate. QuickJS enforces it on its heap;
+  for Python, the operators that build large values (``*``, ``**``,
+  ``<<``) check the size of their result before computing it.
+- evaluation time: wall time of one evaluation of a run, across all of its
+  expressions.
+
+A call over budget raises ``ExprBudgetExceeded`` instead of returning a
+result, which the domain layer reports as an "error" node. Budgets default
+to the ``expr_*_budget`` settings and can be overridden per flow with
+``flow_budgets``.
+
+Breaches are counted per process (with the "process" evaluation
+executor, in the pool workers).
+"""
+
+import contextvars
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from typing import Any, TypedDict
+
+from src.config import (
+    EVAL_TIME_BUDGET_MS,
+    EXPR_MEMORY_BUDGET_MB,
+    EXPR_TIME_BUDGET_MS,
+    FLOW_BUDGETS,
+)
+from src.domain.evaluation import BudgetKind, ExprBudgetExceeded
+from src.execution.sandbox import Limited, LimitExceeded
+
+
+class ExprBudget(TypedDict):
+    """Budgets of a flow's expressions (0 = unlimited).
+
+    Attributes:
+        expr_time_ms: Wall time of an expression per evaluated event
+        expr_memory_mb: Memory one expression call may allocate
+        eval_time_ms: Wall time of one evaluation of a run
+    """
+
+    expr_time_ms: float
+    expr_memory_mb: float
+    eval_time_ms: float
+
+
+DEFAULT_BUDGET = ExprBudget(
+    expr_time_ms=EXPR_TIME_BUDGET_MS,
+    expr_memory_mb=EXPR_MEMORY_BUDGET_MB,
+    eval_time_ms=EVAL_TIME_BUDGET_MS,
+)
+
+
+def flow_budget(flow: str | None) -> ExprBudget:
+    """Budget of a flow: the defaults, overridden by ``flow_budgets``."""
+    overrides: dict[str, Any] = FLOW_BUDGETS.get(flow or "", {})
+    if not overrides:
+        return DEFAULT_BUDGET
+
+    return ExprBudget(
+        expr_time_ms=float(overrides.get("expr_time_ms", EXPR_TIME_BUDGET_MS)),
+        expr_memory_mb=float(overrides.get("expr_memory_mb", EXPR_MEMORY_BUDGET_MB)),
+        eval_time_ms=float(overrides.get("eval_time_ms", EVAL_TIME_BUDGET_MS)),
+    )
+
+
+class ExprLimits:
+    """Limits of the expression calls of one evaluation.
+
+    Args:
+        budget: Budget of the flow being evaluated
+        eval_deadline_ns: ``time.monotonic_ns()`` at which the evaluation
+            runs out of budget (None = no evaluation budget)
+    """
+
+    __slots__ = ("budget", "eval_deadline_ns", "memory_bytes")
+
+    def __init__(self, budget: ExprBudget, eval_deadline_ns: int | None = None) -> None:
+        self.budget = budget
+        self.eval_deadline_ns = eval_deadline_ns
+        self.memory_bytes = int(budget["expr_memory_mb"] * 1024 * 1024)
+
+    def timeout_ns(self, items: int = 1) -> tuple[int | None, BudgetKind]:
+        """Time a call over ``items`` events may take, and the budget
+        that bounds it.
+
+        Raises:
+            ExprBudgetExceeded: If the evaluation is already over budget
+        """
+        timeout: int | None = None
+        kind: BudgetKind = "time"
+
+        if self.budget["expr_time_ms"] > 0:
+            timeout = int(self.budget["expr_time_ms"] * 1_000_000) * max(items, 1)
+
+        if self.eval_deadline_ns is not None:
+            remaining = self.eval_deadline_ns - time.monotonic_ns()
+            if remaining <= 0:
+                raise self.exceeded("evaluation_time")
+            if timeout is None or remaining < timeout:
+                timeout, kind = remaining, "evaluation_time"
+
+        return timeout, kind
+
+    def exceeded(self, kind: BudgetKind) -> ExprBudgetExceeded:
+        """Error reporting a breach of one of the budgets."""
+        if kind == "time":
+            reason = (
+                f"Expression exceeded its time budget "
+                f"({self.budget['expr_time_ms']:g} ms per event)"
+            )
+        elif kind == "evaluation_time":
+            reason = (
+                f"Evaluation exceeded its time budget "
+                f"({self.budget['eval_time_ms']:g} ms)"
+            )
+        elif kind == "memory":
+            reason = (
+                f"Expression exceeded its memory budget "
+                f"({self.budget['expr_memory_mb']:g} MB)"
+            )
+        else:
+            reason = "Expression exceeded its cost budget"
+        return ExprBudgetExceeded(reason, kind)
+
+
+# Limits of the evaluation running in this context. A context variable, so
+# that nodes evaluated on other threads (see ``map_layer``) share it.
+_evaluation: contextvars.ContextVar[ExprLimits | None] = contextvars.ContextVar(
+    "expr_evaluation_limits", default=None
+)
+
+
+@contextmanager
+def evaluation_budget(flow: str | None) -> Iterator[None]:
+    """Run one evaluation of a run under its flow's evaluation budget.
+
+    Expression calls made inside the block (in this context) share the
+    evaluation deadline (see ``current_limits``).
+    """
+    budget = flow_budget(flow)
+    deadline = None
+    if budget["eval_time_ms"] > 0:
+        deadline = time.monotonic_ns() + int(budget["eval_time_ms"] * 1_000_000)
+
+    token = _evaluation.set(ExprLimits(budget, deadline))
+    try:
+        yield
+    finally:
+        _evaluation.reset(token)
+
+
+def current_limits(flow: str | None) -> ExprLimits:
+    """Limits of an expression call of ``flow``.
+
+    Inside ``evaluation_budget`` the evaluation's limits are used, so the
+    call is also bounded by the evaluation deadline.
+    """
+    limits = _evaluation.get()
+    if limits is not None:
+        return limits
+    return ExprLimits(flow_budget(flow))
+
+
+# --- Enforcement in Python code -----------------------------------------------
+
+
+class _PythonLimits:
+    """Context manager enforcing limits on the Python code it wraps."""
+
+    __slots__ = ("limits", "items", "kind", "limited")
+
+    def __init__(self, limits: ExprLimits, items: int) -> None:
+        self.limits = limits
+        self.items = items
+
+    def __enter__(self) -> None:
+        timeout, self.kind = self.limits.timeout_ns(self.items)
+        self.limited = Limited(timeout, self.limits.memory_bytes)
+        self.limited.__enter__()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        try:
+            self.limited.__exit__(*exc_info)
+        except LimitExceeded as e:
+            kind: BudgetKind = self.kind if e.kind == "time" else "memory"
+            raise self.limits.exceeded(kind) from None
+
+
+def python_limits(
+    limits: ExprLimits | None, items: int = 1
+) -> AbstractContextManager[None]:
+    """Run Python code (an expression call over ``items`` events) under limits.
+
+    Raises:
+        ExprBudgetExceeded: If the block ran over the time or memory budget
+    """
+    if limits is None:
+        return nullcontext()
+    return _PythonLimits(limits, items)
+
+
+# --- Breach metrics -----------------------------------------------------------
+
+
+class BudgetStats(TypedDict):
+    """Budget breach counters.
+
+    Attributes:
+        breaches: Expression calls that ran over budget
+        by_kind: Breaches per budget (time, memory, evaluation_time, cost)
+        by_flow: Breaches per flow
+    """
+
+    breaches: int
+    by_kind: dict[str, int]
+    by_flow: dict[str, int]
+
+
+class BudgetMetrics:
+    """Counts budget breaches per budget and per flow."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._by_kind: dict[str, int] = {}
+        self._by_flow: dict[str, int] = {}
+
+    def record(self, flow: str | None, kind: BudgetKind) -> None:
+        """Count a breach."""
+        with self._lock:
+            self._by_kind[kind] = self._by_kind.get(kind, 0) + 1
+            self._by_flow[flow or ""] = self._by_flow.get(flow or "", 0) + 1
+
+    def stats(self) -> BudgetStats:
+        """Return a snapshot of the counters."""
+        with self._lock:
+            return BudgetStats(
+                breaches=sum(self._by_kind.values()),
+                by_kind=dict(self._by_kind),
+                by_flow=dict(self._by_flow),
+            )
+
+    def clear(self) -> None:
+        """Reset the counters."""
+        with self._lock:
+            self._by_kind.clear()
+            self._by_flow.clear()
+
+
+_budget_metrics = BudgetMetrics()
+
+
+def get_budget_metrics() -> BudgetMetrics:
+    """Return the process-wide budget breach counters."""
+    return _budget_metrics
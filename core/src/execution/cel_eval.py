@@ -0,0 +1,1359 @@
+"""CEL expression evaluator implementation.
+
+Implements the core of the Common Expression Language
+(https://github.com/google/cel-spec) for filters and validators:
+
+- literals: int (decimal/hex, ``u`` suffix), double, string and bytes
+  (quoted, triple-quoted, raw), bool, null, lists and maps
+- operators: ``! - * / % + < <= > >= == != in && || ?:``
+- field selection (``data.amount``), indexing (``data.items[0]``,
+  ``data['key']``)
+- functions: ``size``, ``int``, ``uint``, ``double``, ``string``, ``bool``,
+  ``bytes``, ``dyn`` and the string methods ``contains``, ``startsWith``,
+  ``endsWith``
+- macros: ``has``, ``all``, ``exists``, ``exists_one``, ``map``, ``filter``
+
+CEL is not Turing-complete: there are no loops besides macros over finite
+lists and maps, and no recursion. Each script is parsed and checked (known
+variables, functions and macro arities) once, into a tree of Python
+closures, and every call runs under a cost budget (one unit per evaluated
+node, plus the size of strings and lists it builds or scans), so a single
+call can't stall an evaluation worker. Regular expressions (``matches``)
+are not supported, as Python's backtracking engine can't bound their cost.
+
+Values are the JSON types of event data: null, bool, int (``uint`` values
+are ints), double, string, bytes, list and map. Errors follow CEL
+semantics: ``&&``, ``||`` and ``all``/``exists`` absorb errors when the
+other operands decide the result.
+"""
+
+import functools
+import logging
+import math
+import re
+from collections.abc import Callable
+from typing import Any
+
+from src.config import CEL_MAX_COST, EXPR_CACHE_SIZE
+from src.domain.evaluation import ExprBudgetExceeded
+from src.execution.budget import ExprLimits, python_limits
+from src.execution.profiling import record_expression_error
+from src.models import Expr
+
+logger = logging.getLogger(__name__)
+
+INT64_MIN = -(2**63)
+INT64_MAX = 2**63 - 1
+UINT64_MAX = 2**64 - 1
+
+# Max nesting of parentheses, calls, lists, etc. in a script
+MAX_NESTING = 64
+
+# Variables available to filters and validators
+DEFAULT_VARIABLES = ("data", "ctx")
+
+
+class CELError(Exception):
+    """Runtime error of a CEL program (CEL error value)."""
+
+
+class CELSyntaxError(ValueError):
+    """Script that doesn't parse or check."""
+
+
+class CELCostExceededError(Exception):
+    """Program exceeded its cost budget."""
+
+
+# --- Lexer --------------------------------------------------------------------
+
+_TOKEN = re.compile(
+    r"""
+    (?P<space>\s+|//[^\n]*)
+  | (?P<string>(?:[bB][rR]?|[rR][bB]?)?
+        (?:'''[\s\S]*?'''|\"\"\"[\s\S]*?\"\"\"
+          |'(?:[^'\\\n]|\\.)*'|"(?:[^"\\\n]|\\.)*"))
+  | (?P<double>(?:\d+\.\d+(?:[eE][+-]?\d+)?|\d+[eE][+-]?\d+|\.\d+(?:[eE][+-]?\d+)?))
+  | (?P<int>0[xX][0-9a-fA-F]+[uU]?|\d+[uU]?)
+  | (?P<ident>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<op>==|!=|<=|>=|&&|\|\||[<>!+\-*/%?:.,\[\](){}])
+    """,
+    re.VERBOSE,
+)
+
+_RESERVED = frozenset(
+    {
+        "as",
+        "break",
+        "const",
+        "continue",
+        "else",
+        "for",
+        "function",
+        "if",
+        "import",
+        "let",
+        "loop",
+        "package",
+        "namespace",
+        "return",
+        "var",
+        "void",
+        "while",
+    }
+)
+
+_ESCAPES = {
+    "a": "\a",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+    "v": "\v",
+    "\\": "\\",
+    "?": "?",
+    '"': '"',
+    "'": "'",
+    "`": "`",
+}
+
+Token = tuple[str, str, int]  # (kind, text, position)
+
+
+def _tokenize(script: str) -> list[Token]:
+    tokens: list[Token] = []
+    pos = 0
+
+    while pos < len(script):
+        match = _TOKEN.match(script, pos)
+        if match is None:
+            raise CELSyntaxError(f"unexpected character {script[pos]!r} at {pos}")
+        kind = match.lastgroup
+        assert kind is not None
+        if kind != "space":
+            tokens.append((kind, match.group(kind), pos))
+        pos = match.end()
+
+    return tokens
+
+
+def _unescape(body: str, is_bytes: bool) -> str | bytes:
+    out = bytearray()
+    i = 0
+
+    while i < len(body):
+        char = body[i]
+        if char != "\\":
+            out += char.encode("utf-8")
+            i += 1
+            continue
+
+        if i + 1 >= len(body):
+            raise CELSyntaxError("invalid escape at end of string")
+        code = body[i + 1]
+
+        if code in _ESCAPES:
+            out += _ESCAPES[code].encode("utf-8")
+            i += 2
+        elif code in "xX" and re.fullmatch(r"[0-9a-fA-F]{2}", body[i + 2 : i + 4]):
+            value = int(body[i + 2 : i + 4], 16)
+            out += bytes([value]) if is_bytes else chr(value).encode("utf-8")
+            i += 4
+        elif code in "0123" and re.fullmatch(r"[0-7]{2}", body[i + 2 : i + 4]):
+            value = int(body[i + 1 : i + 4], 8)
+            out += bytes([value]) if is_bytes else chr(value).encode("utf-8")
+            i += 4
+        elif code in "uU" and not is_bytes:
+            width = 4 if code == "u" else 8
+            digits = body[i + 2 : i + 2 + width]
+            if not re.fullmatch(rf"[0-9a-fA-F]{{{width}}}", digits):
+                raise CELSyntaxError(f"invalid unicode escape \\{code}{digits}")
+            value = int(digits, 16)
+            if value > 0x10FFFF or 0xD800 <= value <= 0xDFFF:
+                raise CELSyntaxError(f"invalid code point \\{code}{digits}")
+            out += chr(value).encode("utf-8")
+            i += 2 + width
+        else:
+            raise CELSyntaxError(f"invalid escape \\{code}")
+
+    return bytes(out) if is_bytes else out.decode("utf-8")
+
+
+def _string_literal(text: str) -> str | bytes:
+    prefix_len = 0
+    while text[prefix_len] not in "'\"":
+        prefix_len += 1
+    prefix = text[:prefix_len].lower()
+    quoted = text[prefix_len:]
+    quote_len = 3 if quoted[:3] in ("'''", '"""') else 1
+    body = quoted[quote_len:-quote_len]
+    is_bytes = "b" in prefix
+
+    if "r" in prefix:
+        return body.encode("utf-8") if is_bytes else body
+    return _unescape(body, is_bytes)
+
+
+def _int_literal(text: str) -> int:
+    unsigned = text[-1] in "uU"
+    digits = text[:-1] if unsigned else text
+    value = int(digits, 16) if digits[:2].lower() == "0x" else int(digits)
+
+    if value > (UINT64_MAX if unsigned else INT64_MAX):
+        raise CELSyntaxError(f"integer literal out of range: {text}")
+    return value
+
+
+# --- Parser -------------------------------------------------------------------
+
+# AST nodes are tuples tagged by their first element:
+#   ("lit", value)              ("ident", name)
+#   ("select", operand, field)  ("index", operand, key)
+#   ("call", name, target, args)     target is None for global calls
+#   ("list", items)             ("map", [(key, value), ...])
+#   ("unary", op, operand)      ("binary", op, left, right)
+#   ("cond", condition, then, otherwise)
+Node = tuple[Any, ...]
+
+_RELATIONS = frozenset({"<", "<=", ">", ">=", "==", "!=", "in"})
+
+
+class _Parser:
+    def __init__(self, tokens: list[Token]) -> None:
+        self.tokens = tokens
+        self.pos = 0
+        self.depth = 0
+
+    def peek(self) -> Token | None:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def peek_op(self) -> str | None:
+        token = self.peek()
+        if token is None:
+            return None
+        kind, text, _ = token
+        if kind == "op" or (kind == "ident" and text == "in"):
+            return text
+        return None
+
+    def next(self) -> Token:
+        token = self.peek()
+        if token is None:
+            raise CELSyntaxError("unexpected end of expression")
+        self.pos += 1
+        return token
+
+    def expect(self, op: str) -> None:
+        kind, text, pos = self.next()
+        if kind != "op" or text != op:
+            raise CELSyntaxError(f"expected {op!r} at {pos}, got {text!r}")
+
+    def nested(self) -> None:
+        self.depth += 1
+        if self.depth > MAX_NESTING:
+            raise CELSyntaxError("expression is nested too deeply")
+
+    def parse(self) -> Node:
+        node = self.expr()
+        token = self.peek()
+        if token is not None:
+            raise CELSyntaxError(f"unexpected {token[1]!r} at {token[2]}")
+        return node
+
+    def expr(self) -> Node:
+        self.nested()
+        condition = self.logical("||")
+        if self.peek_op() == "?":
+            self.pos += 1
+            then = self.logical("||")
+            self.expect(":")
+            otherwise = self.expr()
+            condition = ("cond", condition, then, otherwise)
+        self.depth -= 1
+        return condition
+
+    def logical(self, op: str) -> Node:
+        operand = self.conjunction if op == "||" else self.relation
+        left = operand()
+        while self.peek_op() == op:
+            self.pos += 1
+            left = ("binary", op, left, operand())
+        return left
+
+    def conjunction(self) -> Node:
+        return self.logical("&&")
+
+    def relation(self) -> Node:
+        left = self.additive()
+        while (op := self.peek_op()) in _RELATIONS:
+            self.pos += 1
+            left = ("binary", op, left, self.additive())
+        return left
+
+    def additive(self) -> Node:
+        left = self.multiplicative()
+        while (op := self.peek_op()) in ("+", "-"):
+            self.pos += 1
+            left = ("binary", op, left, self.multiplicative())
+        return left
+
+    def multiplicative(self) -> Node:
+        left = self.unary()
+        while (op := self.peek_op()) in ("*", "/", "%"):
+            self.pos += 1
+            left = ("binary", op, left, self.unary())
+        return left
+
+    def unary(self) -> Node:
+        op = self.peek_op()
+        if op == "!":
+            self.pos += 1
+            return ("unary", "!", self.unary())
+        if op == "-":
+            self.pos += 1
+            token = self.peek()
+            # Fold negative literals (so INT64_MIN can be written)
+            if token is not None and token[0] in ("int", "double"):
+                kind, text, _ = self.next()
+                if kind == "double":
+                    return self.member(("lit", -float(text)))
+                if text[-1] in "uU":
+                    raise CELSyntaxError(f"invalid negative uint literal: -{text}")
+                value = -int(text, 16) if text[:2].lower() == "0x" else -int(text)
+                if value < INT64_MIN:
+                    raise CELSyntaxError(f"integer literal out of range: -{text}")
+                return self.member(("lit", value))
+            return ("unary", "-", self.unary())
+        return self.member(self.primary())
+
+    def member(self, node: Node) -> Node:
+        while True:
+            op = self.peek_op()
+            if op == ".":
+                self.pos += 1
+                kind, name, pos = self.next()
+                if kind != "ident":
+                    raise CELSyntaxError(f"expected field name at {pos}")
+                if self.peek_op() == "(":
+                    self.pos += 1
+                    node = ("call", name, node, self.args(")"))
+                else:
+                    node = ("select", node, name)
+            elif op == "[":
+                self.pos += 1
+                key = self.expr()
+                self.expect("]")
+                node = ("index", node, key)
+            else:
+                return node
+
+    def args(self, close: str) -> list[Node]:
+        self.nested()
+        args: list[Node] = []
+        while self.peek_op() != close:
+            args.append(self.expr())
+            if self.peek_op() != ",":
+                break
+            self.pos += 1
+        self.expect(close)
+        self.depth -= 1
+        return args
+
+    def primary(self) -> Node:
+        kind, text, pos = self.next()
+
+        if kind == "int":
+            return ("lit", _int_literal(text))
+        if kind == "double":
+            return ("lit", float(text))
+        if kind == "string":
+            return ("lit", _string_literal(text))
+
+        if kind == "ident":
+            if text in ("true", "false"):
+                return ("lit", text == "true")
+            if text == "null":
+                return ("lit", None)
+            if text in _RESERVED or text == "in":
+                raise CELSyntaxError(f"reserved identifier {text!r} at {pos}")
+            if self.peek_op() == "(":
+                self.pos += 1
+                return ("call", text, None, self.args(")"))
+            return ("ident", text)
+
+        if kind == "op":
+            if text == "(":
+                node = self.expr()
+                self.expect(")")
+                return node
+            if text == "[":
+                return ("list", self.args("]"))
+            if text == "{":
+                return ("map", self.map_entries())
+
+        raise CELSyntaxError(f"unexpected {text!r} at {pos}")
+
+    def map_entries(self) -> list[tuple[Node, Node]]:
+        self.nested()
+        entries: list[tuple[Node, Node]] = []
+        while self.peek_op() != "}":
+            key = self.expr()
+            self.expect(":")
+            entries.append((key, self.expr()))
+            if self.peek_op() != ",":
+                break
+            self.pos += 1
+        self.expect("}")
+        self.depth -= 1
+        return entries
+
+
+# --- Runtime helpers ----------------------------------------------------------
+
+
+class _Activation:
+    """Variables and remaining cost of one program run."""
+
+    __slots__ = ("variables", "budget")
+
+    def __init__(self, variables: dict[str, Any], budget: int) -> None:
+        self.variables = variables
+        self.budget = budget
+
+    def charge(self, cost: int = 1) -> None:
+        self.budget -= cost
+        if self.budget < 0:
+            raise CELCostExceededError("CEL cost budget exceeded")
+
+
+Program = Callable[[_Activation], Any]
+
+
+def _kind(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "double"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, bytes):
+        return "bytes"
+    if isinstance(value, (list, tuple)):
+        return "list"
+    if isinstance(value, dict):
+        return "map"
+    raise CELError(f"unsupported value type: {type(value).__name__}")
+
+
+def _no_overload(op: str, *values: Any) -> CELError:
+    kinds = ", ".join(_kind(value) for value in values)
+    return CELError(f"no matching overload for '{op}' applied to ({kinds})")
+
+
+def _check_int(value: int) -> int:
+    if value < INT64_MIN or value > INT64_MAX:
+        raise CELError("integer overflow")
+    return value
+
+
+def _is_number(kind: str) -> bool:
+    return kind in ("int", "double")
+
+
+def _equals(left: Any, right: Any, act: _Activation) -> bool:
+    left_kind, right_kind = _kind(left), _kind(right)
+
+    if _is_number(left_kind) and _is_number(right_kind):
+        return bool(left == right)
+    if left_kind != right_kind:
+        return False
+
+    if left_kind == "list":
+        act.charge(len(left))
+        return len(left) == len(right) and all(
+            _equals(a, b, act) for a, b in zip(left, right, strict=True)
+        )
+    if left_kind == "map":
+        act.charge(len(left))
+        return left.keys() == right.keys() and all(
+            _equals(value, right[key], act) for key, value in left.items()
+        )
+
+    return bool(left == right)
+
+
+def _compare(op: str, left: Any, right: Any) -> int:
+    left_kind, right_kind = _kind(left), _kind(right)
+
+    if (_is_number(left_kind) and _is_number(right_kind)) or (
+        left_kind == right_kind and left_kind in ("string", "bytes", "bool")
+    ):
+        return int(left > right) - int(left < right)
+
+    raise _no_overload(op, left, right)
+
+
+def _map_key(value: Any) -> Any:
+    if _kind(value) not in ("int", "bool", "string"):
+        raise CELError(f"unsupported map key type: {_kind(value)}")
+    return value
+
+
+def _select(operand: Any, field: str) -> Any:
+    if not isinstance(operand, dict):
+        raise CELError(
+            f"type '{_kind(operand)}' does not support field selection ('{field}')"
+        )
+    if field not in operand:
+        raise CELError(f"no such key: {field}")
+    return operand[field]
+
+
+def _index(operand: Any, key: Any) -> Any:
+    kind = _kind(operand)
+
+    if kind == "list":
+        key_kind = _kind(key)
+        if key_kind == "double" and key.is_integer():
+            key = int(key)
+        elif key_kind != "int":
+            raise _no_overload("_[_]", operand, key)
+        if key < 0 or key >= len(operand):
+            raise CELError(f"index out of range: {key}")
+        return operand[key]
+
+    if kind == "map":
+        if _key_of(operand, _map_key(key)) is not None:
+            return operand[key]
+        raise CELError(f"no such key: {key}")
+
+    raise _no_overload("_[_]", operand, key)
+
+
+def _key_of(mapping: dict[Any, Any], key: Any) -> Any:
+    # Python treats True/1 as the same key; CEL doesn't
+    if key not in mapping:
+        return None
+    for candidate in mapping:
+        if candidate == key and type(candidate) is type(key):
+            return candidate
+    return None
+
+
+def _contains(container: Any, item: Any, act: _Activation) -> bool:
+    kind = _kind(container)
+    if kind == "list":
+        act.charge(len(container))
+        return any(_equals(item, element, act) for element in container)
+    if kind == "map":
+        return _key_of(container, item) is not None
+    raise _no_overload("@in", item, container)
+
+
+def _arithmetic(op: str, left: Any, right: Any, act: _Activation) -> Any:
+    left_kind, right_kind = _kind(left), _kind(right)
+
+    if left_kind != right_kind:
+        raise _no_overload(op, left, right)
+
+    if left_kind == "int":
+        if op == "+":
+            return _check_int(left + right)
+        if op == "-":
+            return _check_int(left - right)
+        if op == "*":
+            return _check_int(left * right)
+        if right == 0:
+            raise CELError("division by zero" if op == "/" else "modulus by zero")
+        quotient = abs(left) // abs(right)
+        if op == "/":
+            return _check_int(quotient if (left < 0) == (right < 0) else -quotient)
+        remainder = abs(left) % abs(right)
+        return remainder if left >= 0 else -remainder
+
+    if left_kind == "double" and op != "%":
+        if op == "+":
+            return left + right
+        if op == "-":
+            return left - right
+        if op == "*":
+            return left * right
+        if right == 0:
+            if left == 0 or math.isnan(left):
+                return math.nan
+            return math.copysign(math.inf, left) * math.copysign(1.0, right)
+        return left / right
+
+    if op == "+" and left_kind in ("string", "bytes", "list"):
+        act.charge(1 + (len(left) + len(right)) // 16)
+        return list(left) + list(right) if left_kind == "list" else left + right
+
+    raise _no_overload(op, left, right)
+
+
+def _bool_operand(value: Any, op: str) -> bool:
+    if not isinstance(value, bool):
+        raise _no_overload(op, value)
+    return value
+
+
+# --- Functions ----------------------------------------------------------------
+
+
+def _size(value: Any) -> int:
+    if _kind(value) in ("string", "bytes", "list", "map"):
+        return len(value)
+    raise _no_overload("size", value)
+
+
+def _to_int(value: Any, unsigned: bool = False) -> int:
+    name = "uint" if unsigned else "int"
+    kind = _kind(value)
+    result: int
+
+    if kind == "int":
+        result = value
+    elif kind == "double":
+        if math.isnan(value) or math.isinf(value):
+            raise CELError(f"{name} conversion out of range")
+        result = int(value)
+    elif kind == "string":
+        if not re.fullmatch(r"[+-]?\d+", value):
+            raise CELError(f"invalid {name} literal: {value!r}")
+        result = int(value)
+    else:
+        raise _no_overload(name, value)
+
+    low, high = (0, UINT64_MAX) if unsigned else (INT64_MIN, INT64_MAX)
+    if result < low or result > high:
+        raise CELError(f"{name} conversion out of range")
+    return result
+
+
+def _to_double(value: Any) -> float:
+    kind = _kind(value)
+    if kind in ("int", "double"):
+        return float(value)
+    if kind == "string":
+        try:
+            return float(value)
+        except ValueError:
+            raise CELError(f"invalid double literal: {value!r}") from None
+    raise _no_overload("double", value)
+
+
+def _format_double(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value.is_integer() and abs(value) < 1e21:
+        return str(int(value))
+    return repr(value)
+
+
+def _to_string(value: Any) -> str:
+    kind = _kind(value)
+    if kind == "string":
+        return str(value)
+    if kind == "int":
+        return str(value)
+    if kind == "double":
+        return _format_double(value)
+    if kind == "bool":
+        return "true" if value else "false"
+    if kind == "bytes":
+        try:
+            return bytes(value).decode("utf-8")
+        except UnicodeDecodeError:
+            raise CELError("invalid UTF-8 in bytes") from None
+    raise _no_overload("string", value)
+
+
+def _to_bool(value: Any) -> bool:
+    kind = _kind(value)
+    if kind == "bool":
+        return bool(value)
+    if kind == "string":
+        if value in ("true", "True", "TRUE", "t", "1"):
+            return True
+        if value in ("false", "False", "FALSE", "f", "0"):
+            return False
+        raise CELError(f"invalid bool literal: {value!r}")
+    raise _no_overload("bool", value)
+
+
+def _to_bytes(value: Any) -> bytes:
+    kind = _kind(value)
+    if kind == "bytes":
+        return bytes(value)
+    if kind == "string":
+        return str(value).encode("utf-8")
+    raise _no_overload("bytes", value)
+
+
+def _string_method(name: str, check: Callable[[str, str], bool]) -> Callable[..., Any]:
+    def method(target: Any, arg: Any) -> bool:
+        if not isinstance(target, str) or not isinstance(arg, str):
+            raise _no_overload(name, target, arg)
+        return check(target, arg)
+
+    return method
+
+
+# name -> (function, arity); receiver-style calls pass the target first
+_GLOBAL_FUNCTIONS: dict[str, tuple[Callable[..., Any], int]] = {
+    "size": (_size, 1),
+    "int": (_to_int, 1),
+    "uint": (lambda value: _to_int(value, unsigned=True), 1),
+    "double": (_to_double, 1),
+    "string": (_to_string, 1),
+    "bool": (_to_bool, 1),
+    "bytes": (_to_bytes, 1),
+    "dyn": (lambda value: value, 1),
+}
+
+_RECEIVER_FUNCTIONS: dict[str, tuple[Callable[..., Any], int]] = {
+    "size": (_size, 0),
+    "contains": (_string_method("contains", lambda s, sub: sub in s), 1),
+    "startsWith": (_string_method("startsWith", str.startswith), 1),
+    "endsWith": (_string_method("endsWith", str.endswith), 1),
+}
+
+# Receiver functions whose cost grows with the target's size
+_SCANNING_FUNCTIONS = frozenset({"contains", "startsWith", "endsWith"})
+
+_COMPREHENSIONS = frozenset({"all", "exists", "exists_one", "map", "filter"})
+
+
+# --- Compiler -----------------------------------------------------------------
+
+
+class _Compiler:
+    """Checks an AST and compiles it into closures."""
+
+    def __init__(self, variables: tuple[str, ...]) -> None:
+        self.variables = variables
+        self.scopes: list[str] = []
+
+    def compile(self, node: Node) -> Program:
+        tag = node[0]
+
+        if tag == "lit":
+            value = node[1]
+
+            def literal(act: _Activation) -> Any:
+                act.charge()
+                return value
+
+            return literal
+
+        if tag == "ident":
+            return self.ident(node[1])
+
+        if tag == "select":
+            operand = self.compile(node[1])
+            field = node[2]
+
+            def select(act: _Activation) -> Any:
+                act.charge()
+                return _select(operand(act), field)
+
+            return select
+
+        if tag == "index":
+            operand, key = self.compile(node[1]), self.compile(node[2])
+
+            def index(act: _Activation) -> Any:
+                act.charge()
+                return _index(operand(act), key(act))
+
+            return index
+
+        if tag == "list":
+            items = [self.compile(item) for item in node[1]]
+
+            def build_list(act: _Activation) -> Any:
+                act.charge(1 + len(items))
+                return [item(act) for item in items]
+
+            return build_list
+
+        if tag == "map":
+            return self.map_literal(node[1])
+
+        if tag == "unary":
+            return self.unary(node[1], self.compile(node[2]))
+
+        if tag == "binary":
+            return self.binary(node[1], node[2], node[3])
+
+        if tag == "cond":
+            return self.conditional(node[1], node[2], node[3])
+
+        if tag == "call":
+            return self.call(node[1], node[2], node[3])
+
+        raise CELSyntaxError(f"unsupported expression: {tag}")
+
+    def ident(self, name: str) -> Program:
+        # Comprehension variables live in the activation too
+        if name not in self.scopes and name not in self.variables:
+            raise CELSyntaxError(f"undeclared reference to '{name}'")
+
+        def variable(act: _Activation) -> Any:
+            act.charge()
+            return act.variables[name]
+
+        return variable
+
+    def map_literal(self, entries: list[tuple[Node, Node]]) -> Program:
+        compiled = [(self.compile(key), self.compile(value)) for key, value in entries]
+
+        def build_map(act: _Activation) -> Any:
+            act.charge(1 + len(compiled))
+            result: dict[Any, Any] = {}
+            for key, value in compiled:
+                key_value = _map_key(key(act))
+                if key_value in result:
+                    raise CELError(f"duplicate map key: {key_value}")
+                result[key_value] = value(act)
+            return result
+
+        return build_map
+
+    def unary(self, op: str, operand: Program) -> Program:
+        if op == "!":
+
+            def negate(act: _Activation) -> Any:
+                act.charge()
+                return not _bool_operand(operand(act), "!_")
+
+            return negate
+
+        def minus(act: _Activation) -> Any:
+            act.charge()
+            value = operand(act)
+            kind = _kind(value)
+            if kind == "int":
+                return _check_int(-value)
+            if kind == "double":
+                return -value
+            raise _no_overload("-_", value)
+
+        return minus
+
+    def binary(self, op: str, left_node: Node, right_node: Node) -> Program:
+        left, right = self.compile(left_node), self.compile(right_node)
+
+        if op in ("&&", "||"):
+            return self.logical(op, left, right)
+
+        if op in ("==", "!="):
+            negate = op == "!="
+
+            def equals(act: _Activation) -> Any:
+                act.charge()
+                return _equals(left(act), right(act), act) is not negate
+
+            return equals
+
+        if op == "in":
+
+            def contains(act: _Activation) -> Any:
+                act.charge()
+                item = left(act)
+                return _contains(right(act), item, act)
+
+            return contains
+
+        if op in ("<", "<=", ">", ">="):
+            accept = {
+                "<": (-1,),
+                "<=": (-1, 0),
+                ">": (1,),
+                ">=": (1, 0),
+            }[op]
+
+            def compare(act: _Activation) -> Any:
+                act.charge()
+                return _compare(op, left(act), right(act)) in accept
+
+            return compare
+
+        def arithmetic(act: _Activation) -> Any:
+            act.charge()
+            return _arithmetic(op, left(act), right(act), act)
+
+        return arithmetic
+
+    @staticmethod
+    def logical(op: str, left: Program, right: Program) -> Program:
+        # CEL logical operators are commutative: an error on one side is
+        # absorbed when the other side decides the result
+        absorbing = op == "||"
+
+        def logical(act: _Activation) -> Any:
+            act.charge()
+            error: CELError | None = None
+            for operand in (left, right):
+                try:
+                    value = _bool_operand(operand(act), f"_{op}_")
+                except CELError as e:
+                    error = error or e
+                    continue
+                if value is absorbing:
+                    return absorbing
+            if error is not None:
+                raise error
+            return not absorbing
+
+        return logical
+
+    def conditional(self, condition: Node, then: Node, otherwise: Node) -> Program:
+        test, if_true, if_false = (
+            self.compile(condition),
+            self.compile(then),
+            self.compile(otherwise),
+        )
+
+        def choose(act: _Activation) -> Any:
+            act.charge()
+            if _bool_operand(test(act), "_?_:_"):
+                return if_true(act)
+            return if_false(act)
+
+        return choose
+
+    def call(self, name: str, target: Node | None, args: list[Node]) -> Program:
+        if target is None and name == "has":
+            return self.has(args)
+
+        if target is not None and name in _COMPREHENSIONS:
+            return self.comprehension(name, target, args)
+
+        functions = _GLOBAL_FUNCTIONS if target is None else _RECEIVER_FUNCTIONS
+        if name not in functions:
+            kind = "function" if target is None else "method"
+            raise CELSyntaxError(f"undeclared reference to {kind} '{name}'")
+
+        function, arity = functions[name]
+        if len(args) != arity:
+            raise CELSyntaxError(
+                f"'{name}' expects {arity} argument(s), got {len(args)}"
+            )
+
+        operands = ([] if target is None else [self.compile(target)]) + [
+            self.compile(arg) for arg in args
+        ]
+        scanning = name in _SCANNING_FUNCTIONS
+
+        def invoke(act: _Activation) -> Any:
+            act.charge()
+            values = [operand(act) for operand in operands]
+            if scanning and isinstance(values[0], str):
+                act.charge(len(values[0]) // 16)
+            return function(*values)
+
+        return invoke
+
+    def has(self, args: list[Node]) -> Program:
+        if len(args) != 1 or args[0][0] != "select":
+            raise CELSyntaxError("has() expects a field selection, e.g. has(data.x)")
+
+        operand = self.compile(args[0][1])
+        field = args[0][2]
+
+        def has(act: _Activation) -> Any:
+            act.charge()
+            value = operand(act)
+            if not isinstance(value, dict):
+                raise CELError(
+                    f"type '{_kind(value)}' does not support field selection"
+                )
+            return field in value
+
+        return has
+
+    def comprehension(self, name: str, target: Node, args: list[Node]) -> Program:
+        expected = (2, 3) if name == "map" else (2,)
+        if len(args) not in expected:
+            raise CELSyntaxError(
+                f"'{name}' expects {' or '.join(map(str, expected))} arguments"
+            )
+        if args[0][0] != "ident":
+            raise CELSyntaxError(f"'{name}' expects a variable name first")
+
+        var = args[0][1]
+        if var in self.variables:
+            raise CELSyntaxError(f"'{name}' variable shadows '{var}'")
+
+        source = self.compile(target)
+        self.scopes.append(var)
+        try:
+            bodies = [self.compile(arg) for arg in args[1:]]
+        finally:
+            self.scopes.pop()
+
+        def iterate(act: _Activation) -> Any:
+            act.charge()
+            collection = source(act)
+            kind = _kind(collection)
+            if kind not in ("list", "map"):
+                raise _no_overload(name, collection)
+
+            previous = act.variables.get(var, _UNSET)
+            try:
+                return _COMPREHENSION_RUNNERS[name](act, var, list(collection), bodies)
+            finally:
+                if previous is _UNSET:
+                    act.variables.pop(var, None)
+                else:
+                    act.variables[var] = previous
+
+        return iterate
+
+
+_UNSET = object()
+
+
+def _run_all(
+    act: _Activation, var: str, items: list[Any], bodies: list[Program]
+) -> Any:
+    return _run_quantifier(act, var, items, bodies[0], absorbing=False)
+
+
+def _run_exists(
+    act: _Activation, var: str, items: list[Any], bodies: list[Program]
+) -> Any:
+    return _run_quantifier(act, var, items, bodies[0], absorbing=True)
+
+
+def _run_quantifier(
+    act: _Activation,
+    var: str,
+    items: list[Any],
+    predicate: Program,
+    absorbing: bool,
+) -> bool:
+    error: CELError | None = None
+    for item in items:
+        act.charge()
+        act.variables[var] = item
+        try:
+            value = _bool_operand(predicate(act), "all" if not absorbing else "exists")
+        except CELError as e:
+            error = error or e
+            continue
+        if value is absorbing:
+            return absorbing
+    if error is not None:
+        raise error
+    return not absorbing
+
+
+def _run_exists_one(
+    act: _Activation, var: str, items: list[Any], bodies: list[Program]
+) -> Any:
+    count = 0
+    for item in items:
+        act.charge()
+        act.variables[var] = item
+        if _bool_operand(bodies[0](act), "exists_one"):
+            count += 1
+    return count == 1
+
+
+def _run_map(
+    act: _Activation, var: str, items: list[Any], bodies: list[Program]
+) -> Any:
+    result: list[Any] = []
+    for item in items:
+        act.charge()
+        act.variables[var] = item
+        if len(bodies) == 2 and not _bool_operand(bodies[0](act), "map"):
+            continue
+        result.append(bodies[-1](act))
+    return result
+
+
+def _run_filter(
+    act: _Activation, var: str, items: list[Any], bodies: list[Program]
+) -> Any:
+    result: list[Any] = []
+    for item in items:
+        act.charge()
+        act.variables[var] = item
+        if _bool_operand(bodies[0](act), "filter"):
+            result.append(item)
+    return result
+
+
+_COMPREHENSION_RUNNERS: dict[
+    str, Callable[[_Activation, str, list[Any], list[Program]], Any]
+] = {
+    "all": _run_all,
+    "exists": _run_exists,
+    "exists_one": _run_exists_one,
+    "map": _run_map,
+    "filter": _run_filter,
+}
+
+
+class CELProgram:
+    """A parsed and checked CEL script, ready to run.
+
+    Attributes:
+        script: Source script
+        variables: Variables the script may reference
+    """
+
+    def __init__(self, script: str, variables: tuple[str, ...] = DEFAULT_VARIABLES):
+        self.script = script
+        self.variables = variables
+        self._program = _Compiler(variables).compile(_Parser(_tokenize(script)).parse())
+
+    def run(self, variables: dict[str, Any], max_cost: int = CEL_MAX_COST) -> Any:
+        """Run the program.
+
+        Raises:
+            CELError: If evaluation fails
+            CELCostExceededError: If the run exceeds max_cost
+        """
+        return self._program(_Activation(dict(variables), max_cost))
+
+
+@functools.lru_cache(maxsize=EXPR_CACHE_SIZE)
+def _compile_cached(
+    script: str,
+    variables: tuple[str, ...],
+) -> CELProgram | CELSyntaxError:
+    try:
+        return CELProgram(script, variables)
+    except CELSyntaxError as e:
+        return e
+    except RecursionError:
+        return CELSyntaxError("expression is nested too deeply")
+
+
+def compile_cel(
+    script: str, variables: tuple[str, ...] = DEFAULT_VARIABLES
+) -> CELProgram:
+    """Return the (cached) program of a script.
+
+    Raises:
+        CELSyntaxError: If the script does not parse or check
+    """
+    program = _compile_cached(script, variables)
+    if isinstance(program, CELSyntaxError):
+        raise program
+    return program
+
+
+class CELEvaluator:
+    """CEL expression evaluator.
+
+    Never raises exceptions - all errors are caught and logged - except
+    ``ExprBudgetExceeded`` for calls over their time or cost budget.
+
+    Args:
+        max_cost: Cost budget of each call (see module docstring)
+    """
+
+    def __init__(self, max_cost: int = CEL_MAX_COST) -> None:
+        self.max_cost = max_cost
+
+    def eval_expr(
+        self,
+        script: str,
+        variables: dict[str, Any],
+        limits: ExprLimits | None = None,
+    ) -> Any:
+        """Evaluate a CEL expression and return the result (any type).
+
+        Args:
+            script: CEL expression to evaluate
+            variables: Variables available in the expression
+            limits: Execution limits of the call (None = cost budget only)
+
+        Returns:
+            Any: Result of evaluation (can be any type)
+
+        Raises:
+            ExprBudgetExceeded: If the call ran over its limits
+            CELCostExceededError: If the call ran over its cost budget
+                without limits
+            Exception: If evaluation fails (caller should handle)
+
+        Example:
+            >>> evaluator = CELEvaluator()
+            >>> evaluator.eval_expr("data.payment_id", {"data": {"payment_id": "pmt_123"}})
+            "pmt_123"
+        """
+        program = compile_cel(script, tuple(variables))
+        if limits is None:
+            return program.run(variables, self.max_cost)
+
+        with python_limits(limits):
+            try:
+                return program.run(variables, self.max_cost)
+            except CELCostExceededError:
+                raise self._cost_exceeded() from None
+
+    def evaluate(
+        self,
+        expr: Expr,
+        data: dict[str, Any],
+        ctx: dict[str, Any],
+        limits: ExprLimits | None = None,
+    ) -> bool:
+        """Evaluate a CEL expression against data and context.
+
+        Args:
+            expr: Expression to evaluate (must have engine="cel")
+            data: Target data (current event data)
+            ctx: Context data (typically {"deps": [...], "data": {...}})
+            limits: Execution limits of the call (None = cost budget only)
+
+        Returns:
+            bool: Result of evaluation, False if error or non-CEL engine
+
+        Raises:
+            ExprBudgetExceeded: If the call ran over its limits
+
+        Example:
+            >>> evaluator = CELEvaluator()
+            >>> expr = Expr(engine="cel", script="data.amount > 0")
+            >>> evaluator.evaluate(expr, {"amount": 100}, {})
+            True
+        """
+        if expr.engine != "cel":
+            logger.error(
+                f"Unsupported expression engine: {expr.engine}. "
+                f"CELEvaluator only supports 'cel'."
+            )
+            return False
+
+        try:
+            program = compile_cel(expr.script)
+        except CELSyntaxError as e:
+            self._log_failure(expr, e)
+            return False
+
+        with python_limits(limits):
+            return self._run(expr, program, data, ctx, limits)
+
+    def evaluate_many(
+        self,
+        expr: Expr,
+        items: list[dict[str, Any]],
+        ctx: dict[str, Any],
+        limits: ExprLimits | None = None,
+    ) -> list[bool]:
+        """Evaluate a CEL expression against many data items sharing a ctx.
+
+        The program is looked up once; each item runs under its own cost
+        budget.
+
+        Args:
+            expr: Expression to evaluate (must have engine="cel")
+            items: Target data for each candidate event
+            ctx: Context data shared by all items
+            limits: Execution limits of each item (None = cost budget only)
+
+        Returns:
+            list[bool]: One result per item, False for items that errored
+
+        Raises:
+            ExprBudgetExceeded: If the call ran over its limits
+
+        Example:
+            >>> evaluator = CELEvaluator()
+            >>> expr = Expr(engine="cel", script="data.amount > 0")
+            >>> evaluator.evaluate_many(expr, [{"amount": 1}, {"amount": 0}], {})
+            [True, False]
+        """
+        if expr.engine != "cel":
+            logger.error(
+                f"Unsupported expression engine: {expr.engine}. "
+                f"CELEvaluator only supports 'cel'."
+            )
+            return [False] * len(items)
+
+        if not items:
+            return []
+
+        try:
+            program = compile_cel(expr.script)
+        except CELSyntaxError as e:
+            # Reported for every item, like the other engines
+            for _ in items:
+                self._log_failure(expr, e)
+            return [False] * len(items)
+
+        with python_limits(limits, len(items)):
+            return [self._run(expr, program, data, ctx, limits) for data in items]
+
+    def _run(
+        self,
+        expr: Expr,
+        program: CELProgram,
+        data: dict[str, Any],
+        ctx: dict[str, Any],
+        limits: ExprLimits | None,
+    ) -> bool:
+        try:
+            result = program.run({"data": data, "ctx": ctx}, self.max_cost)
+        except CELCostExceededError as e:
+            if limits is not None:
+                raise self._cost_exceeded() from None
+            self._log_failure(expr, e)
+            return False
+        except CELError as e:
+            self._log_failure(expr, e)
+            return False
+
+        if not isinstance(result, bool):
+            record_expression_error()
+            logger.error(
+                f"Expression '{expr.script}' returned non-boolean: {_kind(result)}"
+            )
+            return False
+
+        return result
+
+    def _cost_exceeded(self) -> ExprBudgetExceeded:
+        return ExprBudgetExceeded(
+            f"Expression exceeded its cost budget ({self.max_cost})", "cost"
+        )
+
+    def _log_failure(self, expr: Expr, e: Exception) -> None:
+        """Log an evaluation error with hints for common mistakes."""
+        record_expression_error()
+
+        if isinstance(e, CELSyntaxError):
+            logger.error(
+                f"Failed to compile CEL expression '{expr.script}': {e}\n"
+                f"Hint: Available variables are 'data' (event data) and 'ctx' "
+                f"(context with dependencies)"
+            )
+        elif isinstance(e, CELCostExceededError):
+            logger.error(
+                f"CEL expression '{expr.script}' exceeded its cost budget "
+                f"({self.max_cost})"
+            )
+        elif "no such key" in str(e) and "ctx" in expr.script:
+            logger.error(
+                f"Failed to evaluate CEL expression '{expr.script}': {e}\n"
+                f"Hint: Context structure is ctx.deps, not ctx.data.\n"
+                f"  - For single dependency: Use ctx.data.field (auto-populated)\n"
+                f"  - For multiple dependencies: Use ctx.deps[i].data.field\n"
+                f"  - Use has(data.field) to check for optional fields"
+            )
+        else:
+            logger.error(f"Failed to evaluate CEL expression '{expr.script}': {e}")
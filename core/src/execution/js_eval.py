@@ -4,15 +4,581 @@ This module provides a safe JavaScript expression evaluator that can be
 used alongside the Python evaluator for filter and validator expressions.
 """
 
+import json
 import logging
-from typing import Any
+import threading
+import time
+from collections.abc import Callable, Hashable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, TypedDict
 
-from quickjs import Function  # type: ignore[import-untyped]
+from quickjs import Context, JSException, Object  # type: ignore[import-untyped]
 
+from src.config import (
+    JS_CONTEXT_MAX_AGE_SECONDS,
+    JS_CONTEXT_MAX_CALLS,
+    JS_CONTEXT_MEMORY_LIMIT_MB,
+)
+from src.domain.evaluation import BudgetKind, ExprBudgetExceeded
+from src.execution.budget import ExprLimits
+from src.execution.profiling import record_expression_error
 from src.models import Expr
 
 logger = logging.getLogger(__name__)
 
+# Compiled functions kept per context before it is recycled
+MAX_FUNCTIONS_PER_CONTEXT = 256
+
+# Run the cycle collector every N calls instead of after every call
+GC_INTERVAL_CALLS = 1000
+
+# Marker key used by batch functions to report a per-item error
+BATCH_ERROR_KEY = "__bu_error__"
+
+# JSON bytes of event data and contexts a QuickJS context keeps loaded
+# (a sixteenth of its memory limit, or this without one)
+VALUE_CACHE_MAX_BYTES = 8 * 1024 * 1024
+
+# Arguments of a call passed as references to loaded values (calls with
+# more variables convert them per call)
+MAX_LOADED_ARGS = 8
+
+# Loaded once in each context. Values live in slots, out of the scripts'
+# reach; the arguments of a call are given as specs: [0, slot] (a loaded
+# value), [1, value] (inline) or [2, [specs]] (an array of them), and left
+# in __buArg0, __buArg1, ... Event data and ctx objects are deep-frozen
+# (__buFreeze) before scripts see them, whether loaded or passed per call:
+# scripts sharing them can't change what the next one reads.
+_VALUES_RUNTIME = """
+function __buFreeze(value) {
+  if (value !== null && typeof value === "object" && !Object.isFrozen(value)) {
+    Object.freeze(value);
+    for (const key of Object.keys(value)) __buFreeze(value[key]);
+  }
+  return value;
+}
+
+var __buLoad = (function () {
+  let values = [];
+
+  function arg(spec) {
+    switch (spec[0]) {
+      case 0: return values[spec[1]];
+      case 1: return __buFreeze(spec[1]);
+      default: return spec[1].map(arg);
+    }
+  }
+
+  return function (text) {
+    const fresh = JSON.parse(text);
+    if (fresh.reset) values = [];
+    for (const [slot, value] of fresh.values) values[slot] = __buFreeze(value);
+    for (const [slot, deps, single] of fresh.ctxs) {
+      const ctx = {
+        deps: deps.map(([flow, id, ref]) => ({ flow, id, data: values[ref] })),
+      };
+      if (single) ctx.data = ctx.deps[0].data;
+      values[slot] = __buFreeze(ctx);
+    }
+    fresh.args.forEach((spec, i) => { globalThis["__buArg" + i] = arg(spec); });
+  };
+})();
+"""
+
+# Argument slots, declared up front: the global object isn't extensible
+_ARG_SLOTS = f"var {', '.join(f'__buArg{i}' for i in range(MAX_LOADED_ARGS))};"
+
+# Run once in each context after the runtime is loaded. Contexts are shared
+# by every flow evaluated in their thread, so scripts must not be able to
+# leave anything behind: every object reachable from the globals (the
+# intrinsics, their prototypes and the runtime's functions) is frozen, and
+# the global object can't be extended. Assigning a global or patching
+# Object.prototype / Array.prototype silently does nothing (sloppy mode).
+# Only the runtime's argument slots stay writable.
+_HARDEN = """
+(function () {
+  // The global object itself is sealed below, not frozen
+  const seen = new Set([globalThis]);
+  function harden(value) {
+    if (value === null || (typeof value !== "object" && typeof value !== "function")) return;
+    if (seen.has(value)) return;
+    seen.add(value);
+    Object.freeze(value);
+    for (const key of Reflect.ownKeys(value)) {
+      const desc = Object.getOwnPropertyDescriptor(value, key);
+      if ("value" in desc) harden(desc.value);
+      else { harden(desc.get); harden(desc.set); }
+    }
+    harden(Object.getPrototypeOf(value));
+  }
+
+  for (const key of Reflect.ownKeys(globalThis)) {
+    if (typeof key === "string" && key.startsWith("__buArg")) continue;
+    const desc = Object.getOwnPropertyDescriptor(globalThis, key);
+    if ("value" in desc) {
+      harden(desc.value);
+      Object.defineProperty(globalThis, key, { writable: false, configurable: false });
+    } else {
+      Object.defineProperty(globalThis, key, { configurable: false });
+    }
+  }
+  harden(Object.getPrototypeOf(globalThis));
+  Object.preventExtensions(globalThis);
+})();
+"""
+
+# Evaluation whose values QuickJS contexts keep loaded (see js_value_scope)
+_value_scope: ContextVar[object | None] = ContextVar("js_value_scope", default=None)
+
+
+@contextmanager
+def js_value_scope() -> Iterator[None]:
+    """Keep event data and contexts loaded in QuickJS for one evaluation.
+
+    Inside the scope, each QuickJS context converts an event's data and a
+    node's ctx once; the filter and validator calls that follow only pass
+    references to them. Scripts of the evaluation share those objects, like
+    the items of one batch already share their ctx; they are frozen, so no
+    script can change what a later one reads.
+    """
+    token = _value_scope.set(object())
+    try:
+        yield
+    finally:
+        _value_scope.reset(token)
+        _js_pool.release_values()
+
+
+class JSPoolStats(TypedDict):
+    """Counters for the QuickJS context pool.
+
+    Attributes:
+        contexts_created: Contexts created since startup
+        contexts_retired: Contexts dropped after reaching a lifetime bound
+        compiles: Scripts compiled into a context
+        hits: Calls served by an already compiled function
+        values_loaded: Event data and contexts converted into a context
+        values_reused: Arguments passed as an already loaded value
+    """
+
+    contexts_created: int
+    contexts_retired: int
+    compiles: int
+    hits: int
+    values_loaded: int
+    values_reused: int
+
+
+def build_function_source(script: str, param_names: list[str]) -> str:
+    """Wrap a filter/validator script into an anonymous JS function expression.
+
+    Scripts containing 'return' are treated as function bodies. This handles
+    cases where SDK serialization didn't strip 'return' (e.g., with comments).
+    Anything else is treated as an expression and wrapped with return.
+    """
+    body = script if "return" in script else f"return {script};"
+    return f"(function evaluateExpr({', '.join(param_names)}) {{\n{body}\n}})"
+
+
+def build_batch_function_source(script: str) -> str:
+    """Wrap a script into a JS function that maps it over an array of data.
+
+    Each item is evaluated independently; an item that throws yields
+    ``{BATCH_ERROR_KEY: message}`` instead of aborting the whole batch.
+    """
+    fn = build_function_source(script, ["data", "ctx"])
+    return (
+        "(function evaluateMany(items, ctx) {\n"
+        f"const evaluateExpr = {fn};\n"
+        "return items.map(function (data) {\n"
+        "try { return evaluateExpr(data, ctx); }\n"
+        f"catch (e) {{ return {{ {BATCH_ERROR_KEY}: String(e) }}; }}\n"
+        "});\n"
+        "})"
+    )
+
+
+def budget_breach(error: Exception) -> BudgetKind | None:
+    """Budget a QuickJS error reports running out of, if any."""
+    message = str(error).strip()
+    if message.startswith("InternalError: interrupted"):
+        return "time"
+    # Out of memory errors are thrown as null when even the error object
+    # can't be allocated
+    if message == "null" or message.startswith("InternalError: out of memory"):
+        return "memory"
+    return None
+
+
+class _ValueCache:
+    """Event data and contexts loaded into a QuickJS context.
+
+    Containers are remembered by identity, contexts built by
+    ``build_upstream_ctx`` by their dependencies, for the duration of one
+    ``js_value_scope``. New values are queued and sent to the context in
+    one JSON document before the call.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.scope: object | None = None
+        self.slots: dict[Hashable, int] = {}
+        # Keeps remembered objects alive, so their ids can't be reused
+        self.refs: list[Any] = []
+        self.bytes = 0
+        self.reset = True
+        self.fresh_values: list[tuple[int, Any]] = []
+        self.fresh_ctxs: list[tuple[int, list[tuple[str, str, int]], bool]] = []
+        self.loaded = 0
+        self.reused = 0
+
+    def begin(self, scope: object) -> None:
+        """Start a call, forgetting values of another scope."""
+        if scope is not self.scope or self.bytes > self.max_bytes:
+            self.clear()
+            self.scope = scope
+
+    def clear(self) -> None:
+        """Forget all values (the context drops them on the next load)."""
+        self.slots.clear()
+        self.refs.clear()
+        self.fresh_values.clear()
+        self.fresh_ctxs.clear()
+        self.bytes = 0
+        self.reset = True
+        self.scope = None
+
+    def encode(self, value: Any) -> list[Any]:
+        """Argument spec of a value, queuing containers not loaded yet."""
+        if not isinstance(value, (dict, list)):
+            return [1, value]
+        return [0, self._slot(value)]
+
+    def encode_ctx(self, ctx: Any) -> list[Any]:
+        """Argument spec of a node's ctx.
+
+        A ctx of the shape built by ``build_upstream_ctx`` is assembled in
+        the context from its dependencies' data, so the filter and the
+        validator of a node share it even though each builds its own dict.
+        """
+        deps = ctx.get("deps") if isinstance(ctx, dict) else None
+        if not isinstance(deps, list) or not set(ctx) <= {"deps", "data"}:
+            return self.encode(ctx)
+
+        single = "data" in ctx
+        if single and (len(deps) != 1 or ctx["data"] is not deps[0].get("data")):
+            return self.encode(ctx)
+
+        refs: list[tuple[str, str, int]] = []
+        for dep in deps:
+            if (
+                not isinstance(dep, dict)
+                or dep.keys() != {"flow", "id", "data"}
+                or not isinstance(dep["data"], (dict, list))
+            ):
+                return self.encode(ctx)
+            refs.append((dep["flow"], dep["id"], self._slot(dep["data"])))
+
+        key = ("ctx", tuple(refs), single)
+        slot = self.slots.get(key)
+        if slot is None:
+            slot = self.slots[key] = len(self.slots)
+            self.fresh_ctxs.append((slot, refs, single))
+            self.loaded += 1
+        else:
+            self.reused += 1
+        return [0, slot]
+
+    def _slot(self, value: Any) -> int:
+        slot = self.slots.get(id(value))
+        if slot is None:
+            slot = self.slots[id(value)] = len(self.slots)
+            self.refs.append(value)
+            self.fresh_values.append((slot, value))
+            self.loaded += 1
+        else:
+            self.reused += 1
+        return slot
+
+    def take_load(self, args: list[Any]) -> str:
+        """JSON document loading the queued values and a call's arguments."""
+        text = json.dumps(
+            {
+                "reset": self.reset,
+                "values": self.fresh_values,
+                "ctxs": self.fresh_ctxs,
+                "args": args,
+            }
+        )
+        self.bytes += len(text)
+        self.reset = False
+        self.fresh_values.clear()
+        self.fresh_ctxs.clear()
+        return text
+
+
+class _PooledContext:
+    """A long-lived QuickJS context with its compiled functions."""
+
+    def __init__(self, memory_limit_bytes: int) -> None:
+        self.context = Context()
+        self.memory_limit_bytes = memory_limit_bytes
+        if memory_limit_bytes > 0:
+            self.context.set_memory_limit(memory_limit_bytes)
+        self.functions: dict[tuple[str, ...], Any] = {}
+        self.created_at = time.monotonic()
+        self.calls = 0
+
+        self.context.eval(_VALUES_RUNTIME)
+        self.context.eval(_ARG_SLOTS)
+        self.load = self.context.get("__buLoad")
+        self.freeze = self.context.get("__buFreeze")
+        self.context.eval(_HARDEN)
+        self.values = _ValueCache(
+            memory_limit_bytes // 16
+            if memory_limit_bytes > 0
+            else VALUE_CACHE_MAX_BYTES
+        )
+
+    def limit_memory(self, budget_bytes: int) -> None:
+        """Let the next call allocate at most ``budget_bytes`` more."""
+        limit = self.context.memory()["malloc_size"] + budget_bytes
+        if self.memory_limit_bytes > 0:
+            limit = min(limit, self.memory_limit_bytes)
+        self.context.set_memory_limit(limit)
+
+    def reset_limits(self) -> None:
+        """Restore the context's own limits after a limited call."""
+        self.context.set_time_limit(-1)
+        self.context.set_memory_limit(
+            self.memory_limit_bytes if self.memory_limit_bytes > 0 else -1
+        )
+
+
+class JSContextPool:
+    """Pool of long-lived QuickJS contexts holding compiled functions.
+
+    A QuickJS runtime must only ever be used from the thread that created it,
+    so the pool keeps one context per evaluating thread. Each context caches
+    the compiled function for every script it has seen, runs under a memory
+    limit, and is recycled once it exceeds its maximum age, call count or
+    number of compiled functions. Contexts are shared by every flow, so
+    their globals and intrinsics are frozen (see ``_HARDEN``).
+    """
+
+    def __init__(
+        self,
+        max_age_seconds: float = 300.0,
+        max_calls: int = 100_000,
+        memory_limit_bytes: int = 64 * 1024 * 1024,
+        max_functions: int = MAX_FUNCTIONS_PER_CONTEXT,
+    ) -> None:
+        self.max_age_seconds = max_age_seconds
+        self.max_calls = max_calls
+        self.memory_limit_bytes = memory_limit_bytes
+        self.max_functions = max_functions
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.contexts_created = 0
+        self.contexts_retired = 0
+        self.compiles = 0
+        self.hits = 0
+        self.values_loaded = 0
+        self.values_reused = 0
+
+    def _expired(self, entry: _PooledContext) -> bool:
+        return (
+            entry.calls >= self.max_calls
+            or len(entry.functions) >= self.max_functions
+            or time.monotonic() - entry.created_at >= self.max_age_seconds
+        )
+
+    def _acquire(self) -> _PooledContext:
+        entry: _PooledContext | None = getattr(self._local, "entry", None)
+
+        if entry is not None and self._expired(entry):
+            with self._lock:
+                self.contexts_retired += 1
+            entry = None
+
+        if entry is None:
+            entry = _PooledContext(self.memory_limit_bytes)
+            self._local.entry = entry
+            with self._lock:
+                self.contexts_created += 1
+
+        return entry
+
+    def call(
+        self,
+        script: str,
+        variables: dict[str, Any],
+        limits: ExprLimits | None = None,
+    ) -> Any:
+        """Run a script with the given variables and return the result.
+
+        Raises:
+            ExprBudgetExceeded: If the call ran over its limits
+            Exception: If compilation or evaluation fails (caller should handle)
+        """
+        param_names = list(variables.keys())
+        return self._run(
+            ("call", script, *param_names),
+            lambda: build_function_source(script, param_names),
+            list(variables.values()),
+            lambda values: [
+                values.encode_ctx(value) if name == "ctx" else values.encode(value)
+                for name, value in variables.items()
+            ],
+            limits,
+        )
+
+    def call_many(
+        self,
+        script: str,
+        items: list[dict[str, Any]],
+        ctx: dict[str, Any],
+        limits: ExprLimits | None = None,
+    ) -> list[Any]:
+        """Run a script once per item in a single QuickJS call.
+
+        Items that throw are returned as ``{BATCH_ERROR_KEY: message}``.
+
+        Raises:
+            ExprBudgetExceeded: If the call ran over its limits
+            Exception: If compilation or the batch call itself fails
+        """
+        results: list[Any] = self._run(
+            ("many", script),
+            lambda: build_batch_function_source(script),
+            [items, ctx],
+            lambda values: [
+                [2, [values.encode(data) for data in items]],
+                values.encode_ctx(ctx),
+            ],
+            limits,
+            len(items),
+        )
+        return results
+
+    def _run(
+        self,
+        key: tuple[str, ...],
+        build_source: Callable[[], str],
+        values: list[Any],
+        encode_args: Callable[[_ValueCache], list[Any]],
+        limits: ExprLimits | None = None,
+        items: int = 1,
+    ) -> Any:
+        entry = self._acquire()
+
+        fn = entry.functions.get(key)
+        if fn is None:
+            fn = entry.context.eval(build_source())
+            entry.functions[key] = fn
+            with self._lock:
+                self.compiles += 1
+        else:
+            with self._lock:
+                self.hits += 1
+
+        scope = _value_scope.get()
+        if scope is None or len(values) > MAX_LOADED_ARGS:
+            # Primitives cross as-is; complex objects are passed through JSON
+            args = [
+                value
+                if isinstance(value, (type(None), str, bool, float, int))
+                else entry.freeze(entry.context.parse_json(json.dumps(value)))
+                for value in values
+            ]
+        else:
+            args = self._load_args(entry, scope, encode_args)
+
+        timeout: int | None = None
+        kind: BudgetKind = "time"
+        if limits is not None:
+            timeout, kind = limits.timeout_ns(items)
+            if timeout is not None:
+                entry.context.set_time_limit(timeout / 1e9)
+            if limits.memory_bytes > 0:
+                entry.limit_memory(limits.memory_bytes)
+
+        entry.calls += 1
+        try:
+            result = fn(*args)
+        except JSException as e:
+            if limits is not None:
+                breach = budget_breach(e)
+                if breach == "time" and timeout is not None:
+                    raise limits.exceeded(kind) from None
+                if breach == "memory" and limits.memory_bytes > 0:
+                    raise limits.exceeded("memory") from None
+            raise
+        finally:
+            if limits is not None:
+                entry.reset_limits()
+            if entry.calls % GC_INTERVAL_CALLS == 0:
+                entry.context.gc()
+
+        if isinstance(result, Object):
+            result = json.loads(result.json())
+
+        return result
+
+    def _load_args(
+        self,
+        entry: _PooledContext,
+        scope: object,
+        encode_args: Callable[[_ValueCache], list[Any]],
+    ) -> list[Any]:
+        """Arguments of a call as references to values loaded in the context,
+        loading the ones it hasn't seen yet in this scope."""
+        cache = entry.values
+        cache.begin(scope)
+        try:
+            specs = encode_args(cache)
+            entry.load(cache.take_load(specs))
+            return [entry.context.get(f"__buArg{i}") for i in range(len(specs))]
+        except Exception:
+            cache.clear()
+            raise
+        finally:
+            with self._lock:
+                self.values_loaded += cache.loaded
+                self.values_reused += cache.reused
+            cache.loaded = cache.reused = 0
+
+    def stats(self) -> JSPoolStats:
+        """Return a snapshot of the pool counters."""
+        with self._lock:
+            return JSPoolStats(
+                contexts_created=self.contexts_created,
+                contexts_retired=self.contexts_retired,
+                compiles=self.compiles,
+                hits=self.hits,
+                values_loaded=self.values_loaded,
+                values_reused=self.values_reused,
+            )
+
+    def release_values(self) -> None:
+        """Forget the values loaded in this thread's context."""
+        entry: _PooledContext | None = getattr(self._local, "entry", None)
+        if entry is not None:
+            entry.values.clear()
+
+
+_js_pool = JSContextPool(
+    max_age_seconds=JS_CONTEXT_MAX_AGE_SECONDS,
+    max_calls=JS_CONTEXT_MAX_CALLS,
+    memory_limit_bytes=JS_CONTEXT_MEMORY_LIMIT_MB * 1024 * 1024,
+)
+
+
+def get_js_pool() -> JSContextPool:
+    """Return the process-wide QuickJS context pool."""
+    return _js_pool
+
 
 class JSEvaluator:
     """JavaScript expression evaluator using QuickJS.
@@ -21,7 +587,15 @@ class JSEvaluator:
     Never raises exceptions - all errors are caught and logged.
     """
 
-    def eval_expr(self, script: str, variables: dict[str, Any]) -> Any:
+    def __init__(self, pool: JSContextPool | None = None) -> None:
+        self.pool = pool or _js_pool
+
+    def eval_expr(
+        self,
+        script: str,
+        variables: dict[str, Any],
+        limits: ExprLimits | None = None,
+    ) -> Any:
         """Evaluate a JavaScript expression and return the result (any type).
 
         This is a lower-level method that returns the raw result without
@@ -30,11 +604,13 @@ class JSEvaluator:
         Args:
             script: JavaScript expression to evaluate
             variables: Variables available in the expression (e.g., {"data": {...}, "ctx": {...}})
+            limits: Execution limits of the call (None = unlimited)
 
         Returns:
             Any: Result of evaluation (can be any type)
 
         Raises:
+            ExprBudgetExceeded: If the call ran over its limits
             Exception: If evaluation fails (caller should handle)
 
         Example:
@@ -42,45 +618,29 @@ class JSEvaluator:
             >>> evaluator.eval_expr("data.payment_id", {"data": {"payment_id": "pmt_123"}})
             "pmt_123"
         """
-        # Build function parameters from variables
-        param_names = list(variables.keys())
-        param_values = [variables[name] for name in param_names]
-
-        # Check if script contains 'return' keyword (indicates it's a function body)
-        # This handles cases where SDK serialization didn't strip 'return' (e.g., with comments)
-        if "return" in script:
-            # Treat as function body - use script as-is
-            function_code = f"""
-            function evaluateExpr({", ".join(param_names)}) {{
-                {script}
-            }}
-            """
-        else:
-            # Treat as expression - wrap with return
-            function_code = f"""
-            function evaluateExpr({", ".join(param_names)}) {{
-                return {script};
-            }}
-            """
-
-        # Create QuickJS function
-        fn = Function("evaluateExpr", function_code)
-
-        # Execute function with parameters
-        result = fn(*param_values)
-        return result
+        return self.pool.call(script, variables, limits)
 
-    def evaluate(self, expr: Expr, data: dict[str, Any], ctx: dict[str, Any]) -> bool:
+    def evaluate(
+        self,
+        expr: Expr,
+        data: dict[str, Any],
+        ctx: dict[str, Any],
+        limits: ExprLimits | None = None,
+    ) -> bool:
         """Evaluate a JavaScript expression against data and context.
 
         Args:
             expr: Expression to evaluate (must have engine="js")
             data: Target data (current event data)
             ctx: Context data (typically {"deps": [...], "data": {...}})
+            limits: Execution limits of the call (None = unlimited)
 
         Returns:
             bool: Result of evaluation, False if error or non-JS engine
 
+        Raises:
+            ExprBudgetExceeded: If the call ran over its limits
+
         Example:
             >>> evaluator = JSEvaluator()
             >>> expr = Expr(engine="js", script="data.amount > 0")
@@ -97,45 +657,129 @@ class JSEvaluator:
 
         try:
             # Use eval_expr for the actual evaluation
-            result = self.eval_expr(expr.script, {"data": data, "ctx": ctx})
+            result = self.eval_expr(expr.script, {"data": data, "ctx": ctx}, limits)
+        except ExprBudgetExceeded:
+            raise
+        except Exception as e:
+            self._log_failure(expr, e, data, ctx)
+            return False
 
-            # Ensure result is boolean
-            if not isinstance(result, bool):
-                logger.error(
-                    f"Expression '{expr.script}' returned non-boolean: {type(result).__name__}"
-                )
-                return False
+        return self._ensure_bool(expr, result)
 
-            return result
+    def evaluate_many(
+        self,
+        expr: Expr,
+        items: list[dict[str, Any]],
+        ctx: dict[str, Any],
+        limits: ExprLimits | None = None,
+    ) -> list[bool]:
+        """Evaluate a JavaScript expression against many data items sharing a ctx.
 
-        except Exception as e:
-            # Provide helpful error messages for common mistakes
-            error_message = str(e)
+        All items are sent to QuickJS as one JSON array and the script is
+        mapped over them in a single call, so the Python/JS bridge is crossed
+        once per node instead of once per event.
 
-            # Check for common context access mistakes
-            if "ctx" in expr.script and (
-                "deps" in error_message or "data" in error_message
-            ):
-                num_deps = len(ctx.get("deps", []))
-                logger.error(
-                    f"Failed to evaluate expression '{expr.script}': {e}\n"
-                    f"Hint: Context structure is ctx.deps, not ctx.data.\n"
-                    f"  - Available context keys: {list(ctx.keys())}\n"
-                    f"  - Number of dependencies: {num_deps}\n"
-                    f"  - For single dependency: Use ctx.data.field (auto-populated)\n"
-                    f"  - For multiple dependencies: Use ctx.deps[i].data.field\n"
-                    f"  - Structure: ctx.deps = [{{flow: str, id: str, data: dict}}, ...]"
-                )
-            elif "data" in expr.script:
-                logger.error(
-                    f"Failed to evaluate expression '{expr.script}': {e}\n"
-                    f"Available data keys: {list(data.keys()) if isinstance(data, dict) else 'N/A'}\n"
-                    f"Available context keys: {list(ctx.keys())}"
-                )
+        Args:
+            expr: Expression to evaluate (must have engine="js")
+            items: Target data for each candidate event
+            ctx: Context data shared by all items
+            limits: Execution limits of each item (None = unlimited)
+
+        Returns:
+            list[bool]: One result per item, False for items that errored
+
+        Raises:
+            ExprBudgetExceeded: If the call ran over its limits
+
+        Example:
+            >>> evaluator = JSEvaluator()
+            >>> expr = Expr(engine="js", script="data.amount > 0")
+            >>> evaluator.evaluate_many(expr, [{"amount": 1}, {"amount": 0}], {})
+            [True, False]
+        """
+        if expr.engine != "js":
+            logger.error(
+                f"Unsupported expression engine: {expr.engine}. "
+                f"JSEvaluator only supports 'js'."
+            )
+            return [False] * len(items)
+
+        if not items:
+            return []
+
+        try:
+            raw_results = self.pool.call_many(expr.script, items, ctx, limits)
+        except ExprBudgetExceeded:
+            raise
+        except Exception:
+            # e.g. syntax error or a limit hit by the whole batch: evaluate
+            # items one by one so each failure is reported individually
+            return [self.evaluate(expr, data, ctx, limits) for data in items]
+
+        results: list[bool] = []
+        for data, result in zip(items, raw_results, strict=True):
+            if isinstance(result, dict) and BATCH_ERROR_KEY in result:
+                error = JSException(result[BATCH_ERROR_KEY])
+                # Out of memory errors are caught per item by the batch
+                if (
+                    limits is not None
+                    and limits.memory_bytes > 0
+                    and budget_breach(error) == "memory"
+                ):
+                    raise limits.exceeded("memory")
+                self._log_failure(expr, error, data, ctx)
+                results.append(False)
             else:
-                logger.error(
-                    f"Failed to evaluate JavaScript expression '{expr.script}': {e}\n"
-                    f"Hint: Available variables are 'data' (event data) and 'ctx' (context with dependencies)",
-                    exc_info=True,
-                )
+                results.append(self._ensure_bool(expr, result))
+
+        return results
+
+    def _ensure_bool(self, expr: Expr, result: Any) -> bool:
+        """Return the result if boolean, otherwise log and return False."""
+        if not isinstance(result, bool):
+            record_expression_error()
+            logger.error(
+                f"Expression '{expr.script}' returned non-boolean: {type(result).__name__}"
+            )
             return False
+
+        return result
+
+    def _log_failure(
+        self,
+        expr: Expr,
+        e: Exception,
+        data: dict[str, Any],
+        ctx: dict[str, Any],
+    ) -> None:
+        """Log an evaluation error with hints for common mistakes."""
+        record_expression_error()
+
+        error_message = str(e)
+
+        # Check for common context access mistakes
+        if "ctx" in expr.script and (
+            "deps" in error_message or "data" in error_message
+        ):
+            num_deps = len(ctx.get("deps", []))
+            logger.error(
+                f"Failed to evaluate expression '{expr.script}': {e}\n"
+                f"Hint: Context structure is ctx.deps, not ctx.data.\n"
+                f"  - Available context keys: {list(ctx.keys())}\n"
+                f"  - Number of dependencies: {num_deps}\n"
+                f"  - For single dependency: Use ctx.data.field (auto-populated)\n"
+                f"  - For multiple dependencies: Use ctx.deps[i].data.field\n"
+                f"  - Structure: ctx.deps = [{{flow: str, id: str, data: dict}}, ...]"
+            )
+        elif "data" in expr.script:
+            logger.error(
+                f"Failed to evaluate expression '{expr.script}': {e}\n"
+                f"Available data keys: {list(data.keys()) if isinstance(data, dict) else 'N/A'}\n"
+                f"Available context keys: {list(ctx.keys())}"
+            )
+        else:
+            logger.error(
+                f"Failed to evaluate JavaScript expression '{expr.script}': {e}\n"
+                f"Hint: Available variables are 'data' (event data) and 'ctx' (context with dependencies)",
+                exc_info=e,
+            )
@@ -0,0 +1,537 @@
+"""Native fast path for simple filter/validator expressions.
+
+Most scripts are simple predicates such as ``data['amount'] > 0`` or
+``ctx.data.status === 'approved'``. Those are compiled into plain Python
+closures instead of going through ``eval()`` or QuickJS. Supported subset,
+for both engines:
+
+- the ``data`` and ``ctx`` variables and constants (numbers, strings,
+  booleans, null/None, undefined; Python tuples/lists/sets of constants)
+- field access with constant or computed keys (``data['a'][0]``,
+  ``data.a[0]``) and JS ``.length``
+- comparisons (Python chains, ``in``, ``not in``, ``is``; JS ``===``,
+  ``!==``, ``==``, ``!=``, ``<``, ``<=``, ``>``, ``>=``, ``in``)
+- boolean operators (``and``/``or``/``not``, ``&&``/``||``/``!``) and
+  Python ``len()``
+
+Anything else is not compiled and runs on its engine. A compiled predicate
+must give the engine's result: it raises ``Unsupported`` for any value it
+cannot handle with the engine's exact semantics (e.g. JS loose equality
+between different types), and evaluators fall back to the engine whenever a
+predicate raises or returns a non-boolean, so errors are always reported by
+the engine itself. Event data is assumed to be JSON as stored (string keys,
+finite numbers), which is what the JS engine sees as well.
+"""
+
+import ast
+import functools
+import math
+import operator
+import re
+from collections.abc import Callable
+from typing import Any
+
+from src.config import EXPR_CACHE_SIZE
+from src.models import Expr
+
+# Compiled predicate: (data, ctx) -> raw result
+NativePredicate = Callable[[Any, Any], Any]
+
+
+class Unsupported(Exception):
+    """Raised by a predicate that can't match the engine's semantics."""
+
+
+class _NotCompilable(Exception):
+    """Raised while compiling a script outside the supported subset."""
+
+
+# Scripts outside the subset, or that the engine will report as invalid
+_COMPILE_ERRORS = (_NotCompilable, SyntaxError, ValueError, RecursionError)
+
+_LITERAL_ERRORS = (ValueError, TypeError)
+
+
+@functools.lru_cache(maxsize=EXPR_CACHE_SIZE)
+def _compile(engine: str, script: str) -> NativePredicate | None:
+    try:
+        if engine == "python":
+            return _compile_python(script)
+        if engine == "js":
+            return _compile_js(script)
+    except _COMPILE_ERRORS:
+        pass
+    return None
+
+
+def native_predicate(expr: Expr) -> NativePredicate | None:
+    """Return the compiled predicate of an expression, None if unsupported."""
+    return _compile(expr.engine, expr.script)
+
+
+def _constant(value: Any) -> NativePredicate:
+    return lambda data, ctx: value
+
+
+# --- Python -------------------------------------------------------------------
+
+_PY_COMPARE: dict[type[ast.cmpop], Callable[[Any, Any], Any]] = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.In: lambda a, b: a in b,
+    ast.NotIn: lambda a, b: a not in b,
+    ast.Is: operator.is_,
+    ast.IsNot: operator.is_not,
+}
+
+
+def _compile_python(script: str) -> NativePredicate:
+    return _py_node(ast.parse(script.strip(), mode="eval").body)
+
+
+def _py_constant(node: ast.expr) -> tuple[bool, Any]:
+    if not isinstance(node, (ast.Constant, ast.UnaryOp, ast.Tuple, ast.List, ast.Set)):
+        return False, None
+    try:
+        return True, ast.literal_eval(node)
+    except _LITERAL_ERRORS:
+        return False, None
+
+
+def _py_node(node: ast.expr) -> NativePredicate:
+    is_constant, value = _py_constant(node)
+    if is_constant:
+        return _constant(value)
+
+    if isinstance(node, ast.Name):
+        if node.id == "data":
+            return lambda data, ctx: data
+        if node.id == "ctx":
+            return lambda data, ctx: ctx
+
+    elif isinstance(node, ast.Subscript) and not isinstance(node.slice, ast.Slice):
+        target = _py_node(node.value)
+        key = _py_node(node.slice)
+        return lambda data, ctx: target(data, ctx)[key(data, ctx)]
+
+    elif isinstance(node, ast.Compare):
+        return _py_compare(node)
+
+    elif isinstance(node, ast.BoolOp):
+        return _py_bool_op(node)
+
+    elif isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        operand = _py_node(node.operand)
+        return lambda data, ctx: not operand(data, ctx)
+
+    elif (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id == "len"
+        and len(node.args) == 1
+        and not isinstance(node.args[0], ast.Starred)
+        and not node.keywords
+    ):
+        arg = _py_node(node.args[0])
+        return lambda data, ctx: len(arg(data, ctx))
+
+    raise _NotCompilable(ast.dump(node))
+
+
+def _py_compare(node: ast.Compare) -> NativePredicate:
+    first = _py_node(node.left)
+    chain = [
+        (_PY_COMPARE[type(op)], _py_node(comparator))
+        for op, comparator in zip(node.ops, node.comparators, strict=True)
+    ]
+
+    if len(chain) == 1:
+        op, right = chain[0]
+        return lambda data, ctx: op(first(data, ctx), right(data, ctx))
+
+    def compare_chain(data: Any, ctx: Any) -> Any:
+        left = first(data, ctx)
+        result: Any = True
+        for op, comparator in chain:
+            right = comparator(data, ctx)
+            result = op(left, right)
+            if not result:
+                return result
+            left = right
+        return result
+
+    return compare_chain
+
+
+def _py_bool_op(node: ast.BoolOp) -> NativePredicate:
+    operands = [_py_node(value) for value in node.values]
+    is_and = isinstance(node.op, ast.And)
+
+    def bool_op(data: Any, ctx: Any) -> Any:
+        result: Any = None
+        for operand in operands:
+            result = operand(data, ctx)
+            if bool(result) != is_and:
+                return result
+        return result
+
+    return bool_op
+
+
+# --- JavaScript ---------------------------------------------------------------
+
+
+class _Undefined:
+    """JS ``undefined`` (None stands for ``null``)."""
+
+    def __repr__(self) -> str:
+        return "undefined"
+
+
+UNDEFINED = _Undefined()
+
+# Properties every object inherits: an own-property lookup can't tell them apart
+_OBJECT_PROTO_KEYS = frozenset(
+    {
+        "__proto__",
+        "__defineGetter__",
+        "__defineSetter__",
+        "__lookupGetter__",
+        "__lookupSetter__",
+        "constructor",
+        "hasOwnProperty",
+        "isPrototypeOf",
+        "propertyIsEnumerable",
+        "toLocaleString",
+        "toString",
+        "valueOf",
+    }
+)
+
+_JS_TOKEN = re.compile(
+    r"""
+    \s*(?:
+        (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+      | (?P<string>'[^'\\\n]*'|"[^"\\\n]*")
+      | (?P<name>[A-Za-z_$][\w$]*)
+      | (?P<op>===|!==|==|!=|<=|>=|&&|\|\||[<>!.\[\]()\-;])
+    )
+    """,
+    re.VERBOSE,
+)
+
+_JS_LITERALS = {"true": True, "false": False, "null": None, "undefined": UNDEFINED}
+
+
+def _js_type(value: Any) -> str:
+    if value is UNDEFINED:
+        return "undefined"
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, (int, float)):
+        if isinstance(value, float) and not math.isfinite(value):
+            raise Unsupported("non-finite number")
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, (dict, list)):
+        return "object"
+    raise Unsupported(type(value).__name__)
+
+
+def _is_bmp(value: str) -> bool:
+    return all(ord(char) <= 0xFFFF for char in value)
+
+
+def _js_truthy(value: Any) -> bool:
+    kind = _js_type(value)
+    if kind in ("undefined", "null"):
+        return False
+    if kind == "boolean":
+        return bool(value)
+    if kind == "number":
+        number = float(value)
+        return not (number == 0 or number != number)
+    if kind == "string":
+        return len(value) > 0
+    return True
+
+
+def _js_member(target: Any, key: Any) -> Any:
+    kind = _js_type(target)
+    key_kind = _js_type(key)
+
+    if kind == "object" and isinstance(target, dict):
+        if key_kind != "string":
+            raise Unsupported("non-string object key")
+        if key in target:
+            return target[key]
+        if key in _OBJECT_PROTO_KEYS:
+            raise Unsupported("inherited property")
+        return UNDEFINED
+
+    if kind == "object":  # Array
+        if key_kind == "string" and key == "length":
+            return len(target)
+        if key_kind == "number" and float(key).is_integer() and key >= 0:
+            index = int(key)
+            return target[index] if index < len(target) else UNDEFINED
+        raise Unsupported("array property")
+
+    if kind == "string" and key_kind == "string" and key == "length":
+        return len(target.encode("utf-16-le")) // 2
+
+    # Properties of primitives, or a TypeError on null/undefined
+    raise Unsupported(f"property of {kind}")
+
+
+def _js_strict_equals(left: Any, right: Any) -> bool:
+    kind = _js_type(left)
+    if kind != _js_type(right):
+        return False
+    if kind == "number":
+        return float(left) == float(right)
+    if kind == "object":
+        # Identity: objects are copied on their way into the engine
+        raise Unsupported("object identity")
+    if kind in ("undefined", "null"):
+        return True
+    return bool(left == right)
+
+
+def _js_loose_equals(left: Any, right: Any) -> bool:
+    left_kind, right_kind = _js_type(left), _js_type(right)
+    nullish = ("undefined", "null")
+
+    if left_kind == right_kind:
+        return _js_strict_equals(left, right)
+    if left_kind in nullish or right_kind in nullish:
+        return left_kind in nullish and right_kind in nullish
+    raise Unsupported("type coercion")
+
+
+def _js_relational(op: Callable[[Any, Any], bool]) -> Callable[[Any, Any], bool]:
+    def compare(left: Any, right: Any) -> bool:
+        left_kind, right_kind = _js_type(left), _js_type(right)
+        if left_kind == right_kind == "number":
+            return op(float(left), float(right))
+        if left_kind == right_kind == "string" and _is_bmp(left) and _is_bmp(right):
+            return op(left, right)
+        raise Unsupported("type coercion")
+
+    return compare
+
+
+def _js_in(key: Any, target: Any) -> bool:
+    if not isinstance(target, dict) or _js_type(key) != "string":
+        raise Unsupported("in operator")
+    if key in target:
+        return True
+    if key in _OBJECT_PROTO_KEYS:
+        raise Unsupported("inherited property")
+    return False
+
+
+_JS_BINARY: dict[str, Callable[[Any, Any], bool]] = {
+    "===": _js_strict_equals,
+    "!==": lambda left, right: not _js_strict_equals(left, right),
+    "==": _js_loose_equals,
+    "!=": lambda left, right: not _js_loose_equals(left, right),
+    "<": _js_relational(operator.lt),
+    "<=": _js_relational(operator.le),
+    ">": _js_relational(operator.gt),
+    ">=": _js_relational(operator.ge),
+    "in": _js_in,
+}
+
+# Binding power of binary operators (higher binds tighter)
+_JS_PRECEDENCE = {
+    "||": 1,
+    "&&": 2,
+    "===": 3,
+    "!==": 3,
+    "==": 3,
+    "!=": 3,
+    "<": 4,
+    "<=": 4,
+    ">": 4,
+    ">=": 4,
+    "in": 4,
+}
+
+
+def _tokenize_js(script: str) -> list[tuple[str, str]]:
+    tokens: list[tuple[str, str]] = []
+    pos = 0
+    script = script.rstrip()
+
+    while pos < len(script):
+        match = _JS_TOKEN.match(script, pos)
+        if match is None or match.end() == pos:
+            raise _NotCompilable(f"unexpected input at {pos}")
+        kind = match.lastgroup
+        assert kind is not None
+        tokens.append((kind, match.group(kind)))
+        pos = match.end()
+
+    # A single trailing semicolon is allowed (the engine wraps the script
+    # in `return <script>;`)
+    if tokens and tokens[-1] == ("op", ";"):
+        tokens.pop()
+    if any(token == ("op", ";") for token in tokens):
+        raise _NotCompilable("multiple statements")
+
+    return tokens
+
+
+class _JSParser:
+    """Precedence-climbing parser for the supported JS subset."""
+
+    def __init__(self, tokens: list[tuple[str, str]]) -> None:
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self) -> tuple[str, str] | None:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def next(self) -> tuple[str, str]:
+        token = self.peek()
+        if token is None:
+            raise _NotCompilable("unexpected end")
+        self.pos += 1
+        return token
+
+    def expect(self, value: str) -> None:
+        if self.next() != ("op", value):
+            raise _NotCompilable(f"expected {value}")
+
+    def parse(self) -> NativePredicate:
+        predicate = self.binary(1)
+        if self.peek() is not None:
+            raise _NotCompilable("trailing input")
+        return predicate
+
+    def binary_op(self) -> str | None:
+        token = self.peek()
+        if token is None:
+            return None
+        kind, value = token
+        if (kind == "op" or (kind == "name" and value == "in")) and (
+            value in _JS_PRECEDENCE
+        ):
+            return value
+        return None
+
+    def binary(self, min_precedence: int) -> NativePredicate:
+        left = self.unary()
+
+        while True:
+            op = self.binary_op()
+            if op is None or _JS_PRECEDENCE[op] < min_precedence:
+                return left
+            self.pos += 1
+            right = self.binary(_JS_PRECEDENCE[op] + 1)
+            left = self.combine(op, left, right)
+
+    @staticmethod
+    def combine(
+        op: str, left: NativePredicate, right: NativePredicate
+    ) -> NativePredicate:
+        if op == "&&":
+
+            def logical_and(data: Any, ctx: Any) -> Any:
+                value = left(data, ctx)
+                return right(data, ctx) if _js_truthy(value) else value
+
+            return logical_and
+
+        if op == "||":
+
+            def logical_or(data: Any, ctx: Any) -> Any:
+                value = left(data, ctx)
+                return value if _js_truthy(value) else right(data, ctx)
+
+            return logical_or
+
+        compare = _JS_BINARY[op]
+        return lambda data, ctx: compare(left(data, ctx), right(data, ctx))
+
+    def unary(self) -> NativePredicate:
+        token = self.peek()
+
+        if token == ("op", "!"):
+            self.pos += 1
+            operand = self.unary()
+            return lambda data, ctx: not _js_truthy(operand(data, ctx))
+
+        if token == ("op", "-"):
+            self.pos += 1
+            kind, value = self.next()
+            if kind != "number":
+                raise _NotCompilable("unary minus")
+            return _constant(-float(value))
+
+        return self.member()
+
+    def member(self) -> NativePredicate:
+        target = self.primary()
+
+        while True:
+            token = self.peek()
+            if token == ("op", "."):
+                self.pos += 1
+                kind, name = self.next()
+                if kind != "name":
+                    raise _NotCompilable("expected property name")
+                target = self.property(target, _constant(name))
+            elif token == ("op", "["):
+                self.pos += 1
+                key = self.binary(1)
+                self.expect("]")
+                target = self.property(target, key)
+            else:
+                return target
+
+    @staticmethod
+    def property(target: NativePredicate, key: NativePredicate) -> NativePredicate:
+        return lambda data, ctx: _js_member(target(data, ctx), key(data, ctx))
+
+    def primary(self) -> NativePredicate:
+        kind, value = self.next()
+
+        if kind == "number":
+            # Sloppy-mode JS reads 010 as octal
+            if len(value) > 1 and value[0] == "0" and value[1].isdigit():
+                raise _NotCompilable("legacy octal literal")
+            return _constant(float(value))
+
+        if kind == "string":
+            return _constant(value[1:-1])
+
+        if kind == "name":
+            if value == "data":
+                return lambda data, ctx: data
+            if value == "ctx":
+                return lambda data, ctx: ctx
+            if value in _JS_LITERALS:
+                return _constant(_JS_LITERALS[value])
+
+        if (kind, value) == ("op", "("):
+            inner = self.binary(1)
+            self.expect(")")
+            return inner
+
+        raise _NotCompilable(f"unsupported token {value!r}")
+
+
+def _compile_js(script: str) -> NativePredicate:
+    # Scripts containing 'return' are function bodies for the engine
+    if "return" in script:
+        raise _NotCompilable("function body")
+    return _JSParser(_tokenize_js(script)).parse()
@@ -0,0 +1,198 @@
+"""Per-expression profiling.
+
+When enabled, MultiEvaluator records every filter/validator call per
+(flow, node_id, script hash, engine that handled it): number of calls and evaluated items,
+errors, and total / p50 / p99 latency. Expressions are attributed to their
+node through ``Expr.origin``, set on the expressions of compiled flow plans
+(expressions evaluated outside a plan are reported with an empty flow and
+node_id).
+
+Profiles live in the process that evaluates: with the "process" evaluation
+executor, they are collected in the pool workers and not visible to the
+server process.
+"""
+
+import hashlib
+import threading
+from collections import deque
+from typing import TypedDict
+
+from src.config import EXPR_PROFILING
+from src.models import Expr
+
+# Latency percentiles are computed over the most recent calls
+SAMPLES_PER_EXPRESSION = 1000
+
+ProfileKey = tuple[str, str, str, str]  # (flow, node_id, script_hash, engine)
+
+_local = threading.local()
+
+
+def record_expression_error() -> None:
+    """Count an expression error in the current thread.
+
+    Called by the evaluators wherever they swallow an error, so the
+    profiler can attribute errors to the call that caused them.
+    """
+    _local.errors = getattr(_local, "errors", 0) + 1
+
+
+def expression_error_count() -> int:
+    """Number of expression errors counted in the current thread so far."""
+    return int(getattr(_local, "errors", 0))
+
+
+def script_hash(script: str) -> str:
+    """Short stable identifier of a script."""
+    return hashlib.sha256(script.encode("utf-8")).hexdigest()[:12]
+
+
+class ExpressionProfile(TypedDict):
+    """Profile of one expression.
+
+    Attributes:
+        flow: Flow the expression belongs to
+        node_id: Node the expression belongs to
+        script_hash: Short hash of the script
+        engine: Engine that handled the calls (``<engine>-native`` for
+            native predicates)
+        script: The script itself
+        calls: Evaluator calls (a batched call evaluates many items)
+        items: Items (events) evaluated
+        errors: Items whose evaluation errored
+        total_ms: Total time spent in the expression
+        p50_ms: Median latency per call
+        p99_ms: 99th percentile latency per call
+        max_ms: Slowest call
+    """
+
+    flow: str
+    node_id: str
+    script_hash: str
+    engine: str
+    script: str
+    calls: int
+    items: int
+    errors: int
+    total_ms: float
+    p50_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+class _ExpressionStats:
+    __slots__ = ("script", "calls", "items", "errors", "total_ns", "max_ns", "samples")
+
+    def __init__(self, script: str) -> None:
+        self.script = script
+        self.calls = 0
+        self.items = 0
+        self.errors = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.samples: deque[int] = deque(maxlen=SAMPLES_PER_EXPRESSION)
+
+
+def _percentile(sorted_samples: list[int], fraction: float) -> int:
+    if not sorted_samples:
+        return 0
+    index = min(len(sorted_samples) - 1, int(fraction * len(sorted_samples)))
+    return sorted_samples[index]
+
+
+class ExprProfiler:
+    """Thread-safe collector of per-expression call statistics.
+
+    Args:
+        enabled: Whether evaluators should record calls
+    """
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self._stats: dict[ProfileKey, _ExpressionStats] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        expr: Expr,
+        elapsed_ns: int,
+        items: int = 1,
+        errors: int = 0,
+        engine: str | None = None,
+    ) -> None:
+        """Record one evaluator call of an expression.
+
+        Args:
+            expr: Evaluated expression
+            elapsed_ns: Duration of the call
+            items: Items evaluated by the call
+            errors: Items whose evaluation errored
+            engine: Engine that handled the call, if not the expression's
+                own (e.g. "python-native")
+        """
+        flow, node_id = expr.origin or ("", "")
+        key = (flow, node_id, script_hash(expr.script), engine or expr.engine)
+
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = _ExpressionStats(expr.script)
+
+            stats.calls += 1
+            stats.items += items
+            stats.errors += errors
+            stats.total_ns += elapsed_ns
+            stats.max_ns = max(stats.max_ns, elapsed_ns)
+            stats.samples.append(elapsed_ns)
+
+    def report(
+        self,
+        flow: str | None = None,
+        limit: int | None = None,
+    ) -> list[ExpressionProfile]:
+        """Return expression profiles, slowest (by total time) first.
+
+        Args:
+            flow: Only report expressions of this flow
+            limit: Max number of expressions to report
+        """
+        with self._lock:
+            entries = [
+                (key, stats, sorted(stats.samples))
+                for key, stats in self._stats.items()
+                if flow is None or key[0] == flow
+            ]
+
+        profiles = [
+            ExpressionProfile(
+                flow=key[0],
+                node_id=key[1],
+                script_hash=key[2],
+                engine=key[3],
+                script=stats.script,
+                calls=stats.calls,
+                items=stats.items,
+                errors=stats.errors,
+                total_ms=stats.total_ns / 1_000_000,
+                p50_ms=_percentile(samples, 0.5) / 1_000_000,
+                p99_ms=_percentile(samples, 0.99) / 1_000_000,
+                max_ms=stats.max_ns / 1_000_000,
+            )
+            for key, stats, samples in entries
+        ]
+        profiles.sort(key=lambda profile: profile["total_ms"], reverse=True)
+
+        return profiles[:limit] if limit is not None else profiles
+
+    def clear(self) -> None:
+        """Drop all recorded statistics."""
+        with self._lock:
+            self._stats.clear()
+
+
+_expr_profiler = ExprProfiler(enabled=EXPR_PROFILING)
+
+
+def get_expr_profiler() -> ExprProfiler:
+    """Return the process-wide expression profiler."""
+    return _expr_profiler
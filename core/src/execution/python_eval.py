@@ -4,22 +4,156 @@ This module provides a safe Python expression evaluator that can be
 swapped out for other implementations (CEL, JS, etc) at desplega.ai.
 """
 
+import builtins
 import logging
-from typing import Any
-
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from types import CodeType
+from typing import Any, TypedDict
+
+from src.config import EXPR_CACHE_SIZE
+from src.domain.evaluation import ExprBudgetExceeded
+from src.execution.budget import ExprLimits, python_limits
+from src.execution.profiling import record_expression_error
+from src.execution.sandbox import EVAL_GLOBALS, compile_expr, compile_expr_many
+from src.execution.subinterp import (
+    SubinterpreterError,
+    SubinterpreterPool,
+    get_subinterpreter_pool,
+)
 from src.models import Expr
 
 logger = logging.getLogger(__name__)
 
 
+class ExprCacheStats(TypedDict):
+    """Counters for the compiled expression cache.
+
+    Attributes:
+        size: Number of compiled scripts currently cached
+        maxsize: Maximum number of cached scripts
+        hits: Lookups served from the cache
+        misses: Lookups that required compiling the script
+        evictions: Scripts dropped to stay within maxsize
+    """
+
+    size: int
+    maxsize: int
+    hits: int
+    misses: int
+    evictions: int
+
+
+class CompiledExprCache:
+    """Thread-safe LRU cache of compiled Python expressions keyed by script.
+
+    Compiling is the expensive part of ``eval()`` on a string, and the same
+    handful of filter/validator scripts are evaluated for every event of
+    every run, so each script is compiled once and reused.
+    """
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        self._codes: OrderedDict[tuple[str, str], CodeType] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, script: str) -> CodeType:
+        """Return the compiled code for a script, compiling it on a miss.
+
+        Raises:
+            SyntaxError: If the script is not a valid Python expression
+        """
+        return self._get(("eval", script), compile_expr)
+
+    def get_many(self, script: str) -> CodeType:
+        """Return the compiled batch loop for a script (see compile_expr_many).
+
+        Raises:
+            SyntaxError: If the script is not a valid Python expression
+        """
+        return self._get(("many", script), compile_expr_many)
+
+    def _get(
+        self,
+        key: tuple[str, str],
+        compiler: Callable[[str], CodeType],
+    ) -> CodeType:
+        with self._lock:
+            code = self._codes.get(key)
+            if code is not None:
+                self._codes.move_to_end(key)
+                self.hits += 1
+                return code
+
+        # Compile outside the lock; failures are not cached
+        code = compiler(key[1])
+
+        with self._lock:
+            self.misses += 1
+            self._codes[key] = code
+            self._codes.move_to_end(key)
+            while len(self._codes) > self.maxsize:
+                self._codes.popitem(last=False)
+                self.evictions += 1
+
+        return code
+
+    def stats(self) -> ExprCacheStats:
+        """Return a snapshot of the cache counters."""
+        with self._lock:
+            return ExprCacheStats(
+                size=len(self._codes),
+                maxsize=self.maxsize,
+                hits=self.hits,
+                misses=self.misses,
+                evictions=self.evictions,
+            )
+
+    def clear(self) -> None:
+        """Drop all cached code objects and reset the counters."""
+        with self._lock:
+            self._codes.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+
+_expr_cache = CompiledExprCache(maxsize=EXPR_CACHE_SIZE)
+
+
+def get_expr_cache() -> CompiledExprCache:
+    """Return the process-wide compiled expression cache."""
+    return _expr_cache
+
+
 class PythonEvaluator:
     """Python expression evaluator.
 
     Evaluates Python expressions in a restricted environment.
     Never raises exceptions - all errors are caught and logged.
+
+    With a subinterpreter pool, ``evaluate`` and ``evaluate_many`` run in
+    one of its subinterpreters; calls it can't take (data that doesn't
+    marshal, a failed subinterpreter) run in this interpreter.
+
+    Args:
+        pool: Subinterpreter pool (defaults to the process-wide one, if
+            configured)
     """
 
-    def eval_expr(self, script: str, variables: dict[str, Any]) -> Any:
+    def __init__(self, pool: SubinterpreterPool | None = None) -> None:
+        self.pool = pool if pool is not None else get_subinterpreter_pool()
+
+    def eval_expr(
+        self,
+        script: str,
+        variables: dict[str, Any],
+        limits: ExprLimits | None = None,
+    ) -> Any:
         """Evaluate a Python expression and return the result (any type).
 
         This is a lower-level method that returns the raw result without
@@ -28,11 +162,13 @@ class PythonEvaluator:
         Args:
             script: Python expression to evaluate
             variables: Variables available in the expression (e.g., {"data": {...}, "input": {...}})
+            limits: Execution limits of the call (None = unlimited)
 
         Returns:
             Any: Result of evaluation (can be any type)
 
         Raises:
+            ExprBudgetExceeded: If the call ran over its limits
             Exception: If evaluation fails (caller should handle)
 
         Example:
@@ -40,42 +176,35 @@ class PythonEvaluator:
             >>> evaluator.eval_expr("data['payment_id']", {"data": {"payment_id": "pmt_123"}})
             "pmt_123"
         """
-        # Example of allowed built-in imports
-        from random import randint, random
-
-        # Execute expression in restricted environment
-        result = eval(
-            script,
-            {
-                "__builtins__": {
-                    "str": str,
-                    "int": int,
-                    "float": float,
-                    "bool": bool,
-                    "len": len,
-                    "min": min,
-                    "max": max,
-                    "sum": sum,
-                    "randint": randint,
-                    "random": random,
-                }
-            },
-            variables,
-        )
+        code = _expr_cache.get(script)
+
+        # Execute pre-compiled expression in restricted environment
+        with python_limits(limits):
+            result = eval(code, EVAL_GLOBALS, variables)
 
         return result
 
-    def evaluate(self, expr: Expr, data: dict[str, Any], ctx: dict[str, Any]) -> bool:
+    def evaluate(
+        self,
+        expr: Expr,
+        data: dict[str, Any],
+        ctx: dict[str, Any],
+        limits: ExprLimits | None = None,
+    ) -> bool:
         """Evaluate a Python expression against data and context.
 
         Args:
             expr: Expression to evaluate (must have engine="python")
             data: Target data (current event data)
             ctx: Context data (typically {\"data\": upstream_event_data})
+            limits: Execution limits of the call (None = unlimited)
 
         Returns:
             bool: Result of evaluation, False if error or non-Python engine
 
+        Raises:
+            ExprBudgetExceeded: If the call ran over its limits
+
         Example:
             >>> evaluator = PythonEvaluator()
             >>> expr = Expr(engine="python", script="data['amount'] > 0")
@@ -90,20 +219,163 @@ class PythonEvaluator:
             )
             return False
 
+        if self.pool is not None:
+            results = self._evaluate_remote(expr, [data], ctx, limits)
+            if results is not None:
+                return results[0]
+
         try:
             # Use eval_expr for the actual evaluation
-            result = self.eval_expr(expr.script, {"data": data, "ctx": ctx})
+            result = self.eval_expr(expr.script, {"data": data, "ctx": ctx}, limits)
+        except ExprBudgetExceeded:
+            raise
+        except Exception as e:
+            self._log_failure(expr, e, data, ctx)
+            return False
+
+        return self._ensure_bool(expr, result)
+
+    def evaluate_many(
+        self,
+        expr: Expr,
+        items: list[dict[str, Any]],
+        ctx: dict[str, Any],
+        limits: ExprLimits | None = None,
+    ) -> list[bool]:
+        """Evaluate a Python expression against many data items sharing a ctx.
 
-            # Ensure result is boolean
-            if not isinstance(result, bool):
+        The expression is compiled once into a loop over all items, so a node
+        with hundreds of candidate events costs a single call. If an item
+        raises, that item and the ones after it are evaluated one by one so
+        errors are reported exactly like ``evaluate`` would.
+
+        Args:
+            expr: Expression to evaluate (must have engine="python")
+            items: Target data for each candidate event
+            ctx: Context data shared by all items
+            limits: Execution limits of each item (None = unlimited)
+
+        Returns:
+            list[bool]: One result per item, False for items that errored
+
+        Raises:
+            ExprBudgetExceeded: If the call ran over its limits
+
+        Example:
+            >>> evaluator = PythonEvaluator()
+            >>> expr = Expr(engine="python", script="data['amount'] > 0")
+            >>> evaluator.evaluate_many(expr, [{"amount": 1}, {"amount": 0}], {})
+            [True, False]
+        """
+        if expr.engine != "python":
+            logger.error(
+                f"Unsupported expression engine: {expr.engine}. "
+                f"PythonEvaluator only supports 'python'."
+            )
+            return [False] * len(items)
+
+        if not items:
+            return []
+
+        if self.pool is not None:
+            remote = self._evaluate_remote(expr, items, ctx, limits)
+            if remote is not None:
+                return remote
+
+        variables: dict[str, Any] = {"ctx": ctx, "__items": items}
+        try:
+            code = _expr_cache.get_many(expr.script)
+            with python_limits(limits, len(items)):
+                exec(code, EVAL_GLOBALS, variables)
+        except ExprBudgetExceeded:
+            raise
+        except Exception:
+            # Re-evaluated individually below to report the error
+            pass
+
+        raw_results: list[Any] = variables.get("__results", [])
+        results = [self._ensure_bool(expr, result) for result in raw_results]
+        for data in items[len(results) :]:
+            results.append(self.evaluate(expr, data, ctx, limits))
+
+        return results
+
+    def _evaluate_remote(
+        self,
+        expr: Expr,
+        items: list[dict[str, Any]],
+        ctx: dict[str, Any],
+        limits: ExprLimits | None,
+    ) -> list[bool] | None:
+        """Evaluate items in a subinterpreter, or None if it can't.
+
+        Raises:
+            ExprBudgetExceeded: If the call ran over its limits
+        """
+        assert self.pool is not None
+
+        timeout: int | None = None
+        memory_bytes = 0
+        if limits is not None:
+            timeout, kind = limits.timeout_ns(len(items))
+            memory_bytes = limits.memory_bytes
+
+        try:
+            status, outcome = self.pool.run(
+                expr.script, items, ctx, timeout, memory_bytes
+            )
+        except ValueError:
+            # Data or ctx holds values marshal can't serialize
+            return None
+        except SubinterpreterError as e:
+            logger.warning(
+                f"Subinterpreter failed to evaluate '{expr.script}' ({e}), "
+                f"evaluating in-process"
+            )
+            return None
+
+        if status == "budget":
+            assert limits is not None
+            raise limits.exceeded(kind if outcome == "time" else "memory")
+
+        results: list[bool] = []
+        for data, result in zip(items, outcome, strict=True):
+            if isinstance(result, bool):
+                results.append(result)
+            elif isinstance(result, str):
+                record_expression_error()
                 logger.error(
-                    f"Expression '{expr.script}' returned non-boolean: {type(result).__name__}"
+                    f"Expression '{expr.script}' returned non-boolean: {result}"
                 )
-                return False
+                results.append(False)
+            else:
+                self._log_failure(expr, _rebuild_error(*result), data, ctx)
+                results.append(False)
+
+        return results
 
-            return result
+    def _ensure_bool(self, expr: Expr, result: Any) -> bool:
+        """Return the result if boolean, otherwise log and return False."""
+        if not isinstance(result, bool):
+            record_expression_error()
+            logger.error(
+                f"Expression '{expr.script}' returned non-boolean: {type(result).__name__}"
+            )
+            return False
+
+        return result
 
-        except KeyError as e:
+    def _log_failure(
+        self,
+        expr: Expr,
+        e: Exception,
+        data: dict[str, Any],
+        ctx: dict[str, Any],
+    ) -> None:
+        """Log an evaluation error with hints for common mistakes."""
+        record_expression_error()
+
+        if isinstance(e, KeyError):
             # Detect common mistakes with context access
             error_key = str(e).strip("'\"")
 
@@ -125,32 +397,32 @@ class PythonEvaluator:
                     f"Available data keys: {list(data.keys()) if isinstance(data, dict) else 'N/A'}\n"
                     f"Available context keys: {list(ctx.keys())}"
                 )
-            return False
 
-        except NameError as e:
+        elif isinstance(e, NameError):
             logger.error(
                 f"Failed to evaluate expression '{expr.script}': {e}\n"
                 f"Hint: Available variables are 'data' (event data) and 'ctx' (context with dependencies)"
             )
-            return False
 
-        except Exception as e:
+        else:
             logger.error(
                 f"Failed to evaluate Python expression '{expr.script}': {e}",
-                exc_info=True,
+                exc_info=e,
             )
-            return False
-
 
-# Placeholder for future implementations
-class CELEvaluator:
-    """CEL expression evaluator (not implemented)."""
 
-    def evaluate(self, expr: Expr, data: dict[str, Any], ctx: dict[str, Any]) -> bool:
-        logger.error("CEL evaluator not implemented")
-        return False
+def _rebuild_error(type_name: str, message: str) -> Exception:
+    """Rebuild an error reported by a subinterpreter as the builtin type."""
+    error_type = getattr(builtins, type_name, None)
+    if isinstance(error_type, type) and issubclass(error_type, Exception):
+        try:
+            return error_type(message)
+        except Exception:
+            pass
+    return RuntimeError(f"{type_name}: {message}")
 
 
+# Placeholder for future implementations
 class JSEvaluator:
     """JavaScript expression evaluator (not implemented)."""
 
@@ -0,0 +1,245 @@
+"""Subinterpreter workers for Python expressions.
+
+With ``python_subinterpreters`` set, PythonEvaluator runs expressions in a
+pool of subinterpreters instead of the server's interpreter. Each one has
+its own GIL and heap: heavy validators of several flows run in parallel
+across cores inside one server process, and a script can't reach the
+server's state.
+
+A call checks out an idle subinterpreter and runs in the calling thread
+(which releases the server's GIL meanwhile). The script, the items and ctx
+cross the boundary marshalled (``marshal`` handles the JSON types of event
+data natively and compactly); results come back as booleans, type names of
+non-boolean results, or error types and messages.
+
+Subinterpreters can only import extension modules that support them, so
+they load ``sandbox`` (standard library only) by file path rather than
+importing the package. Uses ``concurrent.interpreters`` (Python 3.14+);
+without it, Python expressions run in the server's interpreter.
+"""
+
+import atexit
+import importlib
+import logging
+import marshal
+import queue
+import threading
+from pathlib import Path
+from types import ModuleType
+from typing import Any, TypedDict
+
+from src.config import PYTHON_SUBINTERPRETERS
+from src.execution import sandbox
+
+logger = logging.getLogger(__name__)
+
+# Code run once in each new subinterpreter
+_BOOTSTRAP = """
+import importlib.util
+import sys
+
+import concurrent.interpreters
+
+_spec = importlib.util.spec_from_file_location("_business_use_sandbox", {path!r})
+sandbox = importlib.util.module_from_spec(_spec)
+sys.modules[_spec.name] = sandbox
+_spec.loader.exec_module(sandbox)
+"""
+
+_RUN = "results.put(sandbox.run_payload(payload))"
+
+_SHUTDOWN = "sandbox.get_watchdog().stop()"
+
+
+class SubinterpreterError(RuntimeError):
+    """A subinterpreter failed to run a call (it is discarded)."""
+
+
+def _load_api() -> ModuleType | None:
+    """The ``concurrent.interpreters`` module, if this Python has it."""
+    try:
+        return importlib.import_module("concurrent.interpreters")
+    except ImportError:
+        return None
+
+
+_api = _load_api()
+
+
+def subinterpreters_available() -> bool:
+    """Whether this Python can run expressions in subinterpreters."""
+    return _api is not None
+
+
+class _Worker:
+    """A subinterpreter with the sandbox loaded and a results queue."""
+
+    def __init__(self) -> None:
+        assert _api is not None
+        self.interp = _api.create()
+        self.results = _api.create_queue()
+        self.interp.exec(_BOOTSTRAP.format(path=str(Path(sandbox.__file__))))
+        self.interp.prepare_main(results=self.results)
+
+    def run(self, payload: bytes) -> bytes:
+        self.interp.prepare_main(payload=payload)
+        self.interp.exec(_RUN)
+        outcome: bytes = self.results.get()
+        return outcome
+
+    def close(self) -> None:
+        try:
+            self.interp.exec(_SHUTDOWN)
+        finally:
+            self.interp.close()
+
+
+class SubinterpreterPoolStats(TypedDict):
+    """Counters for the subinterpreter pool.
+
+    Attributes:
+        size: Maximum number of subinterpreters
+        workers: Subinterpreters currently alive
+        calls: Calls run in a subinterpreter
+        errors: Calls whose subinterpreter failed (and was discarded)
+    """
+
+    size: int
+    workers: int
+    calls: int
+    errors: int
+
+
+class SubinterpreterPool:
+    """Pool of subinterpreters evaluating Python expressions.
+
+    Subinterpreters are created on demand, up to ``size``; calls beyond
+    that wait for one to be free.
+
+    Args:
+        size: Maximum number of subinterpreters
+    """
+
+    def __init__(self, size: int) -> None:
+        if _api is None:
+            raise RuntimeError("Subinterpreters are not available in this Python")
+        self.size = size
+        self._idle: queue.Queue[_Worker] = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers = 0
+        self.calls = 0
+        self.errors = 0
+
+    def run(
+        self,
+        script: str,
+        items: list[dict[str, Any]],
+        ctx: dict[str, Any],
+        timeout_ns: int | None = None,
+        memory_bytes: int = 0,
+    ) -> tuple[str, Any]:
+        """Evaluate a script over items in a subinterpreter.
+
+        Returns:
+            The outcome of ``sandbox.run_payload``
+
+        Raises:
+            ValueError: If the items or ctx can't be marshalled
+            SubinterpreterError: If the subinterpreter failed
+        """
+        payload = marshal.dumps((script, items, ctx, timeout_ns, memory_bytes))
+        worker = self._acquire()
+
+        try:
+            outcome = worker.run(payload)
+        except Exception as e:
+            self._discard(worker)
+            raise SubinterpreterError(str(e)) from e
+
+        self._idle.put(worker)
+        with self._lock:
+            self.calls += 1
+
+        result: tuple[str, Any] = marshal.loads(outcome)
+        return result
+
+    def _acquire(self) -> _Worker:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            create = self._workers < self.size
+            if create:
+                self._workers += 1
+
+        if not create:
+            return self._idle.get()
+
+        try:
+            return _Worker()
+        except Exception as e:
+            with self._lock:
+                self._workers -= 1
+            raise SubinterpreterError(str(e)) from e
+
+    def _discard(self, worker: _Worker) -> None:
+        with self._lock:
+            self._workers -= 1
+            self.errors += 1
+        try:
+            worker.close()
+        except Exception:
+            logger.warning("Failed to close a subinterpreter", exc_info=True)
+
+    def stats(self) -> SubinterpreterPoolStats:
+        """Return a snapshot of the pool counters."""
+        with self._lock:
+            return SubinterpreterPoolStats(
+                size=self.size,
+                workers=self._workers,
+                calls=self.calls,
+                errors=self.errors,
+            )
+
+    def close(self) -> None:
+        """Close the idle subinterpreters (new ones are created on demand)."""
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            with self._lock:
+                self._workers -= 1
+            worker.close()
+
+
+_pool: SubinterpreterPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_subinterpreter_pool() -> SubinterpreterPool | None:
+    """Return the process-wide subinterpreter pool.
+
+    None when python_subinterpreters is 0 or subinterpreters are not
+    available (Python expressions then run in the server's interpreter).
+    """
+    global _pool
+
+    if PYTHON_SUBINTERPRETERS <= 0:
+        return None
+
+    with _pool_lock:
+        if _pool is None:
+            if _api is None:
+                logger.warning(
+                    "python_subinterpreters is set but this Python has no "
+                    "subinterpreter support: running Python expressions in "
+                    "the server's interpreter"
+                )
+                return None
+            _pool = SubinterpreterPool(PYTHON_SUBINTERPRETERS)
+            # Subinterpreters must be closed before the runtime finalizes
+            atexit.register(_pool.close)
+        return _pool
@@ -11,8 +11,10 @@ from src.db.async_db import Base
 
 # Import all models to ensure they are registered with SQLModel
 from src.models import (  # noqa: F401
+    EvalDeadline,
     EvalOutput,
     Event,
+    LatestRunState,
     Node,
 )
 
@@ -0,0 +1,32 @@
+"""Add node fingerprint column
+
+Revision ID: 3f7a1d9c6b20
+Revises: 9b4e7c2f1a85
+Create Date: 2026-10-15 17:05:33.204118
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3f7a1d9c6b20"
+down_revision: str | None = "9b4e7c2f1a85"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # Not backfilled: existing nodes get their fingerprint on the next batch
+    op.add_column(
+        "node",
+        sa.Column("fingerprint", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("node") as batch_op:
+        batch_op.drop_column("fingerprint")
@@ -0,0 +1,78 @@
+"""Add run_state table with the latest evaluation of each run
+
+Revision ID: 6d1e8b3a0f47
+Revises: 3f7a1d9c6b20
+Create Date: 2026-10-15 18:22:09.671532
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "6d1e8b3a0f47"
+down_revision: str | None = "3f7a1d9c6b20"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    op.create_table(
+        "run_state",
+        sa.Column("flow", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("run_id", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("last_eval_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("deadline_ns", sa.BIGINT(), nullable=True),
+        sa.Column("last_output_id", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.PrimaryKeyConstraint("flow", "run_id"),
+    )
+    op.create_index(
+        op.f("ix_run_state_last_eval_at"),
+        "run_state",
+        ["last_eval_at"],
+        unique=False,
+    )
+    op.create_index(
+        "idx_run_state_status_last_eval_at",
+        "run_state",
+        ["status", "last_eval_at"],
+        unique=False,
+    )
+
+    # Backfill from the latest evaluation of each run
+    if bind.dialect.name == "postgresql":
+        status = "output->>'status'"
+        deadline_ns = "(output->>'deadline_ns')::bigint"
+    else:
+        status = "json_extract(output, '$.status')"
+        deadline_ns = "json_extract(output, '$.deadline_ns')"
+
+    op.execute(
+        f"""
+        INSERT INTO run_state (
+            flow, run_id, status, last_eval_at, deadline_ns, last_output_id
+        )
+        SELECT flow, run_id, {status}, COALESCE(updated_at, created_at),
+            {deadline_ns}, id
+        FROM (
+            SELECT evaloutput.*, ROW_NUMBER() OVER (
+                PARTITION BY flow, run_id ORDER BY created_at DESC, id DESC
+            ) AS rank
+            FROM evaloutput
+            WHERE run_id IS NOT NULL
+        ) AS latest
+        WHERE rank = 1
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_run_state_status_last_eval_at", table_name="run_state")
+    op.drop_index(op.f("ix_run_state_last_eval_at"), table_name="run_state")
+    op.drop_table("run_state")
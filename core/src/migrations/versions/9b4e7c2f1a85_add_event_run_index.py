@@ -0,0 +1,31 @@
+"""Add (run_id, flow, ts) event index
+
+Revision ID: 9b4e7c2f1a85
+Revises: 5c2e9a7d41b3
+Create Date: 2026-10-15 15:40:12.511870
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9b4e7c2f1a85"
+down_revision: str | None = "5c2e9a7d41b3"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+RUN_INDEX = "idx_event_run_id_flow_ts"
+RUN_KEY = ["run_id", "flow", "ts", "id"]
+
+
+def upgrade() -> None:
+    # Replaces ix_event_run_id (its first column)
+    op.create_index(RUN_INDEX, "event", RUN_KEY, unique=False)
+    op.drop_index(op.f("ix_event_run_id"), table_name="event")
+
+
+def downgrade() -> None:
+    op.create_index(op.f("ix_event_run_id"), "event", ["run_id"], unique=False)
+    op.drop_index(RUN_INDEX, table_name="event")
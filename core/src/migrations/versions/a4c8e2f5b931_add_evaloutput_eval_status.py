@@ -0,0 +1,67 @@
+"""Add evaloutput eval_status column and unsettled status partial indexes
+
+Revision ID: a4c8e2f5b931
+Revises: 6d1e8b3a0f47
+Create Date: 2026-10-15 19:03:47.118296
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a4c8e2f5b931"
+down_revision: str | None = "6d1e8b3a0f47"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# Statuses of runs that can still change without new events (as in
+# src.models.UNSETTLED_EVAL_STATUSES at the time of this migration)
+UNSETTLED = "('running', 'failed')"
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    op.add_column("evaloutput", sa.Column("eval_status", sa.String(), nullable=True))
+
+    if bind.dialect.name == "postgresql":
+        status = "output->>'status'"
+    else:
+        status = "json_extract(output, '$.status')"
+    op.execute(f"UPDATE evaloutput SET eval_status = {status}")
+
+    op.create_index(
+        "idx_evaloutput_eval_status_created_at",
+        "evaloutput",
+        ["eval_status", "created_at"],
+        unique=False,
+        sqlite_where=sa.text(f"eval_status IN {UNSETTLED}"),
+        postgresql_where=sa.text(f"eval_status IN {UNSETTLED}"),
+    )
+
+    op.drop_index("idx_run_state_status_last_eval_at", table_name="run_state")
+    op.create_index(
+        "idx_run_state_status_last_eval_at",
+        "run_state",
+        ["status", "last_eval_at"],
+        unique=False,
+        sqlite_where=sa.text(f"status IN {UNSETTLED}"),
+        postgresql_where=sa.text(f"status IN {UNSETTLED}"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_run_state_status_last_eval_at", table_name="run_state")
+    op.create_index(
+        "idx_run_state_status_last_eval_at",
+        "run_state",
+        ["status", "last_eval_at"],
+        unique=False,
+    )
+
+    op.drop_index("idx_evaloutput_eval_status_created_at", table_name="evaloutput")
+    with op.batch_alter_table("evaloutput") as batch_op:
+        batch_op.drop_column("eval_status")
@@ -1,10 +1,11 @@
 from datetime import datetime
 from enum import Enum
-from typing import Any, Literal
+from typing import Any, Literal, Self
 
-from pydantic import BaseModel
-from sqlalchemy import JSON, Column, DateTime
+from pydantic import BaseModel, PrivateAttr
+from sqlalchemy import JSON, Column, DateTime, event, text
 from sqlalchemy.dialects.postgresql import JSONB, TIMESTAMP
+from sqlalchemy.sql.elements import TextClause
 from sqlmodel import BIGINT, Field, Index, String
 
 from src.db.async_db import Base
@@ -26,6 +27,22 @@ EvalStatus = Literal[
     "flaky",
 ]
 
+# Statuses of runs that can still change without new events: a wait can
+# time out, a failure can recover. Partial indexes cover only these.
+UNSETTLED_EVAL_STATUSES: tuple[EvalStatus, ...] = ("running", "failed")
+
+
+def _unsettled(column: str) -> TextClause:
+    """Predicate of the partial indexes over unsettled statuses."""
+    statuses = ", ".join(f"'{status}'" for status in UNSETTLED_EVAL_STATUSES)
+    return text(f"{column} IN ({statuses})")
+
+
+# How much of a run is evaluated once a node failed: everything ("full"),
+# nothing in later layers ("fail_fast"), or nothing downstream of the
+# failed node ("fail_fast_branch"). Skipped nodes get the "cancelled" status.
+EvalPolicy = Literal["full", "fail_fast", "fail_fast_branch"]
+
 
 class AuditBase(Base):
     status: Status = Field(
@@ -86,6 +103,34 @@ class Expr(BaseModel):
     engine: ExprEngine
     script: str
 
+    # (flow, node_id) the expression belongs to, used to attribute profiling
+    # data. Set on compiled flow plans only; never serialized.
+    _origin: tuple[str, str] | None = PrivateAttr(default=None)
+
+    # Identifies the expression and the node definition it belongs to, used
+    # to key memoized results. Set on compiled flow plans only.
+    _memo_key: str | None = PrivateAttr(default=None)
+
+    @property
+    def origin(self) -> tuple[str, str] | None:
+        return self._origin
+
+    @property
+    def memo_key(self) -> str | None:
+        return self._memo_key
+
+    def with_origin(
+        self,
+        flow: str,
+        node_id: str,
+        memo_key: str | None = None,
+    ) -> Self:
+        """Return a copy of the expression attributed to a node."""
+        expr = self.model_copy()
+        expr._origin = (flow, node_id)
+        expr._memo_key = memo_key
+        return expr
+
 
 class ActionInputParams(BaseModel):
     url: str | None = None
@@ -112,8 +157,8 @@ class ActionInput(BaseModel):
 class Event(Base, table=True):
     id: str = Field(primary_key=True)
 
+    # Indexed by idx_event_run_id_flow_ts
     run_id: str = Field(
-        index=True,
         description="The run identifier associated with this event.",
     )
 
@@ -143,7 +188,11 @@ class Event(Base, table=True):
         description="Timestamp in nanoseconds",
     )
 
-    __table_args__ = (Index("idx_event_flow_node_id", "flow", "node_id"),)
+    __table_args__ = (
+        Index("idx_event_flow_node_id", "flow", "node_id"),
+        # A run's events in timestamp order; covers the ID and count queries
+        Index("idx_event_run_id_flow_ts", "run_id", "flow", "ts", "id"),
+    )
 
 
 class NodeCondition(BaseModel):
@@ -226,6 +275,11 @@ class Node(AuditBase, table=True):
         sa_column=Column(JSON().with_variant(JSONB, "postgresql")),
     )
 
+    fingerprint: str | None = Field(
+        default=None,
+        description="Content hash of the fields set by the SDKs, as last ingested.",
+    )
+
     __table_args__ = (Index("idx_node_id_flow", "id", "flow"),)
 
     def ensure(self) -> None:
@@ -268,6 +322,9 @@ class BaseEvalOutput(BaseModel):
     graph: dict[str, list[str]] = {}
     exec_info: list[BaseEvalItemOutput] = []
     ev_ids: list[str] = []
+    deadline_ns: int | None = None
+    # Estimated peak memory of a streaming evaluation (None for others)
+    peak_memory_bytes: int | None = None
 
 
 class EvalOutput(AuditBase, table=True):
@@ -296,6 +353,108 @@ class EvalOutput(AuditBase, table=True):
         sa_column=Column(JSON().with_variant(JSONB, "postgresql")),
     )
 
+    eval_status: EvalStatus | None = Field(
+        default=None,
+        sa_type=String,
+        description="Copy of output.status, set on write.",
+    )
+
+    __table_args__ = (
+        Index(
+            "idx_evaloutput_eval_status_created_at",
+            "eval_status",
+            "created_at",
+            sqlite_where=_unsettled("eval_status"),
+            postgresql_where=_unsettled("eval_status"),
+        ),
+    )
+
     def ensure(self) -> None:
         if isinstance(self.output, dict):
             self.output = BaseEvalOutput.model_validate(self.output)
+
+
+@event.listens_for(EvalOutput, "before_insert")
+@event.listens_for(EvalOutput, "before_update")
+def _set_eval_status(_mapper: Any, _connection: Any, target: EvalOutput) -> None:
+    output = target.output
+    target.eval_status = output["status"] if isinstance(output, dict) else output.status
+
+
+class EvalDeadline(Base, table=True):
+    """Next time a run must be re-evaluated because a wait can time out.
+
+    There is at most one row per (flow, run_id), and only while a node of
+    the run is waiting for its event.
+    """
+
+    flow: str = Field(
+        ...,
+        primary_key=True,
+    )
+
+    run_id: str = Field(
+        ...,
+        primary_key=True,
+    )
+
+    deadline_ns: int = Field(
+        sa_type=BIGINT,
+        index=True,
+        description="When the earliest wait of the run times out, in nanoseconds",
+    )
+
+
+class LatestRunState(Base, table=True):
+    """Latest evaluation of a run.
+
+    There is one row per (flow, run_id), upserted with every evaluation of
+    the whole run, so queries for the current state of runs don't scan the
+    EvalOutput history.
+    """
+
+    flow: str = Field(
+        ...,
+        primary_key=True,
+    )
+
+    run_id: str = Field(
+        ...,
+        primary_key=True,
+    )
+
+    status: EvalStatus = Field(
+        sa_type=String,
+        description="Status of the latest evaluation",
+    )
+
+    last_eval_at: datetime = Field(
+        sa_type=DateTime(timezone=True).with_variant(
+            TIMESTAMP(timezone=True), "postgresql"
+        ),
+        index=True,
+        description="When the run was last evaluated",
+    )
+
+    deadline_ns: int | None = Field(
+        default=None,
+        sa_type=BIGINT,
+        description="When the earliest wait of the run times out, in nanoseconds",
+    )
+
+    last_output_id: str = Field(
+        ...,
+        description="The EvalOutput of the latest evaluation",
+    )
+
+    __tablename__ = "run_state"
+
+    __table_args__ = (
+        Index(
+            "idx_run_state_status_last_eval_at",
+            "status",
+            "last_eval_at",
+            sqlite_where=_unsettled("status"),
+            postgresql_where=_unsettled("status"),
+        ),
+    )
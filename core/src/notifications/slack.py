@@ -27,6 +27,7 @@ _NODE_EMOJI: dict[str, str] = {
     "running": "⏳",
     "pending": "⏸️",
     "skipped": "⏸️",
+    "cancelled": "⏸️",
 }
 
 
@@ -0,0 +1,283 @@
+"""Tests for the bulk ingestion queries of SqliteEventStorage."""
+
+from datetime import UTC, datetime
+from typing import Any
+
+import pytest
+from sqlalchemy import event
+
+from src.adapters.sqlite import SqliteEventStorage
+from src.eval.plan import node_fingerprint
+from src.models import (
+    UNSETTLED_EVAL_STATUSES,
+    BaseEvalOutput,
+    EvalOutput,
+    EvalStatus,
+    Event,
+    Expr,
+    Node,
+)
+
+CREATED_AT = datetime(2026, 1, 1, tzinfo=UTC)
+
+
+def _code_node(node_id: str, flow: str = "checkout", **kwargs: Any) -> Node:
+    node = Node(
+        id=node_id,
+        flow=flow,
+        type="act",
+        source="code",
+        dep_ids=[],
+        conditions=[],
+        created_at=CREATED_AT,
+        **kwargs,
+    )
+    node.fingerprint = node_fingerprint(node)
+    return node
+
+
+async def _upsert(factory, nodes: list[Node]) -> set[str]:
+    async with factory() as session:
+        changed = await SqliteEventStorage().upsert_code_nodes(nodes, session)
+        await session.commit()
+    return changed
+
+
+async def _node(factory, node_id: str) -> Node:
+    async with factory() as session:
+        node: Node | None = await session.get(Node, node_id)
+    assert node is not None
+    return node
+
+
+@pytest.mark.asyncio
+class TestBulkIngestion:
+    """insert_events and upsert_code_nodes."""
+
+    async def test_insert_events(self, session_factory):
+        events = [
+            Event(
+                id=f"e{i}",
+                run_id=f"run_{i % 3}",
+                flow="checkout",
+                node_id="cart",
+                data={"n": i, "items": [{"sku": "a"}]},
+                ts=i,
+            )
+            for i in range(1200)
+        ]
+
+        async with session_factory() as session:
+            await SqliteEventStorage().insert_events(events, session)
+            await session.commit()
+
+        async with session_factory() as session:
+            stored = await SqliteEventStorage().get_events_by_run(
+                "run_1", "checkout", session
+            )
+
+        assert len(stored) == 400
+        assert stored[1].data == {"n": 4, "items": [{"sku": "a"}]}
+
+    async def test_cluster_events(self, session_factory):
+        events = [
+            Event(
+                id=f"e{i}",
+                run_id=f"run_{i % 3}",
+                flow="checkout",
+                node_id="cart",
+                data={"n": i},
+                ts=-i,
+            )
+            for i in range(9)
+        ]
+        async with session_factory() as session:
+            await SqliteEventStorage().insert_events(events, session)
+            await session.commit()
+
+        async with session_factory() as session:
+            assert await SqliteEventStorage().cluster_events(session) == 9
+            await session.commit()
+
+        async with session_factory() as session:
+            connection = await session.connection()
+            rows = await connection.exec_driver_sql(
+                "SELECT run_id, id FROM event ORDER BY rowid"
+            )
+            stored = await session.get(Event, "e4")
+
+        assert [tuple(row) for row in rows.all()] == [
+            (f"run_{i % 3}", f"e{i}") for i in [6, 3, 0, 7, 4, 1, 8, 5, 2]
+        ]
+        assert stored is not None and stored.data == {"n": 4}
+
+    async def test_creates_then_skips_unchanged_nodes(self, session_factory):
+        validator = Expr(engine="python", script="data['n'] > 0")
+        nodes = [
+            _code_node("cart", validator=validator),
+            _code_node("refund_start", flow="refund"),
+        ]
+
+        assert await _upsert(session_factory, nodes) == {"checkout", "refund"}
+        assert await _upsert(session_factory, nodes) == set()
+        assert (await _node(session_factory, "cart")).updated_at is None
+
+    async def test_updates_changed_code_nodes(self, session_factory):
+        await _upsert(session_factory, [_code_node("cart"), _code_node("paid")])
+        validator = Expr(engine="js", script="data.n > 0")
+
+        changed = await _upsert(
+            session_factory,
+            [_code_node("cart", validator=validator), _code_node("paid")],
+        )
+
+        assert changed == {"checkout"}
+        cart = await _node(session_factory, "cart")
+        assert Expr.model_validate(cart.validator) == validator
+        assert cart.updated_at is not None
+        assert (await _node(session_factory, "paid")).updated_at is None
+
+    async def test_upgrades_scan_nodes_and_keeps_manual_nodes(self, session_factory):
+        async with session_factory() as session:
+            session.add(_code_node("scanned"))
+            session.add(_code_node("edited", description="From the UI"))
+            await session.commit()
+        async with session_factory() as session:
+            for node_id, source in [("scanned", "scan"), ("edited", "manual")]:
+                node = await session.get(Node, node_id)
+                node.source = source
+            await session.commit()
+
+        changed = await _upsert(
+            session_factory, [_code_node("scanned"), _code_node("edited")]
+        )
+
+        assert changed == {"checkout"}
+        assert (await _node(session_factory, "scanned")).source == "code"
+        edited = await _node(session_factory, "edited")
+        assert (edited.source, edited.description) == ("manual", "From the UI")
+
+    async def test_statements_dont_grow_with_the_batch(self, session_factory):
+        storage = SqliteEventStorage()
+        statements: list[str] = []
+
+        async with session_factory() as session:
+            engine = session.get_bind()
+            event.listen(
+                engine,
+                "before_cursor_execute",
+                lambda *args: statements.append(args[2]),
+            )
+            events = [
+                Event(
+                    id=f"e{i}",
+                    run_id="run_1",
+                    flow="checkout",
+                    node_id=f"n{i % 10}",
+                    data={},
+                    ts=i,
+                )
+                for i in range(900)
+            ]
+            await storage.insert_events(events, session)
+            await storage.upsert_code_nodes(
+                [_code_node(f"n{i}") for i in range(10)], session
+            )
+            await session.commit()
+
+        assert len([sql for sql in statements if sql.startswith("INSERT")]) == 2
+
+    async def test_nodes_need_a_fingerprint(self, session_factory):
+        node = _code_node("cart")
+        node.fingerprint = None
+
+        with pytest.raises(ValueError):
+            await _upsert(session_factory, [node])
+
+
+def _eval_output(
+    output_id: str, run_id: str, status: EvalStatus, created_at: datetime
+) -> EvalOutput:
+    return EvalOutput(
+        id=output_id,
+        flow="checkout",
+        run_id=run_id,
+        output=BaseEvalOutput(status=status, deadline_ns=42),
+        created_at=created_at,
+    )
+
+
+@pytest.mark.asyncio
+class TestRunStates:
+    """save_eval_outputs, upsert_run_states and get_run_states."""
+
+    async def test_latest_evaluation_is_the_run_state(self, session_factory):
+        storage = SqliteEventStorage()
+        later = datetime(2026, 1, 2, tzinfo=UTC)
+
+        async with session_factory() as session:
+            await storage.save_eval_outputs(
+                [
+                    _eval_output("o1", "run_1", "running", CREATED_AT),
+                    _eval_output("o2", "run_2", "running", CREATED_AT),
+                ],
+                session,
+            )
+            await session.commit()
+        async with session_factory() as session:
+            await storage.save_eval_outputs(
+                [_eval_output("o3", "run_1", "failed", later)], session
+            )
+            # A slower evaluation finishing last doesn't go back in time
+            await storage.save_eval_outputs(
+                [_eval_output("o4", "run_1", "running", CREATED_AT)], session
+            )
+            await session.commit()
+
+        async with session_factory() as session:
+            states = await storage.get_run_states(session)
+            running = await storage.get_run_states(session, statuses=["running"])
+            recent = await storage.get_run_states(session, since=later)
+            outputs = await storage.get_eval_outputs_by_ids(["o1", "o4"], session)
+
+        assert [
+            (state.run_id, state.status, state.last_output_id, state.deadline_ns)
+            for state in states
+        ] == [("run_1", "failed", "o3", 42), ("run_2", "running", "o2", 42)]
+        assert [state.run_id for state in running] == ["run_2"]
+        assert [state.run_id for state in recent] == ["run_1"]
+        # History is kept
+        assert sorted(output.id for output in outputs) == ["o1", "o4"]
+
+    async def test_unsettled_runs_use_the_partial_index(self, session_factory):
+        statements: list[str] = []
+
+        async with session_factory() as session:
+            event.listen(
+                session.get_bind(),
+                "before_cursor_execute",
+                lambda *args: statements.append(args[2]),
+            )
+            await SqliteEventStorage().get_run_states(
+                session, statuses=list(UNSETTLED_EVAL_STATUSES), since=CREATED_AT
+            )
+            connection = await session.connection()
+            plan = await connection.exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statements[-1]}", ("2026-01-01",)
+            )
+
+        assert "status IN ('running', 'failed')" in statements[-1]
+        assert "idx_run_state_status_last_eval_at" in str(plan.all())
+
+    async def test_eval_status_is_set_on_write(self, session_factory):
+        async with session_factory() as session:
+            await SqliteEventStorage().save_eval_outputs(
+                [_eval_output("o1", "run_1", "running", CREATED_AT)], session
+            )
+            await session.commit()
+        async with session_factory() as session:
+            output = await session.get(EvalOutput, "o1")
+            assert output.eval_status == "running"
+            output.output = BaseEvalOutput(status="passed")
+            await session.commit()
+            assert output.eval_status == "passed"
@@ -0,0 +1,111 @@
+"""Tests for run states in /v1/eval-outputs and /v1/reeval-running-flows."""
+
+from datetime import UTC, datetime
+
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+
+from src.api.api import app
+from src.api.middlewares import ensure_api_key
+from src.events.handlers import evaluate_runs
+from src.models import Event, Expr, Node
+
+CREATED_AT = datetime(2026, 1, 1, tzinfo=UTC)
+
+
+async def _no_op_api_key():
+    pass
+
+
+@pytest_asyncio.fixture
+async def client(session_factory):
+    """Authenticated async test client with in-memory DB."""
+    app.dependency_overrides[ensure_api_key] = _no_op_api_key
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+    app.dependency_overrides.clear()
+
+
+async def _seed(factory) -> None:
+    """Two runs of a flow whose second node fails on run_1."""
+    async with factory() as session:
+        session.add(Node(id="cart", flow="checkout", type="act", created_at=CREATED_AT))
+        session.add(
+            Node(
+                id="paid",
+                flow="checkout",
+                type="assert",
+                dep_ids=["cart"],
+                validator=Expr(engine="python", script="data['ok']"),
+                created_at=CREATED_AT,
+            )
+        )
+        for run_id, ok in [("run_1", False), ("run_2", True)]:
+            session.add(
+                Event(
+                    id=f"{run_id}_cart",
+                    run_id=run_id,
+                    flow="checkout",
+                    node_id="cart",
+                    data={},
+                    ts=1,
+                )
+            )
+            session.add(
+                Event(
+                    id=f"{run_id}_paid",
+                    run_id=run_id,
+                    flow="checkout",
+                    node_id="paid",
+                    data={"ok": ok},
+                    ts=2,
+                )
+            )
+        await session.commit()
+
+
+@pytest.mark.asyncio
+class TestRunStates:
+    """Hot queries read one row per run."""
+
+    async def test_latest_outputs(self, client, session_factory):
+        await _seed(session_factory)
+        for _ in range(3):
+            await evaluate_runs("checkout", ["run_1", "run_2"])
+
+        history = (await client.get("/v1/eval-outputs")).json()
+        latest = (await client.get("/v1/eval-outputs?latest=true")).json()
+
+        assert len(history) == 6
+        assert sorted(
+            (output["run_id"], output["output"]["status"]) for output in latest
+        ) == [("run_1", "failed"), ("run_2", "passed")]
+
+    async def test_reeval_checks_each_run_once(self, client, session_factory):
+        await _seed(session_factory)
+        for _ in range(3):
+            await evaluate_runs("checkout", ["run_1", "run_2"])
+
+        # Fix run_1: its latest evaluation is updated in place
+        async with session_factory() as session:
+            event = await session.get(Event, "run_1_paid")
+            event.data = {"ok": True}
+            await session.commit()
+
+        response = await client.post("/v1/reeval-running-flows")
+        latest = (await client.get("/v1/eval-outputs?latest=true")).json()
+
+        assert response.json() == {
+            "message": "Re-evaluation complete",
+            "total_running": 1,
+            "updated": 1,
+            "still_running": 0,
+            "failed": 0,
+        }
+        assert [output["output"]["status"] for output in latest] == [
+            "passed",
+            "passed",
+        ]
+        assert len((await client.get("/v1/eval-outputs")).json()) == 6
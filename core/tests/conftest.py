@@ -0,0 +1,39 @@
+"""Shared test fixtures."""
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+
+from src.db.async_db import _custom_json_serializer
+from src.eval.fingerprints import get_node_fingerprint_cache
+from src.eval.memo import get_result_memo
+from src.eval.plan import get_flow_plan_cache
+
+
+@pytest.fixture(autouse=True)
+def _clear_result_memo():
+    """Tests reuse event IDs: don't let memoized results leak between them."""
+    get_result_memo().clear()
+
+
+@pytest_asyncio.fixture
+async def session_factory(monkeypatch):
+    """In-memory SQLite database used by transactional()."""
+    import src.db.transactional as txn_module
+
+    engine = create_async_engine(
+        "sqlite+aiosqlite://",
+        connect_args={"check_same_thread": False},
+        json_serializer=_custom_json_serializer,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    factory = async_sessionmaker(expire_on_commit=False, bind=engine)
+    monkeypatch.setattr(txn_module, "AsyncSessionLocal", factory)
+    get_flow_plan_cache().clear()
+    get_node_fingerprint_cache().clear()
+    yield factory
+
+    await engine.dispose()
@@ -0,0 +1 @@
+"""Tests for domain layer."""
@@ -0,0 +1,446 @@
+"""Tests for domain flow evaluation (event matching and validation)."""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from time import time_ns
+from typing import Any
+
+import pytest
+
+from src.domain.evaluation import (
+    evaluate_flow,
+    map_layer,
+)
+from src.domain.graph import build_flow_graph, topological_sort_layers
+from src.domain.incremental import RunState, apply_events
+from src.eval.eval import MultiEvaluator
+from src.models import Event, Expr, ExprEngine, Node
+from tests.helpers import evaluate_run, make_event, make_node
+
+SECOND_NS = 1_000_000_000
+
+
+class RecordingEvaluator:
+    """Evaluator that records the calls it receives."""
+
+    def __init__(self) -> None:
+        self.inner = MultiEvaluator()
+        self.calls: list[tuple[str, list[dict[str, Any]], dict[str, Any]]] = []
+
+    def evaluate(self, expr: Expr, data: dict[str, Any], ctx: dict[str, Any]) -> bool:
+        self.calls.append((expr.script, [data], ctx))
+        return self.inner.evaluate(expr, data, ctx)
+
+    def evaluate_many(
+        self, expr: Expr, items: list[dict[str, Any]], ctx: dict[str, Any]
+    ) -> list[bool]:
+        self.calls.append((expr.script, items, ctx))
+        return self.inner.evaluate_many(expr, items, ctx)
+
+
+class TestUpstreamContext:
+    """Ctx construction from matched upstream events."""
+
+    def test_single_dep_populates_ctx_data(self):
+        nodes = [
+            make_node("cart"),
+            make_node(
+                "payment",
+                ["cart"],
+                validator=Expr(
+                    engine="python", script="data['total'] == ctx['data']['total']"
+                ),
+            ),
+        ]
+        events = [
+            make_event("e1", "cart", SECOND_NS, total=10),
+            make_event("e2", "payment", 2 * SECOND_NS, total=10),
+        ]
+
+        _, result = evaluate_run(nodes, events)
+
+        assert result["status"] == "passed"
+        payment = next(i for i in result["items"] if i["node_id"] == "payment")
+        assert payment["upstream_ev_ids"] == ["e1"]
+        assert payment["ev_ids"] == ["e2"]
+
+    def test_multi_deps_keep_dep_order(self):
+        nodes = [
+            make_node("a"),
+            make_node("b"),
+            make_node(
+                "c",
+                ["b", "a"],
+                validator=Expr(
+                    engine="python",
+                    script="[d['id'] for d in ctx['deps']] == ['b', 'b', 'a']",
+                ),
+            ),
+        ]
+        events = [
+            make_event("a1", "a", 1),
+            make_event("b1", "b", 2),
+            make_event("b2", "b", 3),
+            make_event("c1", "c", 4),
+        ]
+
+        _, result = evaluate_run(nodes, events)
+
+        c = next(i for i in result["items"] if i["node_id"] == "c")
+        assert c["status"] == "passed"
+        assert c["upstream_ev_ids"] == ["b1", "b2", "a1"]
+
+    def test_filtered_upstream_events_are_not_in_ctx(self):
+        nodes = [
+            make_node("a", filter=Expr(engine="python", script="data['keep']")),
+            make_node("b", ["a"]),
+        ]
+        events = [
+            make_event("a1", "a", 1, keep=False),
+            make_event("a2", "a", 2, keep=True),
+            make_event("b1", "b", 3),
+        ]
+
+        matched, result = evaluate_run(nodes, events)
+
+        assert matched["layers"] == [["a2"], ["b1"]]
+        b = next(i for i in result["items"] if i["node_id"] == "b")
+        assert b["upstream_ev_ids"] == ["a2"]
+
+    def test_filter_evaluated_once_per_node(self):
+        nodes = [
+            make_node("a"),
+            make_node(
+                "b",
+                ["a"],
+                filter=Expr(engine="python", script="ctx['data']['ok']"),
+            ),
+        ]
+        events = [make_event("a1", "a", 1, ok=True)] + [
+            make_event(f"b{i}", "b", 10 + i) for i in range(5)
+        ]
+        evaluator = RecordingEvaluator()
+
+        matched, _ = evaluate_run(nodes, events, evaluator)
+
+        assert matched["layers"][1] == [f"b{i}" for i in range(5)]
+        assert len(evaluator.calls) == 1
+        _, items, ctx = evaluator.calls[0]
+        assert len(items) == 5
+        assert ctx["data"] == {"ok": True}
+
+
+class TestValidation:
+    """Node status derivation."""
+
+    def test_filter_and_validator_batches_match_per_event_results(self):
+        for engine, flt, vld in [
+            ("python", "data['n'] % 2 == 0", "data['n'] < 6"),
+            ("js", "data.n % 2 === 0", "data.n < 6"),
+        ]:
+            nodes = [
+                make_node("a"),
+                make_node(
+                    "b",
+                    ["a"],
+                    filter=Expr(engine=engine, script=flt),
+                    validator=Expr(engine=engine, script=vld),
+                ),
+            ]
+            events = [make_event("a1", "a", 0)] + [
+                make_event(f"b{n}", "b", n + 1, n=n) for n in range(8)
+            ]
+
+            matched, result = evaluate_run(nodes, events)
+
+            assert matched["layers"][1] == ["b0", "b2", "b4", "b6"]
+            b = next(i for i in result["items"] if i["node_id"] == "b")
+            assert b["status"] == "failed"
+            assert b["error"] == "Validator assertion failed"
+
+    def test_validator_failure_fails_flow(self):
+        nodes = [
+            make_node("a"),
+            make_node(
+                "b", ["a"], validator=Expr(engine="python", script="data['x'] > 1")
+            ),
+        ]
+        events = [make_event("a1", "a", 1), make_event("b1", "b", 2, x=0)]
+
+        _, result = evaluate_run(nodes, events)
+
+        assert result["status"] == "failed"
+        b = next(i for i in result["items"] if i["node_id"] == "b")
+        assert b["error"] == "Validator assertion failed"
+
+    def test_timeout_uses_latest_upstream_event(self):
+        nodes = [
+            make_node("a"),
+            make_node("b", ["a"], conditions=[{"timeout_ms": 1000}]),
+        ]
+        events = [
+            make_event("a1", "a", 0),
+            make_event("a2", "a", 5 * SECOND_NS),
+            make_event("b1", "b", 5 * SECOND_NS + 500_000_000),
+        ]
+
+        _, result = evaluate_run(nodes, events)
+
+        assert result["status"] == "passed"
+
+    def test_missing_assert_node_times_out(self):
+        nodes = [make_node("a"), make_node("b", ["a"], type="assert")]
+        events = [make_event("a1", "a", 0)]
+
+        _, result = evaluate_run(nodes, events)
+
+        assert result["status"] == "failed"
+        b = next(i for i in result["items"] if i["node_id"] == "b")
+        assert b["message"].startswith("Timeout")
+
+    def test_missing_node_without_upstream_is_skipped(self):
+        nodes = [make_node("a"), make_node("b", ["a"], type="assert")]
+        events = [make_event("x1", "unrelated", 0)]
+
+        _, result = evaluate_run(nodes, events)
+
+        assert {i["node_id"]: i["status"] for i in result["items"]} == {
+            "a": "skipped",
+            "b": "skipped",
+        }
+
+
+class TestDeadline:
+    """Deadline of runs with nodes waiting for their event."""
+
+    def test_waiting_nodes_report_earliest_timeout(self):
+        start = time_ns()
+        nodes = [
+            make_node("a"),
+            make_node("b", ["a"], type="assert", conditions=[{"timeout_ms": 60_000}]),
+            make_node("c", ["a"], type="act", conditions=[{"timeout_ms": 30_000}]),
+        ]
+        events = [make_event("a1", "a", start)]
+
+        _, result = evaluate_run(nodes, events)
+
+        assert result["status"] == "running"
+        assert result["deadline_ns"] == start + 30 * SECOND_NS
+
+    def test_settled_runs_have_no_deadline(self):
+        nodes = [make_node("a"), make_node("b", ["a"], type="assert")]
+
+        _, timed_out = evaluate_run(nodes, [make_event("a1", "a", 0)])
+        _, passed = evaluate_run(
+            nodes, [make_event("a1", "a", 0), make_event("b1", "b", SECOND_NS)]
+        )
+
+        assert timed_out["deadline_ns"] is None
+        assert passed["deadline_ns"] is None
+
+
+def _wide_flow(width: int) -> tuple[list[Node], list[Event]]:
+    """Root -> ``width`` independent nodes -> join, with mixed engines."""
+    nodes = [make_node("root")]
+    events = [make_event("r1", "root", 0, total=10)]
+
+    for i in range(width):
+        scripts: list[tuple[ExprEngine, str, str]] = [
+            ("python", "data['n'] % 3 != 0", "data['n'] < ctx['data']['total']"),
+            ("js", "data.n % 3 !== 0", "data.n < ctx.data.total"),
+            ("cel", "data.n % 3 != 0", "data.n < ctx.data.total"),
+        ]
+        engine, flt, vld = scripts[i % 3]
+        nodes.append(
+            make_node(
+                f"n{i}",
+                ["root"],
+                filter=Expr(engine=engine, script=flt),
+                validator=Expr(engine=engine, script=vld),
+            )
+        )
+        events.extend(
+            make_event(f"e{i}_{n}", f"n{i}", n + 1, n=n + i) for n in range(4)
+        )
+
+    nodes.append(make_node("join", [f"n{i}" for i in range(width)], type="assert"))
+    events.append(make_event("j1", "join", 100))
+    return nodes, events
+
+
+def _without_timing(result) -> dict[str, Any]:
+    return {
+        **result,
+        "elapsed_ns": 0,
+        "items": [{**item, "elapsed_ns": 0} for item in result["items"]],
+    }
+
+
+class TestParallelLayers:
+    """Nodes of a layer evaluated concurrently give the serial result."""
+
+    @pytest.fixture
+    def executor(self):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            yield executor
+
+    def test_map_layer_keeps_node_order(self, executor):
+        def slow_for_early_nodes(node_id: str) -> str:
+            time.sleep(0.001 * (10 - int(node_id)))
+            return node_id
+
+        node_ids = [str(i) for i in range(10)]
+
+        assert map_layer(slow_for_early_nodes, node_ids, executor) == node_ids
+
+    def test_map_layer_raises_first_error_in_node_order(self, executor):
+        def fail(node_id: str) -> str:
+            raise ValueError(node_id)
+
+        with pytest.raises(ValueError, match="^a$"):
+            map_layer(fail, ["a", "b", "c"], executor)
+
+    def test_matches_serial_evaluation(self, executor):
+        nodes, events = _wide_flow(24)
+
+        serial_matched, serial = evaluate_run(nodes, events)
+        matched, result = evaluate_run(*_wide_flow(24), executor=executor)
+
+        assert matched == serial_matched
+        assert _without_timing(result) == _without_timing(serial)
+        assert [item["node_id"] for item in result["items"]] == (
+            ["root"] + [f"n{i}" for i in range(24)] + ["join"]
+        )
+
+    def test_incremental_matches_serial_evaluation(self, executor):
+        nodes, events = _wide_flow(12)
+        flow_graph = build_flow_graph(nodes)
+        layers = topological_sort_layers(flow_graph["graph"])
+        evaluator = MultiEvaluator()
+        serial_state, state = RunState("fp"), RunState("fp")
+
+        for batch in (events[:20], events[20:]):
+            serial = apply_events(serial_state, batch, flow_graph, layers, evaluator)
+            result = apply_events(state, batch, flow_graph, layers, evaluator, executor)
+
+            assert _without_timing(result) == _without_timing(serial)
+
+
+def _branching_flow(amount: int) -> tuple[list[Node], list[Event]]:
+    """a -> b (checks the amount) -> c, and a -> d -> e."""
+    nodes = [
+        make_node("a"),
+        make_node("b", ["a"], validator=Expr(engine="python", script="data['n'] > 0")),
+        make_node("c", ["b"], validator=Expr(engine="python", script="data['n'] > 1")),
+        make_node("d", ["a"], filter=Expr(engine="python", script="data['n'] > 2")),
+        make_node("e", ["d"], validator=Expr(engine="python", script="data['n'] > 3")),
+    ]
+    events = [
+        make_event("a1", "a", 0),
+        make_event("b1", "b", 1, n=amount),
+        make_event("c1", "c", 2, n=5),
+        make_event("d1", "d", 3, n=5),
+        make_event("e1", "e", 4, n=5),
+    ]
+    return nodes, events
+
+
+def _evaluate_flow(
+    nodes: list[Node], events: list[Event], policy: Any, evaluator: Any = None
+):
+    flow_graph = build_flow_graph(nodes)
+    layers = topological_sort_layers(flow_graph["graph"])
+    return evaluate_flow(
+        events,
+        layers,
+        flow_graph["nodes"],
+        evaluator or MultiEvaluator(),
+        policy=policy,
+    )
+
+
+class TestEvalPolicy:
+    """Short-circuit evaluation policies."""
+
+    @pytest.mark.parametrize("amount", [0, 1])
+    def test_full_matches_match_then_validate(self, amount):
+        nodes, events = _branching_flow(amount)
+
+        _, expected = evaluate_run(nodes, events)
+        result = _evaluate_flow(nodes, events, "full")
+
+        assert _without_timing(result) == _without_timing(expected)
+
+    @pytest.mark.parametrize(
+        ("policy", "cancelled"),
+        [
+            ("full", set()),
+            ("fail_fast", {"c", "e"}),
+            ("fail_fast_branch", {"c"}),
+        ],
+    )
+    def test_cancels_nodes_after_a_failure(self, policy, cancelled):
+        evaluator = RecordingEvaluator()
+
+        result = _evaluate_flow(*_branching_flow(0), policy, evaluator)
+
+        statuses = {item["node_id"]: item["status"] for item in result["items"]}
+        assert {node for node, status in statuses.items() if status == "cancelled"} == (
+            cancelled
+        )
+        assert statuses["b"] == "failed"
+        assert result["status"] == "failed"
+        # Cancelled nodes run neither their filter nor their validator
+        scripts = {script for script, _, _ in evaluator.calls}
+        assert ("data['n'] > 1" in scripts) is ("c" not in cancelled)
+        assert ("data['n'] > 3" in scripts) is ("e" not in cancelled)
+        assert "data['n'] > 2" in scripts
+
+    @pytest.mark.parametrize("policy", ["fail_fast", "fail_fast_branch"])
+    def test_passing_runs_are_not_cancelled(self, policy):
+        nodes, events = _branching_flow(1)
+
+        result = _evaluate_flow(nodes, events, policy)
+
+        assert _without_timing(result) == _without_timing(
+            _evaluate_flow(nodes, events, "full")
+        )
+        assert result["status"] == "passed"
+
+    def test_cancelled_nodes_cancel_their_branch(self):
+        nodes, events = _branching_flow(0)
+        nodes.append(make_node("f", ["c"]))
+        events.append(make_event("f1", "f", 5))
+
+        result = _evaluate_flow(nodes, events, "fail_fast_branch")
+
+        assert result["items"][-1]["node_id"] == "f"
+        assert result["items"][-1]["status"] == "cancelled"
+
+    def test_unknown_policy(self):
+        with pytest.raises(ValueError, match="Unknown evaluation policy"):
+            _evaluate_flow(*_branching_flow(0), "sometimes")
+
+    @pytest.mark.parametrize("policy", ["full", "fail_fast", "fail_fast_branch"])
+    def test_incremental_matches_evaluate_flow(self, policy):
+        nodes, events = _branching_flow(0)
+        flow_graph = build_flow_graph(nodes)
+        layers = topological_sort_layers(flow_graph["graph"])
+        evaluator = MultiEvaluator()
+        state = RunState("fp")
+        # b's event arrives later: its branch is evaluated, then cancelled
+        batches = [
+            [event for event in events if event.node_id != "b"],
+            events[1:2],
+            [make_event("e2", "e", 6, n=5)],
+        ]
+
+        for n in range(len(batches)):
+            seen = [event for batch in batches[: n + 1] for event in batch]
+            result = apply_events(
+                state, batches[n], flow_graph, layers, evaluator, policy=policy
+            )
+
+            assert _without_timing(result) == _without_timing(
+                _evaluate_flow(nodes, seen, policy)
+            )
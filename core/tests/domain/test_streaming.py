@@ -0,0 +1,239 @@
+"""Tests for streaming flow validation."""
+
+from typing import Any
+
+import pytest
+
+from src.domain.evaluation import (
+    ExprBudgetExceeded,
+    evaluate_flow,
+)
+from src.domain.graph import build_flow_graph, topological_sort_layers
+from src.domain.streaming import (
+    EVENT_BYTES,
+    EvalMemoryExceeded,
+    StreamingValidation,
+    reads_ctx,
+)
+from src.eval.eval import MultiEvaluator
+from src.models import Event, Expr, ExprEngine, Node
+from tests.helpers import evaluate_run, make_event, make_node
+
+SECOND_NS = 1_000_000_000
+
+
+def _streamed(
+    nodes: list[Node],
+    events: list[Event],
+    chunk_size: int,
+    evaluator: Any = None,
+    max_bytes: int = 0,
+    policy: Any = "full",
+) -> tuple[StreamingValidation, Any]:
+    """Feed events like the storage does: per layer, in ts order, in chunks."""
+    flow_graph = build_flow_graph(nodes)
+    layers = topological_sort_layers(flow_graph["graph"])
+    validation = StreamingValidation(
+        flow_graph, layers, evaluator or MultiEvaluator(), max_bytes, policy
+    )
+    ordered = sorted(events, key=lambda event: event.ts)
+
+    for index in range(len(validation.layers)):
+        node_ids = validation.start_layer(index)
+        layer_events = [event for event in ordered if event.node_id in node_ids]
+        for start in range(0, len(layer_events), chunk_size):
+            validation.feed(layer_events[start : start + chunk_size])
+
+    return validation, validation.result()
+
+
+def _without_timing(result) -> dict[str, Any]:
+    return {
+        **result,
+        "elapsed_ns": 0,
+        "items": [{**item, "elapsed_ns": 0} for item in result["items"]],
+    }
+
+
+def _wide_flow() -> tuple[list[Node], list[Event]]:
+    """Root -> nodes of every engine reading ctx or not -> join."""
+    nodes = [make_node("root")]
+    events = [
+        make_event("r1", "root", 0, total=10),
+        make_event("r2", "root", 1, total=6),
+    ]
+    scripts: list[tuple[ExprEngine, str, str | None]] = [
+        (
+            "python",
+            "data['n'] % 3 != 0",
+            "data['n'] < ctx['deps'][-1]['data']['total']",
+        ),
+        ("js", "data.n % 3 !== 0", "data.n < 7"),
+        ("cel", "data.n % 3 != 0", "data.n < 20"),
+        ("python", "data['n'] % 2 == 0", None),
+    ]
+
+    for i, (engine, flt, vld) in enumerate(scripts):
+        nodes.append(
+            make_node(
+                f"n{i}",
+                ["root"],
+                filter=Expr(engine=engine, script=flt),
+                validator=Expr(engine=engine, script=vld) if vld else None,
+            )
+        )
+        events.extend(
+            make_event(f"e{i}_{n}", f"n{i}", n + 2, n=n + i) for n in range(7)
+        )
+
+    nodes.append(
+        make_node(
+            "join",
+            [f"n{i}" for i in range(len(scripts))],
+            type="assert",
+            validator=Expr(engine="python", script="len(ctx['deps']) > 3"),
+        )
+    )
+    events.append(make_event("j1", "join", 100))
+    events.append(make_event("x1", "unknown", 3))
+    return nodes, events
+
+
+class TestStreamingValidation:
+    """StreamingValidation gives the result of the full evaluation."""
+
+    @pytest.mark.parametrize("chunk_size", [1, 3, 1000])
+    def test_matches_full_evaluation(self, chunk_size):
+        nodes, events = _wide_flow()
+
+        _, result = _streamed(nodes, events, chunk_size)
+
+        assert _without_timing(result) == _without_timing(
+            evaluate_run(*_wide_flow())[1]
+        )
+        assert result["status"] == "failed"
+
+    @pytest.mark.parametrize("chunk_size", [1, 1000])
+    def test_timeouts_and_missing_nodes(self, chunk_size):
+        nodes = [
+            make_node("a"),
+            make_node("b", ["a"], conditions=[{"timeout_ms": 1000}]),
+            make_node("c", ["b"], type="assert"),
+            make_node("d", ["a"], type="act"),
+        ]
+        events = [
+            make_event("a1", "a", 0),
+            make_event("b1", "b", SECOND_NS // 2),
+            make_event("b2", "b", 3 * SECOND_NS),
+        ]
+
+        _, result = _streamed(nodes, events, chunk_size)
+
+        assert _without_timing(result) == _without_timing(
+            evaluate_run(nodes, events)[1]
+        )
+        b = next(item for item in result["items"] if item["node_id"] == "b")
+        assert b["status"] == "failed"
+        assert b["error"].startswith("Timeout exceeded")
+
+    def test_keeps_data_only_for_ctx_dependencies(self):
+        nodes, events = _wide_flow()
+
+        validation, _ = _streamed(nodes, events, 2)
+
+        # n0's validator and join's validator read ctx
+        assert [event.id for event in validation.summaries["root"].events] == [
+            "r1",
+            "r2",
+        ]
+        assert validation.summaries["n1"].events != []
+        assert validation.summaries["join"].events == []
+
+    def test_budget_errors_match_full_evaluation(self):
+        class OverBudget:
+            def __init__(self) -> None:
+                self.inner = MultiEvaluator()
+
+            def evaluate_many(self, expr, items, ctx):
+                if "slow" in expr.script and any(item.get("n") == 3 for item in items):
+                    raise ExprBudgetExceeded("too slow")
+                return self.inner.evaluate_many(expr, items, ctx)
+
+        nodes = [
+            make_node("a"),
+            make_node("b", ["a"], filter=Expr(engine="python", script="'slow' != 0")),
+            make_node(
+                "c", ["a"], validator=Expr(engine="python", script="'slow' != 0")
+            ),
+            make_node("d", ["b"], type="assert"),
+        ]
+        events = [make_event("a1", "a", 0)]
+        for n in range(5):
+            events.append(make_event(f"b{n}", "b", n + 1, n=n))
+            events.append(make_event(f"c{n}", "c", n + 1, n=n))
+
+        _, result = _streamed(nodes, events, 2, OverBudget())
+        full = evaluate_run(nodes, events, OverBudget())[1]
+
+        assert _without_timing(result) == _without_timing(full)
+        assert {item["node_id"]: item["status"] for item in result["items"]} == {
+            "a": "passed",
+            "b": "error",
+            "c": "error",
+            "d": "skipped",
+        }
+
+    @pytest.mark.parametrize("policy", ["fail_fast", "fail_fast_branch"])
+    def test_policies_match_full_evaluation(self, policy):
+        nodes, events = _wide_flow()
+        # Fails one of the middle nodes: join is cancelled
+        nodes[1].validator = Expr(engine="python", script="data['n'] < 0")
+
+        validation, result = _streamed(nodes, events, 3, policy=policy)
+        flow_graph = build_flow_graph(nodes)
+        layers = topological_sort_layers(flow_graph["graph"])
+
+        assert _without_timing(result) == _without_timing(
+            evaluate_flow(
+                events, layers, flow_graph["nodes"], MultiEvaluator(), policy=policy
+            )
+        )
+        assert validation.cancelled == {"join"}
+        assert result["items"][-1]["status"] == "cancelled"
+
+    def test_memory_ceiling(self):
+        nodes, events = _wide_flow()
+
+        validation, _ = _streamed(nodes, events, 4)
+
+        assert validation.peak_bytes >= 4 * EVENT_BYTES
+        with pytest.raises(EvalMemoryExceeded):
+            _streamed(nodes, events, 4, max_bytes=validation.peak_bytes - 1)
+        _streamed(nodes, events, 4, max_bytes=validation.peak_bytes)
+
+    def test_peak_memory_is_bounded_by_the_chunk_size(self):
+        nodes = [make_node("a"), make_node("b", ["a"])]
+        events = [make_event("a1", "a", 0)] + [
+            make_event(f"b{n}", "b", n + 1, payload="x" * 1000) for n in range(200)
+        ]
+
+        small, _ = _streamed(nodes, events, 10)
+        large, _ = _streamed(nodes, events, 200)
+
+        assert small.peak_bytes * 5 < large.peak_bytes
+
+
+@pytest.mark.parametrize(
+    ("engine", "script", "expected"),
+    [
+        ("python", "data['n'] > 1", False),
+        ("python", "data['n'] > ctx['data']['n']", True),
+        ("python", "vars()['ctx']", True),
+        ("js", "arguments[1].data.n > 1", True),
+        ("js", 'eval("c" + "tx").data.n > 1', True),
+        ("js", "data.n > 1", False),
+        ("cel", "data.n > 1", False),
+    ],
+)
+def test_reads_ctx(engine, script, expected):
+    assert reads_ctx(Expr(engine=engine, script=script)) is expected
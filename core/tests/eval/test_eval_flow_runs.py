@@ -0,0 +1,268 @@
+"""Tests for evaluating runs loaded from the database (bulk and streaming)."""
+
+from datetime import UTC, datetime
+from typing import Any
+
+import pytest
+import pytest_asyncio
+from sqlmodel import select
+
+import src.adapters.sqlite as sqlite_adapter
+import src.eval.eval as eval_module
+from src.domain.streaming import EvalMemoryExceeded
+from src.eval.eval import eval_flow_run, eval_flow_runs
+from src.eval.incremental import IncrementalEvaluator, get_incremental_evaluator
+from src.events.handlers import new_bus
+from src.events.models import NewBatchEvent
+from src.models import BaseEvalOutput, EvalOutput, Event, Expr, Node
+
+SECOND_NS = 1_000_000_000
+CREATED_AT = datetime(2026, 1, 1, tzinfo=UTC)
+
+
+def _event(ev_id: str, run_id: str, node_id: str, ts: int, **data: Any) -> Event:
+    return Event(
+        id=ev_id, run_id=run_id, flow="checkout", node_id=node_id, data=data, ts=ts
+    )
+
+
+async def _seed(factory) -> None:
+    async with factory() as session:
+        session.add_all(
+            [
+                Node(id="cart", flow="checkout", type="act", created_at=CREATED_AT),
+                Node(
+                    id="paid",
+                    flow="checkout",
+                    type="assert",
+                    dep_ids=["cart"],
+                    validator=Expr(
+                        engine="python", script="data['total'] == ctx['data']['total']"
+                    ),
+                    created_at=CREATED_AT,
+                ),
+            ]
+        )
+        for i in range(5):
+            session.add(_event(f"c{i}", f"run_{i}", "cart", SECOND_NS, total=10))
+            session.add(_event(f"p{i}", f"run_{i}", "paid", 2 * SECOND_NS, total=i))
+        await session.commit()
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    """Force several IN (...) chunks per query."""
+    monkeypatch.setattr(sqlite_adapter, "IDS_PER_QUERY", 2)
+
+
+@pytest.mark.asyncio
+class TestEvalFlowRuns:
+    """eval_flow_runs and IncrementalEvaluator.eval_flow_runs."""
+
+    async def test_matches_single_run_evaluation(self, session_factory, small_chunks):
+        """Test each bulk result equals eval_flow_run for that run."""
+        await _seed(session_factory)
+        run_ids = [f"run_{i}" for i in range(5)]
+
+        outputs = await eval_flow_runs("checkout", run_ids)
+
+        assert list(outputs) == run_ids
+        for run_id in run_ids:
+            single = await eval_flow_run(run_id, "checkout")
+            assert outputs[run_id].status == single.status
+            assert outputs[run_id].ev_ids == single.ev_ids
+        assert outputs["run_0"].status == "failed"
+        assert outputs["run_4"].status == "failed"
+
+    async def test_runs_without_events_are_skipped(self, session_factory):
+        """Test unknown runs are missing from the result."""
+        await _seed(session_factory)
+
+        outputs = await eval_flow_runs("checkout", ["run_1", "missing", "run_1"])
+
+        assert list(outputs) == ["run_1"]
+
+    async def test_unknown_flow_raises(self, session_factory):
+        """Test a flow without nodes raises like eval_flow_run."""
+        await _seed(session_factory)
+
+        with pytest.raises(ValueError, match="No node definitions"):
+            await eval_flow_runs("refund", ["run_1"])
+
+    async def test_incremental_bulk_matches_full(self, session_factory, small_chunks):
+        """Test the incremental bulk path equals the full bulk path."""
+        await _seed(session_factory)
+        run_ids = [f"run_{i}" for i in range(5)]
+        evaluator = IncrementalEvaluator()
+
+        first = await evaluator.eval_flow_runs("checkout", run_ids)
+        async with session_factory() as session:
+            session.add(_event("p5", "run_3", "paid", 3 * SECOND_NS, total=10))
+            await session.commit()
+        second = await evaluator.eval_flow_runs("checkout", run_ids)
+        full = await eval_flow_runs("checkout", run_ids)
+
+        assert first["run_3"].status == "failed"
+        for run_id in run_ids:
+            assert second[run_id].status == full[run_id].status
+            assert second[run_id].ev_ids == full[run_id].ev_ids
+        assert evaluator.stats()["rebuilds"] == 5
+        assert evaluator.stats()["hits"] == 5
+        assert evaluator.stats()["events_applied"] == 11
+
+
+def _comparable(output) -> dict[str, Any]:
+    """Evaluation output without timing and memory fields."""
+    return {
+        **output.model_dump(),
+        "elapsed_ns": 0,
+        "peak_memory_bytes": None,
+        "exec_info": [
+            {**item, "elapsed_ns": 0} for item in output.model_dump()["exec_info"]
+        ],
+    }
+
+
+@pytest.mark.asyncio
+class TestStreamingEvalFlowRun:
+    """eval_flow_run reading the run's events in chunks."""
+
+    @pytest.fixture(autouse=True)
+    def one_event_per_chunk(self, monkeypatch):
+        monkeypatch.setattr(eval_module, "STREAMING_EVAL_CHUNK_SIZE", 1)
+
+    async def test_matches_full_evaluation(self, session_factory):
+        await _seed(session_factory)
+        async with session_factory() as session:
+            session.add(_event("c9", "run_1", "cart", 3 * SECOND_NS, total=1))
+            session.add(_event("p9", "run_1", "paid", 4 * SECOND_NS, total=1))
+            await session.commit()
+
+        for run_id in ["run_1", "run_3"]:
+            full = await eval_flow_run(run_id, "checkout", streaming=False)
+            streamed = await eval_flow_run(run_id, "checkout", streaming=True)
+
+            assert _comparable(streamed) == _comparable(full)
+            assert full.peak_memory_bytes is None
+            assert streamed.peak_memory_bytes > 0
+
+    async def test_large_runs_stream(self, session_factory, monkeypatch):
+        await _seed(session_factory)
+        monkeypatch.setattr(eval_module, "STREAMING_EVAL_MIN_EVENTS", 2)
+
+        assert (await eval_flow_run("run_1", "checkout")).peak_memory_bytes
+
+        monkeypatch.setattr(eval_module, "STREAMING_EVAL_MIN_EVENTS", 3)
+        assert (await eval_flow_run("run_1", "checkout")).peak_memory_bytes is None
+
+    async def test_memory_ceiling(self, session_factory, monkeypatch):
+        await _seed(session_factory)
+        monkeypatch.setattr(eval_module, "STREAMING_EVAL_MAX_MEMORY_MB", 0.001)
+
+        with pytest.raises(EvalMemoryExceeded):
+            await eval_flow_run("run_1", "checkout", streaming=True)
+
+    async def test_unknown_run_raises(self, session_factory):
+        await _seed(session_factory)
+
+        with pytest.raises(ValueError, match="No events found"):
+            await eval_flow_run("missing", "checkout", streaming=True)
+
+
+@pytest.mark.asyncio
+class TestLargeRunsInBulk:
+    """Bulk paths stream runs with streaming_eval_min_events events."""
+
+    @pytest_asyncio.fixture(autouse=True)
+    async def large_run_1(self, session_factory, monkeypatch):
+        await _seed(session_factory)
+        async with session_factory() as session:
+            session.add(_event("c9", "run_1", "cart", 3 * SECOND_NS, total=1))
+            session.add(_event("p9", "run_1", "paid", 4 * SECOND_NS, total=1))
+            await session.commit()
+        monkeypatch.setattr(eval_module, "STREAMING_EVAL_MIN_EVENTS", 3)
+        monkeypatch.setattr(eval_module, "STREAMING_EVAL_CHUNK_SIZE", 1)
+
+    async def test_eval_flow_runs(self, session_factory):
+        outputs = await eval_flow_runs("checkout", ["run_1", "run_2"])
+
+        assert outputs["run_1"].peak_memory_bytes
+        assert outputs["run_2"].peak_memory_bytes is None
+        for run_id, output in outputs.items():
+            full = await eval_flow_run(run_id, "checkout", streaming=False)
+            assert _comparable(output) == _comparable(full)
+
+    async def test_new_batch_event(self, session_factory):
+        evaluator = get_incremental_evaluator()
+        evaluator.clear()
+        bus = new_bus()
+
+        await bus.dispatch(NewBatchEvent(ev_ids=["c9", "p9", "p2"]))
+        await bus.stop()
+
+        async with session_factory() as session:
+            stored = {
+                output.run_id: BaseEvalOutput.model_validate(output.output)
+                for output in (await session.execute(select(EvalOutput))).scalars()
+            }
+        assert stored["run_1"].peak_memory_bytes
+        assert stored["run_2"].peak_memory_bytes is None
+        assert _comparable(stored["run_1"]) == _comparable(
+            await eval_flow_run("run_1", "checkout", streaming=False)
+        )
+        assert evaluator.stats()["streamed"] == 1
+        assert evaluator.stats()["size"] == 1
+        evaluator.clear()
+
+
+@pytest.mark.asyncio
+class TestEvalPolicy:
+    """Evaluation policies through every evaluation path."""
+
+    async def _seed_shipping(self, factory) -> None:
+        await _seed(factory)
+        async with factory() as session:
+            session.add(
+                Node(
+                    id="shipped",
+                    flow="checkout",
+                    type="assert",
+                    dep_ids=["paid"],
+                    created_at=CREATED_AT,
+                )
+            )
+            session.add(_event("s1", "run_1", "shipped", 3 * SECOND_NS))
+            await session.commit()
+
+    @pytest.mark.parametrize("policy", ["fail_fast", "fail_fast_branch"])
+    async def test_paths_agree(self, session_factory, monkeypatch, policy):
+        await self._seed_shipping(session_factory)
+        monkeypatch.setattr(eval_module, "STREAMING_EVAL_CHUNK_SIZE", 1)
+
+        full = await eval_flow_run("run_1", "checkout", streaming=False, policy=policy)
+        streamed = await eval_flow_run(
+            "run_1", "checkout", streaming=True, policy=policy
+        )
+        bulk = await eval_flow_runs("checkout", ["run_1"], policy=policy)
+        incremental = await IncrementalEvaluator().eval_flow_run(
+            "run_1", "checkout", policy=policy
+        )
+
+        assert full.status == "failed"
+        assert [item.status for item in full.exec_info] == [
+            "passed",
+            "failed",
+            "cancelled",
+        ]
+        for output in (streamed, bulk["run_1"], incremental):
+            assert _comparable(output) == _comparable(full)
+
+    async def test_default_policy_from_config(self, session_factory, monkeypatch):
+        await self._seed_shipping(session_factory)
+
+        output = await eval_flow_run("run_1", "checkout")
+        assert output.exec_info[-1].status == "passed"
+
+        monkeypatch.setattr(eval_module, "EVAL_POLICY", "fail_fast")
+        output = await eval_flow_run("run_1", "checkout")
+        assert output.exec_info[-1].status == "cancelled"
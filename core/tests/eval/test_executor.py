@@ -0,0 +1,88 @@
+"""Tests for the evaluation executor."""
+
+import asyncio
+import pickle
+import threading
+import time
+
+import pytest
+
+from src.eval.eval import MultiEvaluator
+from src.eval.executor import EvalExecutor, EvalQueueFullError
+
+
+def _current_thread_name() -> str:
+    return threading.current_thread().name
+
+
+def _sleep(seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+
+@pytest.mark.asyncio
+class TestEvalExecutor:
+    """Running jobs off the event loop with a bounded queue."""
+
+    async def test_thread_mode_runs_off_the_event_loop(self):
+        executor = EvalExecutor(mode="thread", max_workers=2)
+
+        name = await executor.run(_current_thread_name)
+
+        assert name.startswith("bu-eval")
+        assert executor.stats()["completed"] == 1
+        executor.shutdown()
+
+    async def test_inline_mode_runs_on_the_event_loop(self):
+        executor = EvalExecutor(mode="inline")
+
+        assert await executor.run(_current_thread_name) == _current_thread_name()
+
+    async def test_process_mode_runs_picklable_jobs(self):
+        executor = EvalExecutor(mode="process", max_workers=1)
+
+        try:
+            assert await executor.run(sum, [1, 2, 3]) == 6
+        finally:
+            executor.shutdown()
+
+    async def test_errors_are_raised_to_the_caller(self):
+        executor = EvalExecutor(mode="thread", max_workers=1)
+
+        with pytest.raises(ZeroDivisionError):
+            await executor.run(divmod, 1, 0)
+
+        assert executor.stats()["running"] == 0
+        executor.shutdown()
+
+    async def test_full_queue_rejects_jobs(self):
+        executor = EvalExecutor(mode="thread", max_workers=1, max_queue=1)
+
+        running = asyncio.create_task(executor.run(_sleep, 0.2))
+        await asyncio.sleep(0.01)
+        waiting = asyncio.create_task(executor.run(_sleep, 0))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(EvalQueueFullError):
+            await executor.run(_sleep, 0)
+
+        await asyncio.gather(running, waiting)
+        stats = executor.stats()
+        assert stats["rejected"] == 1
+        assert stats["completed"] == 2
+        assert stats["wait_ms_max"] >= 100
+        assert stats["queued"] == 0
+        executor.shutdown()
+
+    async def test_unknown_mode_raises(self):
+        with pytest.raises(ValueError):
+            EvalExecutor(mode="fork")
+
+
+class TestMultiEvaluatorPickling:
+    """MultiEvaluator crosses process boundaries for process pools."""
+
+    def test_pickles_to_a_fresh_evaluator(self):
+        evaluator = pickle.loads(pickle.dumps(MultiEvaluator()))
+
+        assert isinstance(evaluator, MultiEvaluator)
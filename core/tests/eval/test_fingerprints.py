@@ -0,0 +1,84 @@
+"""Tests for node definition fingerprints."""
+
+from datetime import UTC, datetime
+from typing import Any
+
+from src.eval.fingerprints import NodeFingerprintCache, get_node_fingerprint_cache
+from src.eval.plan import get_flow_plan_cache, node_fingerprint
+from src.models import Expr, Node
+
+CREATED_AT = datetime(2026, 1, 1, tzinfo=UTC)
+
+
+def _node(node_id: str, flow: str = "checkout", **kwargs: Any) -> Node:
+    kwargs.setdefault("source", "code")
+    node = Node(id=node_id, flow=flow, created_at=CREATED_AT, **kwargs)
+    node.fingerprint = node_fingerprint(node)
+    return node
+
+
+class TestNodeFingerprint:
+    """node_fingerprint covers the fields set by the SDKs."""
+
+    def test_depends_on_sdk_fields_only(self):
+        base = _node("cart", dep_ids=["start"])
+
+        assert node_fingerprint(base) == _node("cart", dep_ids=["start"]).fingerprint
+        assert (
+            node_fingerprint(base)
+            == _node("cart", dep_ids=["start"], source="manual").fingerprint
+        )
+        for changed in [
+            _node("cart", dep_ids=["start", "login"]),
+            _node("cart", dep_ids=["start"], description="Cart created"),
+            _node("cart", dep_ids=["start"], additional_meta={"team": "growth"}),
+            _node(
+                "cart",
+                dep_ids=["start"],
+                validator=Expr(engine="python", script="data['n'] > 0"),
+            ),
+        ]:
+            assert changed.fingerprint != base.fingerprint
+
+
+class TestNodeFingerprintCache:
+    """NodeFingerprintCache.stale, store and invalidate."""
+
+    def test_stored_fingerprints_are_not_stale(self):
+        cache = NodeFingerprintCache()
+        cart, paid = _node("cart"), _node("paid")
+
+        assert cache.stale([cart, paid]) == [cart, paid]
+        cache.store([cart])
+
+        assert cache.stale([cart, paid]) == [paid]
+        changed = _node("cart", description="Cart created")
+        assert cache.stale([changed]) == [changed]
+        assert cache.stats() == {"size": 1, "hits": 1, "misses": 4, "invalidations": 0}
+
+    def test_fingerprints_expire(self):
+        cache = NodeFingerprintCache(max_age_seconds=0)
+        cart = _node("cart")
+        cache.store([cart])
+
+        assert cache.stale([cart]) == [cart]
+
+    def test_size_is_bounded(self):
+        cache = NodeFingerprintCache(max_size=2)
+        nodes = [_node(f"n{i}") for i in range(3)]
+        cache.store(nodes)
+
+        assert cache.stale(nodes) == nodes[:1]
+        assert cache.stats()["size"] == 2
+
+    def test_node_writes_invalidate_their_flow(self):
+        cache = get_node_fingerprint_cache()
+        cache.clear()
+        cart, refund = _node("cart"), _node("refund_start", flow="refund")
+        cache.store([cart, refund])
+
+        get_flow_plan_cache().invalidate("checkout")
+
+        assert cache.stale([cart, refund]) == [cart]
+        assert cache.stats()["invalidations"] == 1
+        cache.clear()
@@ -0,0 +1,256 @@
+"""Tests for incremental flow evaluation."""
+
+from datetime import UTC, datetime
+from typing import Any
+
+import pytest
+
+from src.domain.incremental import RunState
+from src.eval.eval import eval_flow_run
+from src.eval.incremental import IncrementalEvaluator
+from src.eval.plan import get_flow_plan_cache
+from src.models import Event, Expr, Node, NodeCondition
+from tests.helpers import make_event
+
+SECOND_NS = 1_000_000_000
+CREATED_AT = datetime(2026, 1, 1, tzinfo=UTC)
+
+
+def _nodes() -> list[Node]:
+    return [
+        Node(id="cart", flow="checkout", type="act", created_at=CREATED_AT),
+        Node(
+            id="payment",
+            flow="checkout",
+            type="act",
+            dep_ids=["cart"],
+            filter=Expr(engine="python", script="data['ok']"),
+            created_at=CREATED_AT,
+        ),
+        Node(
+            id="total_matches",
+            flow="checkout",
+            type="assert",
+            dep_ids=["payment"],
+            validator=Expr(engine="js", script="data.total === ctx.data.total"),
+            conditions=[NodeCondition(timeout_ms=60_000)],
+            created_at=CREATED_AT,
+        ),
+        Node(
+            id="email",
+            flow="checkout",
+            type="act",
+            dep_ids=["cart"],
+            created_at=CREATED_AT,
+        ),
+    ]
+
+
+def _comparable(output) -> dict[str, Any]:
+    """Evaluation output without timing fields."""
+    dumped: dict[str, Any] = output.model_dump()
+    dumped.pop("elapsed_ns")
+    for item in dumped["exec_info"]:
+        item.pop("elapsed_ns")
+        if item["message"] and item["message"].startswith("Waiting for event"):
+            item["message"] = "Waiting for event"
+    return dumped
+
+
+async def _add(factory, *objects) -> None:
+    async with factory() as session:
+        session.add_all(objects)
+        await session.commit()
+
+
+@pytest.mark.asyncio
+class TestIncrementalEvaluator:
+    """IncrementalEvaluator against a real (in-memory) database."""
+
+    async def test_matches_full_evaluation_batch_by_batch(self, session_factory):
+        """Test every incremental result equals a full evaluation."""
+        now = 1_000 * SECOND_NS
+        evaluator = IncrementalEvaluator()
+        await _add(session_factory, *_nodes())
+
+        batches = [
+            [make_event("e1", "cart", now, total=10)],
+            [make_event("e2", "payment", now + SECOND_NS, ok=False, total=99)],
+            [
+                make_event("e3", "payment", now + 2 * SECOND_NS, ok=True, total=10),
+                make_event("e4", "email", now + SECOND_NS),
+            ],
+            [make_event("e5", "total_matches", now + 3 * SECOND_NS, total=10)],
+        ]
+
+        for batch in batches:
+            await _add(session_factory, *batch)
+
+            incremental = await evaluator.eval_flow_run("run_1", "checkout")
+            full = await eval_flow_run("run_1", "checkout")
+
+            assert _comparable(incremental) == _comparable(full)
+
+        assert incremental.status == "passed"
+        assert evaluator.stats()["rebuilds"] == 1
+        assert evaluator.stats()["hits"] == 3
+        assert evaluator.stats()["events_applied"] == 5
+
+    async def test_only_affected_nodes_are_reevaluated(self, session_factory):
+        """Test a new event only re-runs expressions at or below its node."""
+        calls: list[str] = []
+        evaluator = IncrementalEvaluator()
+        inner = evaluator.evaluator
+
+        class Recording:
+            def evaluate(self, expr, data, ctx):
+                calls.append(expr.script)
+                return inner.evaluate(expr, data, ctx)
+
+            def evaluate_many(self, expr, items, ctx):
+                calls.append(expr.script)
+                return inner.evaluate_many(expr, items, ctx)
+
+        evaluator.evaluator = Recording()
+
+        await _add(
+            session_factory,
+            *_nodes(),
+            make_event("e1", "cart", SECOND_NS, total=10),
+            make_event("e2", "payment", 2 * SECOND_NS, ok=True, total=10),
+            make_event("e3", "total_matches", 3 * SECOND_NS, total=10),
+        )
+        await evaluator.eval_flow_run("run_1", "checkout")
+        assert len(calls) == 2
+
+        calls.clear()
+        await _add(session_factory, make_event("e4", "email", 4 * SECOND_NS))
+        await evaluator.eval_flow_run("run_1", "checkout")
+        assert calls == []
+
+        calls.clear()
+        await _add(
+            session_factory,
+            make_event("e5", "total_matches", 5 * SECOND_NS, total=11),
+        )
+        result = await evaluator.eval_flow_run("run_1", "checkout")
+        assert calls == ["data.total === ctx.data.total"]
+        assert result.status == "failed"
+
+    async def test_node_definition_change_rebuilds_state(self, session_factory):
+        """Test changing a node definition invalidates the cached state."""
+        evaluator = IncrementalEvaluator()
+        await _add(
+            session_factory,
+            *_nodes(),
+            make_event("e1", "cart", SECOND_NS, total=10),
+            make_event("e2", "payment", 2 * SECOND_NS, ok=False, total=10),
+        )
+        result = await evaluator.eval_flow_run("run_1", "checkout")
+        assert "e2" not in result.ev_ids
+
+        async with session_factory() as session:
+            node = await session.get(Node, "payment")
+            node.filter = Expr(engine="python", script="not data['ok']")
+            session.add(node)
+            await session.commit()
+        get_flow_plan_cache().invalidate("checkout")
+
+        result = await evaluator.eval_flow_run("run_1", "checkout")
+        assert "e2" in result.ev_ids
+        assert evaluator.stats()["rebuilds"] == 2
+
+    async def test_evicted_state_is_restored_from_snapshot(
+        self, session_factory, tmp_path
+    ):
+        """Test states evicted from memory are reloaded from disk."""
+        evaluator = IncrementalEvaluator(max_runs=1, snapshot_dir=tmp_path)
+        await _add(
+            session_factory,
+            *_nodes(),
+            make_event("e1", "cart", SECOND_NS, total=10),
+            Event(
+                id="other",
+                run_id="run_2",
+                flow="checkout",
+                node_id="cart",
+                data={},
+                ts=SECOND_NS,
+            ),
+        )
+
+        first = await evaluator.eval_flow_run("run_1", "checkout")
+        await evaluator.eval_flow_run("run_2", "checkout")  # evicts run_1
+        assert evaluator.stats()["evictions"] == 1
+        assert len(list(tmp_path.iterdir())) == 1
+
+        again = await evaluator.eval_flow_run("run_1", "checkout")
+        assert evaluator.stats()["snapshot_loads"] == 1
+        assert _comparable(again) == _comparable(first)
+
+    async def test_event_count_bounds_memory(self, session_factory):
+        """Test states are evicted by event count and large runs are not kept."""
+        evaluator = IncrementalEvaluator(max_events=2)
+        await _add(
+            session_factory,
+            *_nodes(),
+            make_event("e1", "cart", SECOND_NS, total=10),
+            Event(
+                id="other",
+                run_id="run_2",
+                flow="checkout",
+                node_id="cart",
+                data={},
+                ts=SECOND_NS,
+            ),
+        )
+
+        await evaluator.eval_flow_run("run_1", "checkout")
+        await evaluator.eval_flow_run("run_2", "checkout")
+        assert evaluator.stats()["events"] == 2
+
+        await _add(
+            session_factory,
+            make_event("e2", "payment", 2 * SECOND_NS, ok=True, total=10),
+        )
+        await evaluator.eval_flow_run("run_1", "checkout")  # evicts run_2
+        assert evaluator.stats()["evictions"] == 1
+        assert evaluator.stats()["events"] == 2
+
+        await _add(session_factory, make_event("e3", "email", 3 * SECOND_NS))
+        result = await evaluator.eval_flow_run("run_1", "checkout")
+        assert _comparable(result) == _comparable(
+            await eval_flow_run("run_1", "checkout")
+        )
+        assert evaluator.stats()["oversized"] == 1
+        assert evaluator.stats()["size"] == 0
+        assert evaluator.stats()["events"] == 0
+
+        await evaluator.eval_flow_run("run_1", "checkout")
+        assert evaluator.stats()["rebuilds"] == 3
+
+    async def test_no_events_raises(self, session_factory):
+        """Test evaluating an unknown run raises like eval_flow_run."""
+        await _add(session_factory, *_nodes())
+
+        with pytest.raises(ValueError, match="No events found"):
+            await IncrementalEvaluator().eval_flow_run("missing", "checkout")
+
+
+class TestRunState:
+    """RunState serialization."""
+
+    def test_round_trip(self):
+        state = RunState("fp")
+        cart = make_event("e1", "cart", SECOND_NS, total=10)
+        state.events = {"e1": cart}
+        state.events_by_node = {"cart": [cart]}
+        state.matched_by_node = {"cart": [cart]}
+        state.cancelled = {"paid"}
+
+        restored = RunState.from_dict(state.to_dict())
+
+        assert restored.fingerprint == "fp"
+        assert restored.events_by_node["cart"][0].data == {"total": 10}
+        assert restored.matched_by_node["cart"][0] is restored.events["e1"]
+        assert restored.cancelled == {"paid"}
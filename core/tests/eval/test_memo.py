@@ -0,0 +1,178 @@
+"""Tests for memoized filter/validator results."""
+
+from datetime import UTC, datetime
+
+import pytest
+
+from src.eval.eval import MultiEvaluator, evaluate_events
+from src.eval.memo import ENTRY_OVERHEAD_BYTES, ResultMemo
+from src.eval.plan import FlowPlan, get_flow_plan_cache
+from src.execution.profiling import ExprProfiler
+from src.models import Event, Expr, Node
+from tests.helpers import make_event
+
+CREATED_AT = datetime(2026, 1, 1, tzinfo=UTC)
+
+
+def _nodes(validator: str = "data['total'] == ctx['data']['total']") -> list[Node]:
+    return [
+        Node(id="cart", flow="checkout", created_at=CREATED_AT),
+        Node(
+            id="payment",
+            flow="checkout",
+            dep_ids=["cart"],
+            filter=Expr(engine="python", script="data['ok']"),
+            validator=Expr(engine="python", script=validator),
+            created_at=CREATED_AT,
+        ),
+    ]
+
+
+def _evaluated_items(plan: FlowPlan, events: list[Event], memo: ResultMemo) -> int:
+    """Evaluate a run and return how many items expressions actually ran on."""
+    profiler = ExprProfiler(enabled=True)
+    evaluate_events(
+        events,
+        plan.flow_graph,
+        plan.layers,
+        MultiEvaluator(profiler=profiler, memo=memo),
+    )
+    return sum(profile["items"] for profile in profiler.report())
+
+
+class TestResultMemo:
+    """Bounded storage of expression results."""
+
+    def test_get_and_put(self):
+        memo = ResultMemo()
+        key = ("checkout", "abc:filter", "e1", "")
+
+        assert memo.get_many([key]) == [None]
+        memo.put_many([(key, False)])
+
+        assert memo.get_many([key]) == [False]
+        assert memo.stats()["hits"] == 1
+        assert memo.stats()["misses"] == 1
+
+    def test_evicts_least_recently_used_past_budget(self):
+        memo = ResultMemo(max_bytes=2 * (ENTRY_OVERHEAD_BYTES + 100))
+        keys = [("checkout", "abc:filter", f"e{i}", "") for i in range(3)]
+
+        memo.put_many([(keys[0], True), (keys[1], True)])
+        memo.get_many([keys[0]])
+        memo.put_many([(keys[2], True)])
+
+        assert memo.get_many(keys) == [True, None, True]
+        assert memo.stats()["evictions"] == 1
+
+    def test_invalidate_drops_only_that_flow(self):
+        memo = ResultMemo()
+        memo.put_many(
+            [
+                (("checkout", "abc:filter", "e1", ""), True),
+                (("signup", "def:filter", "e2", ""), True),
+            ]
+        )
+
+        memo.invalidate("checkout")
+
+        assert memo.stats()["size"] == 1
+        assert memo.stats()["invalidations"] == 1
+
+    def test_zero_budget_disables_it(self):
+        memo = ResultMemo(max_bytes=0)
+        memo.put_many([(("checkout", "abc:filter", "e1", ""), True)])
+
+        assert not memo.enabled
+        assert memo.stats()["size"] == 0
+
+
+class TestMemoizedEvaluation:
+    """Re-evaluating a run only runs expressions on new events."""
+
+    def test_reevaluation_only_evaluates_new_events(self):
+        plan = FlowPlan("checkout", _nodes())
+        memo = ResultMemo()
+        events = [
+            make_event("e1", "cart", 1, total=10),
+            make_event("e2", "payment", 2, ok=True, total=10),
+        ]
+
+        first = evaluate_events(events, plan.flow_graph, plan.layers, MultiEvaluator())
+        assert _evaluated_items(plan, events, memo) == 2  # filter + validator
+        assert _evaluated_items(plan, events, memo) == 0
+
+        events.append(make_event("e3", "payment", 3, ok=True, total=10))
+        assert _evaluated_items(plan, events, memo) == 2
+
+        again = evaluate_events(
+            events[:2], plan.flow_graph, plan.layers, MultiEvaluator(memo=memo)
+        )
+        assert again.status == first.status == "passed"
+
+    def test_new_upstream_events_are_reevaluated(self):
+        plan = FlowPlan("checkout", _nodes())
+        memo = ResultMemo()
+        events = [
+            make_event("e1", "cart", 1, total=10),
+            make_event("e2", "payment", 2, ok=True, total=10),
+        ]
+        _evaluated_items(plan, events, memo)
+
+        # Same payment event, different upstream context
+        events.append(make_event("e0", "cart", 0, total=11))
+        assert _evaluated_items(plan, events, memo) == 2
+
+    def test_node_definition_change_is_not_served_from_memo(self):
+        memo = ResultMemo()
+        events = [
+            make_event("e1", "cart", 1, total=10),
+            make_event("e2", "payment", 2, ok=True, total=10),
+        ]
+        _evaluated_items(FlowPlan("checkout", _nodes()), events, memo)
+
+        plan = FlowPlan("checkout", _nodes(validator="data['total'] > 100"))
+        output = evaluate_events(
+            events, plan.flow_graph, plan.layers, MultiEvaluator(memo=memo)
+        )
+
+        assert output.status == "failed"
+
+    def test_errors_are_not_memoized(self):
+        plan = FlowPlan("checkout", _nodes(validator="data['missing']"))
+        memo = ResultMemo()
+        events = [
+            make_event("e1", "cart", 1, total=10),
+            make_event("e2", "payment", 2, ok=True, total=10),
+        ]
+
+        assert _evaluated_items(plan, events, memo) == 2
+        assert _evaluated_items(plan, events, memo) == 1
+
+
+@pytest.mark.asyncio
+class TestPlanCacheInvalidation:
+    """Compiling new node definitions drops the flow's memoized results."""
+
+    async def test_changed_definitions_invalidate_memo(
+        self, session_factory, monkeypatch
+    ):
+        memo = ResultMemo()
+        monkeypatch.setattr("src.eval.plan.get_result_memo", lambda: memo)
+        memo.put_many([(("checkout", "abc:filter", "e1", ""), True)])
+        cache = get_flow_plan_cache()
+
+        async with session_factory() as session:
+            session.add_all(_nodes())
+            await session.commit()
+            await cache.get("checkout", session)
+            assert memo.stats()["size"] == 1
+
+            payment = await session.get(Node, "payment")
+            assert payment is not None
+            payment.validator = {"engine": "python", "script": "True"}
+            await session.commit()
+            cache.invalidate("checkout")
+            await cache.get("checkout", session)
+
+        assert memo.stats()["size"] == 0
@@ -129,12 +129,18 @@ class TestMixedEngines:
 class TestUnknownEngine:
     """Test handling of unknown engines."""
 
-    def test_unknown_engine_cel(self, evaluator):
-        """Test that CEL engine (not yet implemented) returns False."""
-        expr = Expr(engine="cel", script="data.amount > 0")
+    def test_unknown_engine(self, evaluator):
+        """Test that an unknown engine returns False."""
+        expr = Expr.model_construct(engine="lua", script="data.amount > 0")
         result = evaluator.evaluate(expr, {"amount": 100}, {})
         assert result is False
 
+    def test_cel_engine(self, evaluator):
+        """Test that CEL expressions are routed to the CEL evaluator."""
+        expr = Expr(engine="cel", script="data.amount > 0")
+        assert evaluator.evaluate(expr, {"amount": 100}, {}) is True
+        assert evaluator.evaluate(expr, {"amount": 0}, {}) is False
+
 
 class TestContextHandling:
     """Test context handling across engines."""
@@ -265,3 +271,53 @@ class TestErrorPropagation:
         expr = Expr(engine="js", script="data.amount > >")  # Invalid syntax
         result = evaluator.evaluate(expr, {"amount": 100}, {})
         assert result is False
+
+
+class TestEvaluateMany:
+    """Test batched evaluation over many data items."""
+
+    @pytest.mark.parametrize(
+        "engine,script",
+        [
+            ("python", "data['amount'] > ctx['data']['min']"),
+            ("js", "data.amount > ctx.data.min"),
+        ],
+    )
+    def test_matches_individual_evaluation(self, evaluator, engine, script):
+        """Test batched results equal per-item evaluate() results."""
+        expr = Expr(engine=engine, script=script)
+        ctx = {"deps": [{"flow": "test", "id": "node1", "data": {"min": 10}}]}
+        ctx["data"] = ctx["deps"][0]["data"]
+        items = [{"amount": 5}, {"amount": 50}, {}, {"amount": 11}, {"amount": "x"}]
+
+        expected = [evaluator.evaluate(expr, item, ctx) for item in items]
+        assert evaluator.evaluate_many(expr, items, ctx) == expected
+
+    @pytest.mark.parametrize(
+        "engine,script",
+        [("python", "data['amount']"), ("js", "data.amount")],
+    )
+    def test_non_boolean_results_are_false(self, evaluator, engine, script):
+        """Test non-boolean results are rejected per item."""
+        expr = Expr(engine=engine, script=script)
+        items = [{"amount": True}, {"amount": 1}]
+        assert evaluator.evaluate_many(expr, items, {}) == [True, False]
+
+    @pytest.mark.parametrize(
+        "engine,script",
+        [("python", "data['amount' > 0"), ("js", "data.amount > >")],
+    )
+    def test_syntax_error(self, evaluator, engine, script):
+        """Test syntax errors yield False for every item."""
+        expr = Expr(engine=engine, script=script)
+        assert evaluator.evaluate_many(expr, [{}, {}], {}) == [False, False]
+
+    def test_empty_items(self, evaluator):
+        """Test evaluating no items returns no results."""
+        expr = Expr(engine="js", script="data.amount > 0")
+        assert evaluator.evaluate_many(expr, [], {}) == []
+
+    def test_unknown_engine(self, evaluator):
+        """Test unknown engines return False for every item."""
+        expr = Expr.model_construct(engine="lua", script="data.amount > 0")
+        assert evaluator.evaluate_many(expr, [{}, {}], {}) == [False, False]
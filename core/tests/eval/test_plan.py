@@ -0,0 +1,128 @@
+"""Tests for compiled flow plans and the flow plan cache."""
+
+from datetime import UTC, datetime
+
+import pytest
+import pytest_asyncio
+
+from src.eval.plan import FlowPlan, FlowPlanCache, node_definition
+from src.models import Expr, Node
+
+CREATED_AT = datetime(2026, 1, 1, tzinfo=UTC)
+
+
+def _nodes() -> list[Node]:
+    return [
+        Node(id="a", flow="checkout", created_at=CREATED_AT),
+        Node(
+            id="b",
+            flow="checkout",
+            dep_ids=["a"],
+            filter=Expr(engine="python", script="data['ok']"),
+            created_at=CREATED_AT,
+        ),
+        Node(id="c", flow="checkout", dep_ids=["b"], created_at=CREATED_AT),
+        Node(id="d", flow="checkout", dep_ids=["a"], created_at=CREATED_AT),
+    ]
+
+
+@pytest_asyncio.fixture
+async def seeded_factory(session_factory):
+    """Database with the test nodes."""
+    async with session_factory() as session:
+        session.add_all(_nodes())
+        await session.commit()
+
+    return session_factory
+
+
+class TestFlowPlan:
+    """Compiling a plan from node definitions."""
+
+    def test_compiles_graph_layers_and_indexes(self):
+        plan = FlowPlan("checkout", _nodes())
+
+        assert plan.layers[0] == ["a"]
+        assert sorted(plan.layers[1]) == ["b", "d"]
+        assert plan.layers[2] == ["c"]
+        assert plan.deps["c"] == ["b"]
+        assert sorted(plan.children["a"]) == ["b", "d"]
+
+    def test_expressions_are_parsed_on_copies(self):
+        nodes = _nodes()
+        plan = FlowPlan("checkout", nodes)
+
+        assert isinstance(plan.flow_graph["nodes"]["b"].filter, Expr)
+        assert plan.flow_graph["nodes"]["b"] is not nodes[1]
+
+    def test_subgraph_is_memoized(self):
+        plan = FlowPlan("checkout", _nodes())
+
+        flow_graph, layers = plan.subgraph("b")
+
+        assert layers == [["b"], ["c"]]
+        assert flow_graph["nodes"]["b"].filter is None
+        assert plan.flow_graph["nodes"]["b"].filter is not None
+        assert plan.subgraph("b")[0] is flow_graph
+
+    def test_unknown_subgraph_start_raises(self):
+        with pytest.raises(ValueError):
+            FlowPlan("checkout", _nodes()).subgraph("missing")
+
+    def test_fingerprint_ignores_raw_vs_parsed(self):
+        raw = _nodes()
+        parsed = _nodes()
+        for node in parsed:
+            node.ensure()
+
+        assert FlowPlan("checkout", raw).fingerprint == (
+            FlowPlan("checkout", parsed).fingerprint
+        )
+        assert [node_definition(n) for n in raw] == [node_definition(n) for n in parsed]
+
+
+@pytest.mark.asyncio
+class TestFlowPlanCache:
+    """Caching and invalidation of plans."""
+
+    async def test_plan_is_reused_until_invalidated(self, seeded_factory):
+        cache = FlowPlanCache(revalidate_seconds=60)
+
+        async with seeded_factory() as session:
+            first = await cache.get("checkout", session)
+            second = await cache.get("checkout", session)
+
+            cache.invalidate("checkout")
+            third = await cache.get("checkout", session)
+
+        assert first is second
+        assert third is not first
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["compiles"] == 2
+        assert cache.stats()["invalidations"] == 1
+
+    async def test_revalidation_detects_writes_from_other_processes(
+        self, seeded_factory
+    ):
+        cache = FlowPlanCache(revalidate_seconds=0)
+
+        async with seeded_factory() as session:
+            first = await cache.get("checkout", session)
+            assert await cache.get("checkout", session) is first
+            assert cache.stats()["revalidations"] == 1
+
+            # Written without going through this process' cache
+            node = await session.get(Node, "d")
+            node.dep_ids = ["c"]
+            node.updated_at = datetime(2026, 1, 2, tzinfo=UTC)
+            session.add(node)
+            await session.commit()
+
+            plan = await cache.get("checkout", session)
+
+        assert plan is not first
+        assert plan.layers[-1] == ["d"]
+
+    async def test_unknown_flow_returns_none(self, seeded_factory):
+        async with seeded_factory() as session:
+            assert await FlowPlanCache().get("refund", session) is None
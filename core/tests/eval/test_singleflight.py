@@ -0,0 +1,162 @@
+"""Tests for single-flight coalescing of run evaluations."""
+
+import asyncio
+from datetime import UTC, datetime
+
+import pytest
+
+from src.eval.eval import eval_flow_run, eval_flow_runs
+from src.eval.incremental import IncrementalEvaluator
+from src.eval.singleflight import SingleFlight, get_eval_flights
+from src.models import Event, Node
+
+
+class Recorder:
+    """Evaluation function that records its calls and waits to be released."""
+
+    def __init__(self) -> None:
+        self.calls: list[list[str]] = []
+        self.release = asyncio.Event()
+
+    async def __call__(self, keys: list[str]) -> dict[str, str | BaseException]:
+        self.calls.append(keys)
+        call = len(self.calls)
+        await self.release.wait()
+        return {key: f"{key}#{call}" for key in keys if key != "missing"}
+
+
+@pytest.mark.asyncio
+class TestSingleFlight:
+    """SingleFlight.run and run_many."""
+
+    async def test_calls_during_a_flight_share_one_follow_up(self):
+        flights: SingleFlight[str, str] = SingleFlight()
+        fn = Recorder()
+
+        first = asyncio.create_task(flights.run_many(["a"], fn))
+        await asyncio.sleep(0)
+        later = [asyncio.create_task(flights.run_many(["a"], fn)) for _ in range(5)]
+        await asyncio.sleep(0)
+        fn.release.set()
+
+        assert await first == {"a": "a#1"}
+        assert [await task for task in later] == [{"a": "a#2"}] * 5
+        assert fn.calls == [["a"], ["a"]]
+        assert flights.stats() == {
+            "in_flight": 0,
+            "flights": 2,
+            "coalesced": 5,
+            "follow_ups": 1,
+        }
+
+    async def test_new_keys_are_evaluated_together(self):
+        flights: SingleFlight[str, str] = SingleFlight()
+        fn = Recorder()
+
+        first = asyncio.create_task(flights.run_many(["a"], fn))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(flights.run_many(["a", "b", "missing"], fn))
+        await asyncio.sleep(0)
+        assert flights.stats()["in_flight"] == 3
+        fn.release.set()
+
+        assert await first == {"a": "a#1"}
+        # b and missing start right away; a waits for its follow-up
+        assert await second == {"a": "a#3", "b": "b#2"}
+        assert fn.calls == [["a"], ["b", "missing"], ["a"]]
+
+    async def test_errors_are_shared(self):
+        flights: SingleFlight[str, str] = SingleFlight()
+        calls = 0
+
+        async def fail() -> str:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0)
+            raise ValueError("no events")
+
+        results = await asyncio.gather(
+            flights.run("a", fail), flights.run("a", fail), return_exceptions=True
+        )
+
+        assert [type(result) for result in results] == [ValueError, ValueError]
+        assert calls == 2
+
+    async def test_per_key_errors_are_returned(self):
+        flights: SingleFlight[str, str] = SingleFlight()
+
+        async def fail(keys: list[str]) -> dict[str, str | BaseException]:
+            return {key: KeyError(key) for key in keys}
+
+        results = await flights.run_many(["a", "b"], fail)
+
+        assert list(results) == ["a", "b"]
+        assert all(isinstance(result, KeyError) for result in results.values())
+        with pytest.raises(KeyError):
+            await flights.run("a", self._raise_key_error)
+
+    @staticmethod
+    async def _raise_key_error() -> str:
+        raise KeyError("a")
+
+    async def test_cancelled_callers_dont_cancel_the_flight(self):
+        flights: SingleFlight[str, str] = SingleFlight()
+        fn = Recorder()
+
+        first = asyncio.create_task(flights.run_many(["a"], fn))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(flights.run_many(["a"], fn))
+        await asyncio.sleep(0)
+        first.cancel()
+        fn.release.set()
+
+        assert await second == {"a": "a#2"}
+        assert first.cancelled()
+
+
+CREATED_AT = datetime(2026, 1, 1, tzinfo=UTC)
+
+
+async def _seed(factory) -> None:
+    async with factory() as session:
+        session.add(Node(id="cart", flow="checkout", type="act", created_at=CREATED_AT))
+        for i in range(3):
+            session.add(
+                Event(
+                    id=f"c{i}",
+                    run_id=f"run_{i}",
+                    flow="checkout",
+                    node_id="cart",
+                    data={},
+                    ts=1,
+                )
+            )
+        await session.commit()
+
+
+@pytest.mark.asyncio
+class TestCoalescedEvaluations:
+    """Concurrent evaluations of the same run through every entry point."""
+
+    async def test_concurrent_callers_share_evaluations(self, session_factory):
+        await _seed(session_factory)
+        before = get_eval_flights().stats()
+
+        results = await asyncio.gather(
+            eval_flow_run("run_0", "checkout"),
+            eval_flow_run("run_0", "checkout"),
+            eval_flow_run("run_0", "checkout"),
+            eval_flow_runs("checkout", ["run_0", "run_1"]),
+            IncrementalEvaluator().eval_flow_runs("checkout", ["run_1", "run_2"]),
+        )
+
+        after = get_eval_flights().stats()
+        # The 2nd and 3rd calls share run_0's follow-up (with the bulk call)
+        assert results[1] is results[2] is results[3]["run_0"]
+        assert results[0].status == "passed"
+        assert set(results[4]) == {"run_1", "run_2"}
+        # run_0, run_1, run_2, then the follow-ups of run_0 and run_1
+        assert after["flights"] - before["flights"] == 5
+        assert after["follow_ups"] - before["follow_ups"] == 2
+        assert after["coalesced"] - before["coalesced"] == 4
+        assert after["in_flight"] == 0
@@ -0,0 +1,159 @@
+"""Tests for the deadline scheduler."""
+
+import asyncio
+import time
+from datetime import UTC, datetime
+
+import pytest
+import pytest_asyncio
+from sqlmodel import select
+
+import src.events.handlers as handlers
+from src.eval import get_incremental_evaluator
+from src.events.handlers import evaluate_runs, handle_due_deadlines
+from src.events.scheduler import DeadlineScheduler
+from src.models import EvalDeadline, EvalOutput, Event, Node
+
+CREATED_AT = datetime(2026, 1, 1, tzinfo=UTC)
+MS_NS = 1_000_000
+
+
+@pytest_asyncio.fixture
+async def scheduler(session_factory, monkeypatch):
+    """Scheduler used by the handlers, stopped after the test."""
+    scheduler = DeadlineScheduler(lease_seconds=60)
+    monkeypatch.setattr(handlers, "get_deadline_scheduler", lambda: scheduler)
+    get_incremental_evaluator().clear()
+
+    yield scheduler
+
+    await scheduler.stop()
+
+
+async def _wait_for(condition, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not await condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Condition not met in time")
+        await asyncio.sleep(0.01)
+
+
+async def _deadlines(factory) -> list[EvalDeadline]:
+    async with factory() as session:
+        return list((await session.execute(select(EvalDeadline))).scalars().all())
+
+
+@pytest.mark.asyncio
+class TestDeadlineScheduler:
+    """Re-evaluating runs when a wait times out."""
+
+    async def test_run_is_failed_when_wait_times_out(self, session_factory, scheduler):
+        async with session_factory() as session:
+            session.add_all(
+                [
+                    Node(id="cart", flow="checkout", created_at=CREATED_AT),
+                    Node(
+                        id="paid",
+                        flow="checkout",
+                        type="assert",
+                        dep_ids=["cart"],
+                        conditions=[{"timeout_ms": 200}],
+                        created_at=CREATED_AT,
+                    ),
+                ]
+            )
+            session.add(
+                Event(
+                    id="c1",
+                    run_id="run_1",
+                    flow="checkout",
+                    node_id="cart",
+                    ts=time.time_ns(),
+                )
+            )
+            await session.commit()
+
+        handled = asyncio.Event()
+
+        async def on_due(flow: str, run_ids: list[str]) -> None:
+            await handle_due_deadlines(flow, run_ids)
+            handled.set()
+
+        await scheduler.start(on_due)
+        first = await evaluate_runs("checkout", ["run_1"])
+
+        assert first["run_1"].status == "running"
+        assert [d.deadline_ns for d in await _deadlines(session_factory)] == [
+            first["run_1"].deadline_ns
+        ]
+
+        # Don't read while the handler's transaction is open: the in-memory
+        # database shares one connection between sessions
+        await asyncio.wait_for(handled.wait(), 2.0)
+
+        async with session_factory() as session:
+            outputs = (await session.execute(select(EvalOutput))).scalars().all()
+        statuses = sorted(output.output["status"] for output in outputs)
+
+        assert statuses == ["failed", "running"]
+        assert await _deadlines(session_factory) == []
+        assert scheduler.stats()["claimed"] == 1
+        assert scheduler.stats()["lag_ms_last"] < 1000
+
+    async def test_stored_deadlines_are_loaded_on_start(
+        self, session_factory, scheduler
+    ):
+        due: list[tuple[str, list[str]]] = []
+
+        async def on_due(flow: str, run_ids: list[str]) -> None:
+            due.append((flow, run_ids))
+
+        async with session_factory() as session:
+            session.add(
+                EvalDeadline(
+                    flow="checkout", run_id="run_1", deadline_ns=time.time_ns()
+                )
+            )
+            await session.commit()
+
+        await scheduler.start(on_due)
+
+        async def fired() -> bool:
+            return bool(due)
+
+        await _wait_for(fired)
+
+        assert due == [("checkout", ["run_1"])]
+        # Claimed: moved forward by the lease until on_due reschedules it
+        [stored] = await _deadlines(session_factory)
+        assert stored.deadline_ns > time.time_ns() + 30_000 * MS_NS
+
+    async def test_deadline_claimed_elsewhere_is_skipped(
+        self, session_factory, scheduler: DeadlineScheduler
+    ):
+        due: list[tuple[str, list[str]]] = []
+
+        async def on_due(flow: str, run_ids: list[str]) -> None:
+            due.append((flow, run_ids))
+
+        await scheduler.start(on_due)
+        deadline_ns = time.time_ns() + 50 * MS_NS
+
+        async with session_factory() as session:
+            await scheduler.schedule("checkout", {"run_1": deadline_ns}, session)
+            await session.commit()
+
+        # Another process claims it first
+        async with session_factory() as session:
+            stored = await session.get(EvalDeadline, ("checkout", "run_1"))
+            stored.deadline_ns = deadline_ns + 60_000 * MS_NS
+            await session.commit()
+
+        async def dropped() -> bool:
+            return scheduler.stats()["pending"] == 0
+
+        await _wait_for(dropped)
+
+        assert due == []
+        assert scheduler.stats()["fired"] == 1
+        assert scheduler.stats()["claimed"] == 0
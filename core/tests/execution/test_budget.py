@@ -0,0 +1,292 @@
+"""Tests for expression execution budgets."""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime
+from typing import Any
+
+import pytest
+
+from src.domain.evaluation import ExprBudgetExceeded, map_layer
+from src.domain.incremental import RunState, apply_events
+from src.eval.eval import MultiEvaluator, evaluate_events
+from src.eval.plan import FlowPlan
+from src.execution.budget import (
+    ExprBudget,
+    ExprLimits,
+    current_limits,
+    evaluation_budget,
+    flow_budget,
+    get_budget_metrics,
+)
+from src.execution.cel_eval import CELEvaluator
+from src.execution.js_eval import JSEvaluator
+from src.execution.python_eval import PythonEvaluator
+from src.models import Event, Expr, ExprEngine, Node
+
+CREATED_AT = datetime(2026, 1, 1, tzinfo=UTC)
+
+# Runs for seconds over ``XS``
+SLOW_PYTHON = "[b for a in data['xs'] for b in data['xs'] if b < 0] == []"
+XS = list(range(10_000))
+SLOW_JS = "(() => { for (;;) {} })()"
+
+
+def _limits(
+    time_ms: float = 50, memory_mb: float = 8, eval_time_ms: float = 0
+) -> ExprLimits:
+    budget = ExprBudget(
+        expr_time_ms=time_ms, expr_memory_mb=memory_mb, eval_time_ms=eval_time_ms
+    )
+    return ExprLimits(budget)
+
+
+def _plan(validator: str, engine: ExprEngine = "python") -> FlowPlan:
+    return FlowPlan(
+        "checkout",
+        [
+            Node(id="cart", flow="checkout", type="act", created_at=CREATED_AT),
+            Node(
+                id="paid",
+                flow="checkout",
+                type="assert",
+                dep_ids=["cart"],
+                validator=Expr(engine=engine, script=validator),
+                created_at=CREATED_AT,
+            ),
+        ],
+    )
+
+
+def _events(**data: Any) -> list[Event]:
+    return [
+        Event(id="ev_cart", run_id="run_1", flow="checkout", node_id="cart", ts=1),
+        Event(
+            id="ev_paid",
+            run_id="run_1",
+            flow="checkout",
+            node_id="paid",
+            data=data,
+            ts=2,
+        ),
+    ]
+
+
+@pytest.fixture
+def budgets(monkeypatch):
+    """Override flow budgets, and reset the breach counters."""
+    overrides: dict[str, dict[str, Any]] = {}
+    monkeypatch.setattr("src.execution.budget.FLOW_BUDGETS", overrides)
+    get_budget_metrics().clear()
+    yield overrides
+    get_budget_metrics().clear()
+
+
+class TestEngineLimits:
+    """Each engine stops calls that run over their limits."""
+
+    def test_python_time_budget(self):
+        expr = Expr(engine="python", script=SLOW_PYTHON)
+
+        with pytest.raises(ExprBudgetExceeded) as exc_info:
+            PythonEvaluator().evaluate(expr, {"xs": XS}, {}, _limits())
+
+        assert exc_info.value.kind == "time"
+        assert "time budget (50 ms per event)" in exc_info.value.reason
+
+    def test_python_memory_budget(self):
+        evaluator = PythonEvaluator()
+        expr = Expr(engine="python", script="len('x' * 10**7) > 0")
+
+        with pytest.raises(ExprBudgetExceeded) as exc_info:
+            evaluator.evaluate_many(expr, [{}, {}], {}, _limits())
+
+        assert exc_info.value.kind == "memory"
+        assert evaluator.evaluate(expr, {}, {}, _limits(memory_mb=0)) is True
+
+    @pytest.mark.parametrize(
+        "script",
+        [
+            "'%0100000000d' % 1",
+            "'%*d' % (100000000, 1)",
+            "b'%.100000000f' % 1.0",
+            "'{:>100000000}'.format(1)",
+            "'{:>{}}'.format(1, 100000000)",
+            "f'{1:>100000000}'",
+            "str(data['n']).zfill(100000000)",
+            "'a'.ljust(100000000)",
+            "str.rjust('a', 100000000)",
+            "'a'.center(100000000)",
+            "'\\t'.expandtabs(100000000)",
+            "('a' * 1000).join(['b'] * 100000)",
+            "(1).to_bytes(100000000)",
+            "'a'.__mul__(100000000)",
+            "(1.0).__format__('.100000000f')",
+        ],
+    )
+    def test_python_memory_budget_sized_calls(self, script):
+        expr = Expr(engine="python", script=f"len({script}) > 0")
+
+        with pytest.raises(ExprBudgetExceeded) as exc_info:
+            PythonEvaluator().evaluate(expr, {"n": 1}, {}, _limits())
+
+        assert exc_info.value.kind == "memory"
+
+    @pytest.mark.parametrize(
+        ("script", "expected"),
+        [
+            ("'%05.1f|%s' % (1.5, 'a')", "001.5|a"),
+            ("'{:>4}|{!r}'.format('a', 1)", "   a|1"),
+            ("f'{data[\"n\"]:03d}|{1.25:.1f}|{2!r:>2}'", "001|1.2| 2"),
+            ("'-'.join(str(i) for i in [1, 2])", "1-2"),
+            ("str.join(',', ['a', 'b']).zfill(4)", "0a,b"),
+            ("'ab'.replace('a', 'xy').center(5, '*')", "*xyb*"),
+        ],
+    )
+    def test_sized_calls_within_budget(self, script, expected):
+        expr = Expr(engine="python", script=f"({script}) == {expected!r}")
+
+        assert PythonEvaluator().evaluate(expr, {"n": 1}, {}, _limits()) is True
+
+    def test_js_time_budget(self):
+        expr = Expr(engine="js", script=SLOW_JS)
+
+        with pytest.raises(ExprBudgetExceeded) as exc_info:
+            JSEvaluator().evaluate_many(expr, [{}, {}], {}, _limits(time_ms=20))
+
+        assert exc_info.value.kind == "time"
+
+    def test_js_memory_budget(self):
+        script = "(() => { const a = []; for (;;) { a.push('x' + a.length) } })()"
+        expr = Expr(engine="js", script=script)
+
+        with pytest.raises(ExprBudgetExceeded) as exc_info:
+            JSEvaluator().evaluate(expr, {}, {}, _limits(time_ms=0, memory_mb=2))
+
+        assert exc_info.value.kind == "memory"
+
+    def test_cel_cost_budget(self):
+        expr = Expr(engine="cel", script="data.items.exists(x, x < 0)")
+
+        with pytest.raises(ExprBudgetExceeded) as exc_info:
+            CELEvaluator(max_cost=100).evaluate(
+                expr, {"items": list(range(1_000))}, {}, _limits()
+            )
+
+        assert exc_info.value.kind == "cost"
+
+    @pytest.mark.parametrize(
+        ("evaluator", "expr"),
+        [
+            (PythonEvaluator(), Expr(engine="python", script="data['n'] * 2 == 4")),
+            (JSEvaluator(), Expr(engine="js", script="data.n * 2 === 4")),
+            (CELEvaluator(), Expr(engine="cel", script="data.n * 2 == 4")),
+        ],
+    )
+    def test_calls_within_budget_are_unaffected(self, evaluator, expr):
+        limits = _limits()
+
+        assert evaluator.evaluate(expr, {"n": 2}, {}, limits) is True
+        assert evaluator.evaluate_many(expr, [{"n": 2}, {"n": 3}], {}, limits) == [
+            True,
+            False,
+        ]
+
+    def test_evaluation_budget_is_shared(self, budgets):
+        budgets["checkout"] = {"expr_time_ms": 0, "eval_time_ms": 30}
+        expr = Expr(engine="python", script=SLOW_PYTHON).with_origin("checkout", "a")
+        evaluator = MultiEvaluator(native=False)
+
+        with evaluation_budget("checkout"):
+            with pytest.raises(ExprBudgetExceeded) as exc_info:
+                evaluator.evaluate(expr, {"xs": XS}, {})
+            # The deadline has passed: later calls fail right away
+            with pytest.raises(ExprBudgetExceeded):
+                evaluator.evaluate(Expr(engine="python", script="True"), {}, {})
+
+        assert exc_info.value.kind == "evaluation_time"
+
+    def test_evaluation_budget_reaches_layer_threads(self, budgets):
+        budgets["checkout"] = {"eval_time_ms": 1_000}
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            with evaluation_budget("checkout"):
+                limits = current_limits("checkout")
+                in_threads = map_layer(
+                    lambda _: current_limits("checkout"), ["a", "b"], executor
+                )
+
+        assert limits.eval_deadline_ns is not None
+        assert all(other is limits for other in in_threads)
+
+
+class TestFlowBudgets:
+    """Budgets are configured per flow, and breaches counted."""
+
+    def test_flow_overrides(self, budgets):
+        budgets["checkout"] = {"expr_time_ms": 5}
+
+        assert flow_budget("checkout")["expr_time_ms"] == 5
+        assert (
+            flow_budget("checkout")["expr_memory_mb"]
+            == flow_budget(None)["expr_memory_mb"]
+        )
+        assert flow_budget("signup") == flow_budget(None)
+
+    def test_breaches_are_counted_per_flow(self, budgets):
+        budgets["checkout"] = {"expr_time_ms": 20}
+        expr = Expr(engine="js", script=SLOW_JS).with_origin("checkout", "a")
+
+        with pytest.raises(ExprBudgetExceeded):
+            MultiEvaluator().evaluate(expr, {}, {})
+
+        stats = get_budget_metrics().stats()
+        assert stats["breaches"] == 1
+        assert stats["by_kind"] == {"time": 1}
+        assert stats["by_flow"] == {"checkout": 1}
+
+
+class TestErrorStatus:
+    """A node whose expression runs over budget has the "error" status."""
+
+    def test_validator_over_budget(self, budgets):
+        budgets["checkout"] = {"expr_time_ms": 20}
+        plan = _plan(SLOW_PYTHON)
+
+        output = evaluate_events(
+            _events(xs=XS), plan.flow_graph, plan.layers, MultiEvaluator(native=False)
+        )
+
+        assert output.status == "error"
+        item = next(i for i in output.exec_info if i.node_id == "paid")
+        assert item.status == "error"
+        assert item.error is not None
+        assert "time budget" in item.error
+        assert item.ev_ids == ["ev_paid"]
+
+    def test_other_flows_keep_their_budget(self, budgets):
+        budgets["signup"] = {"expr_time_ms": 1}
+        plan = _plan("data['total'] > 0")
+
+        output = evaluate_events(
+            _events(total=10), plan.flow_graph, plan.layers, MultiEvaluator()
+        )
+
+        assert output.status == "passed"
+
+    def test_incremental_state_retries_errored_nodes(self, budgets):
+        budgets["checkout"] = {"expr_time_ms": 1}
+        plan = _plan(SLOW_PYTHON)
+        evaluator = MultiEvaluator(native=False)
+        state = RunState("fp")
+
+        with evaluation_budget("checkout"):
+            result = apply_events(
+                state, _events(xs=XS[:1_000]), plan.flow_graph, plan.layers, evaluator
+            )
+        assert result["status"] == "error"
+
+        # Re-validated on the next batch, even without new events
+        budgets.clear()
+        with evaluation_budget("checkout"):
+            result = apply_events(state, [], plan.flow_graph, plan.layers, evaluator)
+        assert result["status"] == "passed"
@@ -0,0 +1,229 @@
+"""Tests for the CEL expression evaluator."""
+
+from typing import Any
+
+import pytest
+
+from src.execution.cel_eval import (
+    INT64_MIN,
+    CELCostExceededError,
+    CELError,
+    CELEvaluator,
+    CELSyntaxError,
+    compile_cel,
+)
+from src.execution.profiling import expression_error_count
+from src.models import Expr
+
+CTX: dict[str, Any] = {
+    "deps": [{"flow": "checkout", "id": "cart", "data": {"total": 10}}],
+    "data": {"total": 10},
+}
+
+
+@pytest.fixture
+def evaluator():
+    return CELEvaluator()
+
+
+def _eval(script: str, data: dict[str, Any] | None = None) -> Any:
+    return CELEvaluator().eval_expr(script, {"data": data or {}, "ctx": CTX})
+
+
+class TestLanguage:
+    """CEL semantics of the supported subset."""
+
+    @pytest.mark.parametrize(
+        ("script", "expected"),
+        [
+            ("1 + 2 * 3", 7),
+            ("7 / 2", 3),
+            ("-7 / 2", -3),
+            ("-7 % 3", -1),
+            ("7.0 / 2.0", 3.5),
+            ("1.0 / 0.0", float("inf")),
+            ("0x10 + 1u", 17),
+            ("-9223372036854775808", INT64_MIN),
+            ("'a' + \"b\" + '''c'''", "abc"),
+            ("r'\\d' == '\\\\d'", True),
+            ("'\\u00e9' == 'é'", True),
+            ("b'\\xff'.size()", 1),
+            ("size('héllo')", 5),
+            ("[1, 2] + [3]", [1, 2, 3]),
+            ("{'a': 1}['a']", 1),
+            ("1 == 1.0", True),
+            ("1 == '1'", False),
+            ("true == 1", False),
+            ("[1, [2]] == [1, [2.0]]", True),
+            ("2 in [1, 2]", True),
+            ("'a' in {'a': 1}", True),
+            ("null == null", True),
+            ("1 < 2.5 && 'a' < 'b'", True),
+            ("true ? 'y' : 'n'", "y"),
+            ("int('42') + int(2.9)", 44),
+            ("double(1) + 0.5", 1.5),
+            ("string(1.5) + string(100.0) + string(true)", "1.5100true"),
+            ("bool('true')", True),
+            ("'hello'.contains('ell') && 'hello'.startsWith('he')", True),
+            ("'hello'.endsWith('lo')", True),
+            ("[1, 2, 3].all(x, x > 0)", True),
+            ("[1, 2, 3].exists(x, x > 2)", True),
+            ("[1, 2, 3].exists_one(x, x > 1)", False),
+            ("[1, 2, 3].map(x, x * 2)", [2, 4, 6]),
+            ("[1, 2, 3].map(x, x > 1, x * 2)", [4, 6]),
+            ("[1, 2, 3].filter(x, x != 2)", [1, 3]),
+            ("{'a': 1, 'b': 2}.all(k, k.size() == 1)", True),
+            ("[[1], [2, 3]].exists(x, x.exists(x, x == 3))", True),
+        ],
+    )
+    def test_expressions(self, script, expected):
+        assert _eval(script) == expected
+
+    def test_data_and_ctx(self):
+        data = {"amount": 10, "nested": {"tags": ["vip"]}}
+
+        assert _eval("data.amount == ctx.data.total", data) is True
+        assert _eval("ctx.deps[0].data.total == data['amount']", data) is True
+        assert _eval("'vip' in data.nested.tags", data) is True
+
+    def test_has(self):
+        assert _eval("has(data.amount)", {"amount": None}) is True
+        assert _eval("has(data.amount)", {}) is False
+        assert _eval("has(data.a.b)", {"a": {"b": 1}}) is True
+
+    @pytest.mark.parametrize(
+        "script",
+        [
+            "data.missing",
+            "data.amount.field",
+            "[1][1]",
+            "1 / 0",
+            "1 % 0",
+            "1 + 1.0",
+            "'a' < 1",
+            "9223372036854775807 + 1",
+            "-(-9223372036854775808)",
+            "!1",
+            "1 ? true : false",
+            "int('x')",
+            "int(1e100)",
+            "uint(-1)",
+            "{'a': 1, 'a': 2}",
+            "{1.5: 1}",
+            "[1, 'a'].all(x, x > 0)",
+            "[1, 2].exists_one(x, x.y)",
+        ],
+    )
+    def test_runtime_errors(self, script):
+        with pytest.raises(CELError):
+            _eval(script, {"amount": 1})
+
+    def test_logical_operators_absorb_errors(self):
+        assert _eval("data.missing || true") is True
+        assert _eval("false && data.missing") is False
+        assert _eval("data.missing && false") is False
+        assert _eval("[0, 1].exists(x, 1 / x == 1)") is True
+        assert _eval("[0, 1].all(x, 1 / x == 2)") is False
+
+        with pytest.raises(CELError):
+            _eval("data.missing || false")
+
+    def test_comprehension_variable_is_scoped(self):
+        with pytest.raises(CELSyntaxError):
+            compile_cel("[1].all(x, true) && x > 0")
+
+    @pytest.mark.parametrize(
+        "script",
+        [
+            "",
+            "data.",
+            "data.amount >",
+            "(data.amount",
+            "amount > 0",
+            "import > 0",
+            "data.s.matches('a+')",
+            "unknown(1)",
+            "size(1, 2)",
+            "has(data)",
+            "[1].all(1, true)",
+            "[1].all(data, true)",
+            "data.amount = 1",
+            "18446744073709551616u",
+            "'\\q'",
+            "(" * 100 + "1" + ")" * 100,
+        ],
+    )
+    def test_invalid_scripts_fail_to_compile(self, script):
+        with pytest.raises(CELSyntaxError):
+            compile_cel(script)
+
+    def test_programs_are_compiled_once(self):
+        assert compile_cel("data.x == 1") is compile_cel("data.x == 1")
+
+
+class TestCostBudget:
+    """Each call runs under a bounded cost."""
+
+    def test_exceeding_budget_raises(self):
+        evaluator = CELEvaluator(max_cost=1_000)
+        items = list(range(100))
+
+        assert evaluator.eval_expr("data.all(x, x >= 0)", {"data": items[:10]})
+        with pytest.raises(CELCostExceededError):
+            evaluator.eval_expr("data.all(x, data.all(y, y >= 0))", {"data": items})
+
+    def test_building_large_values_is_charged(self):
+        evaluator = CELEvaluator(max_cost=1_000)
+
+        with pytest.raises(CELCostExceededError):
+            evaluator.eval_expr("data.s + data.s == ''", {"data": {"s": "x" * 100_000}})
+
+    def test_budget_is_not_shared_between_calls(self):
+        evaluator = CELEvaluator(max_cost=1_000)
+        expr = Expr(engine="cel", script="data.items.all(x, x >= 0)")
+        items = [{"items": list(range(100))}] * 50
+
+        assert evaluator.evaluate_many(expr, items, {}) == [True] * 50
+
+    def test_over_budget_call_is_false(self):
+        evaluator = CELEvaluator(max_cost=100)
+        expr = Expr(engine="cel", script="data.items.exists(x, x < 0)")
+        errors_before = expression_error_count()
+
+        assert evaluator.evaluate(expr, {"items": list(range(1_000))}, {}) is False
+        assert expression_error_count() == errors_before + 1
+
+
+class TestCELEvaluator:
+    """ExprEvaluator behavior: never raises, False on errors."""
+
+    def test_evaluate(self, evaluator):
+        expr = Expr(engine="cel", script="data.amount > 0 && has(ctx.data.total)")
+
+        assert evaluator.evaluate(expr, {"amount": 100}, CTX) is True
+        assert evaluator.evaluate(expr, {"amount": 0}, CTX) is False
+
+    def test_evaluate_many(self, evaluator):
+        expr = Expr(engine="cel", script="data.status == 'approved'")
+        items = [{"status": "approved"}, {"status": "rejected"}, {}]
+
+        assert evaluator.evaluate_many(expr, items, {}) == [True, False, False]
+        assert evaluator.evaluate_many(expr, [], {}) == []
+
+    @pytest.mark.parametrize(
+        "script",
+        ["data.amount >", "data.missing > 0", "data.amount", "1 / 0 == 1"],
+    )
+    def test_errors_return_false(self, evaluator, script):
+        expr = Expr(engine="cel", script=script)
+        errors_before = expression_error_count()
+
+        assert evaluator.evaluate(expr, {"amount": 1}, {}) is False
+        assert evaluator.evaluate_many(expr, [{"amount": 1}] * 2, {}) == [False] * 2
+        assert expression_error_count() == errors_before + 3
+
+    def test_rejects_other_engines(self, evaluator):
+        expr = Expr(engine="python", script="True")
+
+        assert evaluator.evaluate(expr, {}, {}) is False
+        assert evaluator.evaluate_many(expr, [{}], {}) == [False]
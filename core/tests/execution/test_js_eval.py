@@ -1,8 +1,11 @@
 """Tests for JavaScript expression evaluator."""
 
+from contextlib import nullcontext
+from typing import Any
+
 import pytest
 
-from src.execution.js_eval import JSEvaluator
+from src.execution.js_eval import JSContextPool, JSEvaluator, js_value_scope
 from src.models import Expr
 
 
@@ -371,3 +374,209 @@ return data.item_count > 0 && data.total > 0"""
         expr = Expr(engine="js", script=script)
         result = evaluator.evaluate(expr, {"message": "please return the item"}, {})
         assert result is True
+
+
+class TestContextPool:
+    """Test pooled QuickJS contexts and the per-script function cache."""
+
+    def test_script_compiled_once(self):
+        """Test repeated evaluations reuse the compiled function."""
+        evaluator = JSEvaluator(pool=JSContextPool())
+        expr = Expr(engine="js", script="data.amount > 0")
+
+        for amount in range(1, 6):
+            assert evaluator.evaluate(expr, {"amount": amount}, {}) is True
+
+        stats = evaluator.pool.stats()
+        assert stats["contexts_created"] == 1
+        assert stats["compiles"] == 1
+        assert stats["hits"] == 4
+
+    def test_context_recycled_after_max_calls(self):
+        """Test contexts are replaced once they reach their call budget."""
+        evaluator = JSEvaluator(pool=JSContextPool(max_calls=2))
+        expr = Expr(engine="js", script="data.amount > 0")
+
+        for _ in range(5):
+            assert evaluator.evaluate(expr, {"amount": 1}, {}) is True
+
+        stats = evaluator.pool.stats()
+        assert stats["contexts_created"] == 3
+        assert stats["contexts_retired"] == 2
+
+    def test_context_recycled_after_max_age(self):
+        """Test contexts are replaced once they exceed their lifetime."""
+        evaluator = JSEvaluator(pool=JSContextPool(max_age_seconds=0))
+        expr = Expr(engine="js", script="data.amount > 0")
+
+        evaluator.evaluate(expr, {"amount": 1}, {})
+        evaluator.evaluate(expr, {"amount": 1}, {})
+
+        assert evaluator.pool.stats()["contexts_created"] == 2
+
+    def test_memory_limit_fails_expression(self):
+        """Test an expression exceeding the memory limit evaluates to False."""
+        evaluator = JSEvaluator(pool=JSContextPool(memory_limit_bytes=4 * 1024 * 1024))
+        expr = Expr(
+            engine="js",
+            script="const a = []; while (true) { a.push('x'.repeat(1024)); } return true;",
+        )
+
+        assert evaluator.evaluate(expr, {}, {}) is False
+
+        # The context stays usable after running out of memory
+        ok = Expr(engine="js", script="data.amount > 0")
+        assert evaluator.evaluate(ok, {"amount": 1}, {}) is True
+
+    def test_same_script_with_different_variables(self):
+        """Test functions are cached per script and parameter names."""
+        evaluator = JSEvaluator(pool=JSContextPool())
+
+        assert evaluator.eval_expr("a + 1", {"a": 1}) == 2
+        assert evaluator.eval_expr("a + 1", {"b": 0, "a": 2}) == 3
+        assert evaluator.pool.stats()["compiles"] == 2
+
+    @pytest.mark.parametrize("scoped", [False, True])
+    def test_scripts_cannot_affect_later_scripts(self, scoped):
+        """Test globals and intrinsics set by a script are not visible later."""
+        evaluator = JSEvaluator(pool=JSContextPool())
+        polluting = Expr(
+            engine="js",
+            script=(
+                "leaked = 1; globalThis.leakedToo = 1; "
+                "Object.prototype.polluted = 1; Array.prototype.includes = null; "
+                "JSON.parse = null; return true;"
+            ),
+        )
+        clean = Expr(
+            engine="js",
+            script=(
+                "typeof leaked === 'undefined' && typeof leakedToo === 'undefined' "
+                "&& data.polluted === undefined && [1].includes(1) "
+                "&& JSON.parse('1') === 1"
+            ),
+        )
+
+        with js_value_scope() if scoped else nullcontext():
+            assert evaluator.evaluate(polluting, {}, {}) is True
+            assert evaluator.evaluate(clean, {}, {}) is True
+        assert evaluator.pool.stats()["contexts_created"] == 1
+
+    @pytest.mark.parametrize("scoped", [False, True])
+    def test_scripts_cannot_mutate_shared_values(self, scoped):
+        """Test a script changing its data or ctx doesn't change them for others."""
+        evaluator = JSEvaluator(pool=JSContextPool())
+        data = {"amount": 10, "items": [3, 1, 2]}
+        ctx = _ctx({"x": 1})
+        mutating = Expr(
+            engine="js",
+            script=(
+                "data.amount = -1; data.extra = 1; delete data.items; "
+                "ctx.deps[0].data.x = 99; ctx.deps.length = 0; ctx.data = null; "
+                "return true;"
+            ),
+        )
+        sorting = Expr(engine="js", script="data.items.sort()")
+        reading = Expr(
+            engine="js",
+            script=(
+                "data.amount > 0 && data.extra === undefined "
+                "&& data.items.join() === '3,1,2' && ctx.deps.length === 1 "
+                "&& ctx.deps[0].data.x === 1 && ctx.data.x === 1"
+            ),
+        )
+
+        with js_value_scope() if scoped else nullcontext():
+            assert evaluator.evaluate(mutating, data, ctx) is True
+            assert evaluator.evaluate(sorting, data, ctx) is False
+            assert evaluator.evaluate(reading, data, ctx) is True
+        assert data == {"amount": 10, "items": [3, 1, 2]}
+
+
+def _ctx(*deps: dict[str, Any]) -> dict[str, Any]:
+    """A ctx shaped like the ones build_upstream_ctx returns."""
+    ctx: dict[str, Any] = {
+        "deps": [{"flow": "f", "id": f"n{i}", "data": d} for i, d in enumerate(deps)]
+    }
+    if len(deps) == 1:
+        ctx["data"] = deps[0]
+    return ctx
+
+
+class TestValueScope:
+    """Test event data and contexts are loaded into QuickJS once per scope."""
+
+    def test_values_loaded_once_per_scope(self):
+        """Test a node's filter and validator reuse the loaded ctx and data."""
+        evaluator = JSEvaluator(pool=JSContextPool())
+        upstream = {"items": [1, 2, 3]}
+        items = [{"n": 1}, {"n": 2}]
+        filter_expr = Expr(engine="js", script="ctx.data.items.length === 3")
+        validator = Expr(engine="js", script="data.n <= ctx.deps[0].data.items[1]")
+
+        with js_value_scope():
+            # Each call builds its own ctx dict, like the evaluation does
+            assert evaluator.evaluate_many(filter_expr, items, _ctx(upstream)) == [
+                True,
+                True,
+            ]
+            assert evaluator.evaluate_many(validator, items, _ctx(upstream)) == [
+                True,
+                True,
+            ]
+            assert evaluator.evaluate(validator, items[0], _ctx(upstream)) is True
+
+        stats = evaluator.pool.stats()
+        # The upstream data, the ctx and the two items
+        assert stats["values_loaded"] == 4
+        assert stats["values_reused"] == 7
+
+    def test_values_converted_per_call_outside_scope(self):
+        """Test nothing is kept between calls outside of a scope."""
+        evaluator = JSEvaluator(pool=JSContextPool())
+        expr = Expr(engine="js", script="data.n === ctx.data.n")
+        data = {"n": 1}
+
+        assert evaluator.evaluate(expr, data, _ctx(data)) is True
+        assert evaluator.evaluate(expr, data, _ctx(data)) is True
+
+        stats = evaluator.pool.stats()
+        assert stats["values_loaded"] == 0
+        assert stats["values_reused"] == 0
+
+    def test_ctx_shape(self):
+        """Test contexts assembled in QuickJS match the Python ctx."""
+        evaluator = JSEvaluator(pool=JSContextPool())
+        script = (
+            "JSON.stringify(ctx) === JSON.stringify(expected) "
+            "&& (!ctx.deps || ctx.deps.length !== 1 || ctx.data === ctx.deps[0].data)"
+        )
+
+        with js_value_scope():
+            for ctx in [
+                _ctx(),
+                _ctx({"a": 1}),
+                _ctx({"a": 1}, {"b": [2]}),
+                {"deps": [], "extra": True},
+                {"data": {"a": 1}},
+            ]:
+                result = evaluator.eval_expr(
+                    script, {"ctx": ctx, "expected": dict(ctx)}
+                )
+                assert result is True, ctx
+
+    def test_scopes_do_not_share_values(self):
+        """Test a new scope loads its values again."""
+        evaluator = JSEvaluator(pool=JSContextPool())
+        expr = Expr(engine="js", script="data.n === ctx.data.n")
+        data = {"n": 1}
+
+        for _ in range(2):
+            with js_value_scope():
+                assert evaluator.evaluate(expr, data, _ctx(data)) is True
+                assert evaluator.evaluate(expr, data, _ctx(data)) is True
+
+        stats = evaluator.pool.stats()
+        # Per scope: the data and the ctx are loaded once
+        assert stats["values_loaded"] == 4
+        assert stats["values_reused"] == 8
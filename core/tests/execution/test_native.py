@@ -0,0 +1,144 @@
+"""Tests for native predicates of simple expressions."""
+
+from typing import Any
+
+import pytest
+
+from src.eval.eval import MultiEvaluator
+from src.execution.js_eval import JSEvaluator
+from src.execution.native import native_predicate
+from src.execution.profiling import ExprProfiler
+from src.execution.python_eval import PythonEvaluator
+from src.models import Expr
+
+CTX: dict[str, Any] = {
+    "deps": [{"flow": "checkout", "id": "cart", "data": {"total": 10}}],
+    "data": {"total": 10},
+}
+
+ITEMS: list[dict[str, Any]] = [
+    {"amount": 10, "status": "approved", "tags": ["vip"], "total": 10, "ok": True},
+    {"amount": 0, "status": "rejected", "tags": [], "total": 11, "ok": False},
+    {"amount": -1.5, "status": "", "tags": ["a", "b"], "total": 10.0, "ok": 1},
+    {"amount": "10", "status": None, "tags": "vip", "total": "10"},
+    {"amount": True, "status": "😀", "nested": {"a": [1, {"b": 2}]}},
+    {},
+]
+
+PYTHON_SCRIPTS = [
+    "data['amount'] > 0",
+    "data['status'] == 'approved'",
+    "data['status'] != 'approved' and data['amount'] >= 0",
+    "data['status'] in ('approved', 'pending') or not data['ok']",
+    "len(data['tags']) > 0",
+    "'vip' in data['tags']",
+    "'vip' not in data['tags']",
+    "data['total'] == ctx['data']['total']",
+    "ctx['deps'][0]['data']['total'] == data['total']",
+    "0 <= data['amount'] < 10",
+    "data['status'] is None",
+    "data['nested']['a'][1]['b'] == 2",
+    "data['ok']",
+    "data['amount'] and data['ok']",
+    "not data",
+]
+
+JS_SCRIPTS = [
+    "data.amount > 0",
+    "data.status === 'approved'",
+    'data.status !== "approved" && data.amount >= 0',
+    "data.status === 'approved' || !data.ok",
+    "data.tags.length > 0",
+    "'vip' in data",
+    "data.total === ctx.data.total",
+    "ctx.deps[0].data.total == data.total",
+    "data.amount == '10'",
+    "data.status == null",
+    "data.status === undefined",
+    "data.nested.a[1].b === 2",
+    "data.status.length === 2",
+    "data.missing.field === 1",
+    "data.ok",
+    "data['amount'] < -1",
+    "(data.amount > 0);",
+    "data.toString === undefined",
+]
+
+
+@pytest.mark.parametrize("script", PYTHON_SCRIPTS)
+def test_python_native_matches_engine(script):
+    expr = Expr(engine="python", script=script)
+    assert native_predicate(expr) is not None
+
+    evaluator = MultiEvaluator(native=True)
+    native = [evaluator.evaluate(expr, data, CTX) for data in ITEMS]
+
+    assert native == PythonEvaluator().evaluate_many(expr, ITEMS, CTX)
+
+
+@pytest.mark.parametrize("script", JS_SCRIPTS)
+def test_js_native_matches_engine(script):
+    expr = Expr(engine="js", script=script)
+    assert native_predicate(expr) is not None
+
+    native = MultiEvaluator(native=True).evaluate_many(expr, ITEMS, CTX)
+
+    assert native == JSEvaluator().evaluate_many(expr, ITEMS, CTX)
+
+
+@pytest.mark.parametrize(
+    ("engine", "script"),
+    [
+        ("python", "data['amount'] + 1 > 0"),
+        ("python", "data.get('amount')"),
+        ("python", "[x for x in data]"),
+        ("python", "data['tags'][0:1]"),
+        ("python", "amount > 0"),
+        ("js", "data.tags.includes('vip')"),
+        ("js", "data.amount + 1 > 0"),
+        ("js", "data.amount > 0; data.ok"),
+        ("js", "return data.amount > 0"),
+        ("js", "data.returned === true"),
+        ("js", "data.amount === 010"),
+        ("js", "typeof data.amount === 'number'"),
+        ("js", "data.a?.b"),
+        ("js", "'it\\'s' === data.status"),
+        ("cel", "data.amount > 0"),
+    ],
+)
+def test_unsupported_scripts_are_not_compiled(engine, script):
+    assert native_predicate(Expr(engine=engine, script=script)) is None
+
+
+class TestNativeProfiling:
+    """Profiling reports the engine that handled each call."""
+
+    def test_native_and_fallback_calls_are_reported_separately(self):
+        profiler = ExprProfiler(enabled=True)
+        evaluator = MultiEvaluator(profiler=profiler, native=True)
+        expr = Expr(engine="js", script="data.amount == 10")
+
+        # "10" == 10 coerces: the engine handles that item
+        evaluator.evaluate_many(expr, [{"amount": 10}, {"amount": "10"}], {})
+
+        items_by_engine = {p["engine"]: p["items"] for p in profiler.report()}
+        assert items_by_engine == {"js-native": 1, "js": 1}
+
+    def test_python_batches_use_engine(self):
+        profiler = ExprProfiler(enabled=True)
+        evaluator = MultiEvaluator(profiler=profiler, native=True)
+        expr = Expr(engine="python", script="data['ok']")
+
+        evaluator.evaluate_many(expr, [{"ok": True}], {})
+        evaluator.evaluate_many(expr, [{"ok": True}, {"ok": False}], {})
+
+        items_by_engine = {p["engine"]: p["items"] for p in profiler.report()}
+        assert items_by_engine == {"python-native": 1, "python": 2}
+
+    def test_disabled_native_uses_engine(self):
+        profiler = ExprProfiler(enabled=True)
+        evaluator = MultiEvaluator(profiler=profiler, native=False)
+
+        evaluator.evaluate(Expr(engine="python", script="True"), {}, {})
+
+        assert [p["engine"] for p in profiler.report()] == ["python"]
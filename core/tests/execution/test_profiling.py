@@ -0,0 +1,96 @@
+"""Tests for per-expression profiling."""
+
+from datetime import UTC, datetime
+
+from src.eval.eval import MultiEvaluator
+from src.eval.plan import FlowPlan
+from src.execution.profiling import ExprProfiler, script_hash
+from src.models import Expr, Node
+
+CREATED_AT = datetime(2026, 1, 1, tzinfo=UTC)
+
+
+class TestExprProfiler:
+    """Collecting and reporting expression statistics."""
+
+    def test_records_calls_per_expression(self):
+        profiler = ExprProfiler(enabled=True)
+        expr = Expr(engine="python", script="True").with_origin("checkout", "a")
+
+        for elapsed_ms in range(1, 101):
+            profiler.record(expr, elapsed_ms * 1_000_000)
+
+        [profile] = profiler.report()
+        assert profile["flow"] == "checkout"
+        assert profile["node_id"] == "a"
+        assert profile["script_hash"] == script_hash("True")
+        assert profile["calls"] == 100
+        assert profile["total_ms"] == 5050
+        assert profile["p50_ms"] == 51
+        assert profile["p99_ms"] == 100
+        assert profile["max_ms"] == 100
+
+    def test_report_is_sorted_filtered_and_limited(self):
+        profiler = ExprProfiler(enabled=True)
+        fast = Expr(engine="python", script="1").with_origin("checkout", "a")
+        slow = Expr(engine="python", script="2").with_origin("checkout", "b")
+        other = Expr(engine="python", script="3").with_origin("signup", "c")
+
+        profiler.record(fast, 1_000)
+        profiler.record(slow, 5_000)
+        profiler.record(other, 9_000)
+
+        assert [p["node_id"] for p in profiler.report()] == ["c", "b", "a"]
+        assert [p["node_id"] for p in profiler.report(flow="checkout")] == ["b", "a"]
+        assert len(profiler.report(limit=1)) == 1
+
+        profiler.clear()
+        assert profiler.report() == []
+
+
+class TestMultiEvaluatorProfiling:
+    """MultiEvaluator records calls while profiling is enabled."""
+
+    def test_attributes_plan_expressions_to_their_node(self):
+        plan = FlowPlan(
+            "checkout",
+            [
+                Node(
+                    id="paid",
+                    flow="checkout",
+                    filter={"engine": "python", "script": "data['ok']"},
+                    created_at=CREATED_AT,
+                )
+            ],
+        )
+        expr = plan.flow_graph["nodes"]["paid"].filter
+        profiler = ExprProfiler(enabled=True)
+        evaluator = MultiEvaluator(profiler=profiler, native=False)
+
+        evaluator.evaluate(expr, {"ok": True}, {})
+        evaluator.evaluate_many(expr, [{"ok": True}, {"ok": False}], {})
+
+        [profile] = profiler.report()
+        assert (profile["flow"], profile["node_id"]) == ("checkout", "paid")
+        assert profile["calls"] == 2
+        assert profile["items"] == 3
+        assert profile["errors"] == 0
+
+    def test_counts_errors(self):
+        profiler = ExprProfiler(enabled=True)
+        evaluator = MultiEvaluator(profiler=profiler)
+
+        result = evaluator.evaluate(
+            Expr(engine="python", script="data['missing']"), {}, {}
+        )
+
+        assert result is False
+        assert profiler.report()[0]["errors"] == 1
+
+    def test_disabled_profiler_records_nothing(self):
+        profiler = ExprProfiler(enabled=False)
+        evaluator = MultiEvaluator(profiler=profiler)
+
+        evaluator.evaluate(Expr(engine="python", script="True"), {}, {})
+
+        assert profiler.report() == []
@@ -2,7 +2,11 @@
 
 import pytest
 
-from src.execution.python_eval import PythonEvaluator
+from src.execution.python_eval import (
+    CompiledExprCache,
+    PythonEvaluator,
+    get_expr_cache,
+)
 from src.models import Expr
 
 
@@ -416,3 +420,51 @@ class TestRandomFunctions:
         """Test random generates values between 0 and 1."""
         result = evaluator.eval_expr("random()", {})
         assert 0 <= result <= 1
+
+
+class TestCompiledExprCache:
+    """Test the compiled expression cache."""
+
+    def test_script_compiled_once(self, evaluator):
+        """Test repeated evaluations reuse the compiled code."""
+        cache = get_expr_cache()
+        script = "data['amount'] > 41 and data['cache_probe'] == 1"
+        expr = Expr(engine="python", script=script)
+
+        before = cache.stats()
+        for amount in range(40, 45):
+            evaluator.evaluate(expr, {"amount": amount, "cache_probe": 1}, {})
+        after = cache.stats()
+
+        assert after["misses"] - before["misses"] == 1
+        assert after["hits"] - before["hits"] == 4
+
+    def test_lru_eviction(self):
+        """Test least recently used scripts are evicted first."""
+        cache = CompiledExprCache(maxsize=2)
+        code_a = cache.get("1 + 1")
+        cache.get("2 + 2")
+        assert cache.get("1 + 1") is code_a  # 'a' is now most recent
+        cache.get("3 + 3")  # evicts '2 + 2'
+
+        stats = cache.stats()
+        assert stats["size"] == 2
+        assert stats["evictions"] == 1
+        assert stats["misses"] == 3
+        assert stats["hits"] == 1
+
+        cache.get("2 + 2")
+        assert cache.stats()["misses"] == 4
+
+    def test_syntax_error_not_cached(self):
+        """Test scripts that fail to compile are not cached."""
+        cache = CompiledExprCache(maxsize=2)
+        with pytest.raises(SyntaxError):
+            cache.get("data['amount' > 0")
+        assert cache.stats()["size"] == 0
+
+    def test_builtins_are_read_only(self, evaluator):
+        """Test scripts cannot modify the shared builtins namespace."""
+        with pytest.raises(AttributeError):
+            evaluator.eval_expr("__builtins__.__setitem__('len', None)", {})
+        assert evaluator.eval_expr("len([1, 2])", {}) == 2
@@ -0,0 +1,168 @@
+"""Tests for Python expressions run in subinterpreters."""
+
+import marshal
+from datetime import UTC, datetime
+
+import pytest
+
+from src.domain.evaluation import ExprBudgetExceeded
+from src.execution import subinterp
+from src.execution.budget import ExprBudget, ExprLimits
+from src.execution.python_eval import PythonEvaluator
+from src.execution.sandbox import run_payload
+from src.execution.subinterp import (
+    SubinterpreterPool,
+    get_subinterpreter_pool,
+    subinterpreters_available,
+)
+from src.models import Expr
+
+SLOW_PYTHON = "[b for a in data['xs'] for b in data['xs'] if b < 0] == []"
+XS = list(range(10_000))
+
+
+def _limits(time_ms: float = 50, memory_mb: float = 8) -> ExprLimits:
+    return ExprLimits(
+        ExprBudget(expr_time_ms=time_ms, expr_memory_mb=memory_mb, eval_time_ms=0)
+    )
+
+
+@pytest.fixture(scope="module")
+def pool():
+    """A pool shared by the tests of this module."""
+    pool = SubinterpreterPool(2)
+    yield pool
+    pool.close()
+
+
+class TestRunPayload:
+    """The sandbox entry point, run in this interpreter."""
+
+    def test_outcomes(self):
+        request = ("data['n'] > ctx['min']", [{"n": 2}, {"n": 0}, {}], {"min": 1})
+
+        status, outcomes = marshal.loads(
+            run_payload(marshal.dumps((*request, None, 0)))
+        )
+
+        assert status == "ok"
+        assert outcomes == [True, False, ("KeyError", "n")]
+
+    def test_non_boolean_and_syntax_error(self):
+        status, outcomes = marshal.loads(
+            run_payload(marshal.dumps(("data['n']", [{"n": 1}], {}, None, 0)))
+        )
+        assert (status, outcomes) == ("ok", ["int"])
+
+        status, outcomes = marshal.loads(
+            run_payload(marshal.dumps(("data[", [{}], {}, None, 0)))
+        )
+        assert status == "ok"
+        assert outcomes[0][0] == "SyntaxError"
+
+    def test_budget(self):
+        payload = marshal.dumps((SLOW_PYTHON, [{"xs": XS}], {}, 20_000_000, 0))
+
+        assert marshal.loads(run_payload(payload)) == ("budget", "time")
+
+
+@pytest.mark.skipif(
+    not subinterpreters_available(),
+    reason="Needs concurrent.interpreters (Python 3.14+)",
+)
+class TestSubinterpreterPool:
+    """PythonEvaluator backed by a subinterpreter pool."""
+
+    @pytest.fixture
+    def evaluator(self, pool):
+        return PythonEvaluator(pool)
+
+    @pytest.mark.parametrize(
+        ("script", "data", "expected"),
+        [
+            ("data['amount'] > 0", {"amount": 100}, True),
+            ("data['amount'] > 0", {"amount": -1}, False),
+            ("data['missing'] > 0", {}, False),
+            ("data['amount']", {"amount": 100}, False),
+            ("data[", {}, False),
+            ("__import__('os')", {}, False),
+        ],
+    )
+    def test_matches_inline_evaluation(self, evaluator, script, data, expected):
+        expr = Expr(engine="python", script=script)
+
+        assert evaluator.evaluate(expr, data, {}) is expected
+        assert PythonEvaluator().evaluate(expr, data, {}) is expected
+
+    def test_evaluate_many(self, evaluator, pool):
+        expr = Expr(engine="python", script="data['n'] * 2 == ctx['data']['n']")
+        items = [{"n": 2}, {"n": 3}, {}, {"n": 2}]
+        calls = pool.stats()["calls"]
+
+        results = evaluator.evaluate_many(expr, items, {"data": {"n": 4}})
+
+        assert results == [True, False, False, True]
+        assert pool.stats()["calls"] == calls + 1
+
+    def test_errors_are_logged(self, evaluator, caplog):
+        expr = Expr(engine="python", script="data['amount'] > 0")
+
+        evaluator.evaluate(expr, {"total": 1}, {})
+
+        assert "KeyError" in caplog.text
+        assert "Available data keys: ['total']" in caplog.text
+
+    def test_time_budget(self, evaluator):
+        expr = Expr(engine="python", script=SLOW_PYTHON)
+
+        with pytest.raises(ExprBudgetExceeded) as exc_info:
+            evaluator.evaluate(expr, {"xs": XS}, {}, _limits())
+
+        assert exc_info.value.kind == "time"
+
+    def test_memory_budget(self, evaluator):
+        expr = Expr(engine="python", script="len('x' * 10**7) > 0")
+
+        with pytest.raises(ExprBudgetExceeded) as exc_info:
+            evaluator.evaluate_many(expr, [{}, {}], {}, _limits())
+
+        assert exc_info.value.kind == "memory"
+        assert evaluator.evaluate(expr, {}, {}, _limits(memory_mb=0)) is True
+
+    def test_unmarshalable_data_runs_inline(self, evaluator, pool):
+        expr = Expr(engine="python", script="data['at'].year == 2026")
+        calls = pool.stats()["calls"]
+
+        assert evaluator.evaluate(expr, {"at": datetime(2026, 1, 1, tzinfo=UTC)}, {})
+        assert pool.stats()["calls"] == calls
+
+    def test_close(self):
+        pool = SubinterpreterPool(1)
+        expr = Expr(engine="python", script="True")
+
+        assert PythonEvaluator(pool).evaluate(expr, {}, {}) is True
+        assert pool.stats()["workers"] == 1
+
+        pool.close()
+        assert pool.stats()["workers"] == 0
+        # Closed pools create subinterpreters again on demand
+        assert PythonEvaluator(pool).evaluate(expr, {}, {}) is True
+        pool.close()
+
+
+class TestWithoutSubinterpreters:
+    """Pythons without concurrent.interpreters run expressions inline."""
+
+    @pytest.fixture(autouse=True)
+    def no_api(self, monkeypatch):
+        monkeypatch.setattr(subinterp, "_api", None)
+        monkeypatch.setattr(subinterp, "_pool", None)
+        monkeypatch.setattr(subinterp, "PYTHON_SUBINTERPRETERS", 2)
+
+    def test_reported_unavailable(self, caplog):
+        assert subinterpreters_available() is False
+        assert get_subinterpreter_pool() is None
+        assert "no subinterpreter support" in caplog.text
+
+        with pytest.raises(RuntimeError):
+            SubinterpreterPool(1)
@@ -0,0 +1,41 @@
+"""Builders shared by the flow evaluation tests."""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from src.domain.evaluation import match_events_to_layers, validate_flow_execution
+from src.domain.graph import build_flow_graph, topological_sort_layers
+from src.domain.types import LayeredEvents, ValidationResult
+from src.eval.eval import MultiEvaluator
+from src.models import Event, Node
+
+
+def make_node(node_id: str, dep_ids: list[str] | None = None, **kwargs: Any) -> Node:
+    """A node of the checkout flow."""
+    return Node(id=node_id, flow="checkout", dep_ids=dep_ids or [], **kwargs)
+
+
+def make_event(ev_id: str, node_id: str, ts: int, **data: Any) -> Event:
+    """An event of run_1 of the checkout flow."""
+    return Event(
+        id=ev_id, run_id="run_1", flow="checkout", node_id=node_id, data=data, ts=ts
+    )
+
+
+def evaluate_run(
+    nodes: list[Node],
+    events: list[Event],
+    evaluator: Any = None,
+    executor: ThreadPoolExecutor | None = None,
+) -> tuple[LayeredEvents, ValidationResult]:
+    """Match a run's events to the flow's layers, then validate them."""
+    evaluator = evaluator or MultiEvaluator()
+    flow_graph = build_flow_graph(nodes)
+    layers = topological_sort_layers(flow_graph["graph"])
+    matched = match_events_to_layers(
+        events, layers, flow_graph["nodes"], evaluator, executor
+    )
+    result = validate_flow_execution(
+        matched, flow_graph["nodes"], layers, evaluator, executor
+    )
+    return matched, result
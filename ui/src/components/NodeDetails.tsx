@@ -52,11 +52,13 @@ export function NodeDetails({ node, onEvalInfoChange, onNodeSelect, allNodes }:
     eventsPage * pageSize
   );
 
+  // Latest evaluation of each run (one row per run)
   const { data: evalOutputs, isLoading: loadingOutputs } = useEvalOutputs(
     node ? [node.flow] : undefined,
     undefined,
     pageSize,
-    runsPage * pageSize
+    runsPage * pageSize,
+    true
   );
 
   const runEval = useRunEval();
@@ -82,6 +82,7 @@ class ApiClient {
   async getEvalOutputs(params: {
     name?: string[];
     ev_id?: string;
+    latest?: boolean;
     limit?: number;
     offset?: number;
   }): Promise<EvalOutput[]> {
@@ -90,6 +91,7 @@ class ApiClient {
       params.name.forEach((n) => query.append("name", n));
     }
     if (params.ev_id) query.append("ev_id", params.ev_id);
+    if (params.latest) query.append("latest", "true");
     if (params.limit) query.append("limit", params.limit.toString());
     if (params.offset) query.append("offset", params.offset.toString());
 
@@ -21,10 +21,16 @@ export function useEvents(flow?: string, node_id?: string, limit = 100, offset =
   });
 }
 
-export function useEvalOutputs(name?: string[], ev_id?: string, limit = 100, offset = 0) {
+export function useEvalOutputs(
+  name?: string[],
+  ev_id?: string,
+  limit = 100,
+  offset = 0,
+  latest = false
+) {
   return useQuery({
-    queryKey: ["eval-outputs", name, ev_id, limit, offset],
-    queryFn: () => apiClient.getEvalOutputs({ name, ev_id, limit, offset }),
+    queryKey: ["eval-outputs", name, ev_id, limit, offset, latest],
+    queryFn: () => apiClient.getEvalOutputs({ name, ev_id, limit, offset, latest }),
     refetchInterval: 5000,
   });
 }